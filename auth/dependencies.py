@@ -34,6 +34,7 @@ from typing import Optional
 from fastapi import Cookie, Depends, HTTPException, Request, Response
 from jose import JWTError, jwt
 
+from database.async_db import run_db
 from services.user_service import UserService
 from utils.logger import get_logger
 
@@ -156,7 +157,17 @@ async def get_current_user(
     Works whether or not REQUIRE_LOGIN is enabled.  When login is required
     but no valid token is present, falls through to anonymous resolution
     (the ``require_login`` wrapper handles the 401).
+
+    Identity lookups hit the users tables, so resolution runs on the DB pool.
     """
+    return await run_db(_resolve_current_user, request, response, aguai_uid)
+
+
+def _resolve_current_user(
+    request: Request,
+    response: Response,
+    aguai_uid: Optional[str],
+) -> UserContext:
     svc = _get_user_service()
 
     # --- 1. Authorization: Bearer <token> ----------------------------------
@@ -181,7 +192,7 @@ async def get_current_user(
 
             # Old login format (has "sub" but no user_id) — resolve identity
             if payload.get("sub") in ("user", "guest"):
-                return await _resolve_from_headers(
+                return _resolve_from_headers(
                     svc, request, response, aguai_uid, login_sub=payload.get("sub"),
                 )
 
@@ -193,7 +204,7 @@ async def get_current_user(
                 return ctx
 
     # --- 2-4. No valid Bearer token — resolve from headers / cookie --------
-    return await _resolve_from_headers(svc, request, response, aguai_uid)
+    return _resolve_from_headers(svc, request, response, aguai_uid)
 
 
 async def require_login(
@@ -225,7 +236,7 @@ async def require_login(
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
-async def _resolve_from_headers(
+def _resolve_from_headers(
     svc: UserService,
     request: Request,
     response: Response,
@@ -0,0 +1,131 @@
+"""
+Async DB access layer
+Runs blocking DatabaseFactory work on a dedicated, bounded thread pool
+
+async 路由/服务不在事件循环上直接跑 sqlite 查询：
+- `await run_db(fn, *args)` 把同步 DB 调用交给 DB 线程池执行
+- `@db_coroutine` 把同步 DB 方法包装成可 await 的协程函数（方法体不变）
+DB 线程是常驻线程，配合 DatabaseFactory 的线程亲和连接池，每个线程复用自己的连接。
+"""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+DB_ASYNC_WORKERS = int(os.getenv("DB_ASYNC_WORKERS", "8"))
+# 同一事件循环上最多同时挂起的 DB 调用数；超出的协程在 await 处排队，不占线程也不阻塞循环
+DB_ASYNC_MAX_PENDING = int(os.getenv("DB_ASYNC_MAX_PENDING", "256"))
+
+
+class AsyncDBExecutor:
+    """
+    DB 专用线程池
+
+    - 固定 max_workers 个线程，慢查询不会占用 asyncio 默认线程池（行情/LLM 等外部调用在用）
+    - 每个事件循环一个 asyncio.Semaphore(max_pending) 做有界排队，压力大时背压到调用方
+    - 执行时复制 contextvars，与 asyncio.to_thread 行为一致
+    """
+
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        self.max_workers = max(1, max_workers or DB_ASYNC_WORKERS)
+        self.max_pending = max(self.max_workers, max_pending or DB_ASYNC_MAX_PENDING)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._in_flight = 0
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "peak_in_flight": 0,
+            "max_queue_wait_ms": 0.0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="db"
+                )
+            return self._executor
+
+    def _slots_for(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_pending)
+        return slots
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        async with self._slots_for(loop):
+            with self._lock:
+                self._in_flight += 1
+                self._stats["calls"] += 1
+                self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+            ctx = contextvars.copy_context()
+            call = functools.partial(fn, *args, **kwargs)
+
+            def _run() -> T:
+                wait_ms = (time.monotonic() - submitted) * 1000
+                with self._lock:
+                    self._stats["max_queue_wait_ms"] = max(self._stats["max_queue_wait_ms"], wait_ms)
+                return ctx.run(call)
+
+            try:
+                return await loop.run_in_executor(self._get_executor(), _run)
+            except Exception:
+                with self._lock:
+                    self._stats["failures"] += 1
+                raise
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                **self._stats,
+                "max_queue_wait_ms": round(self._stats["max_queue_wait_ms"], 2),
+            }
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在 DB 线程池执行同步 DB 调用"""
+    return await db_executor.run(fn, *args, **kwargs)
+
+
+def db_coroutine(fn: Callable[..., T]) -> Callable[..., "asyncio.Future[T]"]:
+    """
+    把同步 DB 函数/方法包装成协程函数：`await obj.method(...)` 时方法体在 DB 线程池执行
+
+    原同步实现保留在 `__wrapped__` 上，供已在线程里的调用方直接使用。
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await db_executor.run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+# Singleton instance
+db_executor = AsyncDBExecutor()
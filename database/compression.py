@@ -0,0 +1,103 @@
+"""
+Text compression
+Transparent compression for large TEXT columns (articles.content / ai_score_json)
+
+压缩后的值以 BLOB 存储，前缀为格式标记 b"\\x00CZ" + 编码字节：
+- b"z"：zlib（标准库，默认）
+- b"s"：zstd（可选依赖 zstandard，未安装时写入回退为 zlib；读取 zstd 值时必须安装）
+
+未压缩的 TEXT 原样保留，新旧格式可在同一列混存；读取统一走 unpack_text()。
+SQLite 连接上注册同名 SQL 函数 unpack_text(x)（见 register_sqlite_functions），
+供 FTS 视图/触发器与脚本在 SQL 里解码。
+
+PostgreSQL 会对大字段自动做 TOAST 压缩，DB_BACKEND=postgres 时 pack_text() 不做应用层压缩。
+"""
+from __future__ import annotations
+
+import sqlite3
+import zlib
+from typing import Any, Optional
+
+from config.database import DatabaseConfig
+from utils.logger import get_logger
+
+logger = get_logger()
+
+MARKER = b"\x00CZ"
+_CODEC_ZLIB = b"z"
+_CODEC_ZSTD = b"s"
+
+# 压缩后至少节省 10% 才落盘为 BLOB，否则保留原文
+_MIN_SAVING_RATIO = 0.9
+
+_zstd_warned = False
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    global _zstd_warned
+    if codec == "zstd":
+        zstandard = _zstd()
+        if zstandard is not None:
+            return MARKER + _CODEC_ZSTD + zstandard.ZstdCompressor(level=9).compress(data)
+        if not _zstd_warned:
+            _zstd_warned = True
+            logger.warning("[Compression] zstandard 未安装，TEXT_COMPRESSION=zstd 回退为 zlib")
+    return MARKER + _CODEC_ZLIB + zlib.compress(data, 6)
+
+
+def is_packed(value: Any) -> bool:
+    """是否为 pack_text() 写出的压缩值"""
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:3]) == MARKER
+
+
+def pack_text(value: Optional[str], codec: Optional[str] = None) -> Any:
+    """
+    按配置压缩一段文本，返回要写入数据库的值（压缩后的 bytes 或原文）
+
+    None、短文本、压缩收益不足 10% 或 codec 为 none 时原样返回。
+    """
+    if value is None or not isinstance(value, str):
+        return value
+    if DatabaseConfig.backend() == "postgres":
+        return value
+    codec = (codec or DatabaseConfig.text_compression()).lower()
+    if codec == "none":
+        return value
+    data = value.encode("utf-8")
+    if len(data) < DatabaseConfig.text_compression_min_bytes():
+        return value
+    packed = _compress(data, codec)
+    if len(packed) > len(data) * _MIN_SAVING_RATIO:
+        return value
+    return packed
+
+
+def unpack_text(value: Any) -> Any:
+    """读取侧解码：压缩值还原为 str，其余值（TEXT / None / 数字）原样返回"""
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    data = bytes(value)
+    if data[:3] != MARKER:
+        return data.decode("utf-8", errors="replace")
+    codec, payload = data[3:4], data[4:]
+    if codec == _CODEC_ZLIB:
+        return zlib.decompress(payload).decode("utf-8")
+    if codec == _CODEC_ZSTD:
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed value found but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(payload).decode("utf-8")
+    raise ValueError(f"unknown text compression codec: {codec!r}")
+
+
+def register_sqlite_functions(conn: sqlite3.Connection) -> None:
+    """在 SQLite 连接上注册 unpack_text(x)；FTS 同步触发器依赖它，写 articles 的连接都必须注册"""
+    conn.create_function("unpack_text", 1, unpack_text, deterministic=True)
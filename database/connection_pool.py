@@ -0,0 +1,208 @@
+"""
+Thread-affine SQLite connection pool used by DatabaseFactory.
+
+Connections are configured once (row factory + PRAGMAs) when created and then
+reused by the thread that returned them. A borrowed connection goes back to
+the pool when it is closed or garbage collected, which matches the existing
+call sites that rely on `with DatabaseFactory.get_connection() as conn:`
+dropping the connection at the end of the function.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+_Entry = Tuple[sqlite3.Connection, float]
+
+
+class _ThreadIdle(dict):
+    """单个线程的空闲连接 {path: [(conn, released_at)]}；线程结束被回收时同步扣减全局计数"""
+
+    def __init__(self, pool: "SQLiteConnectionPool"):
+        super().__init__()
+        self.pool = pool
+        self.owner = threading.get_ident()
+
+    def __del__(self) -> None:
+        try:
+            remaining = sum(len(entries) for entries in self.values())
+            if remaining:
+                with self.pool._lock:
+                    self.pool._idle_count -= remaining
+        except Exception:
+            pass
+
+
+class PooledConnection:
+    """
+    sqlite3.Connection proxy handed out by the pool.
+
+    - close() returns the connection to the pool instead of closing it
+    - `with conn:` commits / rolls back like sqlite3 and returns the proxy
+    - any uncommitted transaction is rolled back on release, same as closing
+    """
+
+    __slots__ = ("_conn", "_pool", "_path", "_owner", "_released")
+
+    def __init__(self, conn: sqlite3.Connection, pool: "SQLiteConnectionPool", path: str, owner: _ThreadIdle):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_path", path)
+        object.__setattr__(self, "_owner", owner)
+        object.__setattr__(self, "_released", False)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._conn, name, value)
+
+    def __enter__(self) -> "PooledConnection":
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def close(self) -> None:
+        if self._released:
+            return
+        object.__setattr__(self, "_released", True)
+        self._pool._release(self._conn, self._path, self._owner)
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class SQLiteConnectionPool:
+    """
+    每个线程各自持有空闲连接（按数据库路径分组），借出时只是一次列表 pop
+
+    - 连接只在创建时执行 configure（PRAGMA busy_timeout / journal_mode / foreign_keys 等）
+    - 空闲超过 healthcheck_sec 的连接借出前先 `SELECT 1`，失败则丢弃重建
+    - 全进程空闲连接数不超过 max_size，单线程每个路径不超过 max_idle_per_thread；
+      超出时优先淘汰本线程其他路径的空闲连接，否则直接关闭归还的连接
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[str], sqlite3.Connection],
+        max_size: int = 32,
+        max_idle_per_thread: int = 4,
+        healthcheck_sec: float = 60.0,
+    ):
+        self._connect = connect
+        self.max_size = max(0, max_size)
+        self.max_idle_per_thread = max(0, max_idle_per_thread)
+        self.healthcheck_sec = healthcheck_sec
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle_count = 0
+        self._stats = {"created": 0, "reused": 0, "healthcheck_failures": 0, "closed": 0}
+
+    def _thread_idle(self) -> _ThreadIdle:
+        idle = getattr(self._local, "idle", None)
+        if idle is None:
+            idle = self._local.idle = _ThreadIdle(self)
+        return idle
+
+    def acquire(self, path: str) -> PooledConnection:
+        owner = self._thread_idle()
+        idle = owner.setdefault(path, [])
+        while idle:
+            conn, released_at = idle.pop()
+            with self._lock:
+                self._idle_count -= 1
+            if time.monotonic() - released_at > self.healthcheck_sec and not self._healthy(conn):
+                continue
+            with self._lock:
+                self._stats["reused"] += 1
+            return PooledConnection(conn, self, path, owner)
+
+        conn = self._connect(path)
+        with self._lock:
+            self._stats["created"] += 1
+        return PooledConnection(conn, self, path, owner)
+
+    def _healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except Exception as exc:
+            logger.warning(f"[DBPool] Discarding unhealthy connection: {exc}")
+            self._close(conn)
+            with self._lock:
+                self._stats["healthcheck_failures"] += 1
+            return False
+
+    def _close(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["closed"] += 1
+
+    def _release(self, conn: sqlite3.Connection, path: str, owner: _ThreadIdle) -> None:
+        # 线程亲和：只回收到借出线程自己的空闲列表，跨线程归还直接关闭
+        if owner.owner != threading.get_ident() or self._thread_idle() is not owner:
+            self._close(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            self._close(conn)
+            return
+
+        idle = owner.setdefault(path, [])
+        if len(idle) >= self.max_idle_per_thread:
+            self._close(conn)
+            return
+        with self._lock:
+            full = self._idle_count >= self.max_size
+        if full and not self._evict_other_path(path):
+            self._close(conn)
+            return
+        idle.append((conn, time.monotonic()))
+        with self._lock:
+            self._idle_count += 1
+
+    def _evict_other_path(self, path: str) -> bool:
+        """池满时腾出本线程其他数据库路径（如测试换库后）的一个空闲连接"""
+        for other_path, entries in self._thread_idle().items():
+            if other_path != path and entries:
+                conn, _ = entries.pop(0)
+                with self._lock:
+                    self._idle_count -= 1
+                self._close(conn)
+                return True
+        return False
+
+    def clear(self) -> None:
+        """关闭当前线程的空闲连接（其他线程的连接在各自下次借用或线程结束时回收）"""
+        idle = self._thread_idle()
+        for entries in idle.values():
+            while entries:
+                conn, _ = entries.pop()
+                with self._lock:
+                    self._idle_count -= 1
+                self._close(conn)
+        idle.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "max_idle_per_thread": self.max_idle_per_thread,
+                "idle": self._idle_count,
+                **self._stats,
+            }
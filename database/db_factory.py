@@ -4,6 +4,17 @@ Provides connection pooling and consistent database access across all services
 
 IMPORTANT: All queries return dicts, not sqlite3.Row objects.
 This eliminates the recurring .get() method issues.
+
+Connections come from a thread-affine pool (database/connection_pool.py):
+row factory and PRAGMAs are applied once per connection, and a connection
+returns to the pool when closed or garbage collected.
+
+Statements are timed per template by database/query_stats.py (slow-query log
+with EXPLAIN QUERY PLAN) unless DB_QUERY_STATS_ENABLED=false.
+
+DB_BACKEND=postgres switches every connection to database/pg_backend.py
+(psycopg async pool behind the same sqlite3-style interface; SQL is rewritten
+by database/dialect.py). SQLite stays the default.
 """
 import sqlite3
 import os
@@ -12,6 +23,8 @@ from typing import Optional, List, Dict, Any, Tuple
 from contextlib import contextmanager
 
 from config.database import DatabaseConfig
+from database.connection_pool import SQLiteConnectionPool
+from database.query_stats import InstrumentedConnection
 from database.sqlite_utils import configure_sqlite_connection
 
 logger = logging.getLogger(__name__)
@@ -40,6 +53,7 @@ class DatabaseFactory:
     
     _instance: Optional['DatabaseFactory'] = None
     _db_path: str = None
+    _pool: SQLiteConnectionPool = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -52,28 +66,64 @@ class DatabaseFactory:
         if db_path is None:
             db_path = DatabaseConfig.db_path()
 
+        # 服务构造时都会调用；路径未变时是空操作，不清空连接池也不刷日志
+        if db_path == cls._db_path:
+            return
         DatabaseConfig.validate()
         cls._db_path = db_path
+        # 换库时不再复用当前线程里指向旧库的空闲连接
+        cls._pool.clear()
         logger.info(f"[DatabaseFactory] Initialized with path: {db_path}")
     
     @classmethod
     def _configure_connection(cls, conn: sqlite3.Connection) -> None:
         configure_sqlite_connection(conn)
+
+    @classmethod
+    def _open_connection(cls, db_path: str) -> sqlite3.Connection:
+        """Open and configure a new connection (called by the pool only on a miss)."""
+        if DatabaseConfig.backend() == "postgres":
+            # PostgreSQL 连接来自 pg_backend 自己的连接池，db_path 只作为写队列/账本的分组键
+            from database.pg_backend import pg_backend
+
+            return pg_backend.connect()
+        # check_same_thread=False: a connection released from another thread is closed there
+        factory = InstrumentedConnection if DatabaseConfig.query_stats_enabled() else sqlite3.Connection
+        conn = sqlite3.connect(
+            db_path, timeout=DatabaseConfig.timeout(), check_same_thread=False, factory=factory
+        )
+        conn.row_factory = dict_factory  # KEY: Use dict_factory, not sqlite3.Row
+        cls._configure_connection(conn)
+        return conn
     
     @classmethod
     def get_connection(cls) -> sqlite3.Connection:
         """
         Get a database connection with dict_factory.
         All queries will return dicts, not Row objects.
+
+        The connection is borrowed from the per-thread pool; close() (or dropping
+        the last reference) returns it. Callers must not keep it across threads.
         """
         if cls._db_path is None:
             cls.initialize()
-        
-        conn = sqlite3.connect(cls._db_path, timeout=DatabaseConfig.timeout())
-        conn.row_factory = dict_factory  # KEY: Use dict_factory, not sqlite3.Row
-        cls._configure_connection(conn)
-        
+
+        if not DatabaseConfig.pool_enabled() or DatabaseConfig.backend() == "postgres":
+            return cls._open_connection(cls._db_path)
+
+        conn = cls._pool.acquire(cls._db_path)
+        # 借用方改过 row_factory 时恢复默认，保证所有查询返回 dict
+        if conn.row_factory is not dict_factory:
+            conn.row_factory = dict_factory
         return conn
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Any]:
+        if DatabaseConfig.backend() == "postgres":
+            from database.pg_backend import pg_backend
+
+            return {"enabled": True, **pg_backend.stats()}
+        return {"enabled": DatabaseConfig.pool_enabled(), **cls._pool.stats()}
     
     @classmethod
     @contextmanager
@@ -112,11 +162,11 @@ class DatabaseFactory:
                 name = row.get('name', 'Unknown')  # Safe!
         """
         try:
-            with cls.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                result = cursor.fetchone()
-                return result  # Already dict or None
+            conn = cls.get_connection()
+            try:
+                return conn.execute(query, params).fetchone()  # Already dict or None
+            finally:
+                conn.close()
         except Exception as e:
             logger.error(f"[DatabaseFactory] fetchone error: {e}")
             return None
@@ -133,11 +183,12 @@ class DatabaseFactory:
                 name = row.get('name', 'Unknown')  # Safe!
         """
         try:
-            with cls.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query, params)
-                results = cursor.fetchall()
+            conn = cls.get_connection()
+            try:
+                results = conn.execute(query, params).fetchall()
                 return results if results else []
+            finally:
+                conn.close()
         except Exception as e:
             logger.error(f"[DatabaseFactory] fetchall error: {e}")
             return []
@@ -155,11 +206,9 @@ class DatabaseFactory:
             )
         """
         try:
-            with cls.get_connection() as conn:
-                cursor = conn.cursor()
+            with cls.get_cursor() as cursor:
                 cursor.execute(query, params)
-                conn.commit()
-                return True
+            return True
         except Exception as e:
             logger.error(f"[DatabaseFactory] execute error: {e}")
             return False
@@ -177,16 +226,22 @@ class DatabaseFactory:
             )
         """
         try:
-            with cls.get_connection() as conn:
-                cursor = conn.cursor()
+            with cls.get_cursor() as cursor:
                 cursor.execute(query, params)
-                conn.commit()
                 return cursor.lastrowid
         except Exception as e:
             logger.error(f"[DatabaseFactory] execute_returning_id error: {e}")
             return None
 
 
+DatabaseFactory._pool = SQLiteConnectionPool(
+    DatabaseFactory._open_connection,
+    max_size=DatabaseConfig.pool_max_size(),
+    max_idle_per_thread=DatabaseConfig.pool_max_idle_per_thread(),
+    healthcheck_sec=DatabaseConfig.pool_healthcheck_sec(),
+)
+
+
 # ==================== Legacy Compatibility ====================
 
 def get_db_connection() -> sqlite3.Connection:
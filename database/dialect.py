@@ -0,0 +1,258 @@
+"""
+SQL dialects
+Rewrite the SQLite-flavoured SQL used by services for the active backend
+
+服务里的 SQL 按 SQLite 书写：? 占位符、INSERT OR IGNORE、GROUP_CONCAT、IFNULL、
+datetime('now', ?)、LIKE（ASCII 大小写不敏感）、sqlite_master / PRAGMA table_info 探测表结构。
+DB_BACKEND=postgres 时由 PostgresDialect 在执行前改写为语义等价的 PostgreSQL，SQLite 下原样执行。
+字符串字面量、带引号的标识符和注释不参与改写。
+
+新代码优先写两边都支持的 SQL（ON CONFLICT(...) DO UPDATE / DO NOTHING、COALESCE、
+CURRENT_TIMESTAMP），upsert 用 upsert_sql() 生成。INSERT OR REPLACE 没有冲突目标无法等价改写，
+在 PostgreSQL 下直接报错。
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config.database import DatabaseConfig
+
+# 字面量 / 引号标识符 / 注释，改写前整体遮蔽为 \x00n\x00
+_OPAQUE_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.S)
+_MASK_RE = re.compile(r"\x00(\d+)\x00")
+
+# SQLite datetime() 返回 'YYYY-MM-DD HH:MM:SS' 文本（UTC）
+_PG_DATETIME_FORMAT = "'YYYY-MM-DD HH24:MI:SS'"
+_PG_UTC_NOW = "(NOW() AT TIME ZONE 'UTC')"
+
+_PG_SQLITE_MASTER = (
+    "(SELECT CASE table_type WHEN 'VIEW' THEN 'view' ELSE 'table' END AS type,"
+    " table_name AS name, table_name AS tbl_name"
+    " FROM information_schema.tables WHERE table_schema = current_schema()) AS sqlite_master"
+)
+_PG_TABLE_INFO = (
+    "SELECT ordinal_position - 1 AS cid, column_name AS name, data_type AS type,"
+    " CASE is_nullable WHEN 'NO' THEN 1 ELSE 0 END AS notnull, column_default AS dflt_value"
+    " FROM information_schema.columns"
+    " WHERE table_schema = current_schema() AND table_name = '{table}' ORDER BY ordinal_position"
+)
+
+
+class UnsupportedSQL(ValueError):
+    """当前后端无法等价执行的 SQLite 写法"""
+
+
+def _mask(sql: str) -> Tuple[str, List[str]]:
+    opaque: List[str] = []
+
+    def keep(match: re.Match) -> str:
+        opaque.append(match.group(0))
+        return f"\x00{len(opaque) - 1}\x00"
+
+    return _OPAQUE_RE.sub(keep, sql), opaque
+
+
+def _unmask(masked: str, opaque: List[str], escape_percent: bool = False) -> str:
+    def restore(match: re.Match) -> str:
+        text = opaque[int(match.group(1))]
+        return text.replace("%", "%%") if escape_percent else text
+
+    return _MASK_RE.sub(restore, masked)
+
+
+def _split_statements(masked: str) -> List[str]:
+    return [stmt for stmt in masked.split(";") if stmt.strip()]
+
+
+def statement_kind(sql: str) -> str:
+    """语句首个关键字（大写），用于事务控制判断；注释与空白被跳过"""
+    masked, _ = _mask(sql)
+    match = re.match(r"\s*(?:\x00\d+\x00\s*)*([A-Za-z]+)", masked)
+    return match.group(1).upper() if match else ""
+
+
+def _closing_paren(text: str, open_idx: int) -> int:
+    depth = 0
+    for idx in range(open_idx, len(text)):
+        if text[idx] == "(":
+            depth += 1
+        elif text[idx] == ")":
+            depth -= 1
+            if depth == 0:
+                return idx
+    raise UnsupportedSQL(f"unbalanced parentheses: {text[open_idx:open_idx + 60]!r}")
+
+
+def _split_args(inner: str) -> List[str]:
+    args, depth, start = [], 0, 0
+    for idx, ch in enumerate(inner):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(inner[start:idx].strip())
+            start = idx + 1
+    args.append(inner[start:].strip())
+    return [arg for arg in args if arg]
+
+
+class SQLDialect:
+    """SQLite：原样执行"""
+
+    name = "sqlite"
+
+    def translate(self, sql: str, placeholders: bool = True) -> str:
+        return sql
+
+
+class PostgresDialect(SQLDialect):
+    """SQLite SQL → PostgreSQL（psycopg 的 %s 占位符）"""
+
+    name = "postgres"
+
+    _FUNC_RE = re.compile(r"\b(GROUP_CONCAT|IFNULL|DATETIME)\s*\(", re.I)
+
+    def translate(self, sql: str, placeholders: bool = True) -> str:
+        """
+        改写一条或多条（; 分隔）语句
+
+        placeholders=True 时 ? → %s 且字面量里的 % 转义为 %%（带参数执行）；
+        False 用于不带参数的脚本，% 原样保留。
+        """
+        masked, opaque = _mask(sql)
+        statements = [self._statement(stmt, opaque) for stmt in _split_statements(masked)]
+        out = ";\n".join(statements)
+        if placeholders:
+            out = out.replace("%", "%%").replace("?", "%s")
+        return _unmask(out, opaque, escape_percent=placeholders)
+
+    # ---------- 单条语句 ----------
+
+    def _statement(self, stmt: str, opaque: List[str]) -> str:
+        kind = statement_kind(stmt)
+        if kind == "PRAGMA":
+            return self._pragma(stmt, opaque)
+        if kind == "BEGIN":
+            # BEGIN IMMEDIATE / DEFERRED / EXCLUSIVE：PostgreSQL 行级锁，无需预先抢库级写锁
+            return "BEGIN"
+        if re.match(r"\s*(?:CREATE\s+(?:TEMP\w*\s+)?TABLE|ALTER\s+TABLE)\b", stmt, re.I):
+            stmt = self._ddl_types(stmt)
+        if re.search(r"\bINSERT\s+OR\s+REPLACE\b|^\s*REPLACE\s+INTO\b", stmt, re.I):
+            raise UnsupportedSQL("INSERT OR REPLACE has no conflict target; use upsert_sql()")
+        if re.search(r"\bINSERT\s+OR\s+IGNORE\b", stmt, re.I):
+            stmt = self._insert_or_ignore(stmt)
+        stmt = self._functions(stmt, opaque)
+        stmt = re.sub(r"\bCURRENT_TIMESTAMP\b", f"TO_CHAR({_PG_UTC_NOW}, {_PG_DATETIME_FORMAT})", stmt, flags=re.I)
+        stmt = re.sub(r"\bLIKE\b", "ILIKE", stmt, flags=re.I)
+        stmt = re.sub(r"\bsqlite_master\b", _PG_SQLITE_MASTER, stmt)
+        return stmt.strip()
+
+    @staticmethod
+    def _pragma(stmt: str, opaque: List[str]) -> str:
+        match = re.match(r"\s*PRAGMA\s+table_info\s*\(\s*([^)]+?)\s*\)\s*$", stmt, re.I)
+        if match:
+            table = _unmask(match.group(1), opaque).strip("'\"` ")
+            if not re.fullmatch(r"\w+", table):
+                raise UnsupportedSQL(f"invalid table name in PRAGMA: {table!r}")
+            return _PG_TABLE_INFO.format(table=table)
+        # journal_mode / busy_timeout / foreign_keys / optimize 等在 PostgreSQL 下无对应项
+        return "SELECT 1 WHERE FALSE"
+
+    @staticmethod
+    def _ddl_types(stmt: str) -> str:
+        # SQLite 里日期时间列实际存 TEXT，保持 TEXT 以维持字符串比较/排序语义
+        stmt = re.sub(r"\bINTEGER\s+PRIMARY\s+KEY\s+AUTOINCREMENT\b", "BIGSERIAL PRIMARY KEY", stmt, flags=re.I)
+        stmt = re.sub(
+            r"\bDEFAULT\s+CURRENT_TIMESTAMP\b",
+            f"DEFAULT (TO_CHAR({_PG_UTC_NOW}, {_PG_DATETIME_FORMAT}))",
+            stmt,
+            flags=re.I,
+        )
+        stmt = re.sub(r"\b(?:TIMESTAMP|DATETIME|DATE)\b(?!\s*\()", "TEXT", stmt, flags=re.I)
+        stmt = re.sub(r"\bREAL\b", "DOUBLE PRECISION", stmt, flags=re.I)
+        return re.sub(r"\bBLOB\b", "BYTEA", stmt, flags=re.I)
+
+    @staticmethod
+    def _insert_or_ignore(stmt: str) -> str:
+        stmt = re.sub(r"\bINSERT\s+OR\s+IGNORE\b", "INSERT", stmt, flags=re.I)
+        if re.search(r"\bON\s+CONFLICT\b", stmt, re.I):
+            return stmt
+        returning = re.search(r"\bRETURNING\b", stmt, re.I)
+        if returning:
+            return f"{stmt[:returning.start()].rstrip()} ON CONFLICT DO NOTHING {stmt[returning.start():]}"
+        return f"{stmt.rstrip()} ON CONFLICT DO NOTHING"
+
+    def _functions(self, stmt: str, opaque: List[str]) -> str:
+        # 从最后一个匹配开始改写，内层调用先于外层完成
+        while True:
+            matches = list(self._FUNC_RE.finditer(stmt))
+            if not matches:
+                return stmt
+            match = matches[-1]
+            open_idx = match.end() - 1
+            close_idx = _closing_paren(stmt, open_idx)
+            args = _split_args(stmt[open_idx + 1:close_idx])
+            name = match.group(1).upper()
+            if name == "GROUP_CONCAT":
+                replacement = self._group_concat(args)
+            elif name == "IFNULL":
+                replacement = f"COALESCE({', '.join(args)})"
+            else:
+                replacement = self._datetime(args, opaque)
+            stmt = stmt[:match.start()] + replacement + stmt[close_idx + 1:]
+
+    @staticmethod
+    def _group_concat(args: List[str]) -> str:
+        expr = args[0]
+        distinct = ""
+        if re.match(r"DISTINCT\b", expr, re.I):
+            distinct, expr = "DISTINCT ", expr[len("DISTINCT"):].strip()
+        separator = args[1] if len(args) > 1 else "','"
+        return f"STRING_AGG({distinct}CAST({expr} AS TEXT), {separator})"
+
+    @staticmethod
+    def _datetime(args: List[str], opaque: List[str]) -> str:
+        if not args:
+            raise UnsupportedSQL("datetime() without arguments")
+        first = _unmask(args[0], opaque).strip()
+        base = _PG_UTC_NOW if first.lower() == "'now'" else f"CAST({args[0]} AS TIMESTAMP)"
+        # 修饰符（'-7 days'、'+1 hours'）恰好也是合法的 INTERVAL 文本
+        for modifier in args[1:]:
+            base = f"{base} + CAST({modifier} AS INTERVAL)"
+        return f"TO_CHAR({base}, {_PG_DATETIME_FORMAT})"
+
+
+def upsert_sql(
+    table: str,
+    columns: Sequence[str],
+    conflict: Sequence[str],
+    update: Optional[Sequence[str]] = None,
+) -> str:
+    """
+    两种后端通用的 upsert：INSERT ... ON CONFLICT(conflict) DO UPDATE SET col = excluded.col
+
+    update 默认为 columns 中除冲突列以外的全部列；传空序列时为 DO NOTHING。
+    """
+    if update is None:
+        update = [col for col in columns if col not in conflict]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        f" ON CONFLICT({', '.join(conflict)})"
+    )
+    if not update:
+        return f"{sql} DO NOTHING"
+    return f"{sql} DO UPDATE SET {', '.join(f'{col} = excluded.{col}' for col in update)}"
+
+
+_DIALECTS: Dict[str, SQLDialect] = {"sqlite": SQLDialect(), "postgres": PostgresDialect()}
+
+
+def get_dialect(backend: Optional[str] = None) -> SQLDialect:
+    """当前（或指定）后端的方言"""
+    name = backend or DatabaseConfig.backend()
+    try:
+        return _DIALECTS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported DB_BACKEND: {name!r}") from None
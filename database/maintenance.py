@@ -0,0 +1,167 @@
+"""
+SQLite maintenance
+WAL checkpoints, planner statistics, incremental vacuum and integrity checks
+
+开启 WAL 且写入方多时，自动检查点经常因读者未退出而无法回卷，-wal 文件持续增长；
+planner 统计（sqlite_stat1）也从不刷新。这里的操作由 services/db_maintenance_scheduler.py
+定时执行，每项返回耗时与前后文件大小，记录到 job_health_tracker。
+
+维护使用独立连接（不进连接池），busy_timeout 取 DB_MAINTENANCE_BUSY_TIMEOUT_MS：
+拿不到锁时本轮跳过（检查点返回 busy=1），不会长时间阻塞业务写入。
+DB_BACKEND=postgres 时不需要（autovacuum / autoanalyze 由 PostgreSQL 负责）。
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from config.database import DatabaseConfig
+from database.sqlite_utils import configure_sqlite_connection
+from utils.logger import get_logger
+
+logger = get_logger()
+
+_CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+# PRAGMA optimize 时每个索引最多采样的行数，避免大表上的 ANALYZE 变成全表扫描
+_ANALYSIS_LIMIT = 1000
+_INTEGRITY_MAX_ERRORS = 20
+_AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class SQLiteMaintenance:
+    """对一个 SQLite 库执行维护操作；db_path 为空时使用 DatabaseFactory 当前库"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self._db_path = db_path
+
+    @property
+    def db_path(self) -> str:
+        if self._db_path:
+            return self._db_path
+        from database.db_factory import DatabaseFactory
+
+        return DatabaseFactory.get_db_path()
+
+    def file_sizes(self) -> Dict[str, int]:
+        path = self.db_path
+        return {
+            "db_bytes": _file_size(path),
+            "wal_bytes": _file_size(f"{path}-wal"),
+            "shm_bytes": _file_size(f"{path}-shm"),
+        }
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=DatabaseConfig.maintenance_busy_timeout_ms() / 1000)
+        try:
+            configure_sqlite_connection(conn)
+            conn.execute(f"PRAGMA busy_timeout={DatabaseConfig.maintenance_busy_timeout_ms()}")
+            yield conn
+        finally:
+            conn.close()
+
+    def checkpoint(self, mode: str = "TRUNCATE") -> Dict[str, Any]:
+        """
+        wal_checkpoint(mode)；TRUNCATE 成功时 -wal 文件截断为 0
+
+        busy=1 表示有读者/写者占用，本轮只回卷了部分帧，不视为失败。
+        """
+        mode = mode.upper()
+        if mode not in _CHECKPOINT_MODES:
+            raise ValueError(f"unsupported checkpoint mode: {mode}")
+        started = time.perf_counter()
+        wal_before = self.file_sizes()["wal_bytes"]
+        with self._connect() as conn:
+            busy, wal_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        return {
+            "mode": mode,
+            "busy": int(busy),
+            "wal_frames": int(wal_frames),
+            "checkpointed_frames": int(checkpointed),
+            "wal_bytes_before": wal_before,
+            "wal_bytes_after": self.file_sizes()["wal_bytes"],
+            "duration_ms": _elapsed_ms(started),
+        }
+
+    def optimize(self, full_analyze: bool = False) -> Dict[str, Any]:
+        """
+        刷新 planner 统计：默认 PRAGMA optimize（只分析统计过期的表，采样受 analysis_limit 限制），
+        full_analyze=True 时执行完整 ANALYZE
+        """
+        started = time.perf_counter()
+        with self._connect() as conn:
+            if full_analyze:
+                conn.execute("ANALYZE")
+            else:
+                conn.execute(f"PRAGMA analysis_limit={_ANALYSIS_LIMIT}")
+                conn.execute("PRAGMA optimize")
+            conn.commit()
+        return {"full_analyze": full_analyze, "duration_ms": _elapsed_ms(started)}
+
+    def incremental_vacuum(self, max_pages: Optional[int] = None) -> Dict[str, Any]:
+        """
+        归还空闲页：仅 auto_vacuum=INCREMENTAL 的库生效（新库由 run_migrations 设置）；
+        其它库只报告空闲页数量，需离线执行 enable_incremental_vacuum() 转换
+        """
+        max_pages = DatabaseConfig.incremental_vacuum_pages() if max_pages is None else max_pages
+        started = time.perf_counter()
+        with self._connect() as conn:
+            mode = _AUTO_VACUUM_MODES.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0], "unknown")
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if mode == "incremental" and free_before:
+                # execute() 只步进一次（每步归还一页），executescript 才会执行到底
+                conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+            free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return {
+            "auto_vacuum": mode,
+            "freelist_pages_before": int(free_before),
+            "freelist_pages_after": int(free_after),
+            "reclaimed_bytes": int(free_before - free_after) * int(page_size),
+            "duration_ms": _elapsed_ms(started),
+        }
+
+    def integrity_check(self, full: bool = False) -> Dict[str, Any]:
+        """默认 quick_check（不校验索引内容，O(N)）；full=True 时 integrity_check"""
+        started = time.perf_counter()
+        pragma = "integrity_check" if full else "quick_check"
+        with self._connect() as conn:
+            rows = conn.execute(f"PRAGMA {pragma}({_INTEGRITY_MAX_ERRORS})").fetchall()
+        errors: List[str] = [str(row[0]) for row in rows if str(row[0]) != "ok"]
+        return {
+            "check": pragma,
+            "ok": not errors,
+            "errors": errors,
+            "duration_ms": _elapsed_ms(started),
+        }
+
+    def enable_incremental_vacuum(self) -> Dict[str, Any]:
+        """把已有库转换为 auto_vacuum=INCREMENTAL（需要完整 VACUUM，会独占整个库，只在停机窗口手动执行）"""
+        started = time.perf_counter()
+        before = self.file_sizes()["db_bytes"]
+        with self._connect() as conn:
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+        return {
+            "db_bytes_before": before,
+            "db_bytes_after": self.file_sizes()["db_bytes"],
+            "duration_ms": _elapsed_ms(started),
+        }
+
+
+# Singleton instance
+db_maintenance = SQLiteMaintenance()
@@ -0,0 +1,129 @@
+"""
+Keyset pagination helpers
+Opaque cursors, "after cursor" predicates and cached approximate totals
+
+列表接口按排序键（如 publish_date, created_at, id）做 keyset 分页：下一页条件是
+「排序键严格小于上一页最后一行」，可走索引直接定位，深翻页不再是 O(offset)。
+游标对客户端不透明（base64url 编码的排序键）；总数按过滤条件短期缓存，仅作近似值展示。
+"""
+from __future__ import annotations
+
+import base64
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+APPROX_COUNT_TTL_SEC = float(os.getenv("DB_APPROX_COUNT_TTL_SEC", "60"))
+
+
+class CursorError(ValueError):
+    """客户端传入的游标无法解析"""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str], size: int) -> Optional[Tuple[Any, ...]]:
+    """空游标返回 None（第一页）；格式不对抛 CursorError"""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception as e:
+        raise CursorError(f"invalid cursor: {e}") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise CursorError("invalid cursor")
+    for value in values:
+        if value is not None and not isinstance(value, (str, int, float)):
+            raise CursorError("invalid cursor")
+    return tuple(values)
+
+
+def keyset_after_desc(
+    columns: Sequence[str],
+    values: Sequence[Any],
+    nullable: Sequence[str] = (),
+) -> Tuple[str, List[Any]]:
+    """
+    ORDER BY columns 全部 DESC 时，「排在游标行之后」的 WHERE 条件
+
+    展开为 (c1 < v1) OR (c1 = v1 AND c2 < v2) OR ...，不依赖行值比较，方便 SQLite 用首列做范围扫描。
+    nullable 中的列按 SQLite 规则处理：NULL 最小，DESC 时排在最后。
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    for idx, (column, value) in enumerate(zip(columns, values)):
+        prefix: List[str] = []
+        prefix_params: List[Any] = []
+        for prev_column, prev_value in zip(columns[:idx], values[:idx]):
+            if prev_value is None:
+                prefix.append(f"{prev_column} IS NULL")
+            else:
+                prefix.append(f"{prev_column} = ?")
+                prefix_params.append(prev_value)
+
+        if value is None:
+            # 游标在该列已是 NULL（最小值），同前缀下没有更靠后的非 NULL 值
+            continue
+        if column in nullable:
+            after = f"({column} < ? OR {column} IS NULL)"
+        else:
+            after = f"{column} < ?"
+        clauses.append("(" + " AND ".join(prefix + [after]) + ")")
+        params.extend(prefix_params + [value])
+
+    if not clauses:
+        return "0", []
+    sql = "(" + " OR ".join(clauses) + ")"
+    first_column, first_value = columns[0], values[0]
+    if first_value is not None and first_column not in nullable:
+        # 冗余的首列上界：OR 展开本身无法用作索引范围，加上它规划器才能 SEARCH 而非整段扫描
+        sql = f"({first_column} <= ? AND {sql})"
+        params = [first_value] + params
+    return sql, params
+
+
+class ApproxCountCache:
+    """
+    COUNT(*) 结果的短期缓存（按表 + 过滤条件为 key）
+
+    翻页时不再每页重新 COUNT；写路径可按表 invalidate。
+    """
+
+    def __init__(self, ttl_sec: float = APPROX_COUNT_TTL_SEC, max_entries: int = 256):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[Any, ...], Tuple[int, float]] = {}
+
+    def get(self, key: Tuple[Any, ...], compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached and now - cached[1] < self.ttl_sec:
+            return cached[0]
+
+        value = int(compute())
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                oldest = min(self._entries, key=lambda k: self._entries[k][1])
+                self._entries.pop(oldest, None)
+            self._entries[key] = (value, now)
+        return value
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        with self._lock:
+            if table is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k and k[0] == table]:
+                self._entries.pop(key, None)
+
+
+# Singleton instance
+approx_counts = ApproxCountCache()
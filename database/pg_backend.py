@@ -0,0 +1,432 @@
+"""
+PostgreSQL backend
+psycopg 3 AsyncConnectionPool behind a sqlite3-compatible synchronous facade
+
+DB_BACKEND=postgres 时 DatabaseFactory.get_connection() 返回这里的 PgConnection：
+- 连接池（psycopg_pool.AsyncConnectionPool）跑在独立的事件循环线程 "pg-backend" 上；
+  多个应用节点可连同一个库，写入由 PostgreSQL 行锁并发处理，不再串行在 SQLite 的库级写锁上
+- 服务代码不变：SQL 经 PostgresDialect 改写后执行，行以 dict 返回，事务语义对齐 sqlite3
+  （DML 前隐式 BEGIN，commit()/rollback() 结束；只读语句自动提交；事务内单条语句失败只回滚该语句）
+- psycopg 异常映射为同名 sqlite3 异常，服务里 except sqlite3.IntegrityError 与写队列的忙重试照常生效
+- 协程里可直接 await pg_backend.fetchall_async()/execute_async()，不占用 db_executor 线程
+
+依赖 psycopg[binary,pool]，只在 DB_BACKEND=postgres 时导入。
+"""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config.database import DatabaseConfig
+from database.dialect import get_dialect, statement_kind
+from database.query_stats import query_stats
+from utils.logger import get_logger
+
+logger = get_logger()
+
+_DML = {"INSERT", "UPDATE", "DELETE", "REPLACE"}
+
+# 事务内每条 DML 包一层 savepoint：PostgreSQL 语句出错会让整个事务进入 aborted 状态，
+# SQLite 只撤销出错的那条语句
+_STMT_SAVEPOINT = "pg_backend_stmt"
+
+
+def _adapt(value: Any) -> Any:
+    """对齐 sqlite3 默认适配：日期时间存 ISO 文本，bool 存 0/1"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _adapt_params(params: Optional[Sequence[Any]]) -> Tuple[Any, ...]:
+    return tuple(_adapt(v) for v in (params or ()))
+
+
+def _map_error(exc: Exception) -> Exception:
+    """psycopg 异常 → sqlite3 异常（保留原异常为 __cause__）"""
+    from psycopg import errors
+
+    message = str(exc).strip()
+    if isinstance(exc, (errors.SerializationFailure, errors.DeadlockDetected, errors.LockNotAvailable)):
+        # write_queue / run_with_busy_retry 按 "locked" 识别可重试错误
+        return sqlite3.OperationalError(f"database is locked: {message}")
+    if isinstance(exc, errors.IntegrityError):
+        return sqlite3.IntegrityError(message)
+    if isinstance(exc, errors.OperationalError):
+        return sqlite3.OperationalError(message)
+    if isinstance(exc, errors.ProgrammingError):
+        return sqlite3.OperationalError(message)
+    return sqlite3.DatabaseError(message)
+
+
+class PgCursor:
+    """sqlite3.Cursor 的子集：结果在 execute 时一次取回，fetch* 不再往返数据库"""
+
+    arraysize = 1
+
+    def __init__(self, connection: "PgConnection"):
+        self.connection = connection
+        self.description: Optional[Tuple[Tuple[Any, ...], ...]] = None
+        self.rowcount = -1
+        self.lastrowid: Optional[int] = None
+        self._rows: List[Dict[str, Any]] = []
+        self._pos = 0
+
+    def execute(self, sql: str, parameters: Sequence[Any] = ()) -> "PgCursor":
+        self.connection._execute(self, sql, [parameters])
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Sequence[Sequence[Any]]) -> "PgCursor":
+        self.connection._execute(self, sql, list(seq_of_parameters), many=True)
+        return self
+
+    def _set_result(self, description, rows: List[Dict[str, Any]], rowcount: int, lastrowid=None) -> None:
+        self.description = description
+        self._rows = rows
+        self._pos = 0
+        self.rowcount = rowcount
+        if lastrowid is not None:
+            self.lastrowid = lastrowid
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Dict[str, Any]]:
+        size = self.arraysize if size is None else size
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def close(self) -> None:
+        self._rows = []
+
+
+class PgConnection:
+    """
+    sqlite3.Connection 的子集，背后是从池里借出的一个 psycopg AsyncConnection
+
+    首条语句时才借连接，close()（或被回收）时归还；未提交的事务在归还前回滚。
+    """
+
+    def __init__(self, backend: "PostgresBackend"):
+        self._backend = backend
+        self._conn = None
+        self.in_transaction = False
+        # 兼容 sqlite3 接口：DatabaseFactory 会设置 row_factory，这里的行始终是 dict
+        self.row_factory = None
+
+    # ---------- sqlite3 接口 ----------
+
+    def cursor(self) -> PgCursor:
+        return PgCursor(self)
+
+    def execute(self, sql: str, parameters: Sequence[Any] = ()) -> PgCursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Sequence[Sequence[Any]]) -> PgCursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script: str, translate: bool = True) -> PgCursor:
+        """
+        执行多条语句（不带参数）。与 sqlite3 不同，不会先提交当前事务：
+        迁移脚本在调用方显式 BEGIN 的事务里执行，失败整体回滚（PostgreSQL DDL 可回滚）。
+        """
+        if translate:
+            script = get_dialect("postgres").translate(script, placeholders=False)
+        conn = self._raw()
+        self._backend._call(self._backend._run(conn, script, None))
+        return self.cursor()
+
+    def commit(self) -> None:
+        if self.in_transaction:
+            self._backend._call(self._backend._run(self._raw(), "COMMIT", None))
+            self.in_transaction = False
+
+    def rollback(self) -> None:
+        if self.in_transaction:
+            self._backend._call(self._backend._run(self._raw(), "ROLLBACK", None))
+            self.in_transaction = False
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if self.in_transaction:
+                self._backend._call(self._backend._run(conn, "ROLLBACK", None))
+        except Exception as exc:
+            logger.warning(f"[PgBackend] rollback on close failed: {exc}")
+        finally:
+            self.in_transaction = False
+            self._backend._release(conn)
+
+    def __enter__(self) -> "PgConnection":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        # 与 sqlite3 一致：with 块只负责提交/回滚，不关闭连接
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    # ---------- 执行 ----------
+
+    def _raw(self):
+        if self._conn is None:
+            self._conn = self._backend._acquire()
+        return self._conn
+
+    def _execute(self, cursor: PgCursor, sql: str, param_sets: List[Sequence[Any]], many: bool = False) -> None:
+        kind = statement_kind(sql)
+        if kind in ("COMMIT", "END"):
+            self.commit()
+            return
+        if kind == "ROLLBACK" and not _is_rollback_to(sql):
+            self.rollback()
+            return
+
+        translated = get_dialect("postgres").translate(sql)
+        conn = self._raw()
+        begin = kind == "BEGIN" or (kind in _DML and not self.in_transaction)
+        if kind == "BEGIN":
+            translated = None
+        savepoint = kind in _DML
+        returning = kind == "INSERT" and not many and " RETURNING " not in f" {translated.upper()} "
+        if returning:
+            # 用 RETURNING * 取回新行主键，模拟 cursor.lastrowid
+            translated = f"{translated.rstrip().rstrip(';')} RETURNING *"
+
+        started = time.perf_counter()
+        try:
+            description, rows, rowcount = self._backend._call(
+                self._backend._statement(
+                    conn, translated, [_adapt_params(p) for p in param_sets], begin=begin, savepoint=savepoint
+                )
+            )
+        except Exception as exc:
+            if begin and kind != "BEGIN":
+                # 隐式 BEGIN 已执行，语句本身失败：事务保持打开，与 sqlite3 一致
+                self.in_transaction = True
+            if exc.__class__.__module__.startswith("psycopg"):
+                raise _map_error(exc) from exc
+            raise
+        finally:
+            if DatabaseConfig.query_stats_enabled():
+                query_stats.observe(sql, (time.perf_counter() - started) * 1000, 0)
+
+        if begin:
+            self.in_transaction = True
+        lastrowid = None
+        if returning:
+            if rows:
+                lastrowid = rows[-1].get("id")
+            description, rows, rowcount = None, [], len(rows)
+        cursor._set_result(description, rows, rowcount, lastrowid)
+
+
+def _is_rollback_to(sql: str) -> bool:
+    return " TO " in f" {sql.strip().upper()} "
+
+
+class PostgresBackend:
+    """AsyncConnectionPool + 后台事件循环；首次使用时才连接"""
+
+    def __init__(self, dsn: Optional[str] = None):
+        self._dsn = dsn
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pool = None
+
+    # ---------- 生命周期 ----------
+
+    def _ensure_started(self) -> None:
+        if self._pool is not None:
+            return
+        with self._lock:
+            if self._pool is not None:
+                return
+            try:
+                from psycopg.rows import dict_row
+                from psycopg_pool import AsyncConnectionPool
+            except ImportError as exc:
+                raise RuntimeError("DB_BACKEND=postgres requires psycopg[binary,pool]") from exc
+
+            dsn = self._dsn or DatabaseConfig.database_url()
+            if not dsn:
+                raise RuntimeError("DATABASE_URL must be set when DB_BACKEND=postgres")
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="pg-backend", daemon=True)
+            thread.start()
+
+            async def open_pool():
+                pool = AsyncConnectionPool(
+                    dsn,
+                    min_size=DatabaseConfig.pg_pool_min_size(),
+                    max_size=DatabaseConfig.pg_pool_max_size(),
+                    timeout=DatabaseConfig.timeout(),
+                    kwargs={"autocommit": True, "row_factory": dict_row},
+                    open=False,
+                )
+                await pool.open(wait=True, timeout=DatabaseConfig.timeout())
+                return pool
+
+            try:
+                self._pool = asyncio.run_coroutine_threadsafe(open_pool(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(5)
+                loop.close()
+                raise
+            self._loop, self._thread = loop, thread
+            logger.info(
+                f"[PgBackend] pool opened (min={DatabaseConfig.pg_pool_min_size()}, "
+                f"max={DatabaseConfig.pg_pool_max_size()})"
+            )
+
+    def close(self) -> None:
+        """关闭连接池与事件循环线程；之后再次使用会按当前配置重新连接"""
+        with self._lock:
+            pool, loop, thread = self._pool, self._loop, self._thread
+            self._pool = self._loop = self._thread = None
+        if pool is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(pool.close(), loop).result(DatabaseConfig.timeout())
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+
+    def connect(self) -> PgConnection:
+        self._ensure_started()
+        return PgConnection(self)
+
+    def stats(self) -> Dict[str, Any]:
+        if self._pool is None:
+            return {"backend": "postgres", "open": False}
+        return {"backend": "postgres", "open": True, **self._pool.get_stats()}
+
+    # ---------- 协程入口（供 async 代码直接 await） ----------
+
+    async def fetchall_async(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        _, rows, _ = await self._submit(self._pooled(sql, params))
+        return rows
+
+    async def execute_async(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """单条写语句（自动提交），返回影响行数"""
+        _, _, rowcount = await self._submit(self._pooled(sql, params))
+        return rowcount
+
+    async def _submit(self, coro):
+        self._ensure_started()
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
+
+    async def _pooled(self, sql: str, params: Sequence[Any]):
+        async with self._pool.connection() as conn:
+            try:
+                return await self._statement(
+                    conn, get_dialect("postgres").translate(sql), [_adapt_params(params)]
+                )
+            except Exception as exc:
+                if exc.__class__.__module__.startswith("psycopg"):
+                    raise _map_error(exc) from exc
+                raise
+
+    # ---------- 事件循环线程上执行 ----------
+
+    def _call(self, coro):
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("PgConnection used from the pg-backend loop; await the *_async API instead")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _acquire(self):
+        self._ensure_started()
+        return self._call(self._pool.getconn())
+
+    def _release(self, conn) -> None:
+        if self._pool is None:
+            return
+        try:
+            self._call(self._pool.putconn(conn))
+        except Exception as exc:
+            logger.warning(f"[PgBackend] failed to return connection: {exc}")
+
+    @staticmethod
+    async def _run(conn, sql: str, params: Optional[Tuple[Any, ...]]) -> None:
+        await conn.execute(sql, params)
+
+    @staticmethod
+    async def _statement(
+        conn,
+        sql: Optional[str],
+        param_sets: List[Tuple[Any, ...]],
+        begin: bool = False,
+        savepoint: bool = False,
+    ):
+        """一次事件循环往返内完成 BEGIN / savepoint / 语句 / 取结果"""
+        if begin:
+            await conn.execute("BEGIN")
+        if sql is None:
+            return None, [], -1
+        if savepoint:
+            await conn.execute(f"SAVEPOINT {_STMT_SAVEPOINT}")
+        try:
+            async with conn.cursor() as cur:
+                if len(param_sets) == 1:
+                    await cur.execute(sql, param_sets[0])
+                else:
+                    await cur.executemany(sql, param_sets)
+                rows = await cur.fetchall() if cur.description is not None else []
+                description = (
+                    tuple((col.name, None, None, None, None, None, None) for col in cur.description)
+                    if cur.description is not None
+                    else None
+                )
+                rowcount = cur.rowcount
+        except Exception:
+            if savepoint:
+                await conn.execute(f"ROLLBACK TO SAVEPOINT {_STMT_SAVEPOINT}")
+            raise
+        if savepoint:
+            await conn.execute(f"RELEASE SAVEPOINT {_STMT_SAVEPOINT}")
+        return description, rows, rowcount
+
+
+# Singleton instance
+pg_backend = PostgresBackend()
@@ -0,0 +1,337 @@
+"""
+Query instrumentation
+Per-statement-template latency histograms, rows returned and a slow-query log
+
+DatabaseFactory 打开的连接使用 InstrumentedConnection（sqlite3 connect factory），
+conn.execute / conn.cursor() 返回的游标会记录：
+- 语句模板（字面量归一成 ?、IN 列表折叠）的调用次数、耗时直方图、返回行数
+- 超过 DB_SLOW_QUERY_MS 的语句写入慢查询环形日志，并附带 EXPLAIN QUERY PLAN
+
+耗时 = execute + 取数（fetch*/迭代）耗时；游标在取完、close、再次 execute 或被回收时结算。
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config.database import DatabaseConfig
+from utils.logger import get_logger
+
+logger = get_logger()
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+# 只对 DML/查询做 EXPLAIN；PRAGMA / DDL / 事务语句没有查询计划
+_EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+MAX_TEMPLATE_CHARS = 500
+OTHER_TEMPLATE = "<other>"
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql: str) -> str:
+    """SQL → 统计模板：字面量替换为 ?，IN (?, ?, ...) 折叠为 IN (...)，压缩空白"""
+    template = _STRING_LITERAL_RE.sub("?", sql)
+    template = _NUMBER_LITERAL_RE.sub("?", template)
+    template = _IN_LIST_RE.sub("IN (...)", template)
+    template = _WHITESPACE_RE.sub(" ", template).strip().rstrip(";").strip()
+    return template[:MAX_TEMPLATE_CHARS]
+
+
+class QueryStats:
+    """
+    进程内 SQL 统计（自进程启动起）
+
+    - 按模板聚合：count / total_ms / max_ms / rows / 直方图（BUCKETS_MS 上界，最后一档为溢出）
+    - 模板数超过 max_templates 后新模板并入 "<other>"，防止拼接 SQL 撑爆内存
+    - 慢查询保留最近 slow_log_size 条；同一模板的 EXPLAIN 结果缓存 plan_ttl_sec 秒
+    """
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+    def __init__(
+        self,
+        slow_ms: Optional[float] = None,
+        max_templates: int = 500,
+        slow_log_size: int = 50,
+        plan_ttl_sec: float = 300.0,
+    ):
+        self.slow_ms = DatabaseConfig.slow_query_ms() if slow_ms is None else slow_ms
+        self.max_templates = max_templates
+        self.plan_ttl_sec = plan_ttl_sec
+        self._lock = threading.Lock()
+        self._templates: Dict[str, Dict[str, Any]] = {}
+        self._slow: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._plans: Dict[str, tuple] = {}
+        self._started_at = time.time()
+
+    def _bucket(self, elapsed_ms: float) -> int:
+        for idx, bound in enumerate(self.BUCKETS_MS):
+            if elapsed_ms <= bound:
+                return idx
+        return len(self.BUCKETS_MS)
+
+    def observe(
+        self,
+        sql: str,
+        elapsed_ms: float,
+        rows: int,
+        explain: Optional[Callable[[], List[str]]] = None,
+    ) -> None:
+        template = normalize_sql(sql)
+        with self._lock:
+            entry = self._templates.get(template)
+            if entry is None:
+                if len(self._templates) >= self.max_templates:
+                    template = OTHER_TEMPLATE
+                    entry = self._templates.get(template)
+                if entry is None:
+                    entry = self._templates[template] = {
+                        "count": 0,
+                        "total_ms": 0.0,
+                        "max_ms": 0.0,
+                        "rows": 0,
+                        "slow": 0,
+                        "histogram": [0] * (len(self.BUCKETS_MS) + 1),
+                    }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["rows"] += max(rows, 0)
+            entry["histogram"][self._bucket(elapsed_ms)] += 1
+            is_slow = self.slow_ms > 0 and elapsed_ms >= self.slow_ms
+            if is_slow:
+                entry["slow"] += 1
+
+        if is_slow:
+            self._record_slow(template, sql, elapsed_ms, rows, explain)
+
+    def _record_slow(
+        self,
+        template: str,
+        sql: str,
+        elapsed_ms: float,
+        rows: int,
+        explain: Optional[Callable[[], List[str]]],
+    ) -> None:
+        plan = self._cached_plan(template)
+        if plan is None and explain is not None and sql.lstrip().upper().startswith(_EXPLAINABLE_PREFIXES):
+            try:
+                plan = explain()
+            except Exception as e:
+                plan = [f"<explain failed: {e}>"]
+            with self._lock:
+                self._plans[template] = (plan, time.monotonic())
+
+        record = {
+            "at": time.time(),
+            "template": template,
+            "elapsed_ms": round(elapsed_ms, 2),
+            "rows": rows,
+            "plan": plan or [],
+        }
+        with self._lock:
+            self._slow.append(record)
+        logger.warning(
+            f"[SlowQuery] {elapsed_ms:.1f}ms rows={rows} sql={template} plan={' | '.join(plan or [])}"
+        )
+
+    def _cached_plan(self, template: str) -> Optional[List[str]]:
+        with self._lock:
+            cached = self._plans.get(template)
+        if cached and time.monotonic() - cached[1] < self.plan_ttl_sec:
+            return cached[0]
+        return None
+
+    @classmethod
+    def _percentile(cls, histogram: List[int], count: int, q: float) -> Optional[float]:
+        """直方图近似分位数：返回所在桶的上界（溢出桶返回 None 表示超过最大上界）"""
+        if count <= 0:
+            return None
+        target = q * count
+        seen = 0
+        for idx, n in enumerate(histogram):
+            seen += n
+            if seen >= target:
+                return float(cls.BUCKETS_MS[idx]) if idx < len(cls.BUCKETS_MS) else None
+        return None
+
+    def snapshot(self, limit: int = 50, order_by: str = "total_ms") -> Dict[str, Any]:
+        with self._lock:
+            items = [(template, dict(entry, histogram=list(entry["histogram"])))
+                     for template, entry in self._templates.items()]
+            slow = list(self._slow)
+
+        templates = []
+        for template, entry in items:
+            count = entry["count"]
+            templates.append({
+                "template": template,
+                "count": count,
+                "total_ms": round(entry["total_ms"], 2),
+                "avg_ms": round(entry["total_ms"] / count, 3) if count else 0.0,
+                "max_ms": round(entry["max_ms"], 2),
+                "p50_ms": self._percentile(entry["histogram"], count, 0.50),
+                "p95_ms": self._percentile(entry["histogram"], count, 0.95),
+                "p99_ms": self._percentile(entry["histogram"], count, 0.99),
+                "rows": entry["rows"],
+                "avg_rows": round(entry["rows"] / count, 2) if count else 0.0,
+                "slow": entry["slow"],
+                "histogram": entry["histogram"],
+            })
+        if order_by not in {"total_ms", "count", "max_ms", "avg_ms", "rows", "slow"}:
+            order_by = "total_ms"
+        templates.sort(key=lambda t: t[order_by], reverse=True)
+
+        return {
+            "since": self._started_at,
+            "slow_ms": self.slow_ms,
+            "buckets_ms": list(self.BUCKETS_MS),
+            "template_count": len(items),
+            "templates": templates[: max(0, limit)],
+            "slow_queries": list(reversed(slow)),
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self._slow.clear()
+            self._plans.clear()
+            self._started_at = time.time()
+
+
+def _plan_details(rows: List[Any]) -> List[str]:
+    return [row["detail"] if isinstance(row, dict) else row[3] for row in rows]
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """sqlite3.Cursor：执行与取数计时，结果集取完/游标结束时上报 query_stats"""
+
+    def __init__(self, connection: sqlite3.Connection):
+        super().__init__(connection)
+        self._q_sql: Optional[str] = None
+        self._q_params: Any = ()
+        self._q_ms = 0.0
+        self._q_rows = 0
+
+    def _q_finish(self) -> None:
+        sql, self._q_sql = self._q_sql, None
+        if sql is None:
+            return
+        params = self._q_params
+        connection = self.connection
+
+        def explain() -> List[str]:
+            cursor = sqlite3.Cursor(connection)
+            try:
+                return _plan_details(cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall())
+            finally:
+                cursor.close()
+
+        query_stats.observe(sql, self._q_ms, self._q_rows, explain)
+
+    def _q_start(self, sql: str, params: Any) -> None:
+        self._q_finish()
+        self._q_sql = sql
+        self._q_params = params
+        self._q_ms = 0.0
+        self._q_rows = 0
+
+    def execute(self, sql: str, parameters: Any = ()) -> "InstrumentedCursor":
+        self._q_start(sql, parameters)
+        started = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._q_ms += (time.perf_counter() - started) * 1000
+        if self.description is None:
+            # 写语句/无结果集：立即结算
+            self._q_rows = max(self.rowcount, 0)
+            self._q_finish()
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> "InstrumentedCursor":
+        self._q_start(sql, ())
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._q_ms += (time.perf_counter() - started) * 1000
+        self._q_rows = max(self.rowcount, 0)
+        self._q_finish()
+        return self
+
+    def fetchone(self) -> Any:
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._q_ms += (time.perf_counter() - started) * 1000
+        if row is None:
+            self._q_finish()
+        else:
+            self._q_rows += 1
+        return row
+
+    def fetchmany(self, size: Optional[int] = None) -> List[Any]:
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._q_ms += (time.perf_counter() - started) * 1000
+        self._q_rows += len(rows)
+        if len(rows) < size:
+            self._q_finish()
+        return rows
+
+    def fetchall(self) -> List[Any]:
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._q_ms += (time.perf_counter() - started) * 1000
+        self._q_rows += len(rows)
+        self._q_finish()
+        return rows
+
+    def __next__(self) -> Any:
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._q_ms += (time.perf_counter() - started) * 1000
+            self._q_finish()
+            raise
+        self._q_ms += (time.perf_counter() - started) * 1000
+        self._q_rows += 1
+        return row
+
+    def close(self) -> None:
+        self._q_finish()
+        super().close()
+
+    def __del__(self) -> None:
+        # conn.execute(...).fetchone() 这类只取一行的游标在回收时结算
+        try:
+            self._q_finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3.connect(factory=...) 用的连接类：cursor()/execute()/executemany() 走 InstrumentedCursor"""
+
+    def cursor(self, factory: type = InstrumentedCursor) -> sqlite3.Cursor:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+# Singleton instance
+query_stats = QueryStats()
@@ -0,0 +1,488 @@
+"""
+Time-partitioned retention
+Moves expired rows of append-only tables into monthly archive databases
+
+分析记录、判断检查、提醒、邮件日志与用量表只增不删，热查询所在的 B 树随之无限增长。
+这里按月把超过保留期的行搬到 <archive_dir>/archive_YYYY-MM.db（同名同结构的表），主库只留近期数据；
+每个归档月在 retention_rollups 里保留一份按维度的汇总（行数 / 用户数 / 数值合计）供看板使用，
+明细仍可由 query_history() 按需 ATTACH 归档库查询。
+
+- 只归档整月：截止点取「今天 - 保留天数」所在月的月初，归档月与热库不重叠，汇总即整月口径
+- 每批 DB_RETENTION_BATCH_SIZE 行先在一个事务里写入归档库并提交，再在另一个事务里从主库删除：
+  主库为 WAL 时跨库提交不是原子的，分两步提交保证任何时刻中断行都至少在一边；
+  写入后、删除前中断的批次重跑时按主键覆盖写入归档库，不会丢行
+- keep_where 命中的行过期后仍留在热库（如每个判断的最新一次检查）
+- DB_BACKEND=postgres 时不执行（PostgreSQL 应使用原生分区）
+"""
+from __future__ import annotations
+
+import glob
+import os
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from config.database import DatabaseConfig
+from database.sqlite_utils import configure_sqlite_connection
+from utils.logger import get_logger
+
+logger = get_logger()
+
+_ARCHIVE_ALIAS = "archive"
+_ARCHIVE_FILE_RE = re.compile(r"^archive_(\d{4}-\d{2})\.db$")
+_MONTH_GLOB = "[0-9][0-9][0-9][0-9]-[0-9][0-9]"
+_CREATE_TABLE_RE = re.compile(
+    r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:\"[^\"]+\"|\[[^\]]+\]|`[^`]+`|[\w.]+)",
+    re.IGNORECASE,
+)
+# query_history 单个连接同时 ATTACH 的归档库数（SQLite 默认上限 10）
+_MAX_ATTACHED = 8
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """
+    一张追加型表的保留策略
+
+    - time_column: 决定行所属月份的列（ISO 日期 / 时间文本）
+    - user_column / dimension_column / sum_column: 汇总时去重计数的用户列、分组维度、累加的数值列
+    - keep_where: 过期后仍需留在热库的行（SQL 条件，可引用本表列）
+    """
+
+    table: str
+    time_column: str
+    default_days: int
+    user_column: Optional[str] = "user_id"
+    dimension_column: Optional[str] = None
+    sum_column: Optional[str] = None
+    keep_where: Optional[str] = None
+
+    @property
+    def days(self) -> int:
+        return DatabaseConfig.retention_days(self.table, self.default_days)
+
+
+# 看板（运营用量、邮件发送统计）最多回看 90 天，各表保留期不短于此
+RETENTION_POLICIES: Tuple[RetentionPolicy, ...] = (
+    # 邀请奖励按被邀请人的分析总数判断「首次分析」，被邀请人的记录不归档
+    RetentionPolicy(
+        table="analysis_records",
+        time_column="analysis_date",
+        default_days=180,
+        keep_where="user_id IN (SELECT invitee_id FROM invite_acceptances)",
+    ),
+    # 判断列表 / 详情取每个判断最新一次检查，最新一条始终留在热库
+    RetentionPolicy(
+        table="judgment_checks",
+        time_column="created_at",
+        default_days=180,
+        user_column=None,
+        dimension_column="current_structure_status",
+        keep_where=(
+            "id = (SELECT c.id FROM judgment_checks c WHERE c.judgment_id = judgment_checks.judgment_id "
+            "ORDER BY c.created_at DESC LIMIT 1)"
+        ),
+    ),
+    RetentionPolicy(
+        table="watchlist_signal_alerts",
+        time_column="created_at",
+        default_days=90,
+        dimension_column="signal_type",
+    ),
+    RetentionPolicy(
+        table="watchlist_risk_alerts",
+        time_column="created_at",
+        default_days=90,
+        dimension_column="risk_level",
+    ),
+    RetentionPolicy(
+        table="risk_alert_email_log",
+        time_column="created_at",
+        default_days=90,
+        dimension_column="status",
+        sum_column="item_count",
+    ),
+    RetentionPolicy(
+        table="journal_due_email_log",
+        time_column="created_at",
+        default_days=90,
+        dimension_column="status",
+        sum_column="item_count",
+    ),
+    RetentionPolicy(
+        table="llm_usage_daily",
+        time_column="usage_date",
+        default_days=400,
+        user_column=None,
+        dimension_column="user_type",
+        sum_column="stock_count",
+    ),
+)
+
+
+def _next_month(month: str) -> str:
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _columns(conn: sqlite3.Connection, schema: str, table: str) -> List[Tuple[str, str]]:
+    return [(row[1], row[2]) for row in conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()]
+
+
+def _keep_filter(policy: RetentionPolicy) -> str:
+    if not policy.keep_where:
+        return "1=1"
+    return f"NOT COALESCE(({policy.keep_where}), 0)"
+
+
+class RetentionManager:
+    """按 RETENTION_POLICIES 归档主库过期行；db_path / archive_dir 为空时取当前配置"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        archive_dir: Optional[str] = None,
+        policies: Sequence[RetentionPolicy] = RETENTION_POLICIES,
+    ):
+        self._db_path = db_path
+        self._archive_dir = archive_dir
+        self._policies = {policy.table: policy for policy in policies}
+
+    @property
+    def db_path(self) -> str:
+        if self._db_path:
+            return self._db_path
+        from database.db_factory import DatabaseFactory
+
+        return DatabaseFactory.get_db_path()
+
+    @property
+    def archive_dir(self) -> str:
+        return (
+            self._archive_dir
+            or DatabaseConfig.archive_dir()
+            or os.path.join(os.path.dirname(self.db_path) or ".", "archive")
+        )
+
+    def archive_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"archive_{month}.db")
+
+    def archived_months(self) -> List[str]:
+        months = []
+        for path in glob.glob(os.path.join(self.archive_dir, "archive_*.db")):
+            match = _ARCHIVE_FILE_RE.match(os.path.basename(path))
+            if match:
+                months.append(match.group(1))
+        return sorted(months)
+
+    def policy(self, table: str) -> RetentionPolicy:
+        if table not in self._policies:
+            raise ValueError(f"no retention policy for table: {table}")
+        return self._policies[table]
+
+    @staticmethod
+    def cutoff(policy: RetentionPolicy, today: date) -> str:
+        """早于该日期（某月 1 日）的行过期"""
+        return (today - timedelta(days=policy.days)).replace(day=1).isoformat()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=DatabaseConfig.timeout())
+        try:
+            configure_sqlite_connection(conn)
+            # 归档表沿用主库 DDL，被引用表不在归档库里，不做外键校验
+            conn.execute("PRAGMA foreign_keys=OFF")
+            conn.row_factory = sqlite3.Row
+            yield conn
+        finally:
+            conn.close()
+
+    # ==================== Archiving ====================
+
+    def run(
+        self,
+        today: Optional[date] = None,
+        tables: Optional[Iterable[str]] = None,
+        dry_run: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        归档所有（或指定）表的过期整月；dry_run 只统计每月待归档行数
+
+        单表失败只记录在该表结果的 error 里，不影响其它表。
+        """
+        today = today or date.today()
+        policies = [self.policy(table) for table in tables] if tables else list(self._policies.values())
+        started = time.perf_counter()
+        results: Dict[str, Any] = {}
+        with self._connect() as conn:
+            for policy in policies:
+                try:
+                    results[policy.table] = self._run_policy(conn, policy, today, dry_run)
+                except sqlite3.Error as exc:
+                    conn.rollback()
+                    self._detach(conn, _ARCHIVE_ALIAS)
+                    logger.error(f"[Retention] {policy.table} failed: {exc}")
+                    results[policy.table] = {"error": str(exc)}
+        return {
+            "dry_run": dry_run,
+            "moved": sum(result.get("moved", 0) for result in results.values()),
+            "tables": results,
+            "duration_ms": _elapsed_ms(started),
+        }
+
+    def _run_policy(
+        self, conn: sqlite3.Connection, policy: RetentionPolicy, today: date, dry_run: bool
+    ) -> Dict[str, Any]:
+        if not conn.execute(
+            "SELECT 1 FROM main.sqlite_master WHERE type='table' AND name=?", (policy.table,)
+        ).fetchone():
+            return {"skipped": "table missing"}
+
+        cutoff = self.cutoff(policy, today)
+        column = policy.time_column
+        pending = conn.execute(
+            f"""
+            SELECT substr({column}, 1, 7) AS month, COUNT(*) AS row_count
+            FROM main.{policy.table}
+            WHERE {column} < ? AND substr({column}, 1, 7) GLOB ? AND {_keep_filter(policy)}
+            GROUP BY month
+            ORDER BY month
+            """,
+            (cutoff, _MONTH_GLOB),
+        ).fetchall()
+
+        months: Dict[str, int] = {}
+        for row in pending:
+            month = row["month"]
+            months[month] = int(row["row_count"]) if dry_run else self._archive_month(conn, policy, month)
+        if months and not dry_run:
+            logger.info(f"[Retention] {policy.table}: archived {sum(months.values())} rows before {cutoff}")
+        return {"cutoff": cutoff, "months": months, "moved": 0 if dry_run else sum(months.values())}
+
+    def _archive_month(self, conn: sqlite3.Connection, policy: RetentionPolicy, month: str) -> int:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        conn.execute(f"ATTACH DATABASE ? AS {_ARCHIVE_ALIAS}", (self.archive_path(month),))
+        try:
+            column_list = ", ".join(self._ensure_archive_table(conn, policy))
+            select_batch = f"""
+                SELECT rowid FROM main.{policy.table}
+                WHERE {policy.time_column} >= ? AND {policy.time_column} < ? AND {_keep_filter(policy)}
+                LIMIT ?
+            """
+            bounds = (f"{month}-01", f"{_next_month(month)}-01")
+            batch_size = max(1, DatabaseConfig.retention_batch_size())
+            moved = 0
+            while True:
+                rowids = [row[0] for row in conn.execute(select_batch, (*bounds, batch_size)).fetchall()]
+                if not rowids:
+                    break
+                placeholders = ", ".join("?" for _ in rowids)
+                conn.execute(
+                    f"""
+                    INSERT OR REPLACE INTO {_ARCHIVE_ALIAS}.{policy.table} ({column_list})
+                    SELECT {column_list} FROM main.{policy.table} WHERE rowid IN ({placeholders})
+                    """,
+                    rowids,
+                )
+                # 归档库先落盘，再删主库：两个文件分开提交，中断时最坏是归档库多一份副本
+                conn.commit()
+                moved += conn.execute(
+                    f"DELETE FROM main.{policy.table} WHERE rowid IN ({placeholders})", rowids
+                ).rowcount
+                conn.commit()
+            self._refresh_rollup(conn, policy, month)
+            conn.commit()
+            return moved
+        finally:
+            self._detach(conn, _ARCHIVE_ALIAS)
+
+    def _ensure_archive_table(self, conn: sqlite3.Connection, policy: RetentionPolicy) -> List[str]:
+        """归档库里按主库当前 DDL 建表；主库后来补的列同步 ADD COLUMN。返回主库列名"""
+        table = policy.table
+        archived = _columns(conn, _ARCHIVE_ALIAS, table)
+        if not archived:
+            ddl = conn.execute(
+                "SELECT sql FROM main.sqlite_master WHERE type='table' AND name=?", (table,)
+            ).fetchone()[0]
+            conn.execute(_CREATE_TABLE_RE.sub(f"CREATE TABLE IF NOT EXISTS {_ARCHIVE_ALIAS}.{table}", ddl, count=1))
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {_ARCHIVE_ALIAS}.idx_{table}_{policy.time_column} "
+                f"ON {table}({policy.time_column})"
+            )
+            if policy.user_column:
+                conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS {_ARCHIVE_ALIAS}.idx_{table}_{policy.user_column} "
+                    f"ON {table}({policy.user_column})"
+                )
+            archived = _columns(conn, _ARCHIVE_ALIAS, table)
+
+        hot = _columns(conn, "main", table)
+        archived_names = {name for name, _ in archived}
+        for name, column_type in hot:
+            if name not in archived_names:
+                conn.execute(f"ALTER TABLE {_ARCHIVE_ALIAS}.{table} ADD COLUMN {name} {column_type}")
+        return [name for name, _ in hot]
+
+    def _refresh_rollup(self, conn: sqlite3.Connection, policy: RetentionPolicy, month: str) -> None:
+        """按归档库中该月全部行重算汇总（重跑 / 分多晚归档同一月时结果一致）"""
+        dimension = (
+            f"COALESCE(CAST({policy.dimension_column} AS TEXT), '')" if policy.dimension_column else "''"
+        )
+        users = f"COUNT(DISTINCT {policy.user_column})" if policy.user_column else "NULL"
+        total = f"SUM({policy.sum_column})" if policy.sum_column else "NULL"
+        conn.execute(
+            "DELETE FROM main.retention_rollups WHERE table_name = ? AND period = ?",
+            (policy.table, month),
+        )
+        conn.execute(
+            f"""
+            INSERT INTO main.retention_rollups (
+                table_name, period, dimension, row_count, distinct_users, value_sum, archived_at
+            )
+            SELECT ?, ?, {dimension}, COUNT(*), {users}, {total}, ?
+            FROM {_ARCHIVE_ALIAS}.{policy.table}
+            WHERE {policy.time_column} >= ? AND {policy.time_column} < ?
+            GROUP BY {dimension}
+            """,
+            (
+                policy.table,
+                month,
+                datetime.utcnow().isoformat() + "Z",
+                f"{month}-01",
+                f"{_next_month(month)}-01",
+            ),
+        )
+
+    @staticmethod
+    def _detach(conn: sqlite3.Connection, alias: str) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        attached = {row[1] for row in conn.execute("PRAGMA database_list").fetchall()}
+        if alias in attached:
+            conn.execute(f"DETACH DATABASE {alias}")
+
+    # ==================== Reading ====================
+
+    def query_history(
+        self,
+        table: str,
+        where: str = "",
+        params: Sequence[Any] = (),
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        热库 + 归档库合并查询，按 time_column 倒序
+
+        since / until 为 ISO 日期（含 since，不含 until），只 ATTACH 覆盖该区间的归档月；
+        where 为代码内拼好的条件（参数用 ? 占位），不要拼接用户输入。
+        """
+        policy = self.policy(table)
+        column = policy.time_column
+        conditions: List[str] = []
+        bound: List[Any] = []
+        if where:
+            conditions.append(f"({where})")
+            bound.extend(params)
+        if since:
+            conditions.append(f"{column} >= ?")
+            bound.append(since)
+        if until:
+            conditions.append(f"{column} < ?")
+            bound.append(until)
+        clause = " AND ".join(conditions) or "1=1"
+        months = [
+            month
+            for month in self.archived_months()
+            if (not since or month >= since[:7]) and (not until or month <= until[:7])
+        ]
+
+        rows: List[Dict[str, Any]] = []
+        with self._connect() as conn:
+            columns = [name for name, _ in _columns(conn, "main", table)]
+            rows.extend(self._select_union(conn, ["main"], table, columns, clause, bound, column, limit))
+            for start in range(0, len(months), _MAX_ATTACHED):
+                aliases = []
+                try:
+                    for offset, month in enumerate(months[start:start + _MAX_ATTACHED]):
+                        alias = f"{_ARCHIVE_ALIAS}_{offset}"
+                        conn.execute(f"ATTACH DATABASE ? AS {alias}", (self.archive_path(month),))
+                        aliases.append(alias)
+                    rows.extend(self._select_union(conn, aliases, table, columns, clause, bound, column, limit))
+                finally:
+                    for alias in aliases:
+                        self._detach(conn, alias)
+
+        rows.sort(key=lambda row: row.get(column) or "", reverse=True)
+        return rows[:limit] if limit else rows
+
+    @staticmethod
+    def _select_union(
+        conn: sqlite3.Connection,
+        schemas: Sequence[str],
+        table: str,
+        columns: Sequence[str],
+        clause: str,
+        params: Sequence[Any],
+        order_column: str,
+        limit: Optional[int],
+    ) -> List[Dict[str, Any]]:
+        selects = []
+        bound: List[Any] = []
+        for schema in schemas:
+            present = {name for name, _ in _columns(conn, schema, table)}
+            if not present:
+                continue
+            # 旧归档月缺少主库后来补的列时以 NULL 补齐，保证 UNION ALL 列数一致
+            select_list = ", ".join(name if name in present else f"NULL AS {name}" for name in columns)
+            selects.append(f"SELECT {select_list} FROM {schema}.{table} WHERE {clause}")
+            bound.extend(params)
+        if not selects:
+            return []
+        sql = " UNION ALL ".join(selects) + f" ORDER BY {order_column} DESC"
+        if limit:
+            sql += " LIMIT ?"
+            bound.append(int(limit))
+        return [dict(row) for row in conn.execute(sql, bound).fetchall()]
+
+    def rollups(self, table: Optional[str] = None) -> List[Dict[str, Any]]:
+        """已归档月份的汇总，按表、月份倒序"""
+        query = """
+            SELECT table_name, period, dimension, row_count, distinct_users, value_sum, archived_at
+            FROM retention_rollups
+        """
+        params: List[Any] = []
+        if table:
+            query += " WHERE table_name = ?"
+            params.append(table)
+        query += " ORDER BY table_name ASC, period DESC, dimension ASC"
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def summary(self) -> Dict[str, Any]:
+        """运营看板用：各表保留期、归档文件大小与月度汇总"""
+        return {
+            "archive_dir": self.archive_dir,
+            "policies": [
+                {"table": policy.table, "time_column": policy.time_column, "days": policy.days}
+                for policy in self._policies.values()
+            ],
+            "archives": [
+                {"month": month, "bytes": os.path.getsize(self.archive_path(month))}
+                for month in self.archived_months()
+            ],
+            "rollups": self.rollups(),
+        }
+
+
+# Singleton instance
+retention_manager = RetentionManager()
@@ -0,0 +1,176 @@
+"""
+Schema Registry
+Code-owned table DDL and column migrations, applied once at startup
+
+migrations/*.sql 之外，部分表结构历史上由服务在构造时自行维护（CREATE TABLE IF NOT EXISTS +
+PRAGMA table_info + ALTER TABLE）。这些定义集中登记在这里，由 scripts/run_migrations.py 在
+SQL 迁移之后统一执行一次；服务本身假定 schema 已存在，请求路径上不再有 DDL。
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from database.compression import register_sqlite_functions
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """
+    一张表的代码侧定义
+
+    - create_sql: 表不存在时执行（CREATE TABLE IF NOT EXISTS ...）；由 SQL 迁移建表的可留空
+    - columns: 需补齐的列 (name, type)，缺失时 ALTER TABLE ADD COLUMN（SQLite 不支持 DROP COLUMN）
+    - indexes: CREATE INDEX IF NOT EXISTS 语句
+    """
+
+    table: str
+    create_sql: Optional[str] = None
+    columns: Tuple[Tuple[str, str], ...] = ()
+    indexes: Tuple[str, ...] = ()
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=? LIMIT 1",
+        (table,),
+    ).fetchone()
+    return row is not None
+
+
+def _column_names(conn: sqlite3.Connection, table: str) -> Set[str]:
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return {row["name"] if isinstance(row, dict) else row[1] for row in rows}
+
+
+class SchemaRegistry:
+    """登记代码侧表结构；apply() 幂等，可重复执行"""
+
+    def __init__(self):
+        self._schemas: Dict[str, TableSchema] = {}
+        self._ensured: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def register(self, schema: TableSchema) -> TableSchema:
+        self._schemas[schema.table] = schema
+        return schema
+
+    def tables(self) -> List[str]:
+        return list(self._schemas)
+
+    def apply(self, conn: sqlite3.Connection) -> List[str]:
+        """
+        在给定连接上建表/补列/建索引，返回实际发生的变更（调用方负责 commit）
+        """
+        changes: List[str] = []
+        for schema in self._schemas.values():
+            existed = _table_exists(conn, schema.table)
+            if not existed:
+                if not schema.create_sql:
+                    # 由 SQL 迁移负责建表，迁移未覆盖时跳过补列
+                    continue
+                conn.execute(schema.create_sql)
+                changes.append(f"CREATE TABLE {schema.table}")
+
+            existing = _column_names(conn, schema.table)
+            for column, column_type in schema.columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {schema.table} ADD COLUMN {column} {column_type}")
+                    changes.append(f"ALTER TABLE {schema.table} ADD COLUMN {column}")
+
+            for index_sql in schema.indexes:
+                conn.execute(index_sql)
+
+        for change in changes:
+            logger.info(f"[SchemaRegistry] {change}")
+        return changes
+
+    def ensure(self, db_path: str) -> List[str]:
+        """对指定库执行一次 apply（同一进程内同一路径只执行一次），供脚本/测试使用"""
+        with self._lock:
+            if db_path in self._ensured:
+                return []
+            conn = sqlite3.connect(db_path)
+            register_sqlite_functions(conn)
+            try:
+                changes = self.apply(conn)
+                conn.commit()
+            finally:
+                conn.close()
+            self._ensured.add(db_path)
+            return changes
+
+
+# Singleton instance
+schema_registry = SchemaRegistry()
+
+# ==================== Registered schemas ====================
+
+# 分析专栏文章（原 ArchiveService._init_db / _ensure_article_columns）
+schema_registry.register(TableSchema(
+    table="articles",
+    create_sql="""
+        CREATE TABLE IF NOT EXISTS articles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            stock_code TEXT NOT NULL,
+            stock_name TEXT NOT NULL,
+            market_type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            score INTEGER,
+            legacy_score INTEGER,
+            score_version TEXT,
+            ai_score_json TEXT,
+            publish_date TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            preview TEXT,
+            content_length INTEGER,
+            UNIQUE(title)
+        )
+    """,
+    columns=(
+        ("legacy_score", "INTEGER"),
+        ("score_version", "TEXT"),
+        ("ai_score_json", "TEXT"),
+        ("preview", "TEXT"),
+        ("content_length", "INTEGER"),
+    ),
+))
+
+# 判断快照 v0.1 字段（原 JudgmentService._init_db）；judgments / judgment_checks 表本身由
+# 迁移 001/006/018 维护，这里只补 JudgmentService 依赖的列
+schema_registry.register(TableSchema(
+    table="judgments",
+    columns=(("verification_period", "INTEGER DEFAULT 7"),),
+))
+
+# 后台任务健康表由迁移 015 建立；这里补最近一次运行的耗时与指标（JobHealthTracker 写入）
+schema_registry.register(TableSchema(
+    table="job_health",
+    columns=(
+        ("last_duration_ms", "REAL"),
+        ("last_metrics", "TEXT"),
+    ),
+))
+
+# 归档月份的汇总（database/retention.py 写入），明细已搬到月度归档库
+schema_registry.register(TableSchema(
+    table="retention_rollups",
+    create_sql="""
+        CREATE TABLE IF NOT EXISTS retention_rollups (
+            table_name TEXT NOT NULL,
+            period TEXT NOT NULL,
+            dimension TEXT NOT NULL DEFAULT '',
+            row_count INTEGER NOT NULL DEFAULT 0,
+            distinct_users INTEGER,
+            value_sum REAL,
+            archived_at TEXT NOT NULL,
+            PRIMARY KEY (table_name, period, dimension)
+        )
+    """,
+))
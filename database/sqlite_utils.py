@@ -8,6 +8,7 @@ import time
 from typing import Callable, TypeVar
 
 from config.database import DatabaseConfig
+from database.compression import register_sqlite_functions
 
 T = TypeVar("T")
 
@@ -18,6 +19,7 @@ def configure_sqlite_connection(conn: sqlite3.Connection) -> None:
     if DatabaseConfig.enable_wal():
         conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA foreign_keys=ON")
+    register_sqlite_functions(conn)
 
 
 def run_with_busy_retry(
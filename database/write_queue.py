@@ -0,0 +1,319 @@
+"""
+Group-commit write queue
+Batches small append-only / upsert writes into one SQLite transaction
+
+分析完成后的额度记录、用量计数、邀请奖励判定、任务健康状态等写入原本各自开连接、
+各自抢一次写锁并 commit。这里改为提交给后台写线程：每 DB_WRITE_QUEUE_FLUSH_MS 毫秒
+或攒够 DB_WRITE_QUEUE_MAX_BATCH 条合并成一个 BEGIN IMMEDIATE ... COMMIT，
+单条失败只回滚到自己的 SAVEPOINT，不影响同批其它写入。
+
+持久性约定（按写入类别）：
+- 额度 / 奖励（analysis_records、invite_rewards）：入队即返回，正常退出时 shutdown 刷盘；
+  进程被强杀时最多丢失最近一个刷盘窗口内的记录。同一用户的额度读取前会等待其未提交写入
+  （barrier），读自己的写不受延迟影响。
+- 计数（llm_usage_daily）：尽力而为，丢失窗口同上；运营看板读取前先 barrier。
+- 状态（job_health）：按 job_id 合并，只落最后一次状态；进程内内存为准，表只是镜像。
+
+DB_WRITE_QUEUE_ENABLED=false 时 submit 在调用线程内同步执行（单独事务），行为与改造前一致。
+"""
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+from config.database import DatabaseConfig
+from database.db_factory import DatabaseFactory
+from database.sqlite_utils import run_with_busy_retry
+from utils.logger import get_logger
+
+logger = get_logger()
+
+WriteOp = Callable[[sqlite3.Cursor], Any]
+
+# 写线程最多保留的库连接数（测试里会频繁切换临时库）
+_MAX_WRITER_CONNECTIONS = 4
+
+
+@dataclass
+class _PendingWrite:
+    op: WriteOp
+    db_path: str
+    key: Optional[Hashable] = None
+    coalesce: bool = False
+    label: str = ""
+    submitted: float = field(default_factory=time.monotonic)
+
+
+def _is_busy(exc: BaseException) -> bool:
+    message = str(exc).lower()
+    return isinstance(exc, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+class GroupCommitWriter:
+    """
+    后台写线程 + 有序队列
+
+    - FIFO：同一库的写入按提交顺序执行，后入队的读改写操作（如奖励判定）能看到先入队的写入
+    - coalesce=True 的写入按 key 合并，尚未落盘时用新操作替换旧操作（保留原位置）
+    - flush() / barrier(key) 等待已入队写入提交，供读自己写与测试使用
+    """
+
+    def __init__(self, flush_ms: Optional[float] = None, max_batch: Optional[int] = None):
+        self.flush_ms = DatabaseConfig.write_queue_flush_ms() if flush_ms is None else flush_ms
+        self.max_batch = max(1, max_batch or DatabaseConfig.write_queue_max_batch())
+        self._cond = threading.Condition()
+        self._queue: Deque[_PendingWrite] = deque()
+        self._coalescing: Dict[Hashable, _PendingWrite] = {}
+        self._pending_keys: Counter = Counter()
+        self._submitted_seq = 0
+        self._done_seq = 0
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        # 按最近使用排序，超过 _MAX_WRITER_CONNECTIONS 时关闭最久未用的
+        self._connections: "OrderedDict[str, sqlite3.Connection]" = OrderedDict()
+        self._stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "committed": 0,
+            "failed": 0,
+            "batches": 0,
+            "max_batch_size": 0,
+            "max_commit_ms": 0.0,
+            "last_commit_ms": 0.0,
+        }
+
+    # ---------- 提交 ----------
+
+    def submit(
+        self,
+        op: WriteOp,
+        *,
+        key: Optional[Hashable] = None,
+        coalesce: bool = False,
+        label: str = "",
+    ) -> None:
+        """入队一个写操作；op(cursor) 在写线程的批事务里执行，不要在 op 内 commit"""
+        item = _PendingWrite(
+            op=op,
+            db_path=DatabaseFactory.get_db_path(),
+            key=key,
+            coalesce=coalesce and key is not None,
+            label=label or (str(key) if key is not None else ""),
+        )
+        if not DatabaseConfig.write_queue_enabled():
+            self._run_inline(item)
+            return
+
+        with self._cond:
+            if self._stopping:
+                inline = True
+            else:
+                inline = False
+                self._stats["submitted"] += 1
+                queued = self._coalescing.get((item.db_path, key)) if item.coalesce else None
+                if queued is not None:
+                    queued.op = op
+                    self._stats["coalesced"] += 1
+                    return
+                self._queue.append(item)
+                self._submitted_seq += 1
+                if key is not None:
+                    self._pending_keys[key] += 1
+                if item.coalesce:
+                    self._coalescing[(item.db_path, key)] = item
+                self._ensure_thread()
+                if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                    self._cond.notify_all()
+        if inline:
+            self._run_inline(item)
+
+    def has_pending(self, key: Hashable) -> bool:
+        with self._cond:
+            return self._pending_keys.get(key, 0) > 0
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._submitted_seq - self._done_seq
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待当前已入队的写入全部提交；超时返回 False"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            target = self._submitted_seq
+            if self._done_seq >= target:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._done_seq < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def barrier(self, key: Hashable, timeout: float = 5.0) -> bool:
+        """key 有未提交写入时 flush；没有则立即返回（读自己写的廉价保证）"""
+        if not self.has_pending(key):
+            return True
+        return self.flush(timeout)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """停止写线程：先把队列里的写入全部提交，之后的 submit 同步执行"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.warning(f"[WriteQueue] writer did not stop within {timeout}s, pending={self.pending()}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "enabled": DatabaseConfig.write_queue_enabled(),
+                "flush_ms": self.flush_ms,
+                "max_batch": self.max_batch,
+                "pending": self._submitted_seq - self._done_seq,
+                **self._stats,
+                "max_commit_ms": round(self._stats["max_commit_ms"], 2),
+                "last_commit_ms": round(self._stats["last_commit_ms"], 2),
+            }
+
+    # ---------- 写线程 ----------
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def _next_batch(self) -> Optional[List[_PendingWrite]]:
+        with self._cond:
+            while not self._queue and not self._stopping:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            # 攒批：等到刷盘窗口结束、批满、有人 flush 或正在停止
+            deadline = self._queue[0].submitted + self.flush_ms / 1000
+            while len(self._queue) < self.max_batch and not self._flush_requested and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            for item in batch:
+                if item.coalesce:
+                    self._coalescing.pop((item.db_path, item.key), None)
+            if not self._queue:
+                self._flush_requested = False
+            return batch
+
+    def _run(self) -> None:
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                try:
+                    self._commit_batch(batch)
+                finally:
+                    with self._cond:
+                        self._done_seq += len(batch)
+                        for item in batch:
+                            if item.key is not None:
+                                self._pending_keys[item.key] -= 1
+                                if self._pending_keys[item.key] <= 0:
+                                    del self._pending_keys[item.key]
+                        self._cond.notify_all()
+        finally:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._connections.clear()
+
+    def _writer_connection(self, db_path: str) -> sqlite3.Connection:
+        conn = self._connections.get(db_path)
+        if conn is not None:
+            self._connections.move_to_end(db_path)
+            return conn
+        if len(self._connections) >= _MAX_WRITER_CONNECTIONS:
+            _, oldest = self._connections.popitem(last=False)
+            oldest.close()
+        conn = self._connections[db_path] = DatabaseFactory._open_connection(db_path)
+        return conn
+
+    def _commit_batch(self, batch: List[_PendingWrite]) -> None:
+        by_path: Dict[str, List[_PendingWrite]] = {}
+        for item in batch:
+            by_path.setdefault(item.db_path, []).append(item)
+        for db_path, items in by_path.items():
+            try:
+                self._commit(self._writer_connection(db_path), items)
+            except Exception as exc:
+                bad = self._connections.pop(db_path, None)
+                if bad is not None:
+                    bad.close()
+                with self._cond:
+                    self._stats["failed"] += len(items)
+                labels = sorted({item.label for item in items if item.label})
+                logger.error(f"[WriteQueue] batch of {len(items)} dropped ({', '.join(labels)}): {exc}")
+
+    def _commit(self, conn: sqlite3.Connection, items: List[_PendingWrite]) -> None:
+        started = time.monotonic()
+
+        def attempt() -> int:
+            cursor = conn.cursor()
+            failed = 0
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                for item in items:
+                    cursor.execute("SAVEPOINT write_queue_item")
+                    try:
+                        item.op(cursor)
+                    except Exception as exc:
+                        if _is_busy(exc):
+                            raise
+                        cursor.execute("ROLLBACK TO write_queue_item")
+                        failed += 1
+                        logger.warning(f"[WriteQueue] {item.label or 'write'} skipped: {exc}")
+                    cursor.execute("RELEASE write_queue_item")
+                conn.commit()
+                return failed
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+        failed = run_with_busy_retry(attempt)
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._cond:
+            self._stats["batches"] += 1
+            self._stats["committed"] += len(items) - failed
+            self._stats["failed"] += failed
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(items))
+            self._stats["last_commit_ms"] = elapsed_ms
+            self._stats["max_commit_ms"] = max(self._stats["max_commit_ms"], elapsed_ms)
+
+    def _run_inline(self, item: _PendingWrite) -> None:
+        """队列关闭/已停止时在调用线程同步执行"""
+        if item.db_path == DatabaseFactory.get_db_path():
+            conn = DatabaseFactory.get_connection()
+        else:
+            conn = DatabaseFactory._open_connection(item.db_path)
+        try:
+            self._commit(conn, [item])
+        except Exception as exc:
+            logger.error(f"[WriteQueue] {item.label or 'write'} failed: {exc}")
+        finally:
+            conn.close()
+
+
+# Singleton instance
+write_queue = GroupCommitWriter()
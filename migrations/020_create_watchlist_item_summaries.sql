@@ -0,0 +1,21 @@
+-- Migration 020: 观察列表摘要物化表
+-- 盘后任务为所有观察列表标的写入当日摘要，盘中只刷新价格列；
+-- get_summary 直接读行，晚间请求不再触发上游调用，重启后摘要仍是热的。
+-- payload 为 WatchlistItemSummary JSON（不含权重 / 风险名单等按列表叠加的字段），
+-- price / change_pct 以列值为准（盘中刷新只更新列）。
+
+CREATE TABLE IF NOT EXISTS watchlist_item_summaries (
+    ts_code TEXT NOT NULL,
+    asof TEXT NOT NULL,              -- YYYY-MM-DD
+    name TEXT,
+    price REAL,
+    change_pct REAL,
+    payload TEXT NOT NULL,
+    source TEXT NOT NULL,            -- post_close / on_demand
+    built_at TEXT NOT NULL,          -- ISO8601 Timestamp
+    price_updated_at TEXT,           -- ISO8601 Timestamp
+    PRIMARY KEY (ts_code, asof)
+);
+
+CREATE INDEX IF NOT EXISTS idx_watchlist_item_summaries_asof
+    ON watchlist_item_summaries(asof);
@@ -0,0 +1,10 @@
+-- Migration 021: 观察池结构信号滚动状态
+-- 每只标的保留最近 N 根日线（trade_date, close, vol），盘后扫描只追加当日一根 bar，
+-- 无需每次重拉整年历史；状态落后超过一个交易日时用批量日线重新预热。
+
+CREATE TABLE IF NOT EXISTS watchlist_signal_state (
+    ts_code TEXT PRIMARY KEY,
+    last_trade_date TEXT NOT NULL,   -- YYYYMMDD
+    bars TEXT NOT NULL,              -- JSON [[trade_date, close, vol], ...] 按日期升序
+    updated_at TEXT NOT NULL
+);
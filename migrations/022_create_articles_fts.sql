@@ -0,0 +1,52 @@
+-- Migration 022: 分析专栏全文检索（FTS5）
+-- 外部内容表：索引 title / stock_code / stock_name / content，正文不重复存储，由触发器与 articles 同步。
+-- trigram 分词对中文按任意 3 字子串建索引（等价于 LIKE '%kw%' 的子串语义），
+-- 不足 3 字的关键词由 ArchiveService 回退为窄列 LIKE。
+-- articles 历史上由服务自行建表，这里先补一个与 schema registry 一致的定义，保证全新库上触发器可建。
+-- 注意：REPLACE INTO 在 recursive_triggers 关闭时不会触发 DELETE 触发器，写入方需用 DELETE + INSERT。
+
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    stock_name TEXT NOT NULL,
+    market_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    score INTEGER,
+    legacy_score INTEGER,
+    score_version TEXT,
+    ai_score_json TEXT,
+    publish_date TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(title)
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title,
+    stock_code,
+    stock_name,
+    content,
+    content='articles',
+    content_rowid='id',
+    tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, stock_code, stock_name, content)
+    VALUES (new.id, new.title, new.stock_code, new.stock_name, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, stock_code, stock_name, content)
+    VALUES ('delete', old.id, old.title, old.stock_code, old.stock_name, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, stock_code, stock_name, content ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, stock_code, stock_name, content)
+    VALUES ('delete', old.id, old.title, old.stock_code, old.stock_name, old.content);
+    INSERT INTO articles_fts(rowid, title, stock_code, stock_name, content)
+    VALUES (new.id, new.title, new.stock_code, new.stock_name, new.content);
+END;
+
+-- 为已有文章建索引
+INSERT INTO articles_fts(articles_fts) VALUES ('rebuild');
@@ -0,0 +1,55 @@
+-- Migration 023: 热点查询索引审计
+-- 为列表/计数/最新一条等高频查询补齐复合或覆盖索引，使 EXPLAIN QUERY PLAN 不再出现全表 SCAN
+-- 或为 ORDER BY 建临时 B 树。被新索引前缀覆盖的旧单列索引一并删除，减少写放大。
+-- 每条查询对应的计划由 tests/test_query_plans.py 回归校验，改 SQL 或删索引时需同步更新。
+
+-- articles：公开/管理端列表按 (publish_date, created_at, id) 倒序 + keyset 翻页
+CREATE INDEX IF NOT EXISTS idx_articles_publish_order
+    ON articles(publish_date DESC, created_at DESC, id DESC);
+
+-- articles：按标的取文章（含 WEEKLY_RECAP 最新一期）
+CREATE INDEX IF NOT EXISTS idx_articles_stock_publish
+    ON articles(stock_code, publish_date DESC, id DESC);
+
+-- judgment_checks：每个判断的最新一次检查
+DROP INDEX IF EXISTS idx_checks_judgment_id;
+CREATE INDEX IF NOT EXISTS idx_checks_judgment_created
+    ON judgment_checks(judgment_id, created_at DESC);
+
+-- watchlist_items：观察池明细按加入时间倒序（主键只覆盖 watchlist_id 过滤，不覆盖排序）
+CREATE INDEX IF NOT EXISTS idx_watchlist_items_added
+    ON watchlist_items(watchlist_id, added_at DESC);
+
+-- 风险提醒：未读计数 / 列表（全部或仅未读）按时间倒序；邮件汇总按交易日取用户
+DROP INDEX IF EXISTS idx_watchlist_risk_alerts_user;
+DROP INDEX IF EXISTS idx_watchlist_risk_alerts_unread;
+CREATE INDEX IF NOT EXISTS idx_watchlist_risk_alerts_user_created
+    ON watchlist_risk_alerts(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_risk_alerts_unread_created
+    ON watchlist_risk_alerts(user_id, read_at, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_risk_alerts_trade_user
+    ON watchlist_risk_alerts(trade_date, user_id);
+
+-- 结构信号提醒：同上，列表排序多一个 trade_date
+DROP INDEX IF EXISTS idx_watchlist_signal_alerts_user;
+DROP INDEX IF EXISTS idx_watchlist_signal_alerts_unread;
+CREATE INDEX IF NOT EXISTS idx_watchlist_signal_alerts_user_created
+    ON watchlist_signal_alerts(user_id, created_at DESC, trade_date DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_signal_alerts_unread_created
+    ON watchlist_signal_alerts(user_id, read_at, created_at DESC, trade_date DESC);
+
+-- analysis_records：当日额度（COUNT + GROUP_CONCAT(stock_code)）走覆盖索引；用量统计按日期范围
+DROP INDEX IF EXISTS idx_analysis_user_date;
+CREATE INDEX IF NOT EXISTS idx_analysis_user_date_stock
+    ON analysis_records(user_id, analysis_date, stock_code);
+CREATE INDEX IF NOT EXISTS idx_analysis_date_user
+    ON analysis_records(analysis_date, user_id);
+
+-- users：管理端用户列表 keyset 翻页
+DROP INDEX IF EXISTS idx_users_created_at;
+CREATE INDEX IF NOT EXISTS idx_users_created_user
+    ON users(created_at DESC, user_id DESC);
+
+-- invite_acceptances：管理端邀请明细 keyset 翻页
+CREATE INDEX IF NOT EXISTS idx_invite_acceptances_accepted
+    ON invite_acceptances(accepted_at DESC, id DESC);
@@ -0,0 +1,51 @@
+-- Migration 024: articles_fts 改为从解码视图取正文
+-- articles.content 大文本改为压缩 BLOB 存储（database/compression.py，迁移 025 回填），
+-- FTS 外部内容表不能直接索引压缩值：改为以视图 articles_fts_source 为 content 表，
+-- 视图与同步触发器通过 SQL 函数 unpack_text() 解码（未压缩的 TEXT 原样返回）。
+-- 注意：unpack_text 由应用在连接上注册（configure_sqlite_connection / register_sqlite_functions），
+-- 未注册该函数的连接（如 sqlite3 命令行）写 articles 会报 no such function。
+
+DROP TRIGGER IF EXISTS articles_fts_ai;
+DROP TRIGGER IF EXISTS articles_fts_ad;
+DROP TRIGGER IF EXISTS articles_fts_au;
+DROP TABLE IF EXISTS articles_fts;
+DROP VIEW IF EXISTS articles_fts_source;
+
+CREATE VIEW articles_fts_source AS
+    SELECT id, title, stock_code, stock_name, unpack_text(content) AS content
+    FROM articles;
+
+CREATE VIRTUAL TABLE articles_fts USING fts5(
+    title,
+    stock_code,
+    stock_name,
+    content,
+    content='articles_fts_source',
+    content_rowid='id',
+    tokenize='trigram'
+);
+
+CREATE TRIGGER articles_fts_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, stock_code, stock_name, content)
+    VALUES (new.id, new.title, new.stock_code, new.stock_name, unpack_text(new.content));
+END;
+
+CREATE TRIGGER articles_fts_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, stock_code, stock_name, content)
+    VALUES ('delete', old.id, old.title, old.stock_code, old.stock_name, unpack_text(old.content));
+END;
+
+-- 只改存储格式（TEXT → 压缩 BLOB）时解码后的正文不变，跳过重建索引
+CREATE TRIGGER articles_fts_au AFTER UPDATE OF title, stock_code, stock_name, content ON articles
+WHEN old.title IS NOT new.title
+  OR old.stock_code IS NOT new.stock_code
+  OR old.stock_name IS NOT new.stock_name
+  OR unpack_text(old.content) IS NOT unpack_text(new.content)
+BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, stock_code, stock_name, content)
+    VALUES ('delete', old.id, old.title, old.stock_code, old.stock_name, unpack_text(old.content));
+    INSERT INTO articles_fts(rowid, title, stock_code, stock_name, content)
+    VALUES (new.id, new.title, new.stock_code, new.stock_name, unpack_text(new.content));
+END;
+
+INSERT INTO articles_fts(articles_fts) VALUES ('rebuild');
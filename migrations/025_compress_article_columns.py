@@ -0,0 +1,55 @@
+"""
+Migration 025: 文章大文本压缩存储 + 列表预览列
+
+- articles 补 preview（列表摘要，与前端 getArticlePreview 同规则）与 content_length（正文字符数）
+- 按 id 分批把 content / ai_score_json 改写为压缩格式（database/compression.py），逐批提交，
+  不长时间占用写锁；已压缩或过短的值保持不变，可重复执行
+
+FTS 同步触发器（迁移 024）在正文解码结果不变时不重建索引。
+由 scripts/run_migrations.py 加载并调用 migrate(conn)。
+"""
+import sqlite3
+
+from database.compression import pack_text, unpack_text
+from services.archive_service import article_preview
+
+BATCH_SIZE = 200
+
+
+def _add_column(conn: sqlite3.Connection, column: str, column_type: str) -> None:
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(articles)").fetchall()}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE articles ADD COLUMN {column} {column_type}")
+
+
+def migrate(conn: sqlite3.Connection) -> None:
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='articles'").fetchone() is None:
+        return
+    _add_column(conn, "preview", "TEXT")
+    _add_column(conn, "content_length", "INTEGER")
+    conn.commit()
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, content, ai_score_json FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for article_id, content, ai_score_json in rows:
+            text = unpack_text(content)
+            updates.append((
+                pack_text(text),
+                pack_text(unpack_text(ai_score_json)),
+                article_preview(text),
+                len(text or ""),
+                article_id,
+            ))
+        conn.executemany(
+            "UPDATE articles SET content = ?, ai_score_json = ?, preview = ?, content_length = ? WHERE id = ?",
+            updates,
+        )
+        conn.commit()
+        last_id = rows[-1][0]
@@ -0,0 +1,11 @@
+-- Migration 026: 调度器 leader 租约
+-- 多 worker 部署时各进程竞争同一行租约，只有持有者运行定时任务（services/scheduler_leader.py）。
+-- 时间为 epoch 秒，持有者超过 expires_at 未续约即视为失联，可被其它 worker 接管。
+
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name TEXT PRIMARY KEY,
+    holder_id TEXT NOT NULL,
+    acquired_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL
+);
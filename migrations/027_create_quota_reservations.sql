@@ -0,0 +1,15 @@
+-- Migration 027: 跨 worker 的额度预占
+-- WEB_WORKERS>1 时各进程的 QuotaLedger 在同一事务里读已用 / 邀请额度 / 未过期预占并写入新预占（services/quota_service.py），
+-- 避免每个进程各自放出一整份额度。commit 时与 analysis_records 同一事务删除；进程崩溃留下的预占在 expires_at（epoch 秒）后失效。
+
+CREATE TABLE IF NOT EXISTS quota_reservations (
+    reservation_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    analysis_date TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (reservation_id, stock_code)
+);
+
+CREATE INDEX IF NOT EXISTS idx_quota_reservations_user_date
+    ON quota_reservations(user_id, analysis_date);
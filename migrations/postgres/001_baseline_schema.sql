@@ -0,0 +1,371 @@
+-- PostgreSQL baseline: 与 SQLite 迁移 001–023 + schema_registry 之后的结构一致
+-- DB_BACKEND=postgres 时 scripts/run_migrations.py 只执行 migrations/postgres/ 下的脚本；
+-- 之后新增的 SQLite 迁移需在本目录补一个对应的 PostgreSQL 脚本（编号独立递增）。
+-- 日期时间列沿用 TEXT（SQLite 里存的就是 ISO 文本），保证字符串比较/排序与 SQLite 一致。
+
+CREATE TABLE IF NOT EXISTS analysis_records (
+    id BIGSERIAL PRIMARY KEY,
+    user_id TEXT NOT NULL,                    -- aguai_uid from cookie
+    stock_code TEXT NOT NULL,                 -- Stock code (e.g., "000001")
+    analysis_date TEXT NOT NULL,              -- Analysis date (YYYY-MM-DD)
+    created_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS')),
+    
+    -- Prevent duplicate records for same user+stock+date
+    UNIQUE(user_id, stock_code, analysis_date)
+);
+
+CREATE TABLE IF NOT EXISTS invite_codes (
+    id BIGSERIAL PRIMARY KEY,
+    invite_code TEXT UNIQUE NOT NULL,         -- Unique invite code (8 chars)
+    inviter_id TEXT NOT NULL,                 -- Inviter's aguai_uid
+    created_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS')),
+    expires_at TEXT                      -- Optional expiration (NULL = never expires)
+);
+
+CREATE TABLE IF NOT EXISTS invite_rewards (
+    id BIGSERIAL PRIMARY KEY,
+    inviter_id TEXT NOT NULL,                 -- Inviter's aguai_uid
+    invitee_id TEXT NOT NULL,                 -- Invitee's aguai_uid
+    invite_code TEXT NOT NULL,                -- Invite code used
+    reward_quota INTEGER DEFAULT 5,           -- Reward amount (default 5)
+    reward_date TEXT NOT NULL,                -- Date reward was granted
+    created_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS')),
+    
+    -- Prevent same invitee from rewarding inviter multiple times
+    UNIQUE(inviter_id, invitee_id)
+);
+
+CREATE TABLE IF NOT EXISTS anchors (
+    anchor_id TEXT PRIMARY KEY,              -- UUID
+    anchor_type TEXT NOT NULL DEFAULT 'email', -- Fixed to 'email' for V-1
+    anchor_value_hash TEXT UNIQUE NOT NULL,  -- SHA256(email) for lookup
+    anchor_value_masked TEXT,                -- Masked email like u***@example.com
+    created_at TEXT NOT NULL                 -- ISO datetime
+);
+
+CREATE TABLE IF NOT EXISTS email_codes (
+    id BIGSERIAL PRIMARY KEY,
+    email_hash TEXT NOT NULL,                -- SHA256(email)
+    code TEXT NOT NULL,                      -- 6-digit verification code
+    expires_at TEXT NOT NULL,                -- ISO datetime (10 minutes from creation)
+    created_at TEXT NOT NULL,                -- ISO datetime
+    send_count INTEGER DEFAULT 1,            -- Rate limiting counter
+    used INTEGER DEFAULT 0                   -- 0=unused, 1=used (prevent reuse)
+);
+
+CREATE TABLE IF NOT EXISTS anchor_tokens (
+    token TEXT PRIMARY KEY,
+    anchor_id TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    FOREIGN KEY (anchor_id) REFERENCES anchors(anchor_id)
+);
+
+CREATE TABLE IF NOT EXISTS watchlists (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '默认自选',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS watchlist_items (
+    watchlist_id TEXT NOT NULL,
+    ts_code TEXT NOT NULL,
+    name TEXT,  -- 股票名称缓存
+    added_at TEXT NOT NULL, weight_pct DOUBLE PRECISION,
+    PRIMARY KEY (watchlist_id, ts_code),
+    FOREIGN KEY (watchlist_id) REFERENCES watchlists(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS judgments (
+    id TEXT PRIMARY KEY,          -- UUID (e.g. "jr_...")
+    user_id TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    candidate TEXT,               -- A/B/C
+    selected_premises TEXT,       -- JSON array
+    selected_risk_checks TEXT,    -- JSON array
+    constraints TEXT,             -- JSON object
+    snapshot TEXT,                -- JSON object
+    validation_date TEXT,         -- ISO8601 Timestamp
+    status TEXT DEFAULT 'active', -- active/due/reviewed/archived
+    review TEXT,                  -- JSON object
+    created_at TEXT NOT NULL,     -- ISO8601 Timestamp
+    updated_at TEXT NOT NULL      -- ISO8601 Timestamp
+, verification_status TEXT DEFAULT 'PENDING', verification_result TEXT, verification_period INTEGER DEFAULT 7);
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    primary_email TEXT,
+    email_verified INTEGER NOT NULL DEFAULT 0,
+    display_name TEXT,
+    profile_completed INTEGER NOT NULL DEFAULT 0,
+    is_public_analysis_enabled INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'active',
+    created_at TEXT NOT NULL,
+    last_active_at TEXT NOT NULL
+, notify_pref TEXT DEFAULT '{"risk_alert_email":true}');
+
+CREATE TABLE IF NOT EXISTS user_identities (
+    id BIGSERIAL PRIMARY KEY,
+    identity_type TEXT NOT NULL,
+    identity_value TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    is_primary INTEGER NOT NULL DEFAULT 0,
+    verified_at TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+);
+
+CREATE TABLE IF NOT EXISTS app_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS nav_links (
+    id BIGSERIAL PRIMARY KEY,
+    label TEXT NOT NULL,
+    href TEXT NOT NULL,
+    target TEXT NOT NULL DEFAULT '_blank',
+    rel TEXT NOT NULL DEFAULT 'noopener',
+    sort_order INTEGER NOT NULL DEFAULT 0,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS invite_acceptances (
+    id BIGSERIAL PRIMARY KEY,
+    inviter_id TEXT NOT NULL,
+    invitee_id TEXT NOT NULL,
+    invite_code TEXT NOT NULL,
+    accepted_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS')),
+
+    -- One user can only be attributed to one inviter.
+    UNIQUE(invitee_id)
+);
+
+CREATE TABLE IF NOT EXISTS risk_stock_items (
+    id BIGSERIAL PRIMARY KEY,
+    trade_date TEXT NOT NULL,
+    ts_code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    market TEXT,
+    tags_json TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    limit_up_days INTEGER DEFAULT 0,
+    is_st INTEGER DEFAULT 0,
+    source TEXT,
+    created_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS')),
+    updated_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS')), limit_down_days INTEGER DEFAULT 0, pct_chg DOUBLE PRECISION,
+    UNIQUE(trade_date, ts_code)
+);
+
+CREATE TABLE IF NOT EXISTS watchlist_risk_alerts (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    ts_code TEXT NOT NULL,
+    stock_name TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    tags_json TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    read_at TEXT,
+    UNIQUE(user_id, ts_code, trade_date)
+);
+
+CREATE TABLE IF NOT EXISTS risk_alert_email_log (
+    user_id TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    email TEXT NOT NULL,
+    item_count INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'sent',
+    error_message TEXT,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, trade_date)
+);
+
+CREATE TABLE IF NOT EXISTS job_health (
+    job_id TEXT PRIMARY KEY,
+    last_run_at TEXT,
+    last_success_at TEXT,
+    last_status TEXT NOT NULL DEFAULT 'unknown',
+    last_error TEXT,
+    consecutive_failures INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS llm_usage_daily (
+    usage_date TEXT NOT NULL,
+    user_type TEXT NOT NULL,
+    call_count INTEGER NOT NULL DEFAULT 0,
+    stock_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (usage_date, user_type)
+);
+
+CREATE TABLE IF NOT EXISTS journal_due_email_log (
+    user_id TEXT NOT NULL,
+    digest_date TEXT NOT NULL,
+    email TEXT NOT NULL,
+    item_count INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'sent',
+    error_message TEXT,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, digest_date)
+);
+
+CREATE TABLE IF NOT EXISTS watchlist_signal_alerts (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    ts_code TEXT NOT NULL,
+    stock_name TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    signal_type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    detail TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    read_at TEXT,
+    UNIQUE(user_id, ts_code, trade_date, signal_type)
+);
+
+CREATE TABLE IF NOT EXISTS judgment_checks (
+    id BIGSERIAL PRIMARY KEY,
+    judgment_id TEXT NOT NULL,
+    check_time TEXT NOT NULL,
+    current_price DOUBLE PRECISION,
+    price_change_pct DOUBLE PRECISION,
+    current_structure_status TEXT,
+    status_description TEXT,
+    reasons TEXT,
+    created_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS'))
+);
+
+CREATE TABLE IF NOT EXISTS watchlist_item_summaries (
+    ts_code TEXT NOT NULL,
+    asof TEXT NOT NULL,              -- YYYY-MM-DD
+    name TEXT,
+    price DOUBLE PRECISION,
+    change_pct DOUBLE PRECISION,
+    payload TEXT NOT NULL,
+    source TEXT NOT NULL,            -- post_close / on_demand
+    built_at TEXT NOT NULL,          -- ISO8601 Timestamp
+    price_updated_at TEXT,           -- ISO8601 Timestamp
+    PRIMARY KEY (ts_code, asof)
+);
+
+CREATE TABLE IF NOT EXISTS watchlist_signal_state (
+    ts_code TEXT PRIMARY KEY,
+    last_trade_date TEXT NOT NULL,   -- YYYYMMDD
+    bars TEXT NOT NULL,              -- JSON [[trade_date, close, vol], ...] 按日期升序
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS articles (
+    id BIGSERIAL PRIMARY KEY,
+    title TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    stock_name TEXT NOT NULL,
+    market_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    score INTEGER,
+    legacy_score INTEGER,
+    score_version TEXT,
+    ai_score_json TEXT,
+    publish_date TEXT NOT NULL,
+    created_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS')),
+    UNIQUE(title)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analysis_stock
+    ON analysis_records(stock_code);
+CREATE INDEX IF NOT EXISTS idx_invite_inviter
+    ON invite_codes(inviter_id);
+CREATE INDEX IF NOT EXISTS idx_reward_inviter_date
+    ON invite_rewards(inviter_id, reward_date);
+CREATE INDEX IF NOT EXISTS idx_reward_invitee
+    ON invite_rewards(invitee_id);
+CREATE INDEX IF NOT EXISTS idx_anchors_hash ON anchors(anchor_value_hash);
+CREATE INDEX IF NOT EXISTS idx_anchors_created ON anchors(created_at);
+CREATE INDEX IF NOT EXISTS idx_email_codes_hash ON email_codes(email_hash);
+CREATE INDEX IF NOT EXISTS idx_email_codes_expires ON email_codes(expires_at);
+CREATE INDEX IF NOT EXISTS idx_email_codes_created ON email_codes(created_at);
+CREATE INDEX IF NOT EXISTS idx_anchor_tokens_anchor ON anchor_tokens(anchor_id);
+CREATE INDEX IF NOT EXISTS idx_anchor_tokens_expires ON anchor_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_watchlists_user ON watchlists(user_id);
+CREATE INDEX IF NOT EXISTS idx_watchlist_items_code ON watchlist_items(ts_code);
+CREATE INDEX IF NOT EXISTS idx_judgments_user_id ON judgments(user_id);
+CREATE INDEX IF NOT EXISTS idx_judgments_stock_code ON judgments(stock_code);
+CREATE INDEX IF NOT EXISTS idx_judgments_status ON judgments(status);
+CREATE INDEX IF NOT EXISTS idx_judgments_validation ON judgments(validation_date);
+CREATE INDEX IF NOT EXISTS idx_judgments_created_at ON judgments(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_judgments_ver_status ON judgments(verification_status);
+CREATE INDEX IF NOT EXISTS idx_users_status ON users(status);
+CREATE INDEX IF NOT EXISTS idx_users_primary_email ON users(primary_email);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_identities_unique_identity
+    ON user_identities(identity_type, identity_value);
+CREATE INDEX IF NOT EXISTS idx_user_identities_user_id
+    ON user_identities(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_identities_type
+    ON user_identities(identity_type);
+CREATE INDEX IF NOT EXISTS idx_app_settings_updated ON app_settings(updated_at);
+CREATE INDEX IF NOT EXISTS idx_nav_links_sort ON nav_links(sort_order, enabled);
+CREATE INDEX IF NOT EXISTS idx_invite_acceptances_inviter
+    ON invite_acceptances(inviter_id);
+CREATE INDEX IF NOT EXISTS idx_invite_acceptances_code
+    ON invite_acceptances(invite_code);
+CREATE INDEX IF NOT EXISTS idx_risk_stock_items_date
+    ON risk_stock_items(trade_date);
+CREATE INDEX IF NOT EXISTS idx_risk_stock_items_code
+    ON risk_stock_items(ts_code);
+CREATE INDEX IF NOT EXISTS idx_risk_alert_email_log_trade_date
+    ON risk_alert_email_log(trade_date);
+CREATE INDEX IF NOT EXISTS idx_llm_usage_daily_date
+    ON llm_usage_daily(usage_date DESC);
+CREATE INDEX IF NOT EXISTS idx_journal_due_email_log_digest_date
+    ON journal_due_email_log(digest_date);
+CREATE INDEX IF NOT EXISTS idx_checks_created_at ON judgment_checks(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_item_summaries_asof
+    ON watchlist_item_summaries(asof);
+CREATE INDEX IF NOT EXISTS idx_articles_publish_order
+    ON articles(publish_date DESC, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_articles_stock_publish
+    ON articles(stock_code, publish_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_checks_judgment_created
+    ON judgment_checks(judgment_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_items_added
+    ON watchlist_items(watchlist_id, added_at DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_risk_alerts_user_created
+    ON watchlist_risk_alerts(user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_risk_alerts_unread_created
+    ON watchlist_risk_alerts(user_id, read_at, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_risk_alerts_trade_user
+    ON watchlist_risk_alerts(trade_date, user_id);
+CREATE INDEX IF NOT EXISTS idx_watchlist_signal_alerts_user_created
+    ON watchlist_signal_alerts(user_id, created_at DESC, trade_date DESC);
+CREATE INDEX IF NOT EXISTS idx_watchlist_signal_alerts_unread_created
+    ON watchlist_signal_alerts(user_id, read_at, created_at DESC, trade_date DESC);
+CREATE INDEX IF NOT EXISTS idx_analysis_user_date_stock
+    ON analysis_records(user_id, analysis_date, stock_code);
+CREATE INDEX IF NOT EXISTS idx_analysis_date_user
+    ON analysis_records(analysis_date, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_created_user
+    ON users(created_at DESC, user_id DESC);
+CREATE INDEX IF NOT EXISTS idx_invite_acceptances_accepted
+    ON invite_acceptances(accepted_at DESC, id DESC);
+
+-- 文章关键词检索：SQLite 用 FTS5 trigram（迁移 022），这里用 pg_trgm GIN 索引支撑
+-- ArchiveService 回退路径的 LIKE（方言改写为 ILIKE）子串匹配；实例未提供 pg_trgm 时跳过
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_articles_title_trgm ON articles USING GIN (title gin_trgm_ops)';
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_articles_stock_name_trgm ON articles USING GIN (stock_name gin_trgm_ops)';
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_articles_stock_code_trgm ON articles USING GIN (stock_code gin_trgm_ops)';
+    END IF;
+END
+$$;
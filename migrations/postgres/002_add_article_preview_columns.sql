@@ -0,0 +1,8 @@
+-- 对应 SQLite 迁移 024/025：列表预览列与正文长度
+-- PostgreSQL 对大字段自动做 TOAST 压缩，content / ai_score_json 不做应用层压缩，也不需要 FTS 视图。
+-- 已有行的 preview 保持 NULL，由 ArchiveService 读取列表时按正文补算，之后的写入会落库。
+
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS preview TEXT;
+ALTER TABLE articles ADD COLUMN IF NOT EXISTS content_length INTEGER;
+
+UPDATE articles SET content_length = LENGTH(content) WHERE content_length IS NULL;
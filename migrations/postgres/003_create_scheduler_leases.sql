@@ -0,0 +1,9 @@
+-- 对应 SQLite 迁移 026：调度器 leader 租约（多 worker / 多实例共用同一个 PostgreSQL 时同样适用）
+
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name TEXT PRIMARY KEY,
+    holder_id TEXT NOT NULL,
+    acquired_at DOUBLE PRECISION NOT NULL,
+    expires_at DOUBLE PRECISION NOT NULL,
+    heartbeat_at DOUBLE PRECISION NOT NULL
+);
@@ -0,0 +1,13 @@
+-- 对应 SQLite 迁移 027：跨 worker 的额度预占（多 worker / 多实例共用同一个 PostgreSQL 时同样适用）
+
+CREATE TABLE IF NOT EXISTS quota_reservations (
+    reservation_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    analysis_date TEXT NOT NULL,
+    stock_code TEXT NOT NULL,
+    expires_at DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (reservation_id, stock_code)
+);
+
+CREATE INDEX IF NOT EXISTS idx_quota_reservations_user_date
+    ON quota_reservations(user_id, analysis_date);
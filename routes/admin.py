@@ -19,12 +19,18 @@ from auth.admin_auth import (
     verify_admin_password,
     _rate_limit_ok,
 )
+from config.database import DatabaseConfig
+from database.async_db import db_coroutine, db_executor
 from database.db_factory import DatabaseFactory
+from database.pagination import CursorError, approx_counts, decode_cursor, encode_cursor, keyset_after_desc
+from database.query_stats import query_stats
+from database.retention import retention_manager
+from database.write_queue import write_queue
 from services.analyze_slo_tracker import analyze_slo_tracker
 from services.app_settings_service import PATCHABLE_KEYS, AppSettingsService, ai_effective_for_admin_display
 from services.job_health_tracker import job_health_tracker
 from services.llm_usage_service import llm_usage_service
-from services.archive_service import ArchiveService
+from services.archive_service import ArchiveService, article_cursor
 from services.journal import journal_service
 from services.nav_links_service import NavLinksService
 from utils.logger import get_logger
@@ -111,7 +117,8 @@ async def admin_me(_: dict = Depends(require_admin)):
 
 
 @router.get("/settings")
-async def admin_get_settings(_: dict = Depends(require_admin)):
+@db_coroutine
+def admin_get_settings(_: dict = Depends(require_admin)):
     rows = _settings_service().list_all()
     effective = ai_effective_for_admin_display()
     return {
@@ -122,7 +129,8 @@ async def admin_get_settings(_: dict = Depends(require_admin)):
 
 
 @router.patch("/settings")
-async def admin_patch_settings(
+@db_coroutine
+def admin_patch_settings(
     body: Dict[str, str] = Body(..., examples=[{"ai.api_url": "https://api.example.com/v1/chat/completions"}]),
     _: dict = Depends(require_admin),
 ):
@@ -155,12 +163,24 @@ async def admin_list_articles(
     limit: int = 50,
     offset: int = 0,
     q: Optional[str] = None,
+    cursor: Optional[str] = None,
     _: dict = Depends(require_admin),
 ):
     limit = min(max(limit, 1), 200)
     offset = max(offset, 0)
-    items, total = await _archive_service().admin_list_articles_with_total(limit, offset, q)
-    return {"articles": items, "total": total, "limit": limit, "offset": offset}
+    try:
+        items, total = await _archive_service().admin_list_articles_with_total(limit, offset, q, after=cursor)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = article_cursor(items[-1]) if items and len(items) >= limit else None
+    return {
+        "articles": items,
+        "total": total,
+        "total_is_estimate": True,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor,
+    }
 
 
 @router.get("/articles/{article_id}")
@@ -191,16 +211,22 @@ async def admin_delete_article(article_id: int, _: dict = Depends(require_admin)
 
 
 @router.get("/users")
-async def admin_list_users(
+@db_coroutine
+def admin_list_users(
     limit: int = 50,
     offset: int = 0,
     q: Optional[str] = None,
     email_verified: Optional[int] = None,
     has_email: Optional[int] = None,
+    cursor: Optional[str] = None,
     _: dict = Depends(require_admin),
 ):
     limit = min(max(limit, 1), 200)
     offset = max(offset, 0)
+    try:
+        after = decode_cursor(cursor, 2)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     with DatabaseFactory.get_connection() as conn:
         cur = conn.cursor()
         where = ["1=1"]
@@ -215,25 +241,50 @@ async def admin_list_users(
         if has_email == 1:
             where.append("(primary_email IS NOT NULL AND TRIM(primary_email) != '')")
         wh = " AND ".join(where)
+        filter_params = tuple(params)
+
+        def count() -> int:
+            cur.execute(f"SELECT COUNT(*) AS c FROM users WHERE {wh}", filter_params)
+            return int(cur.fetchone()["c"])
+
+        total = approx_counts.get(
+            ("users", DatabaseFactory.get_db_path(), q or "", email_verified, has_email), count
+        )
+
+        page_where = wh
+        if after is not None:
+            keyset_sql, keyset_params = keyset_after_desc(("created_at", "user_id"), after)
+            page_where = f"{wh} AND {keyset_sql}"
+            params.extend(keyset_params)
+            offset = 0
         cur.execute(
             f"""
             SELECT user_id, primary_email, email_verified, display_name, status,
                    profile_completed, is_public_analysis_enabled, created_at, last_active_at
             FROM users
-            WHERE {wh}
-            ORDER BY created_at DESC
+            WHERE {page_where}
+            ORDER BY created_at DESC, user_id DESC
             LIMIT ? OFFSET ?
             """,
             (*params, limit, offset),
         )
         rows = [dict(r) for r in cur.fetchall()]
-        cur.execute(f"SELECT COUNT(*) AS c FROM users WHERE {wh}", params)
-        total = int(cur.fetchone()["c"])
-    return {"users": rows, "total": total, "limit": limit, "offset": offset}
+    next_cursor = (
+        encode_cursor([rows[-1]["created_at"], rows[-1]["user_id"]]) if len(rows) >= limit else None
+    )
+    return {
+        "users": rows,
+        "total": total,
+        "total_is_estimate": True,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor,
+    }
 
 
 @router.patch("/users/{user_id}")
-async def admin_patch_user(user_id: str, body: UserPatchBody, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_patch_user(user_id: str, body: UserPatchBody, _: dict = Depends(require_admin)):
     if body.status not in ("active", "disabled"):
         raise HTTPException(status_code=400, detail="status 只能是 active 或 disabled")
     with DatabaseFactory.get_connection() as conn:
@@ -246,7 +297,8 @@ async def admin_patch_user(user_id: str, body: UserPatchBody, _: dict = Depends(
 
 
 @router.post("/journal/{record_id}/force-due")
-async def admin_force_journal_due(record_id: str, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_force_journal_due(record_id: str, _: dict = Depends(require_admin)):
     result = journal_service.force_due_record(record_id)
     if result.get("error") == "Record not found":
         raise HTTPException(status_code=404, detail="判断记录不存在")
@@ -256,7 +308,8 @@ async def admin_force_journal_due(record_id: str, _: dict = Depends(require_admi
 
 
 @router.get("/invites/summary")
-async def admin_invite_summary(_: dict = Depends(require_admin)):
+@db_coroutine
+def admin_invite_summary(_: dict = Depends(require_admin)):
     with DatabaseFactory.get_connection() as conn:
         cur = conn.cursor()
         cur.execute("SELECT COUNT(*) AS c FROM invite_codes")
@@ -299,56 +352,84 @@ async def admin_invite_summary(_: dict = Depends(require_admin)):
 
 
 @router.get("/invites/acceptances")
-async def admin_invite_acceptances(limit: int = 100, offset: int = 0, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_invite_acceptances(
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    _: dict = Depends(require_admin),
+):
     limit = min(max(limit, 1), 500)
     offset = max(offset, 0)
+    try:
+        after = decode_cursor(cursor, 2)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    keyset_sql, keyset_params = "1=1", []
+    if after is not None:
+        keyset_sql, keyset_params = keyset_after_desc(
+            ("a.accepted_at", "a.id"), after, nullable=("a.accepted_at",)
+        )
+        offset = 0
     with DatabaseFactory.get_connection() as conn:
         cur = conn.cursor()
         cur.execute(
-            """
+            f"""
             SELECT
-                a.id,
-                a.inviter_id,
-                a.invitee_id,
-                a.invite_code,
-                a.accepted_at,
-                COALESCE(ar.analysis_count, 0) AS analysis_count,
+                p.*,
                 CASE
-                    WHEN r.id IS NOT NULL THEN 'rewarded'
-                    WHEN COALESCE(ar.analysis_count, 0) > 0 THEN 'analysis_without_reward'
+                    WHEN p.reward_id IS NOT NULL THEN 'rewarded'
+                    WHEN p.analysis_count > 0 THEN 'analysis_without_reward'
                     ELSE 'pending_first_analysis'
-                END AS status,
-                r.reward_quota,
-                r.reward_date,
-                r.created_at AS rewarded_at
-            FROM invite_acceptances a
-            LEFT JOIN (
-                SELECT user_id, COUNT(*) AS analysis_count
-                FROM analysis_records
-                GROUP BY user_id
-            ) ar ON ar.user_id = a.invitee_id
-            LEFT JOIN invite_rewards r
-              ON r.inviter_id = a.inviter_id AND r.invitee_id = a.invitee_id
-            ORDER BY a.accepted_at DESC, a.id DESC
-            LIMIT ? OFFSET ?
+                END AS status
+            FROM (
+                -- 先按 keyset 取出当前页，再逐行按索引统计分析次数，避免每页全表 GROUP BY
+                SELECT
+                    a.id,
+                    a.inviter_id,
+                    a.invitee_id,
+                    a.invite_code,
+                    a.accepted_at,
+                    (
+                        SELECT COUNT(*) FROM analysis_records ar WHERE ar.user_id = a.invitee_id
+                    ) AS analysis_count,
+                    r.id AS reward_id,
+                    r.reward_quota,
+                    r.reward_date,
+                    r.created_at AS rewarded_at
+                FROM invite_acceptances a
+                LEFT JOIN invite_rewards r
+                  ON r.inviter_id = a.inviter_id AND r.invitee_id = a.invitee_id
+                WHERE {keyset_sql}
+                ORDER BY a.accepted_at DESC, a.id DESC
+                LIMIT ? OFFSET ?
+            ) p
+            ORDER BY p.accepted_at DESC, p.id DESC
             """,
-            (limit, offset),
+            (*keyset_params, limit, offset),
         )
         rows = [dict(r) for r in cur.fetchall()]
+    for row in rows:
+        row.pop("reward_id", None)
 
     pending_count = sum(1 for row in rows if row.get("status") == "pending_first_analysis")
     rewarded_count = sum(1 for row in rows if row.get("status") == "rewarded")
+    next_cursor = (
+        encode_cursor([rows[-1]["accepted_at"], rows[-1]["id"]]) if len(rows) >= limit else None
+    )
     return {
         "acceptances": rows,
         "pending_count": pending_count,
         "rewarded_count": rewarded_count,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
     }
 
 
 @router.get("/invites/diagnose/{invitee_id}")
-async def admin_invite_diagnosis(invitee_id: str, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_invite_diagnosis(invitee_id: str, _: dict = Depends(require_admin)):
     with DatabaseFactory.get_connection() as conn:
         cur = conn.cursor()
         cur.execute(
@@ -431,7 +512,8 @@ async def admin_invite_diagnosis(invitee_id: str, _: dict = Depends(require_admi
 
 
 @router.get("/invites/rewards")
-async def admin_invite_rewards(limit: int = 100, offset: int = 0, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_invite_rewards(limit: int = 100, offset: int = 0, _: dict = Depends(require_admin)):
     limit = min(max(limit, 1), 500)
     offset = max(offset, 0)
     with DatabaseFactory.get_connection() as conn:
@@ -450,12 +532,14 @@ async def admin_invite_rewards(limit: int = 100, offset: int = 0, _: dict = Depe
 
 
 @router.get("/nav-links")
-async def admin_nav_list(_: dict = Depends(require_admin)):
+@db_coroutine
+def admin_nav_list(_: dict = Depends(require_admin)):
     return {"links": _nav_service().list_all()}
 
 
 @router.post("/nav-links")
-async def admin_nav_create(body: NavLinkCreateBody, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_nav_create(body: NavLinkCreateBody, _: dict = Depends(require_admin)):
     new_id = _nav_service().create(
         label=body.label,
         href=body.href,
@@ -468,7 +552,8 @@ async def admin_nav_create(body: NavLinkCreateBody, _: dict = Depends(require_ad
 
 
 @router.patch("/nav-links/{link_id}")
-async def admin_nav_patch(link_id: int, body: NavLinkPatchBody, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_nav_patch(link_id: int, body: NavLinkPatchBody, _: dict = Depends(require_admin)):
     patch = {k: v for k, v in body.model_dump(exclude_none=True).items()}
     if not patch:
         raise HTTPException(status_code=400, detail="无更新字段")
@@ -479,7 +564,8 @@ async def admin_nav_patch(link_id: int, body: NavLinkPatchBody, _: dict = Depend
 
 
 @router.delete("/nav-links/{link_id}")
-async def admin_nav_delete(link_id: int, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_nav_delete(link_id: int, _: dict = Depends(require_admin)):
     ok = _nav_service().delete(link_id)
     if not ok:
         raise HTTPException(status_code=404, detail="链接不存在")
@@ -547,7 +633,8 @@ def _journal_due_email_summary(days: int = 7) -> dict:
 
 
 @router.get("/ops/summary")
-async def admin_ops_summary(days: int = 7, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_ops_summary(days: int = 7, _: dict = Depends(require_admin)):
     """Ops dashboard: analyze SLO, scheduler health, LLM usage rollup."""
     days = max(1, min(int(days), 90))
     slo = analyze_slo_tracker.snapshot()
@@ -580,7 +667,60 @@ async def admin_ops_summary(days: int = 7, _: dict = Depends(require_admin)):
     }
 
 
+@router.get("/ops/cache")
+@db_coroutine
+def admin_ops_cache(_: dict = Depends(require_admin)):
+    """In-process cache health: sizes, per-module hit rates and evictions (since restart)."""
+    from services.tushare.cache import TushareCache
+    from services.tushare.daily_series import daily_series_cache
+    from services.tushare.event_calendar import event_calendar
+    from services.tushare.rate_limiter import tushare_request_scheduler
+    from services.watchlist.cache import watchlist_summary_cache
+    from services.watchlist.executor import summary_executor
+
+    return {
+        "scope": "since_process_restart",
+        "tushare_cache": TushareCache.stats(),
+        "daily_series": daily_series_cache.stats(),
+        "event_calendar": event_calendar.stats(),
+        "tushare_requests": tushare_request_scheduler.stats(),
+        "watchlist_summary_cache": watchlist_summary_cache.get_stats(),
+        "watchlist_summary_executor": summary_executor.stats(),
+        "db_executor": db_executor.stats(),
+        "db_pool": DatabaseFactory.pool_stats(),
+        "db_write_queue": write_queue.stats(),
+    }
+
+
+@router.get("/ops/queries")
+async def admin_ops_queries(
+    limit: int = 50,
+    order_by: str = "total_ms",
+    _: dict = Depends(require_admin),
+):
+    """SQL statement templates: latency histogram, rows returned, slow queries with EXPLAIN QUERY PLAN (since restart)."""
+    limit = max(1, min(int(limit), 500))
+    return {"scope": "since_process_restart", **query_stats.snapshot(limit=limit, order_by=order_by)}
+
+
+@router.post("/ops/queries/reset")
+async def admin_ops_queries_reset(_: dict = Depends(require_admin)):
+    """Clear in-process query statistics (e.g. before reproducing a slow page)."""
+    query_stats.reset()
+    return {"ok": True}
+
+
 @router.get("/ops/llm-usage")
-async def admin_ops_llm_usage(days: int = 7, _: dict = Depends(require_admin)):
+@db_coroutine
+def admin_ops_llm_usage(days: int = 7, _: dict = Depends(require_admin)):
     days = max(1, min(int(days), 90))
     return llm_usage_service.get_summary(days=days)
+
+
+@router.get("/ops/retention")
+@db_coroutine
+def admin_ops_retention(_: dict = Depends(require_admin)):
+    """Retention archiving: per-table horizons, monthly archive files and rollups of archived months."""
+    if DatabaseConfig.backend() != "sqlite":
+        return {"enabled": False, "reason": "retention archiving only runs on the SQLite backend"}
+    return {"enabled": DatabaseConfig.retention_enabled(), **retention_manager.summary()}
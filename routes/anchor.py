@@ -17,6 +17,7 @@ from auth.dependencies import (
     UserContext,
     SECRET_KEY,
 )
+from database.async_db import db_coroutine
 from services.anchor_service import AnchorService
 from services.journal import journal_service
 from services.user_service import UserService
@@ -98,7 +99,7 @@ def _get_actor_from_request(request: Request) -> dict:
 
 
 @router.post("/api/anchor/send_code", response_model=SendCodeResponse)
-async def send_verification_code(request: SendCodeRequest):
+def send_verification_code(request: SendCodeRequest):
     email = request.email.lower().strip()
 
     if not validate_email_format(email):
@@ -125,7 +126,8 @@ async def send_verification_code(request: SendCodeRequest):
 
 
 @router.post("/api/anchor/verify_and_bind", response_model=VerifyAndBindResponse)
-async def verify_and_bind(
+@db_coroutine
+def verify_and_bind(
     request: VerifyAndBindRequest,
     x_anonymous_id: Optional[str] = Header(None, alias="X-Anonymous-Id"),
     aguai_uid: Optional[str] = Cookie(None),
@@ -187,7 +189,8 @@ async def verify_and_bind(
 
 
 @router.get("/api/anchor/status", response_model=AnchorStatusResponse)
-async def get_anchor_status(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def get_anchor_status(user: UserContext = Depends(get_current_user)):
     if user.is_authenticated and (user.identity_type == "email_anchor" or user.anchor_id):
         masked_email = None
         user_record = user_service.get_user(user.user_id) or {}
@@ -202,6 +205,7 @@ async def get_anchor_status(user: UserContext = Depends(get_current_user)):
 
 
 @router.post("/api/anchor/cleanup")
-async def cleanup_expired_codes():
+@db_coroutine
+def cleanup_expired_codes():
     deleted_count = anchor_service.cleanup_expired_codes()
     return {"ok": True, "deleted_count": deleted_count}
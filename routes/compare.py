@@ -39,7 +39,7 @@ class CompareResponse(BaseModel):
 
 
 @router.post("/api/compare", response_model=CompareResponse)
-async def compare_stocks(request: CompareRequest):
+def compare_stocks(request: CompareRequest):
     """
     比较标的并分桶
     
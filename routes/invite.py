@@ -6,6 +6,7 @@ from typing import Optional
 from pydantic import BaseModel
 
 from auth.dependencies import get_current_user, UserContext
+from database.async_db import db_coroutine
 from services.invite_service import InviteService
 from utils.logger import get_logger
 
@@ -31,7 +32,8 @@ class InviteAcceptResponse(BaseModel):
 
 
 @router.post("/invite/generate", response_model=InviteGenerateResponse)
-async def generate_invite_code(
+@db_coroutine
+def generate_invite_code(
     request: Request,
     user: UserContext = Depends(get_current_user),
 ):
@@ -58,7 +60,8 @@ async def generate_invite_code(
 
 
 @router.get("/invite/accept", response_model=InviteAcceptResponse)
-async def accept_invite(
+@db_coroutine
+def accept_invite(
     code: str,
     response: Response,
     user: UserContext = Depends(get_current_user),
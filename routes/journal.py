@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
 from auth.dependencies import get_current_user, UserContext
+from database.async_db import db_coroutine
 from services.journal import journal_service
 from services.journal.failure_reasons import normalize_failure_reason
 from services.user_service import UserService
@@ -61,7 +62,8 @@ class ReviewRequest(BaseModel):
 
 
 @router.post("")
-async def create_record(
+@db_coroutine
+def create_record(
     request: CreateRecordRequest,
     user: UserContext = Depends(get_current_user),
 ):
@@ -82,7 +84,8 @@ async def create_record(
 
 
 @router.get("")
-async def list_records(
+@db_coroutine
+def list_records(
     status: Optional[str] = Query(None, description="状态过滤: active/due/reviewed"),
     ts_code: Optional[str] = Query(None, description="股票代码过滤"),
     page: int = Query(1, ge=1),
@@ -111,7 +114,8 @@ async def list_records(
 
 
 @router.get("/due-count")
-async def get_due_count(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def get_due_count(user: UserContext = Depends(get_current_user)):
     try:
         user_id = _resolve_journal_user(user)
         return {"due_count": journal_service.get_due_count(user_id)}
@@ -121,7 +125,8 @@ async def get_due_count(user: UserContext = Depends(get_current_user)):
 
 
 @router.get("/stats")
-async def get_review_stats(
+@db_coroutine
+def get_review_stats(
     limit: int = Query(30, ge=1, le=200),
     user: UserContext = Depends(get_current_user),
 ):
@@ -134,7 +139,8 @@ async def get_review_stats(
 
 
 @router.get("/accuracy-stats")
-async def get_public_accuracy_stats(
+@db_coroutine
+def get_public_accuracy_stats(
     window_days: int = Query(90, ge=7, le=365),
 ):
     try:
@@ -147,7 +153,8 @@ async def get_public_accuracy_stats(
 
 
 @router.get("/stock-timeline")
-async def get_stock_timeline(
+@db_coroutine
+def get_stock_timeline(
     ts_code: str = Query(..., min_length=1, description="股票代码"),
     limit: int = Query(20, ge=1, le=100),
     user: UserContext = Depends(get_current_user),
@@ -166,7 +173,8 @@ async def get_stock_timeline(
 
 
 @router.get("/{record_id}")
-async def get_record(
+@db_coroutine
+def get_record(
     record_id: str,
     user: UserContext = Depends(get_current_user),
 ):
@@ -185,7 +193,7 @@ async def get_record(
 
 
 @router.get("/{record_id}/evaluation")
-async def evaluate_record(
+def evaluate_record(
     record_id: str,
     user: UserContext = Depends(get_current_user),
 ):
@@ -203,7 +211,7 @@ async def evaluate_record(
 
 
 @router.post("/{record_id}/review")
-async def review_record(
+def review_record(
     record_id: str,
     request: ReviewRequest,
     user: UserContext = Depends(get_current_user),
@@ -230,7 +238,8 @@ async def review_record(
 
 
 @router.delete("/{record_id}")
-async def delete_record(
+@db_coroutine
+def delete_record(
     record_id: str,
     user: UserContext = Depends(get_current_user),
 ):
@@ -248,7 +257,8 @@ async def delete_record(
 
 
 @router.post("/run_due_check")
-async def run_due_check():
+@db_coroutine
+def run_due_check():
     try:
         updated = journal_service.run_due_check()
         return {"updated": updated}
@@ -10,6 +10,7 @@ from functools import lru_cache
 from pydantic import BaseModel
 
 from auth.dependencies import get_current_user, UserContext
+from database.async_db import db_coroutine
 from schemas.analysis_v1 import JudgmentSnapshot
 from services.judgment_service import JudgmentService
 from utils.logger import get_logger
@@ -35,7 +36,8 @@ class CreateJudgmentResponse(BaseModel):
 
 
 @router.post("/judgments", response_model=CreateJudgmentResponse)
-async def create_judgment(
+@db_coroutine
+def create_judgment(
     body: CreateJudgmentRequest,
     force: bool = False,
     user: UserContext = Depends(get_current_user),
@@ -80,7 +82,7 @@ async def create_judgment(
 
 
 @router.get("/me/judgments")
-async def get_my_judgments(
+def get_my_judgments(
     limit: int = 50,
     user: UserContext = Depends(get_current_user),
 ):
@@ -116,7 +118,8 @@ async def get_my_judgments(
 
 
 @router.get("/judgments/{judgment_id}")
-async def get_judgment_detail(judgment_id: str):
+@db_coroutine
+def get_judgment_detail(judgment_id: str):
     try:
         judgment = get_judgment_service().get_judgment_detail(judgment_id)
         if not judgment:
@@ -130,7 +133,8 @@ async def get_judgment_detail(judgment_id: str):
 
 
 @router.delete("/judgments/{judgment_id}")
-async def delete_judgment(
+@db_coroutine
+def delete_judgment(
     judgment_id: str,
     user: UserContext = Depends(get_current_user),
 ):
@@ -7,6 +7,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import HTMLResponse
 
 from auth.dependencies import UserContext, get_current_user
+from database.async_db import db_coroutine
 from services.journal import journal_service
 from services.notify_pref_service import NotifyPrefService
 from services.risk_alert_email_service import verify_risk_alert_unsubscribe_token
@@ -25,7 +26,8 @@ watchlist_signal_service = WatchlistSignalService()
 
 
 @router.get("/inbox")
-async def get_notification_inbox(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def get_notification_inbox(user: UserContext = Depends(get_current_user)):
     user_id = user.user_id
     due_count = journal_service.get_due_count(user_id)
     due_preview = []
@@ -95,7 +97,8 @@ async def get_notification_inbox(user: UserContext = Depends(get_current_user)):
 
 
 @router.get("/unsubscribe", response_class=HTMLResponse)
-async def unsubscribe_risk_alert_email(token: str = Query(..., min_length=10)):
+@db_coroutine
+def unsubscribe_risk_alert_email(token: str = Query(..., min_length=10)):
     user_id = verify_risk_alert_unsubscribe_token(token)
     if not user_id:
         raise HTTPException(status_code=400, detail="退订链接无效或已过期")
@@ -133,7 +136,8 @@ async def unsubscribe_risk_alert_email(token: str = Query(..., min_length=10)):
 
 
 @router.get("/unsubscribe-journal-due", response_class=HTMLResponse)
-async def unsubscribe_journal_due_email(token: str = Query(..., min_length=10)):
+@db_coroutine
+def unsubscribe_journal_due_email(token: str = Query(..., min_length=10)):
     user_id = verify_journal_due_unsubscribe_token(token)
     if not user_id:
         raise HTTPException(status_code=400, detail="退订链接无效或已过期")
@@ -6,6 +6,7 @@ from typing import Optional
 from pydantic import BaseModel
 
 from auth.dependencies import get_current_user, UserContext
+from database.async_db import db_coroutine
 from services.quota_service import QuotaService
 from utils.logger import get_logger
 
@@ -28,7 +29,8 @@ class QuotaCheckResponse(BaseModel):
 
 
 @router.get("/quota/status")
-async def get_quota_status(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def get_quota_status(user: UserContext = Depends(get_current_user)):
     try:
         return quota_service.get_quota_status(
             user.user_id,
@@ -43,7 +45,8 @@ async def get_quota_status(user: UserContext = Depends(get_current_user)):
 
 
 @router.post("/quota/check", response_model=QuotaCheckResponse)
-async def check_quota(
+@db_coroutine
+def check_quota(
     request: QuotaCheckRequest,
     user: UserContext = Depends(get_current_user),
 ):
@@ -9,6 +9,7 @@ from fastapi.responses import Response
 from pydantic import BaseModel, Field
 
 from auth.admin_auth import require_admin
+from database.async_db import db_coroutine
 from services.risk_stock_export import build_export_filename, render_csv_bytes, render_xlsx_bytes
 from services.risk_stock_service import RiskStockService
 
@@ -78,7 +79,8 @@ def _export_risk_stocks(
 
 
 @router.get("")
-async def list_risk_stocks(
+@db_coroutine
+def list_risk_stocks(
     trade_date: Optional[str] = Query(None, description="交易日 YYYYMMDD，不填则返回最新交易日"),
     tag: Optional[str] = Query(None, description="标签过滤，如 ST股 / 三连板"),
 ):
@@ -104,7 +106,8 @@ async def list_risk_stocks(
 
 
 @router.get("/export/csv")
-async def export_risk_stocks_csv(
+@db_coroutine
+def export_risk_stocks_csv(
     trade_date: Optional[str] = Query(None, description="交易日 YYYYMMDD，不填则导出最新交易日"),
     tag: Optional[str] = Query(None, description="标签过滤，如 ST股 / 三连板"),
 ):
@@ -112,7 +115,8 @@ async def export_risk_stocks_csv(
 
 
 @router.get("/export/xlsx")
-async def export_risk_stocks_xlsx(
+@db_coroutine
+def export_risk_stocks_xlsx(
     trade_date: Optional[str] = Query(None, description="交易日 YYYYMMDD，不填则导出最新交易日"),
     tag: Optional[str] = Query(None, description="标签过滤，如 ST股 / 三连板"),
 ):
@@ -120,7 +124,7 @@ async def export_risk_stocks_xlsx(
 
 
 @admin_router.post("/refresh-auto")
-async def admin_refresh_risk_stocks_auto(
+def admin_refresh_risk_stocks_auto(
     trade_date: Optional[str] = Query(None, description="交易日 YYYYMMDD，不填则自动识别最近交易日"),
     _: dict = Depends(require_admin),
 ):
@@ -128,7 +132,8 @@ async def admin_refresh_risk_stocks_auto(
 
 
 @admin_router.post("/refresh")
-async def admin_refresh_risk_stocks(
+@db_coroutine
+def admin_refresh_risk_stocks(
     request: RiskStockRefreshRequest,
     _: dict = Depends(require_admin),
 ):
@@ -7,6 +7,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 
 from auth.dependencies import get_current_user, UserContext
+from database.async_db import db_coroutine
 from services.user_service import UserService
 from services.quota_service import QuotaService
 from services.invite_service import InviteService
@@ -40,7 +41,8 @@ def _mask_email(email: Optional[str]) -> Optional[str]:
 
 
 @router.get("/overview")
-async def get_user_center_overview(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def get_user_center_overview(user: UserContext = Depends(get_current_user)):
     try:
         user_record = user_service.get_user(user.user_id) or {}
         watchlists = watchlist_service.get_user_watchlists(user.user_id)
@@ -84,7 +86,8 @@ async def get_user_center_overview(user: UserContext = Depends(get_current_user)
 
 
 @router.get("/weekly-recap")
-async def get_user_weekly_recap(
+@db_coroutine
+def get_user_weekly_recap(
     window_days: int = 7,
     user: UserContext = Depends(get_current_user),
 ):
@@ -106,12 +109,14 @@ async def get_user_weekly_recap(
 
 
 @router.get("/notify-pref")
-async def get_notify_pref(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def get_notify_pref(user: UserContext = Depends(get_current_user)):
     return {"notify_pref": notify_pref_service.get_notify_pref(user.user_id)}
 
 
 @router.patch("/notify-pref")
-async def update_notify_pref(
+@db_coroutine
+def update_notify_pref(
     body: NotifyPrefUpdateRequest,
     user: UserContext = Depends(get_current_user),
 ):
@@ -2,15 +2,20 @@
 Watchlist API Routes
 自选股列表 API 端点 — uses unified auth
 """
-from fastapi import APIRouter, HTTPException, Query, Depends
+import asyncio
+import threading
+
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
 from typing import Optional, List
 
 from auth.dependencies import get_current_user, UserContext
+from database.async_db import db_coroutine
 from schemas.watchlist import (
     Watchlist, WatchlistCreate, WatchlistUpdate,
     WatchlistAddSymbols, WatchlistSummaryResponse, WatchlistSymbolWeightUpdate,
 )
 from services.watchlist import watchlist_service
+from services.watchlist.executor import SummaryJobCancelled
 from services.watchlist_risk_alert_service import WatchlistRiskAlertService
 from services.watchlist_signal_service import WatchlistSignalService
 from utils.logger import get_logger
@@ -48,7 +53,8 @@ def _resolve_watchlist_user(user: UserContext) -> str:
 
 
 @router.get("", response_model=List[Watchlist])
-async def list_watchlists(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def list_watchlists(user: UserContext = Depends(get_current_user)):
     try:
         return watchlist_service.get_user_watchlists(_resolve_watchlist_user(user))
     except Exception as e:
@@ -57,7 +63,8 @@ async def list_watchlists(user: UserContext = Depends(get_current_user)):
 
 
 @router.post("", response_model=Watchlist)
-async def create_watchlist(
+@db_coroutine
+def create_watchlist(
     data: WatchlistCreate,
     user: UserContext = Depends(get_current_user),
 ):
@@ -69,7 +76,8 @@ async def create_watchlist(
 
 
 @router.get("/risk-alerts/unread-count")
-async def get_risk_alert_unread_count(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def get_risk_alert_unread_count(user: UserContext = Depends(get_current_user)):
     try:
         user_id = _resolve_watchlist_user(user)
         return {"count": _watchlist_risk_alert_service().get_unread_count(user_id)}
@@ -79,7 +87,8 @@ async def get_risk_alert_unread_count(user: UserContext = Depends(get_current_us
 
 
 @router.get("/risk-alerts")
-async def list_risk_alerts(
+@db_coroutine
+def list_risk_alerts(
     limit: int = Query(20, ge=1, le=100),
     unread_only: bool = Query(False),
     user: UserContext = Depends(get_current_user),
@@ -97,7 +106,8 @@ async def list_risk_alerts(
 
 
 @router.post("/risk-alerts/mark-read")
-async def mark_risk_alerts_read(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def mark_risk_alerts_read(user: UserContext = Depends(get_current_user)):
     try:
         user_id = _resolve_watchlist_user(user)
         return _watchlist_risk_alert_service().mark_all_read(user_id)
@@ -107,7 +117,8 @@ async def mark_risk_alerts_read(user: UserContext = Depends(get_current_user)):
 
 
 @router.get("/signal-alerts")
-async def list_signal_alerts(
+@db_coroutine
+def list_signal_alerts(
     limit: int = Query(20, ge=1, le=100),
     unread_only: bool = Query(False),
     user: UserContext = Depends(get_current_user),
@@ -125,7 +136,8 @@ async def list_signal_alerts(
 
 
 @router.post("/signal-alerts/mark-read")
-async def mark_signal_alerts_read(user: UserContext = Depends(get_current_user)):
+@db_coroutine
+def mark_signal_alerts_read(user: UserContext = Depends(get_current_user)):
     try:
         user_id = _resolve_watchlist_user(user)
         return _watchlist_signal_service().mark_all_read(user_id)
@@ -144,7 +156,8 @@ async def update_watchlist(
 
 
 @router.post("/{watchlist_id}/symbols")
-async def add_symbols(
+@db_coroutine
+def add_symbols(
     watchlist_id: str,
     data: WatchlistAddSymbols,
     user: UserContext = Depends(get_current_user),
@@ -158,7 +171,8 @@ async def add_symbols(
 
 
 @router.delete("/{watchlist_id}/symbols/{ts_code}")
-async def remove_symbol(
+@db_coroutine
+def remove_symbol(
     watchlist_id: str,
     ts_code: str,
     user: UserContext = Depends(get_current_user),
@@ -176,7 +190,8 @@ async def remove_symbol(
 
 
 @router.patch("/{watchlist_id}/symbols/{ts_code}/weight")
-async def update_symbol_weight(
+@db_coroutine
+def update_symbol_weight(
     watchlist_id: str,
     ts_code: str,
     data: WatchlistSymbolWeightUpdate,
@@ -198,8 +213,32 @@ async def update_symbol_weight(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{watchlist_id}/upcoming-events")
+@db_coroutine
+def get_upcoming_events(
+    watchlist_id: str,
+    days: int = Query(14, ge=1, le=30, description="未来天数"),
+    user: UserContext = Depends(get_current_user),
+):
+    try:
+        return watchlist_service.get_upcoming_events(watchlist_id, days=days)
+    except Exception as e:
+        logger.error(f"Error getting upcoming events: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _watch_disconnect(request: Request, cancelled: threading.Event, poll_sec: float = 0.5) -> None:
+    """客户端断开后置位 cancelled，让摘要计算撤销尚未开始的分块"""
+    while not cancelled.is_set():
+        if await request.is_disconnected():
+            cancelled.set()
+            return
+        await asyncio.sleep(poll_sec)
+
+
 @router.get("/{watchlist_id}/summary", response_model=WatchlistSummaryResponse)
 async def get_summary(
+    request: Request,
     watchlist_id: str,
     asof: Optional[str] = Query(None, description="日期 YYYY-MM-DD"),
     sort: str = Query("SCORE_DESC", description="排序方式"),
@@ -207,16 +246,27 @@ async def get_summary(
     phase: str = Query("full", description="加载阶段：fast=缓存+骨架，full=完整指标"),
     user: UserContext = Depends(get_current_user),
 ):
+    cancelled = threading.Event()
+    watcher = asyncio.create_task(_watch_disconnect(request, cancelled))
     try:
         filter_list = filters.split(",") if filters else []
         normalized_phase = phase if phase in {"fast", "full"} else "full"
-        return watchlist_service.get_summary(
+        # 摘要计算在线程里跑（实际的并发由进程级 summary_executor 控制），不阻塞事件循环
+        return await asyncio.to_thread(
+            watchlist_service.get_summary,
             watchlist_id=watchlist_id,
             asof=asof,
             sort=sort,
             filters=filter_list,
             phase=normalized_phase,
+            cancelled=cancelled,
         )
+    except SummaryJobCancelled:
+        logger.info(f"[Watchlist] Summary for {watchlist_id} cancelled: client disconnected")
+        return Response(status_code=499)
     except Exception as e:
         logger.error(f"Error getting summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        cancelled.set()
+        watcher.cancel()
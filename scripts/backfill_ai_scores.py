@@ -12,7 +12,9 @@ REPO_ROOT = Path(__file__).resolve().parents[1]
 if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
+from database.compression import pack_text, register_sqlite_functions
 from services.ai_score.calculator import AiScoreCalculator
+from services.archive_service import article_preview
 from services.stock_data_provider import StockDataProvider
 from services.technical_indicator import TechnicalIndicator
 from utils.logger import get_logger
@@ -58,7 +60,7 @@ def load_candidates(
     if article_ids:
         placeholders = ",".join("?" for _ in article_ids)
         sql = f"""
-            SELECT id, title, stock_code, stock_name, market_type, content, score, legacy_score, score_version, publish_date
+            SELECT id, title, stock_code, stock_name, market_type, unpack_text(content) AS content, score, legacy_score, score_version, publish_date
             FROM articles
             WHERE id IN ({placeholders})
             ORDER BY publish_date DESC, id DESC
@@ -66,10 +68,10 @@ def load_candidates(
         return conn.execute(sql, tuple(article_ids)).fetchall()
 
     sql = """
-        SELECT id, title, stock_code, stock_name, market_type, content, score, legacy_score, score_version, publish_date
+        SELECT id, title, stock_code, stock_name, market_type, unpack_text(content) AS content, score, legacy_score, score_version, publish_date
         FROM articles
         WHERE ai_score_json IS NULL
-          AND content LIKE '{%'
+          AND unpack_text(content) LIKE '{%'
         ORDER BY publish_date DESC, id DESC
         LIMIT ?
     """
@@ -166,6 +168,7 @@ async def main() -> int:
 
     conn = sqlite3.connect(db_path)
     conn.row_factory = sqlite3.Row
+    register_sqlite_functions(conn)
     try:
         candidates = load_candidates(conn, args.article_ids, args.limit)
         if not candidates:
@@ -194,6 +197,8 @@ async def main() -> int:
                 """
                 UPDATE articles
                 SET content = ?,
+                    preview = ?,
+                    content_length = ?,
                     score = ?,
                     legacy_score = ?,
                     score_version = ?,
@@ -201,11 +206,13 @@ async def main() -> int:
                 WHERE id = ?
                 """,
                 (
-                    payload["content"],
+                    pack_text(payload["content"]),
+                    article_preview(payload["content"]),
+                    len(payload["content"]),
                     payload["score"],
                     payload["legacy_score"],
                     payload["score_version"],
-                    payload["ai_score_json"],
+                    pack_text(payload["ai_score_json"]),
                     article["id"],
                 ),
             )
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Run SQLite maintenance by hand (the scheduler runs the same steps nightly).
+
+python scripts/db_maintenance.py --db-path data/stocks.db checkpoint optimize vacuum integrity
+--enable-incremental-vacuum 把旧库转换为 auto_vacuum=INCREMENTAL（完整 VACUUM，需停机执行）。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from database.maintenance import SQLiteMaintenance
+
+TASKS = ("checkpoint", "optimize", "vacuum", "integrity")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SQLite maintenance: checkpoint / optimize / vacuum / integrity")
+    parser.add_argument("tasks", nargs="*", choices=TASKS, default=list(TASKS))
+    parser.add_argument("--db-path", default="data/stocks.db", help="SQLite 数据库路径，默认 data/stocks.db")
+    parser.add_argument("--full", action="store_true", help="完整 ANALYZE 与 integrity_check（默认 optimize / quick_check）")
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="先把库转换为 auto_vacuum=INCREMENTAL（完整 VACUUM，会独占数据库）",
+    )
+    args = parser.parse_args()
+    if not Path(args.db_path).exists():
+        print(f"数据库不存在: {args.db_path}")
+        return 1
+
+    maintenance = SQLiteMaintenance(args.db_path)
+    results = {"sizes_before": maintenance.file_sizes()}
+    if args.enable_incremental_vacuum:
+        results["enable_incremental_vacuum"] = maintenance.enable_incremental_vacuum()
+    for task in args.tasks:
+        if task == "checkpoint":
+            results[task] = maintenance.checkpoint("TRUNCATE")
+        elif task == "optimize":
+            results[task] = maintenance.optimize(full_analyze=args.full)
+        elif task == "vacuum":
+            results[task] = maintenance.incremental_vacuum()
+        else:
+            results[task] = maintenance.integrity_check(full=args.full)
+    results["sizes_after"] = maintenance.file_sizes()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0 if results.get("integrity", {}).get("ok", True) else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Archive expired months of append-only tables by hand (the scheduler runs this nightly).
+
+python scripts/db_retention.py --db-path data/stocks.db --dry-run
+python scripts/db_retention.py --table analysis_records --table judgment_checks
+保留天数按表覆盖：DB_RETENTION_DAYS_<TABLE>=N；归档库默认写到主库同级的 archive/ 目录。
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from database.retention import RETENTION_POLICIES, RetentionManager
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Move expired rows into monthly archive databases")
+    parser.add_argument("--db-path", default="data/stocks.db", help="SQLite 数据库路径，默认 data/stocks.db")
+    parser.add_argument("--archive-dir", default=None, help="归档库目录，默认 <db 目录>/archive")
+    parser.add_argument(
+        "--table",
+        action="append",
+        choices=[policy.table for policy in RETENTION_POLICIES],
+        help="只处理指定表（可重复），默认全部",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="只统计每月待归档行数，不搬移")
+    args = parser.parse_args()
+    if not Path(args.db_path).exists():
+        print(f"数据库不存在: {args.db_path}")
+        return 1
+
+    manager = RetentionManager(args.db_path, archive_dir=args.archive_dir)
+    result = manager.run(tables=args.table, dry_run=args.dry_run)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if any("error" in item for item in result["tables"].values()) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
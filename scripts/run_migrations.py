@@ -1,11 +1,27 @@
 #!/usr/bin/env python3
 """
 Run all SQL migrations in valid order
+
+migrations/ 下按文件名排序执行：.sql 整体 executescript；.py 为需要逐行处理数据的迁移
+（如回填），模块需提供 migrate(conn)。两者都记录在 schema_migrations。
 """
+import importlib.util
 import sqlite3
 import os
 import sys
+from contextlib import contextmanager
 from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from database.compression import register_sqlite_functions
+from database.schema_registry import schema_registry
+
+# PostgreSQL 迁移用的 advisory lock 键（任意常量，全库唯一即可）
+_PG_MIGRATION_LOCK_KEY = 20260601
 
 
 def _table_exists(cursor: sqlite3.Cursor, table_name: str) -> bool:
@@ -47,19 +63,115 @@ def _mark_applied(cursor: sqlite3.Cursor, name: str) -> None:
         (name, datetime.utcnow().isoformat() + "Z"),
     )
 
+
+def _run_python_migration(conn: sqlite3.Connection, file_path: str) -> None:
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    spec = importlib.util.spec_from_file_location(f"migrations_{name}", file_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.migrate(conn)
+
+
+@contextmanager
+def _migration_lock(db_path: str):
+    """
+    多 worker 同时启动时串行执行 SQLite 迁移：后拿到锁的进程读到的 schema_migrations 已是最新，
+    不会重复执行同一迁移。无 fcntl 的平台（Windows）不加锁。
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(f"{db_path}.migrate.lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _run_postgres_migrations():
+    """
+    DB_BACKEND=postgres：执行 migrations/postgres/*.sql。每个脚本与其 schema_migrations 记录
+    在同一事务里提交（PostgreSQL 的 DDL 可回滚），失败即整体回滚并中止，不存在"部分应用"。
+    """
+    from database.db_factory import DatabaseFactory
+
+    migrations_dir = os.path.join('migrations', 'postgres')
+    print(f"Applying PostgreSQL migrations from {migrations_dir}...")
+
+    conn = DatabaseFactory.get_connection()
+    try:
+        # 多 worker / 多实例同时启动时串行执行；会话级锁，连接会回到连接池，结束时显式释放
+        conn.execute("SELECT pg_advisory_lock(?)", (_PG_MIGRATION_LOCK_KEY,))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations (name TEXT PRIMARY KEY, applied_at TEXT NOT NULL)"
+        )
+        applied = {r["name"] for r in conn.execute("SELECT name FROM schema_migrations").fetchall()}
+        files = sorted(f for f in os.listdir(migrations_dir) if f.endswith('.sql'))
+        for f in files:
+            if f in applied:
+                print(f"  Skipping {f}... already applied")
+                continue
+            print(f"  Running {f}...", end=" ")
+            with open(os.path.join(migrations_dir, f), 'r') as sql_file:
+                sql_script = sql_file.read()
+            conn.execute("BEGIN")
+            try:
+                conn.executescript(sql_script, translate=False)
+                conn.execute(
+                    "INSERT INTO schema_migrations(name, applied_at) VALUES (?, ?)",
+                    (f, datetime.utcnow().isoformat() + "Z"),
+                )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"FAILED: {e}")
+                raise
+            print("OK")
+
+        changes = schema_registry.apply(conn)
+        conn.commit()
+        for change in changes:
+            print(f"  Schema registry: {change}")
+    finally:
+        try:
+            conn.execute("SELECT pg_advisory_unlock(?)", (_PG_MIGRATION_LOCK_KEY,))
+        finally:
+            conn.close()
+    print("✓ All migrations completed.")
+
+
 def run_migrations():
+    from config.database import DatabaseConfig
+
+    if DatabaseConfig.backend() == "postgres":
+        _run_postgres_migrations()
+        return
+
     db_path = os.getenv("DB_PATH") or 'data/stocks.db'
+    with _migration_lock(db_path):
+        _run_sqlite_migrations(db_path)
+
+
+def _run_sqlite_migrations(db_path: str):
     migrations_dir = 'migrations'
     
     print(f"Applying migrations to {db_path}...")
     
     conn = sqlite3.connect(db_path)
+    # 迁移 024 起 FTS 视图/触发器依赖 unpack_text()
+    register_sqlite_functions(conn)
+    # 新库启用增量 auto_vacuum（只能在建第一张表之前设置），空闲页由 db_maintenance 定期归还
+    if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
     cursor = conn.cursor()
     _ensure_migrations_table(cursor)
     conn.commit()
     
-    # Get all .sql files sorted
-    files = sorted([f for f in os.listdir(migrations_dir) if f.endswith('.sql')])
+    # Get all .sql / .py migrations sorted
+    files = sorted([f for f in os.listdir(migrations_dir) if f.endswith(('.sql', '.py'))])
     applied = _load_applied(cursor)
     
     for f in files:
@@ -71,6 +183,14 @@ def run_migrations():
         print(f"  Running {f}...", end=" ")
         
         try:
+            if f.endswith('.py'):
+                _run_python_migration(conn, file_path)
+                _mark_applied(cursor, f)
+                conn.commit()
+                applied.add(f)
+                print("OK")
+                continue
+
             with open(file_path, 'r') as sql_file:
                 sql_script = sql_file.read()
                 # Safety: avoid destructive migration that drops judgments when data exists
@@ -114,7 +234,13 @@ def run_migrations():
             conn.rollback()
             conn.close()
             raise
-            
+
+    # 代码侧登记的表结构（原先由各服务构造时执行），在 SQL 迁移之后统一补齐
+    changes = schema_registry.apply(conn)
+    conn.commit()
+    for change in changes:
+        print(f"  Schema registry: {change}")
+
     conn.close()
     print("✓ All migrations completed.")
 
@@ -7,6 +7,7 @@ from typing import Dict, List, Any, Optional
 import sqlite3
 import os
 from utils.logger import get_logger
+from config.database import DatabaseConfig
 from database.sqlite_utils import configure_sqlite_connection
 
 logger = get_logger()
@@ -35,6 +36,10 @@ class AdminService:
     
     def _get_connection(self) -> sqlite3.Connection:
         """Get a direct database connection"""
+        if DatabaseConfig.backend() == "postgres":
+            from database.db_factory import DatabaseFactory
+
+            return DatabaseFactory.get_connection()
         conn = sqlite3.connect(self.db_path, timeout=30.0)
         conn.row_factory = dict_factory
         configure_sqlite_connection(conn)
@@ -12,6 +12,7 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
 import math
+import os
 
 from utils.logger import get_logger
 from utils.validation import normalize_ts_code
@@ -29,6 +30,9 @@ from .models import (
 
 logger = get_logger()
 
+# 增强模块截止时间：留出 AI_SCORE_TIMEOUT 的 1/4 给评分计算本身，慢模块单独降级
+ENHANCEMENT_DEADLINE_SEC = float(os.getenv('AI_SCORE_TIMEOUT', '2.0')) * 0.75
+
 
 def _clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
@@ -167,7 +171,7 @@ class AiScoreCalculator:
         if market_type == "A" and include_enhancements:
             try:
                 ts_code = normalize_ts_code(stock_code)
-                enh = enhancement_orchestrator.enhance(ts_code)
+                enh = enhancement_orchestrator.enhance(ts_code, deadline=ENHANCEMENT_DEADLINE_SEC)
                 rs_mod = enh.relative_strength
                 flow_mod = enh.capital_flow
                 events_mod = enh.events
@@ -3,13 +3,21 @@ Archive Service
 Manages article storage and retrieval
 
 REFACTORED: Uses DatabaseFactory for unified database access
+Async methods run on the DB thread pool (database/async_db.py)
+
+content / ai_score_json 超过阈值时压缩存储（database/compression.py），读出时解码；
+列表只取轻量列，摘要用写入时预先算好的 preview。
 """
+import json
+import re
 import sqlite3
-import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from utils.logger import get_logger
+from database.async_db import db_coroutine
+from database.compression import pack_text, unpack_text
 from database.db_factory import DatabaseFactory
+from database.pagination import approx_counts, decode_cursor, encode_cursor, keyset_after_desc
 
 logger = get_logger()
 
@@ -18,6 +26,118 @@ _PUBLIC_ARTICLE_EXCLUDE_SQL = (
 )
 
 
+# articles_fts 使用 trigram 分词：少于 3 个字符的关键词无法走索引，回退为窄列 LIKE
+_FTS_MIN_CHARS = 3
+# 列表筛选只匹配标题/代码/名称（与原 LIKE 语义一致）；search_articles 额外匹配正文
+_FTS_LIST_COLUMNS = "{title stock_code stock_name}"
+# bm25 列权重：title, stock_code, stock_name, content
+_FTS_BM25 = "bm25(articles_fts, 10.0, 5.0, 5.0, 1.0)"
+_fts_available: Dict[str, bool] = {}
+
+# 列表排序键（全部 DESC），同时作为 keyset 游标
+_ARTICLE_ORDER_COLUMNS = ("publish_date", "created_at", "id")
+_ARTICLE_ORDER_SQL = "publish_date DESC, created_at DESC, id DESC"
+
+# 列表只投影轻量列：正文 / ai_score_json 动辄数十 KB，列表用 preview 代替
+_ARTICLE_LIST_COLUMNS = (
+    "id, title, stock_code, stock_name, market_type, score, legacy_score, score_version,"
+    " publish_date, created_at, preview, content_length"
+)
+# 与前端 getJsonSummary 的候选字段一致
+_PREVIEW_JSON_KEYS = ("summary", "executive_summary", "conclusion", "analysis_summary")
+_PREVIEW_NESTED_KEYS = (
+    ("structure_snapshot", "trend_description"),
+    ("relative_strength", "summary"),
+    ("capital_flow", "summary"),
+    ("events", "summary"),
+)
+# 前端展示时再截断到 120 字并加省略号，这里多留一些
+_PREVIEW_MAX_CHARS = 200
+
+
+def article_cursor(article: Dict[str, Any]) -> str:
+    """列表最后一行 → 下一页游标"""
+    return encode_cursor([article.get(column) for column in _ARTICLE_ORDER_COLUMNS])
+
+
+def _strip_rich_text(text: str) -> str:
+    text = re.sub(r"```[\s\S]*?```", " ", text)
+    text = re.sub(r"`([^`]+)`", r"\1", text)
+    text = re.sub(r"!\[[^\]]*\]\([^)]+\)", " ", text)
+    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    text = re.sub(r"[#>*_\-]+", " ", text)
+    text = re.sub(r"<[^>]+>", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _json_summary(raw: str) -> str:
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return ""
+    if not isinstance(parsed, dict):
+        return ""
+    candidates = [parsed.get(key) for key in _PREVIEW_JSON_KEYS]
+    for outer, inner in _PREVIEW_NESTED_KEYS:
+        nested = parsed.get(outer)
+        candidates.append(nested.get(inner) if isinstance(nested, dict) else None)
+    first = next((item for item in candidates if isinstance(item, str) and item.strip()), "")
+    return _strip_rich_text(first) if first else ""
+
+
+def article_preview(content: Optional[str]) -> str:
+    """列表摘要（与前端 getArticlePreview 同规则，不含截断省略号），无可用摘要时为空串"""
+    normalized = (content or "").strip()
+    if not normalized:
+        return ""
+    summary = _json_summary(normalized) if normalized.startswith("{") else _strip_rich_text(normalized)
+    return summary[:_PREVIEW_MAX_CHARS].strip()
+
+
+def _decode_article(row: Dict[str, Any]) -> Dict[str, Any]:
+    article = dict(row)
+    for column in ("content", "ai_score_json"):
+        if column in article:
+            article[column] = unpack_text(article[column])
+    return article
+
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _replace_article(cursor: sqlite3.Cursor, article_data: Dict[str, Any]) -> int:
+    """
+    按标题去重覆盖写入（等价于原 REPLACE INTO：旧行删除、新行获得新 id）
+
+    显式 DELETE + INSERT，保证 articles_fts 的同步触发器在 recursive_triggers 关闭时也会执行。
+    """
+    cursor.execute("DELETE FROM articles WHERE title = ?", (article_data["title"],))
+    cursor.execute(
+        """
+        INSERT INTO articles
+        (title, stock_code, stock_name, market_type, content, score, legacy_score, score_version, ai_score_json,
+         publish_date, preview, content_length)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            article_data["title"],
+            article_data["stock_code"],
+            article_data["stock_name"],
+            article_data["market_type"],
+            pack_text(article_data["content"]),
+            article_data.get("score"),
+            article_data.get("legacy_score"),
+            article_data.get("score_version"),
+            pack_text(article_data.get("ai_score_json")),
+            article_data.get("publish_date", datetime.now().strftime("%Y-%m-%d")),
+            article_preview(article_data["content"]),
+            len(article_data["content"] or ""),
+        ),
+    )
+    return cursor.lastrowid
+
+
 def _is_private_archive_article(article: Optional[Dict[str, Any]]) -> bool:
     if not article:
         return False
@@ -30,152 +150,181 @@ class ArchiveService:
     def __init__(self, db_path: str = "data/stocks.db"):
         self.db_path = db_path
         self.db = DatabaseFactory
+        # articles 表结构由 database/schema_registry.py 在启动迁移时统一维护
         DatabaseFactory.initialize(db_path)
-        self._init_db()
 
-    def _init_db(self):
-        """初始化数据库和表结构"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+    @db_coroutine
+    def save_article(self, article_data: Dict[str, Any]) -> int:
+        """保存或更新文章 (De-duplication by title)"""
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS articles (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL,
-                        stock_code TEXT NOT NULL,
-                        stock_name TEXT NOT NULL,
-                        market_type TEXT NOT NULL,
-                        content TEXT NOT NULL,
-                        score INTEGER,
-                        legacy_score INTEGER,
-                        score_version TEXT,
-                        ai_score_json TEXT,
-                        publish_date TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(title)
-                    )
-                """)
-                # Backward-compatible migration for existing DBs
-                self._ensure_article_columns(conn)
+                article_id = _replace_article(cursor, article_data)
                 conn.commit()
-                logger.debug(f"数据库初始化成功: {self.db_path}")
+                approx_counts.invalidate("articles")
+                return article_id
         except Exception as e:
-            logger.error(f"数据库初始化失败: {str(e)}")
-
-    def _ensure_article_columns(self, conn: sqlite3.Connection):
-        """
-        Ensure new columns exist for backward compatibility.
-        SQLite supports ADD COLUMN but not DROP COLUMN.
-        """
-        try:
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(articles)")
-            existing = {row["name"] for row in cursor.fetchall() if row and row.get("name")}
-
-            columns: Dict[str, str] = {
-                "legacy_score": "INTEGER",
-                "score_version": "TEXT",
-                "ai_score_json": "TEXT",
-            }
-
-            for col, col_type in columns.items():
-                if col not in existing:
-                    logger.info(f"[Archive] Migrating articles: ADD COLUMN {col} {col_type}")
-                    cursor.execute(f"ALTER TABLE articles ADD COLUMN {col} {col_type}")
-        except Exception as e:
-            logger.warning(f"[Archive] Failed to ensure article columns: {e}")
+            logger.error(f"保存文章时出错: {str(e)}, 数据: {article_data}")
+            return -1
 
-    async def save_article(self, article_data: Dict[str, Any]) -> int:
-        """保存或更新文章 (De-duplication by title)"""
+    def save_article_sync(self, article_data: Dict[str, Any]) -> int:
+        """Synchronous article save for schedulers and background jobs."""
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
-                # 使用 REPLACE INTO 实现去重覆盖
-                cursor.execute("""
-                    REPLACE INTO articles 
-                    (title, stock_code, stock_name, market_type, content, score, legacy_score, score_version, ai_score_json, publish_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    article_data['title'],
-                    article_data['stock_code'],
-                    article_data['stock_name'],
-                    article_data['market_type'],
-                    article_data['content'],
-                    article_data.get('score'),
-                    article_data.get('legacy_score'),
-                    article_data.get('score_version'),
-                    article_data.get('ai_score_json'),
-                    article_data.get('publish_date', datetime.now().strftime("%Y-%m-%d"))
-                ))
+                article_id = _replace_article(cursor, article_data)
                 conn.commit()
-                return cursor.lastrowid
+                approx_counts.invalidate("articles")
+                return int(article_id or 0)
         except Exception as e:
-            logger.error(f"保存文章时出错: {str(e)}, 数据: {article_data}")
+            logger.error(f"[Archive] save_article_sync failed: {e}")
             return -1
 
-    def save_article_sync(self, article_data: Dict[str, Any]) -> int:
-        """Synchronous article save for schedulers and background jobs."""
+    @db_coroutine
+    def get_articles(
+        self,
+        limit: int = 20,
+        offset: int = 0,
+        keyword: str = None,
+        after: Optional[str] = None,
+        with_ai_score: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        获取文章列表，支持关键字搜索
+
+        只返回轻量列（不含正文，摘要见 preview）；with_ai_score=True 时额外返回解码后的 ai_score_json。
+        after 为上一页 article_cursor() 返回的游标时按 (publish_date, created_at, id) keyset 翻页，
+        忽略 offset；游标非法时抛 CursorError。
+        """
+        after_key = decode_cursor(after, 3)
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
+                where = [f"({_PUBLIC_ARTICLE_EXCLUDE_SQL})"]
+                params: List[Any] = []
+                if keyword:
+                    keyword_sql, keyword_params = self._keyword_filter(cursor, keyword)
+                    where.append(keyword_sql)
+                    params.extend(keyword_params)
+                if after_key is not None:
+                    keyset_sql, keyset_params = keyset_after_desc(
+                        _ARTICLE_ORDER_COLUMNS, after_key, nullable=("created_at",)
+                    )
+                    where.append(keyset_sql)
+                    params.extend(keyset_params)
+                    offset = 0
+
+                columns = f"{_ARTICLE_LIST_COLUMNS}, ai_score_json" if with_ai_score else _ARTICLE_LIST_COLUMNS
                 cursor.execute(
-                    """
-                    REPLACE INTO articles
-                    (title, stock_code, stock_name, market_type, content, score, legacy_score, score_version, ai_score_json, publish_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    f"""
+                    SELECT {columns} FROM articles
+                    WHERE {" AND ".join(where)}
+                    ORDER BY {_ARTICLE_ORDER_SQL}
+                    LIMIT ? OFFSET ?
                     """,
-                    (
-                        article_data["title"],
-                        article_data["stock_code"],
-                        article_data["stock_name"],
-                        article_data["market_type"],
-                        article_data["content"],
-                        article_data.get("score"),
-                        article_data.get("legacy_score"),
-                        article_data.get("score_version"),
-                        article_data.get("ai_score_json"),
-                        article_data.get("publish_date", datetime.now().strftime("%Y-%m-%d")),
-                    ),
+                    (*params, limit, offset),
                 )
-                conn.commit()
-                return int(cursor.lastrowid or 0)
+                articles = [_decode_article(row) for row in cursor.fetchall()]
+                self._fill_missing_previews(cursor, articles)
+                return articles
         except Exception as e:
-            logger.error(f"[Archive] save_article_sync failed: {e}")
-            return -1
+            logger.error(f"获取文章列表出错: {str(e)}")
+            return []
+
+    @staticmethod
+    def _fill_missing_previews(cursor: sqlite3.Cursor, articles: List[Dict[str, Any]]) -> None:
+        """preview 尚未回填（NULL）的行按正文现算，只读取这些行的正文"""
+        missing = [article["id"] for article in articles if article.get("preview") is None]
+        if not missing:
+            return
+        cursor.execute(
+            f"SELECT id, content FROM articles WHERE id IN ({','.join('?' for _ in missing)})",
+            tuple(missing),
+        )
+        contents = {row["id"]: unpack_text(row["content"]) for row in cursor.fetchall()}
+        for article in articles:
+            if article.get("preview") is None:
+                article["preview"] = article_preview(contents.get(article["id"]))
+
+    def _has_fts(self, cursor: sqlite3.Cursor) -> bool:
+        """articles_fts 是否已由迁移 022 建立（只缓存已建立的库路径，迁移稍后执行也能生效）"""
+        if _fts_available.get(self.db_path):
+            return True
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='articles_fts' LIMIT 1"
+        )
+        available = cursor.fetchone() is not None
+        if available:
+            _fts_available[self.db_path] = True
+        return available
+
+    def _keyword_filter(self, cursor: sqlite3.Cursor, keyword: str) -> tuple[str, tuple]:
+        """标题/代码/名称子串匹配：有 FTS 且关键词够长时走 articles_fts，否则回退 LIKE"""
+        keyword = keyword.strip()
+        if len(keyword) >= _FTS_MIN_CHARS and self._has_fts(cursor):
+            return (
+                "id IN (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)",
+                (f"{_FTS_LIST_COLUMNS} : {_fts_phrase(keyword)}",),
+            )
+        pattern = f"%{keyword}%"
+        return "(title LIKE ? OR stock_code LIKE ? OR stock_name LIKE ?)", (pattern, pattern, pattern)
 
-    async def get_articles(self, limit: int = 20, offset: int = 0, keyword: str = None) -> List[Dict[str, Any]]:
-        """获取文章列表，支持关键字搜索"""
+    @db_coroutine
+    def search_articles(self, query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        全文检索（标题/代码/名称/正文），按 bm25 相关度排序并返回正文摘要片段
+
+        空白分隔的多个词为 AND；任一词不足 3 个字符（或库中没有 articles_fts）时
+        回退为标题/代码/名称 LIKE，按发布时间排序，snippet 为 None。
+        """
+        terms = [t for t in (query or "").split() if t]
+        if not terms:
+            return []
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                if keyword:
-                    sql = f"""
-                        SELECT * FROM articles 
-                        WHERE ({_PUBLIC_ARTICLE_EXCLUDE_SQL})
-                          AND (title LIKE ? OR stock_code LIKE ? OR stock_name LIKE ?)
-                        ORDER BY publish_date DESC, created_at DESC 
-                        LIMIT ? OFFSET ?
-                    """
-                    pattern = f"%{keyword}%"
-                    params = (pattern, pattern, pattern, limit, offset)
-                else:
-                    sql = f"""
-                        SELECT * FROM articles 
-                        WHERE {_PUBLIC_ARTICLE_EXCLUDE_SQL}
-                        ORDER BY publish_date DESC, created_at DESC 
+                if all(len(t) >= _FTS_MIN_CHARS for t in terms) and self._has_fts(cursor):
+                    cursor.execute(
+                        f"""
+                        SELECT a.id, a.title, a.stock_code, a.stock_name, a.market_type, a.score,
+                               a.publish_date, a.created_at,
+                               {_FTS_BM25} AS rank,
+                               snippet(articles_fts, 3, '<mark>', '</mark>', '…', 24) AS snippet
+                        FROM articles_fts
+                        JOIN (SELECT * FROM articles WHERE {_PUBLIC_ARTICLE_EXCLUDE_SQL}) a
+                          ON a.id = articles_fts.rowid
+                        WHERE articles_fts MATCH ?
+                        ORDER BY rank
                         LIMIT ? OFFSET ?
-                    """
-                    params = (limit, offset)
-                    
-                cursor.execute(sql, params)
-                return cursor.fetchall()  # Already list of dicts due to dict_factory
+                        """,
+                        (" ".join(_fts_phrase(t) for t in terms), limit, offset),
+                    )
+                    return [dict(r) for r in cursor.fetchall()]
+
+                clauses = []
+                params: List[Any] = []
+                for term in terms:
+                    pattern = f"%{term}%"
+                    clauses.append("(title LIKE ? OR stock_code LIKE ? OR stock_name LIKE ?)")
+                    params.extend([pattern, pattern, pattern])
+                cursor.execute(
+                    f"""
+                    SELECT id, title, stock_code, stock_name, market_type, score,
+                           publish_date, created_at, NULL AS rank, NULL AS snippet
+                    FROM articles
+                    WHERE ({_PUBLIC_ARTICLE_EXCLUDE_SQL}) AND {" AND ".join(clauses)}
+                    ORDER BY publish_date DESC, created_at DESC
+                    LIMIT ? OFFSET ?
+                    """,
+                    (*params, limit, offset),
+                )
+                return [dict(r) for r in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"获取文章列表出错: {str(e)}")
+            logger.error(f"全文检索文章出错: {str(e)}")
             return []
 
-    async def get_article_by_id(self, article_id: int) -> Optional[Dict[str, Any]]:
+    @db_coroutine
+    def get_article_by_id(self, article_id: int) -> Optional[Dict[str, Any]]:
         """根据ID获取文章详情"""
         try:
             with self.db.get_connection() as conn:
@@ -186,7 +335,7 @@ class ArchiveService:
                     return None
                 from services.instrument_name_resolver import enrich_article_record
 
-                article = enrich_article_record(dict(row))
+                article = enrich_article_record(_decode_article(row))
                 if _is_private_archive_article(article):
                     return None
                 return article
@@ -194,55 +343,60 @@ class ArchiveService:
             logger.error(f"获取文章详情出错: {str(e)}")
             return None
 
-    async def admin_list_articles_with_total(
-        self, limit: int = 50, offset: int = 0, keyword: Optional[str] = None
+    @db_coroutine
+    def admin_list_articles_with_total(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        keyword: Optional[str] = None,
+        after: Optional[str] = None,
     ) -> tuple[List[Dict[str, Any]], int]:
-        """管理端列表 + 总数（与筛选条件一致）。"""
+        """管理端列表 + 总数（与筛选条件一致；总数为短期缓存的近似值）。after 语义同 get_articles。"""
+        after_key = decode_cursor(after, 3)
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
+                where: List[str] = []
+                params: List[Any] = []
                 if keyword:
-                    pattern = f"%{keyword}%"
-                    cursor.execute(
-                        """
-                        SELECT COUNT(*) AS c FROM articles
-                        WHERE title LIKE ? OR stock_code LIKE ? OR stock_name LIKE ?
-                        """,
-                        (pattern, pattern, pattern),
-                    )
-                    total = int(cursor.fetchone()["c"])
-                    cursor.execute(
-                        """
-                        SELECT id, title, stock_code, stock_name, market_type, score, legacy_score,
-                               score_version, publish_date, created_at,
-                               LENGTH(content) AS content_length
-                        FROM articles
-                        WHERE title LIKE ? OR stock_code LIKE ? OR stock_name LIKE ?
-                        ORDER BY publish_date DESC, id DESC
-                        LIMIT ? OFFSET ?
-                        """,
-                        (pattern, pattern, pattern, limit, offset),
-                    )
-                else:
-                    cursor.execute("SELECT COUNT(*) AS c FROM articles")
-                    total = int(cursor.fetchone()["c"])
-                    cursor.execute(
-                        """
-                        SELECT id, title, stock_code, stock_name, market_type, score, legacy_score,
-                               score_version, publish_date, created_at,
-                               LENGTH(content) AS content_length
-                        FROM articles
-                        ORDER BY publish_date DESC, id DESC
-                        LIMIT ? OFFSET ?
-                        """,
-                        (limit, offset),
+                    keyword_sql, keyword_params = self._keyword_filter(cursor, keyword)
+                    where.append(keyword_sql)
+                    params.extend(keyword_params)
+                filter_sql = f"WHERE {' AND '.join(where)}" if where else ""
+                filter_params = tuple(params)
+
+                def count() -> int:
+                    cursor.execute(f"SELECT COUNT(*) AS c FROM articles {filter_sql}", filter_params)
+                    return int(cursor.fetchone()["c"])
+
+                total = approx_counts.get(("articles", self.db_path, "admin", keyword or ""), count)
+
+                if after_key is not None:
+                    keyset_sql, keyset_params = keyset_after_desc(
+                        _ARTICLE_ORDER_COLUMNS, after_key, nullable=("created_at",)
                     )
+                    where.append(keyset_sql)
+                    params.extend(keyset_params)
+                    offset = 0
+                cursor.execute(
+                    f"""
+                    SELECT id, title, stock_code, stock_name, market_type, score, legacy_score,
+                           score_version, publish_date, created_at,
+                           COALESCE(content_length, LENGTH(content)) AS content_length
+                    FROM articles
+                    {f"WHERE {' AND '.join(where)}" if where else ""}
+                    ORDER BY {_ARTICLE_ORDER_SQL}
+                    LIMIT ? OFFSET ?
+                    """,
+                    (*params, limit, offset),
+                )
                 return [dict(r) for r in cursor.fetchall()], total
         except Exception as e:
             logger.error(f"管理端文章列表出错: {str(e)}")
             return [], 0
 
-    async def update_article_by_id(self, article_id: int, fields: Dict[str, Any]) -> bool:
+    @db_coroutine
+    def update_article_by_id(self, article_id: int, fields: Dict[str, Any]) -> bool:
         """按主键更新文章；fields 仅允许白名单列。"""
         allowed = {
             "title",
@@ -262,7 +416,10 @@ class ArchiveService:
             if k not in allowed:
                 continue
             sets.append(f"{k} = ?")
-            vals.append(v)
+            vals.append(pack_text(v) if k in ("content", "ai_score_json") else v)
+            if k == "content":
+                sets.extend(["preview = ?", "content_length = ?"])
+                vals.extend([article_preview(v), len(v or "")])
         if not sets:
             return False
         vals.append(article_id)
@@ -272,17 +429,20 @@ class ArchiveService:
                 cursor = conn.cursor()
                 cursor.execute(sql, vals)
                 conn.commit()
+                approx_counts.invalidate("articles")
                 return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"更新文章出错: {str(e)}")
             return False
 
-    async def delete_article_by_id(self, article_id: int) -> bool:
+    @db_coroutine
+    def delete_article_by_id(self, article_id: int) -> bool:
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM articles WHERE id = ?", (article_id,))
                 conn.commit()
+                approx_counts.invalidate("articles")
                 return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"删除文章出错: {str(e)}")
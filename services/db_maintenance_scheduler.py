@@ -0,0 +1,242 @@
+"""
+SQLite maintenance scheduler — keeps the WAL bounded and planner stats fresh.
+
+- db_wal_checkpoint：每 30 分钟。非交易时段 TRUNCATE（截断 -wal 文件）；交易时段只做不阻塞
+  写入的 PASSIVE，除非 WAL 已超过 DB_WAL_TRUNCATE_MB
+- db_retention：每日 03:00 把追加型表超过保留期的整月搬到月度归档库（database/retention.py），
+  DB_RETENTION_ENABLED=false 时跳过
+- db_maintenance：每日 03:30（Asia/Shanghai）PRAGMA optimize → incremental_vacuum →
+  quick_check → TRUNCATE 检查点；周日改为完整 ANALYZE + integrity_check（归档腾出的页在此归还）
+
+每次运行的耗时与文件大小记录到 job_health_tracker（last_duration_ms / last_metrics），
+/api/health 的 checks.db_maintenance 展示最近一次结果。DB_BACKEND=postgres 时不启动。
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from config.database import DatabaseConfig
+from database.maintenance import db_maintenance
+from database.retention import retention_manager
+from services.scheduler_leader import TimerChain
+from utils.logger import get_logger
+
+logger = get_logger()
+
+CHECKPOINT_JOB_ID = "db_wal_checkpoint"
+MAINTENANCE_JOB_ID = "db_maintenance"
+RETENTION_JOB_ID = "db_retention"
+
+_MARKET_TZ = ZoneInfo("Asia/Shanghai")
+
+
+def is_quiet_time(now: Optional[datetime] = None) -> bool:
+    """A 股交易时段（工作日 09:00–15:30）之外视为低峰"""
+    now = now.astimezone(_MARKET_TZ) if now else datetime.now(_MARKET_TZ)
+    if now.weekday() >= 5:
+        return True
+    minutes = now.hour * 60 + now.minute
+    return not (9 * 60 <= minutes < 15 * 60 + 30)
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class DbMaintenanceScheduler:
+    _instance = None
+    _scheduler = None
+    _running = False
+    _job_lock = threading.Lock()
+    _timers = TimerChain()
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    @classmethod
+    def start(cls):
+        if cls._running:
+            logger.info("[DbMaintenanceScheduler] Already running")
+            return
+        if DatabaseConfig.backend() != "sqlite" or not DatabaseConfig.maintenance_enabled():
+            logger.info("[DbMaintenanceScheduler] Disabled (non-SQLite backend or DB_MAINTENANCE_ENABLED=false)")
+            return
+        try:
+            from apscheduler.schedulers.background import BackgroundScheduler
+            from apscheduler.triggers.cron import CronTrigger
+
+            cls._scheduler = BackgroundScheduler()
+            cls._scheduler.add_job(
+                cls._run_checkpoint_job,
+                trigger=CronTrigger(minute="5,35", timezone="Asia/Shanghai"),
+                id="db_wal_checkpoint_job",
+                name="SQLite WAL Checkpoint",
+                replace_existing=True,
+            )
+            cls._scheduler.add_job(
+                cls._run_retention_job,
+                trigger=CronTrigger(hour=3, minute=0, timezone="Asia/Shanghai"),
+                id="db_retention_nightly_job",
+                name="SQLite Retention Archiving",
+                replace_existing=True,
+            )
+            cls._scheduler.add_job(
+                cls._run_maintenance_job,
+                trigger=CronTrigger(hour=3, minute=30, timezone="Asia/Shanghai"),
+                id="db_maintenance_nightly_job",
+                name="SQLite Nightly Maintenance",
+                replace_existing=True,
+            )
+            cls._scheduler.start()
+            cls._running = True
+            logger.info(
+                "[DbMaintenanceScheduler] Started - checkpoint every 30 min, "
+                "retention daily 03:00, maintenance daily 03:30 Asia/Shanghai"
+            )
+        except ImportError:
+            logger.warning("[DbMaintenanceScheduler] APScheduler not installed, using timer fallback")
+            cls._start_simple_timer()
+        except Exception as exc:
+            logger.error(f"[DbMaintenanceScheduler] Failed to start: {exc}")
+
+    @classmethod
+    def _start_simple_timer(cls):
+        cls._timers.schedule(600, 30 * 60, cls._run_checkpoint_job)
+        cls._timers.schedule(3600, 24 * 3600, cls._run_nightly_jobs)
+        cls._running = True
+        logger.info("[DbMaintenanceScheduler] Started (simple timer)")
+
+    @classmethod
+    def stop(cls):
+        if cls._scheduler:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+        cls._timers.cancel()
+        cls._running = False
+        logger.info("[DbMaintenanceScheduler] Stopped")
+
+    @classmethod
+    def _run_nightly_jobs(cls):
+        cls._run_retention_job()
+        cls._run_maintenance_job()
+
+    @classmethod
+    def _run_checkpoint_job(cls, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        from services.job_health_tracker import job_health_tracker
+
+        # 夜间维护正在执行时跳过本轮检查点（维护结束时会做一次 TRUNCATE）
+        if not cls._job_lock.acquire(blocking=False):
+            return None
+        try:
+            wal_mb = db_maintenance.file_sizes()["wal_bytes"] / (1024 * 1024)
+            truncate = is_quiet_time(now) or wal_mb >= DatabaseConfig.wal_truncate_threshold_mb()
+            result = db_maintenance.checkpoint("TRUNCATE" if truncate else "PASSIVE")
+            job_health_tracker.record_success(
+                CHECKPOINT_JOB_ID,
+                duration_ms=result["duration_ms"],
+                metrics={**result, **db_maintenance.file_sizes()},
+            )
+            return result
+        except Exception as exc:
+            logger.error(f"[DbMaintenanceScheduler] Checkpoint failed: {exc}")
+            job_health_tracker.record_failure(CHECKPOINT_JOB_ID, str(exc))
+            return None
+        finally:
+            cls._job_lock.release()
+
+    @classmethod
+    def _run_retention_job(cls, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        from services.job_health_tracker import job_health_tracker
+
+        if not DatabaseConfig.retention_enabled():
+            return None
+        now = now.astimezone(_MARKET_TZ) if now else datetime.now(_MARKET_TZ)
+        with cls._job_lock:
+            try:
+                result = retention_manager.run(today=now.date())
+            except Exception as exc:
+                logger.error(f"[DbMaintenanceScheduler] Retention failed: {exc}")
+                job_health_tracker.record_failure(RETENTION_JOB_ID, str(exc))
+                return None
+        errors = {table: item["error"] for table, item in result["tables"].items() if "error" in item}
+        if errors:
+            job_health_tracker.record_failure(
+                RETENTION_JOB_ID,
+                "; ".join(f"{table}: {error}" for table, error in errors.items()),
+                duration_ms=result["duration_ms"],
+                metrics=result,
+            )
+            return result
+        logger.info(f"[DbMaintenanceScheduler] Retention archived {result['moved']} rows in {result['duration_ms']}ms")
+        job_health_tracker.record_success(RETENTION_JOB_ID, duration_ms=result["duration_ms"], metrics=result)
+        return result
+
+    @classmethod
+    def _run_maintenance_job(cls, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        from services.job_health_tracker import job_health_tracker
+
+        now = now.astimezone(_MARKET_TZ) if now else datetime.now(_MARKET_TZ)
+        weekly = now.weekday() == 6
+        started = time.perf_counter()
+        metrics: Dict[str, Any] = {"sizes_before": db_maintenance.file_sizes()}
+        with cls._job_lock:
+            try:
+                metrics["optimize"] = db_maintenance.optimize(full_analyze=weekly)
+                metrics["incremental_vacuum"] = db_maintenance.incremental_vacuum()
+                metrics["integrity"] = db_maintenance.integrity_check(full=weekly)
+                metrics["checkpoint"] = db_maintenance.checkpoint("TRUNCATE")
+            except Exception as exc:
+                logger.error(f"[DbMaintenanceScheduler] Maintenance failed: {exc}")
+                job_health_tracker.record_failure(
+                    MAINTENANCE_JOB_ID, str(exc), duration_ms=_elapsed_ms(started), metrics=metrics
+                )
+                return None
+        metrics["sizes_after"] = db_maintenance.file_sizes()
+        duration_ms = _elapsed_ms(started)
+
+        integrity = metrics["integrity"]
+        if not integrity["ok"]:
+            error = f"{integrity['check']} failed: " + "; ".join(integrity["errors"][:3])
+            logger.error(f"[DbMaintenanceScheduler] {error}")
+            job_health_tracker.record_failure(MAINTENANCE_JOB_ID, error, duration_ms=duration_ms, metrics=metrics)
+            # 库损坏不会自愈，不等连续失败阈值，立即告警
+            from services.ops_alert_service import ops_alert_service
+
+            ops_alert_service.send_job_failure_alert(MAINTENANCE_JOB_ID, 1, error)
+            return metrics
+
+        logger.info(
+            f"[DbMaintenanceScheduler] Completed in {duration_ms}ms "
+            f"db={metrics['sizes_after']['db_bytes']}B wal={metrics['sizes_after']['wal_bytes']}B"
+        )
+        job_health_tracker.record_success(MAINTENANCE_JOB_ID, duration_ms=duration_ms, metrics=metrics)
+        return metrics
+
+
+def maintenance_health() -> Dict[str, Any]:
+    """/api/health 用：当前文件大小 + 各维护任务最近一次的状态、耗时（调用前已由 snapshot 刷新内存）"""
+    from services.job_health_tracker import job_health_tracker
+
+    sizes = db_maintenance.file_sizes()
+    summary: Dict[str, Any] = {
+        "db_mb": round(sizes["db_bytes"] / (1024 * 1024), 1),
+        "wal_mb": round(sizes["wal_bytes"] / (1024 * 1024), 1),
+    }
+    for job_id in (CHECKPOINT_JOB_ID, RETENTION_JOB_ID, MAINTENANCE_JOB_ID):
+        job = job_health_tracker.get(job_id) or {}
+        summary[job_id] = {
+            "last_run_at": job.get("last_run_at"),
+            "last_status": job.get("last_status"),
+            "last_duration_ms": job.get("last_duration_ms"),
+        }
+    return summary
+
+
+def start_db_maintenance_scheduler():
+    DbMaintenanceScheduler.start()
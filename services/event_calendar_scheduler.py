@@ -0,0 +1,64 @@
+"""
+Background scheduler for the market-wide event calendar.
+每个交易日开盘前批量刷新分红除权 / 财报披露日历，EventsEnhancer 热路径只读内存索引。
+"""
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class EventCalendarScheduler:
+    _instance = None
+    _scheduler = None
+    _running = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    @classmethod
+    def start(cls):
+        if cls._running:
+            logger.info("[EventCalendarScheduler] Already running")
+            return
+
+        try:
+            from apscheduler.schedulers.background import BackgroundScheduler
+            from apscheduler.triggers.cron import CronTrigger
+
+            cls._scheduler = BackgroundScheduler()
+            cls._scheduler.add_job(
+                cls._run_refresh_job,
+                trigger=CronTrigger(hour=8, minute=10, timezone="Asia/Shanghai"),
+                id="event_calendar_refresh_job",
+                name="Refresh Market Event Calendar",
+                replace_existing=True,
+            )
+            cls._scheduler.start()
+            cls._running = True
+            logger.info("[EventCalendarScheduler] Started - daily refresh at 08:10 Asia/Shanghai")
+        except Exception as exc:
+            logger.error(f"[EventCalendarScheduler] Failed to start: {exc}")
+
+    @classmethod
+    def _run_refresh_job(cls):
+        from services.job_health_tracker import job_health_tracker
+
+        job_id = "event_calendar_scheduler"
+        try:
+            from services.tushare.event_calendar import event_calendar
+            from services.tushare.rate_limiter import BATCH, tushare_priority
+
+            logger.info("[EventCalendarScheduler] Refreshing market event calendar...")
+            with tushare_priority(BATCH):
+                result = event_calendar.refresh()
+            logger.info(f"[EventCalendarScheduler] Completed {result}")
+            job_health_tracker.record_success(job_id)
+        except Exception as exc:
+            job_health_tracker.record_failure(job_id, str(exc))
+            logger.error(f"[EventCalendarScheduler] Refresh failed: {exc}")
+
+
+def start_event_calendar_scheduler():
+    EventCalendarScheduler.start()
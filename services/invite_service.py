@@ -11,6 +11,8 @@ from datetime import date, datetime
 from typing import Any, Optional, Dict, Tuple
 from utils.logger import get_logger
 from database.db_factory import DatabaseFactory
+from database.write_queue import write_queue
+from services.quota_service import quota_ledger
 from services.user_service import UserService
 
 logger = get_logger()
@@ -202,40 +204,11 @@ class InviteService:
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                # Check if already rewarded
-                cursor.execute("""
-                    SELECT id FROM invite_rewards
-                    WHERE inviter_id = ? AND invitee_id = ?
-                """, (inviter_id, invitee_id))
-                
-                if cursor.fetchone():
-                    logger.info(f"Invite reward already exists: inviter={inviter_id}, invitee={invitee_id}")
-                    return (False, "already_rewarded")
-                
-                # Check daily invite limit
-                cursor.execute("""
-                    SELECT COALESCE(SUM(reward_quota), 0) as total
-                    FROM invite_rewards
-                    WHERE inviter_id = ? AND reward_date = ?
-                """, (inviter_id, reward_date))
-                
-                daily_result = cursor.fetchone()
-                daily_total = daily_result.get('total', 0) if daily_result else 0
-                if daily_total >= 20:  # Daily limit
-                    logger.info(f"Daily invite limit reached for user: {inviter_id}")
-                    return (False, "daily_limit_reached")
-                
-                # Record reward
-                cursor.execute("""
-                    INSERT INTO invite_rewards 
-                    (inviter_id, invitee_id, invite_code, reward_quota, reward_date)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (inviter_id, invitee_id, invite_code, self.REWARD_QUOTA, reward_date))
+                result = self._insert_reward(cursor, inviter_id, invitee_id, invite_code, reward_date)
                 conn.commit()
-                
-                logger.info(f"Recorded invite reward: inviter={inviter_id}, invitee={invitee_id}, quota={self.REWARD_QUOTA}")
-                return (True, "reward_granted")
+            if result[0]:
+                quota_ledger.mark_stale(inviter_id)
+            return result
                 
         except sqlite3.IntegrityError as e:
             # UNIQUE constraint violation (duplicate reward)
@@ -244,6 +217,50 @@ class InviteService:
         except Exception as e:
             logger.error(f"Failed to record invite reward: {str(e)}")
             return (False, "error")
+
+    def _insert_reward(
+        self,
+        cursor: sqlite3.Cursor,
+        inviter_id: str,
+        invitee_id: str,
+        invite_code: str,
+        reward_date: date,
+    ) -> Tuple[bool, str]:
+        """在调用方事务内判重、检查每日上限并写入奖励（不 commit）"""
+        # Check if already rewarded
+        cursor.execute("""
+            SELECT id FROM invite_rewards
+            WHERE inviter_id = ? AND invitee_id = ?
+        """, (inviter_id, invitee_id))
+        
+        if cursor.fetchone():
+            logger.info(f"Invite reward already exists: inviter={inviter_id}, invitee={invitee_id}")
+            return (False, "already_rewarded")
+        
+        # Check daily invite limit
+        cursor.execute("""
+            SELECT COALESCE(SUM(reward_quota), 0) as total
+            FROM invite_rewards
+            WHERE inviter_id = ? AND reward_date = ?
+        """, (inviter_id, reward_date))
+        
+        daily_result = cursor.fetchone()
+        daily_total = daily_result.get('total', 0) if daily_result else 0
+        if daily_total >= 20:  # Daily limit
+            logger.info(f"Daily invite limit reached for user: {inviter_id}")
+            return (False, "daily_limit_reached")
+        
+        # Record reward
+        cursor.execute("""
+            INSERT INTO invite_rewards 
+            (inviter_id, invitee_id, invite_code, reward_quota, reward_date)
+            VALUES (?, ?, ?, ?, ?)
+        """, (inviter_id, invitee_id, invite_code, self.REWARD_QUOTA, reward_date))
+        
+        # 邀请者当天总额度变了，额度账本下次预占前重新加载
+        quota_ledger.mark_stale(inviter_id)
+        logger.info(f"Recorded invite reward: inviter={inviter_id}, invitee={invitee_id}, quota={self.REWARD_QUOTA}")
+        return (True, "reward_granted")
     
     def check_and_reward_inviter(self, invitee_id: str, referrer_id: Optional[str] = None) -> Optional[Dict]:
         """
@@ -256,6 +273,50 @@ class InviteService:
         Returns:
             Reward info dict if reward granted, None otherwise
         """
+        prepared = self._prepare_reward(invitee_id, referrer_id)
+        if not prepared:
+            return None
+        
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                reward = self._reward_first_analysis(cursor, *prepared)
+                conn.commit()
+            if reward:
+                quota_ledger.mark_stale(reward["inviter_id"])
+            return reward
+                    
+        except Exception as e:
+            logger.error(f"Failed to check and reward inviter: {str(e)}")
+            return None
+
+    def queue_reward_check(self, invitee_id: str, referrer_id: Optional[str] = None) -> bool:
+        """
+        check_and_reward_inviter 的写队列版本
+
+        身份解析与邀请码查询在调用线程完成；「是否首次分析 + 写奖励」作为一个写操作入队，
+        排在同一请求先入队的 analysis_records 之后执行，能看到刚写入的分析记录。
+
+        Returns:
+            True if a reward check was queued
+        """
+        prepared = self._prepare_reward(invitee_id, referrer_id)
+        if not prepared:
+            return False
+        inviter_id = prepared[0]
+
+        def _reward(cursor: sqlite3.Cursor) -> None:
+            reward = self._reward_first_analysis(cursor, *prepared)
+            if reward:
+                logger.info(f"Invite reward granted: {reward}")
+
+        write_queue.submit(_reward, key=("invite_rewards", inviter_id), label="invite_rewards")
+        return True
+
+    def _prepare_reward(
+        self, invitee_id: str, referrer_id: Optional[str]
+    ) -> Optional[Tuple[str, str, str]]:
+        """解析 (inviter_id, invitee_id, invite_code)；不满足奖励前提时返回 None"""
         canonical_invitee_id = self._resolve_canonical_user_id(invitee_id)
         canonical_referrer_id = self._resolve_canonical_user_id(referrer_id)
 
@@ -274,62 +335,59 @@ class InviteService:
         if canonical_referrer_id == canonical_invitee_id:
             logger.info(f"Skip self-invite reward for user: {canonical_invitee_id}")
             return None
-        
-        try:
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Check if invitee has any analysis records
-                cursor.execute("""
-                    SELECT COUNT(*) as cnt FROM analysis_records
-                    WHERE user_id = ?
-                """, (canonical_invitee_id,))
-                
-                count_result = cursor.fetchone()
-                analysis_count = count_result.get('cnt', 0) if count_result else 0
-                
-                # Only reward on first analysis
-                if analysis_count != 1:
-                    logger.debug(f"Invitee {canonical_invitee_id} has {analysis_count} analyses, skipping reward")
-                    return None
-                
-                invite_code = acceptance.get("invite_code") if acceptance else None
-                if not invite_code:
+
+        invite_code = acceptance.get("invite_code") if acceptance else None
+        if not invite_code:
+            try:
+                with self.db.get_connection() as conn:
+                    cursor = conn.cursor()
                     # Get invite code used
                     cursor.execute("""
                         SELECT invite_code FROM invite_codes
                         WHERE inviter_id = ?
                         LIMIT 1
                     """, (canonical_referrer_id,))
-                    
                     code_result = cursor.fetchone()
-                    if not code_result:
-                        logger.warning(f"No invite code found for inviter: {canonical_referrer_id}")
-                        return None
-                    
-                    invite_code = code_result.get('invite_code')
-                
-                # Record reward
-                success, message = self.record_invite_reward(
-                    inviter_id=canonical_referrer_id,
-                    invitee_id=canonical_invitee_id,
-                    invite_code=invite_code
-                )
-                
-                if success:
-                    return {
-                        "inviter_id": canonical_referrer_id,
-                        "invitee_id": canonical_invitee_id,
-                        "reward_quota": self.REWARD_QUOTA,
-                        "message": f"邀请成功！邀请者获得 +{self.REWARD_QUOTA} 次额度"
-                    }
-                else:
-                    logger.info(f"Invite reward not granted: {message}")
-                    return None
-                    
-        except Exception as e:
-            logger.error(f"Failed to check and reward inviter: {str(e)}")
+            except Exception as e:
+                logger.error(f"Failed to look up invite code: {str(e)}")
+                return None
+
+            if not code_result:
+                logger.warning(f"No invite code found for inviter: {canonical_referrer_id}")
+                return None
+            invite_code = code_result.get('invite_code')
+
+        return canonical_referrer_id, canonical_invitee_id, invite_code
+
+    def _reward_first_analysis(
+        self, cursor: sqlite3.Cursor, inviter_id: str, invitee_id: str, invite_code: str
+    ) -> Optional[Dict]:
+        """被邀请人恰好有 1 条分析记录时在当前事务内发放奖励（不 commit）"""
+        # Check if invitee has any analysis records
+        cursor.execute("""
+            SELECT COUNT(*) as cnt FROM analysis_records
+            WHERE user_id = ?
+        """, (invitee_id,))
+        
+        count_result = cursor.fetchone()
+        analysis_count = count_result.get('cnt', 0) if count_result else 0
+        
+        # Only reward on first analysis
+        if analysis_count != 1:
+            logger.debug(f"Invitee {invitee_id} has {analysis_count} analyses, skipping reward")
+            return None
+        
+        # Record reward
+        success, message = self._insert_reward(cursor, inviter_id, invitee_id, invite_code, date.today())
+        if not success:
+            logger.info(f"Invite reward not granted: {message}")
             return None
+        return {
+            "inviter_id": inviter_id,
+            "invitee_id": invitee_id,
+            "reward_quota": self.REWARD_QUOTA,
+            "message": f"邀请成功！邀请者获得 +{self.REWARD_QUOTA} 次额度"
+        }
 
     def _get_acceptance_for_invitee(self, invitee_id: str) -> Optional[Dict[str, Any]]:
         try:
@@ -1,13 +1,19 @@
 """
 Track background job / startup task health for ops and /api/health.
+
+除状态外可记录最近一次运行的耗时（last_duration_ms）和任务自带的指标（last_metrics，
+JSON，如数据库维护任务的文件大小）；两列由 schema registry 补齐，旧库缺列时只写状态。
 """
 from __future__ import annotations
 
+import json
 import threading
+import time
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
 from database.db_factory import DatabaseFactory
+from database.write_queue import write_queue
 from utils.logger import get_logger
 
 logger = get_logger()
@@ -15,6 +21,10 @@ logger = get_logger()
 _FAILURE_ALERT_THRESHOLD = int(__import__("os").getenv("OPS_ALERT_FAILURE_THRESHOLD", "3"))
 
 
+def _write_key(job_id: str):
+    return ("job_health", job_id)
+
+
 def _utc_now() -> str:
     return datetime.now(timezone.utc).replace(tzinfo=None).isoformat() + "Z"
 
@@ -23,6 +33,7 @@ class JobHealthTracker:
     def __init__(self) -> None:
         self._lock = threading.Lock()
         self._memory: Dict[str, Dict[str, Any]] = {}
+        self._metric_columns_ready: set = set()
 
     def _ensure_table(self, cursor) -> bool:
         row = cursor.execute(
@@ -30,6 +41,17 @@ class JobHealthTracker:
         ).fetchone()
         return bool(row)
 
+    def _has_metric_columns(self, cursor) -> bool:
+        """last_duration_ms / last_metrics 是否已补齐（只缓存已补齐的库路径）"""
+        db_path = DatabaseFactory.get_db_path()
+        if db_path in self._metric_columns_ready:
+            return True
+        columns = {row["name"] for row in cursor.execute("PRAGMA table_info(job_health)").fetchall()}
+        ready = {"last_duration_ms", "last_metrics"} <= columns
+        if ready:
+            self._metric_columns_ready.add(db_path)
+        return ready
+
     def ensure_registered(self, job_id: str, *, detail: str = "awaiting first run") -> None:
         self._load_from_db()
         with self._lock:
@@ -45,7 +67,14 @@ class JobHealthTracker:
             }
         self._persist(job_id)
 
-    def record_success(self, job_id: str, *, detail: str = "") -> None:
+    def record_success(
+        self,
+        job_id: str,
+        *,
+        detail: str = "",
+        duration_ms: Optional[float] = None,
+        metrics: Optional[Dict[str, Any]] = None,
+    ) -> None:
         now = _utc_now()
         with self._lock:
             self._memory[job_id] = {
@@ -55,10 +84,19 @@ class JobHealthTracker:
                 "last_status": "ok",
                 "last_error": detail or None,
                 "consecutive_failures": 0,
+                "last_duration_ms": duration_ms,
+                "last_metrics": metrics,
             }
         self._persist(job_id)
 
-    def record_failure(self, job_id: str, error: str) -> None:
+    def record_failure(
+        self,
+        job_id: str,
+        error: str,
+        *,
+        duration_ms: Optional[float] = None,
+        metrics: Optional[Dict[str, Any]] = None,
+    ) -> None:
         now = _utc_now()
         failures = 1
         with self._lock:
@@ -72,6 +110,8 @@ class JobHealthTracker:
                 "last_status": "fail",
                 "last_error": (error or "")[:500],
                 "consecutive_failures": failures,
+                "last_duration_ms": duration_ms,
+                "last_metrics": metrics,
             }
             snapshot = dict(self._memory[job_id])
         self._persist(job_id)
@@ -81,42 +121,69 @@ class JobHealthTracker:
             ops_alert_service.send_job_failure_alert(job_id, failures, snapshot.get("last_error") or "")
 
     def _persist(self, job_id: str) -> None:
-        row = self._memory.get(job_id)
+        with self._lock:
+            row = dict(self._memory.get(job_id) or {})
         if not row:
             return
-        try:
-            with DatabaseFactory.get_connection() as conn:
-                cursor = conn.cursor()
-                if not self._ensure_table(cursor):
-                    return
+        params = (
+            job_id,
+            row.get("last_run_at"),
+            row.get("last_success_at"),
+            row.get("last_status"),
+            row.get("last_error"),
+            int(row.get("consecutive_failures") or 0),
+            _utc_now(),
+        )
+        metric_params = (
+            row.get("last_duration_ms"),
+            json.dumps(row["last_metrics"], ensure_ascii=False) if row.get("last_metrics") is not None else None,
+        )
+
+        def _upsert(cursor) -> None:
+            if not self._ensure_table(cursor):
+                return
+            if self._has_metric_columns(cursor):
                 cursor.execute(
                     """
                     INSERT INTO job_health (
                         job_id, last_run_at, last_success_at, last_status,
-                        last_error, consecutive_failures, updated_at
+                        last_error, consecutive_failures, updated_at,
+                        last_duration_ms, last_metrics
                     )
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ON CONFLICT(job_id) DO UPDATE SET
                         last_run_at = excluded.last_run_at,
                         last_success_at = excluded.last_success_at,
                         last_status = excluded.last_status,
                         last_error = excluded.last_error,
                         consecutive_failures = excluded.consecutive_failures,
-                        updated_at = excluded.updated_at
+                        updated_at = excluded.updated_at,
+                        last_duration_ms = excluded.last_duration_ms,
+                        last_metrics = excluded.last_metrics
                     """,
-                    (
-                        job_id,
-                        row.get("last_run_at"),
-                        row.get("last_success_at"),
-                        row.get("last_status"),
-                        row.get("last_error"),
-                        int(row.get("consecutive_failures") or 0),
-                        _utc_now(),
-                    ),
+                    params + metric_params,
                 )
-                conn.commit()
-        except Exception as exc:
-            logger.warning(f"[JobHealth] Persist skipped for {job_id}: {exc}")
+                return
+            cursor.execute(
+                """
+                INSERT INTO job_health (
+                    job_id, last_run_at, last_success_at, last_status,
+                    last_error, consecutive_failures, updated_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET
+                    last_run_at = excluded.last_run_at,
+                    last_success_at = excluded.last_success_at,
+                    last_status = excluded.last_status,
+                    last_error = excluded.last_error,
+                    consecutive_failures = excluded.consecutive_failures,
+                    updated_at = excluded.updated_at
+                """,
+                params,
+            )
+
+        # 只落最后一次状态：同一 job 尚未提交的旧状态直接被替换
+        write_queue.submit(_upsert, key=_write_key(job_id), coalesce=True, label="job_health")
 
     def _load_from_db(self) -> None:
         try:
@@ -124,18 +191,28 @@ class JobHealthTracker:
                 cursor = conn.cursor()
                 if not self._ensure_table(cursor):
                     return
+                metric_columns = (
+                    ", last_duration_ms, last_metrics" if self._has_metric_columns(cursor) else ""
+                )
                 rows = cursor.execute(
-                    """
+                    f"""
                     SELECT job_id, last_run_at, last_success_at, last_status,
-                           last_error, consecutive_failures
+                           last_error, consecutive_failures{metric_columns}
                     FROM job_health
                     """
                 ).fetchall()
             with self._lock:
                 for row in rows or []:
                     job_id = row.get("job_id")
-                    if job_id:
-                        self._memory[job_id] = dict(row)
+                    # 写队列里还有更新的状态时以内存为准，表里的是旧值
+                    if job_id and not write_queue.has_pending(_write_key(job_id)):
+                        job = dict(row)
+                        if isinstance(job.get("last_metrics"), str):
+                            try:
+                                job["last_metrics"] = json.loads(job["last_metrics"])
+                            except ValueError:
+                                job["last_metrics"] = None
+                        self._memory[job_id] = job
         except Exception as exc:
             logger.warning(f"[JobHealth] Load skipped: {exc}")
 
@@ -170,6 +247,12 @@ class JobHealthTracker:
     def is_degraded(self) -> bool:
         return bool(self.snapshot().get("degraded"))
 
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """内存里的最近状态（不访问数据库；snapshot() 之后调用即为最新）"""
+        with self._lock:
+            job = self._memory.get(job_id)
+            return dict(job) if job else None
+
 
 job_health_tracker = JobHealthTracker()
 
@@ -179,12 +262,17 @@ def track_job(job_id: str):
 
     def decorator(func):
         def wrapper(*args, **kwargs):
+            started = time.perf_counter()
             try:
                 result = func(*args, **kwargs)
-                job_health_tracker.record_success(job_id)
+                job_health_tracker.record_success(
+                    job_id, duration_ms=round((time.perf_counter() - started) * 1000, 1)
+                )
                 return result
             except Exception as exc:
-                job_health_tracker.record_failure(job_id, str(exc))
+                job_health_tracker.record_failure(
+                    job_id, str(exc), duration_ms=round((time.perf_counter() - started) * 1000, 1)
+                )
                 raise
 
         wrapper.__name__ = getattr(func, "__name__", job_id)
@@ -3,8 +3,8 @@ Scheduled due-check and digest email for judgment journal records.
 """
 from __future__ import annotations
 
-import threading
 
+from services.scheduler_leader import TimerChain
 from utils.logger import get_logger
 
 logger = get_logger()
@@ -14,6 +14,7 @@ class JournalDueScheduler:
     _instance = None
     _scheduler = None
     _running = False
+    _timers = TimerChain()
 
     def __new__(cls):
         if cls._instance is None:
@@ -49,18 +50,19 @@ class JournalDueScheduler:
 
     @classmethod
     def _start_simple_timer(cls):
-        def run_and_reschedule():
-            cls._run_job()
-            timer = threading.Timer(24 * 3600, run_and_reschedule)
-            timer.daemon = True
-            timer.start()
-
-        timer = threading.Timer(600, run_and_reschedule)
-        timer.daemon = True
-        timer.start()
+        cls._timers.schedule(600, 24 * 3600, cls._run_job)
         cls._running = True
         logger.info("[JournalDueScheduler] Started (simple timer)")
 
+    @classmethod
+    def stop(cls):
+        if cls._scheduler:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+        cls._timers.cancel()
+        cls._running = False
+        logger.info("[JournalDueScheduler] Stopped")
+
     @classmethod
     def _run_job(cls):
         from services.job_health_tracker import job_health_tracker
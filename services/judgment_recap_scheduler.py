@@ -4,8 +4,8 @@ SSR page is rendered on demand from live verifier data.
 """
 from __future__ import annotations
 
-import threading
 
+from services.scheduler_leader import TimerChain
 from utils.logger import get_logger
 
 logger = get_logger()
@@ -15,6 +15,7 @@ class JudgmentRecapScheduler:
     _instance = None
     _scheduler = None
     _running = False
+    _timers = TimerChain()
 
     def __new__(cls):
         if cls._instance is None:
@@ -49,17 +50,18 @@ class JudgmentRecapScheduler:
 
     @classmethod
     def _start_simple_timer(cls):
-        def run_and_reschedule():
-            cls._run_weekly_job()
-            timer = threading.Timer(7 * 24 * 3600, run_and_reschedule)
-            timer.daemon = True
-            timer.start()
-
-        timer = threading.Timer(600, run_and_reschedule)
-        timer.daemon = True
-        timer.start()
+        cls._timers.schedule(600, 7 * 24 * 3600, cls._run_weekly_job)
         cls._running = True
 
+    @classmethod
+    def stop(cls):
+        if cls._scheduler:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+        cls._timers.cancel()
+        cls._running = False
+        logger.info("[JudgmentRecapScheduler] Stopped")
+
     @classmethod
     def _run_weekly_job(cls):
         from services.job_health_tracker import job_health_tracker
@@ -28,78 +28,8 @@ class JudgmentService:
     def __init__(self, db_path: str = "data/stocks.db"):
         self.db_path = db_path
         self.db = DatabaseFactory  # Use factory for helper methods
+        # 表结构由 migrations/ 与 database/schema_registry.py 在启动时统一维护
         DatabaseFactory.initialize(db_path)  # Ensure initialized
-        self._init_db()
-
-    def _init_db(self):
-        """Initialize database and tables"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        try:
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Create judgments table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS judgments (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        judgment_id TEXT UNIQUE NOT NULL,
-                        user_id TEXT NOT NULL,
-                        stock_code TEXT NOT NULL,
-                        stock_name TEXT,
-                        market_type TEXT,
-                        snapshot_time TIMESTAMP NOT NULL,
-                        structure_premise TEXT,
-                        selected_candidates TEXT,
-                        key_levels_snapshot TEXT,
-                        structure_type TEXT,
-                        ma200_position TEXT,
-                        phase TEXT,
-                        verification_period INTEGER DEFAULT 7,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-
-                # Check if verification_period column exists (for migration)
-                cursor.execute("PRAGMA table_info(judgments)")
-                columns = [
-                    info["name"] if isinstance(info, dict) else info[1]
-                    for info in cursor.fetchall()
-                ]
-                if "verification_period" not in columns:
-                    logger.info("Migrating database: adding verification_period column")
-                    cursor.execute("ALTER TABLE judgments ADD COLUMN verification_period INTEGER DEFAULT 7")
-                
-                # Create indexes
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_judgments_user_id ON judgments(user_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_judgments_stock_code ON judgments(stock_code)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_judgments_created_at ON judgments(created_at DESC)")
-                
-                # Create judgment_checks table
-                # 注意：绝不能加 FOREIGN KEY (judgment_id) REFERENCES judgments(judgment_id)。
-                # 006 之后 judgments 表没有 judgment_id 列，foreign_keys=ON 时这个坏外键
-                # 会让所有 DELETE FROM judgments 报 "foreign key mismatch"（见迁移 018）。
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS judgment_checks (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        judgment_id TEXT NOT NULL,
-                        check_time TIMESTAMP NOT NULL,
-                        current_price REAL,
-                        price_change_pct REAL,
-                        current_structure_status TEXT,
-                        status_description TEXT,
-                        reasons TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Create indexes
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_checks_judgment_id ON judgment_checks(judgment_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_checks_created_at ON judgment_checks(created_at DESC)")
-                
-                conn.commit()
-                logger.debug(f"Judgment tables initialized: {self.db_path}")
-        except Exception as e:
-            logger.error(f"Failed to initialize judgment tables: {str(e)}")
 
     def create_judgment(self, owner_type: str, owner_id: str, snapshot: JudgmentSnapshot) -> str:
         """
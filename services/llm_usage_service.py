@@ -7,13 +7,14 @@ from datetime import date, datetime, timedelta
 from typing import Any, Dict, List
 
 from database.db_factory import DatabaseFactory
-from database.sqlite_utils import run_with_busy_retry
+from database.write_queue import write_queue
 from utils.logger import get_logger
 
 logger = get_logger()
 
 USER_TYPE_AUTHENTICATED = "authenticated"
 USER_TYPE_ANONYMOUS = "anonymous"
+_USAGE_WRITE_KEY = ("llm_usage_daily",)
 
 
 class LlmUsageService:
@@ -28,31 +29,28 @@ class LlmUsageService:
             return
         user_type = USER_TYPE_AUTHENTICATED if is_authenticated else USER_TYPE_ANONYMOUS
         usage_date = date.today().isoformat()
-        try:
-            def _write() -> None:
-                with DatabaseFactory.get_connection() as conn:
-                    cursor = conn.cursor()
-                    if not self._table_exists(cursor):
-                        return
-                    cursor.execute(
-                        """
-                        INSERT INTO llm_usage_daily (usage_date, user_type, call_count, stock_count)
-                        VALUES (?, ?, 1, ?)
-                        ON CONFLICT(usage_date, user_type) DO UPDATE SET
-                            call_count = call_count + 1,
-                            stock_count = stock_count + excluded.stock_count
-                        """,
-                        (usage_date, user_type, stock_count),
-                    )
-                    conn.commit()
 
-            run_with_busy_retry(_write)
-        except Exception as exc:
-            logger.warning(f"[LlmUsage] record_analyze skipped: {exc}")
+        def _upsert(cursor) -> None:
+            if not self._table_exists(cursor):
+                return
+            cursor.execute(
+                """
+                INSERT INTO llm_usage_daily (usage_date, user_type, call_count, stock_count)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(usage_date, user_type) DO UPDATE SET
+                    call_count = call_count + 1,
+                    stock_count = stock_count + excluded.stock_count
+                """,
+                (usage_date, user_type, stock_count),
+            )
+
+        # 尽力而为的计数：交给写队列与其它写入合并提交
+        write_queue.submit(_upsert, key=_USAGE_WRITE_KEY, label="llm_usage_daily")
 
     def get_daily_usage(self, *, days: int = 7) -> List[Dict[str, Any]]:
         days = max(1, min(int(days), 90))
         start_date = (date.today() - timedelta(days=days - 1)).isoformat()
+        write_queue.barrier(_USAGE_WRITE_KEY)
         try:
             with DatabaseFactory.get_connection() as conn:
                 cursor = conn.cursor()
@@ -82,6 +80,8 @@ class LlmUsageService:
         """Historical analyze usage from quota records (available before llm_usage_daily)."""
         days = max(1, min(int(days), 90))
         start_date = (date.today() - timedelta(days=days - 1)).isoformat()
+        # 跨用户汇总，先把队列里所有分析记录落盘
+        write_queue.flush()
         try:
             with DatabaseFactory.get_connection() as conn:
                 cursor = conn.cursor()
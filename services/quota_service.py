@@ -6,13 +6,27 @@ REFACTORED: Uses DatabaseFactory for unified database access
 """
 import sqlite3
 import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
 from datetime import date, datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from utils.logger import get_logger
+from config.database import DatabaseConfig
+from database.async_db import run_db
 from database.db_factory import DatabaseFactory
+from database.sqlite_utils import run_with_busy_retry
+from database.write_queue import write_queue
 
 logger = get_logger()
 
+QUOTA_LEDGER_TTL_SEC = float(os.getenv("QUOTA_LEDGER_TTL_SEC", "60"))
+# 预占的有效期：请求既没 commit 也没 release（共享预占的进程崩溃、进程内预占的响应被提前拆掉）时，
+# 超过该时长后额度自动归还
+QUOTA_RESERVATION_TTL_SEC = float(os.getenv("QUOTA_RESERVATION_TTL_SEC", "900"))
+WEB_WORKERS = max(1, int(os.getenv("WEB_WORKERS", "1")))
+
 
 class QuotaService:
     """Service for managing user analysis quota"""
@@ -28,27 +42,18 @@ class QuotaService:
         self.db_path = db_path or os.getenv("DB_PATH", "data/stocks.db")
         self.db = DatabaseFactory  # Use factory for connections
         DatabaseFactory.initialize(self.db_path)
-        self._ensure_tables()
-    
-    def _ensure_tables(self):
-        """Ensure quota tables exist (defensive check)"""
-        try:
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                # Check if analysis_records table exists
-                cursor.execute("""
-                    SELECT name FROM sqlite_master 
-                    WHERE type='table' AND name='analysis_records'
-                """)
-                if not cursor.fetchone():
-                    logger.warning("Quota tables not found. Run migration 002.")
-        except Exception as e:
-            logger.error(f"Failed to check quota tables: {str(e)}")
     
-    def _resolve_base_quota(self, is_authenticated: bool = False) -> int:
+    @classmethod
+    def _resolve_base_quota(cls, is_authenticated: bool = False) -> int:
         if is_authenticated:
-            return self.AUTHENTICATED_BASE_QUOTA
-        return self.ANONYMOUS_BASE_QUOTA
+            return cls.AUTHENTICATED_BASE_QUOTA
+        return cls.ANONYMOUS_BASE_QUOTA
+
+    @staticmethod
+    def _await_pending_writes(user_id: str) -> None:
+        """该用户的分析记录/邀请奖励还在写队列里时先等其提交，保证读到自己的写入"""
+        write_queue.barrier(("analysis_records", user_id))
+        write_queue.barrier(("invite_rewards", user_id))
 
     def get_quota_status(
         self,
@@ -79,6 +84,7 @@ class QuotaService:
         if analysis_date is None:
             analysis_date = date.today()
         
+        self._await_pending_writes(user_id)
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
@@ -164,6 +170,7 @@ class QuotaService:
         if analysis_date is None:
             analysis_date = date.today()
         
+        self._await_pending_writes(user_id)
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
@@ -222,6 +229,7 @@ class QuotaService:
         if not codes:
             return (False, "invalid_request", {"message": "请输入代码"})
 
+        self._await_pending_writes(user_id)
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
@@ -295,6 +303,45 @@ class QuotaService:
                 recorded += 1
         return recorded
     
+    @classmethod
+    def queue_analyses(
+        cls,
+        user_id: str,
+        stock_codes: List[str],
+        analysis_date: Optional[date] = None,
+        *,
+        reservation_id: Optional[str] = None,
+    ) -> int:
+        """
+        Record analyses through the group-commit write queue (consumes quota)
+
+        与 record_analyses 相同的 INSERT OR IGNORE，但交给 write_queue 合并提交，调用方不等写锁。
+        同一用户随后的额度读取会先 barrier，因此不会多放额度。QuotaLedger.commit 经由这里落盘；
+        带 reservation_id 时在同一事务里删除对应的共享预占，其它 worker 不会看到"既未预占也未记录"的空档。
+
+        Returns:
+            Number of distinct codes queued
+        """
+        if analysis_date is None:
+            analysis_date = date.today()
+        codes = list(dict.fromkeys(str(item).strip() for item in stock_codes if str(item).strip()))
+        if not user_id or not codes:
+            return 0
+        rows = [(user_id, code, analysis_date) for code in codes]
+
+        def _insert(cursor: sqlite3.Cursor) -> None:
+            cursor.executemany("""
+                INSERT OR IGNORE INTO analysis_records
+                (user_id, stock_code, analysis_date)
+                VALUES (?, ?, ?)
+            """, rows)
+            if reservation_id:
+                cursor.execute("DELETE FROM quota_reservations WHERE reservation_id = ?", (reservation_id,))
+
+        write_queue.submit(_insert, key=("analysis_records", user_id), label="analysis_records")
+        logger.info(f"Queued analysis records: user={user_id}, stocks={codes}, date={analysis_date}")
+        return len(codes)
+
     def record_analysis(
         self, 
         user_id: str, 
@@ -325,17 +372,19 @@ class QuotaService:
                 """, (user_id, stock_code, analysis_date))
                 conn.commit()
                 
-                logger.info(f"Recorded analysis: user={user_id}, stock={stock_code}, date={analysis_date}")
-                return True
+            quota_ledger.mark_stale(user_id)
+            logger.info(f"Recorded analysis: user={user_id}, stock={stock_code}, date={analysis_date}")
+            return True
                 
         except Exception as e:
             logger.error(f"Failed to record analysis: {str(e)}")
             return False
     
-    def _get_quota_exceeded_message(self, status: Dict) -> str:
+    @classmethod
+    def _get_quota_exceeded_message(cls, status: Dict) -> str:
         """Generate friendly quota exceeded message"""
         analyzed = status.get("analyzed_stocks_today", [])
-        total = status.get("total_quota", self.BASE_QUOTA)
+        total = status.get("total_quota", cls.BASE_QUOTA)
         
         message = f"今日新股票分析次数已用完 ({total}/{total})\n\n"
         message += "💡 建议：\n"
@@ -348,3 +397,357 @@ class QuotaService:
         message += "💡 提示：专注少数标的,比广撒网更有价值"
         
         return message
+
+
+@dataclass
+class QuotaReservation:
+    """一次分析请求预占的额度；commit 或 release 之后即失效"""
+    reservation_id: str
+    db_path: str
+    user_id: str
+    analysis_date: date
+    new_codes: Tuple[str, ...]
+    state: str = "open"
+    # True 表示预占记在 quota_reservations 表里（多 worker 共享），否则只在本进程内存
+    shared: bool = False
+
+
+@dataclass
+class _UserDay:
+    analyzed: Set[str]
+    invite_quota: int
+    # reservation_id -> (预占的代码, 过期时刻 time.monotonic())
+    reserved: Dict[str, Tuple[Tuple[str, ...], float]] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def drop_expired_reservations(self) -> None:
+        now = time.monotonic()
+        for reservation_id in [rid for rid, (_, expires_at) in self.reserved.items() if expires_at <= now]:
+            self.reserved.pop(reservation_id, None)
+
+
+class QuotaLedger:
+    """
+    进程内的每用户每日额度账本
+
+    - 首次访问某用户当天额度时从 analysis_records / invite_rewards 加载（之后纯内存判断）
+    - reserve：检查并预占新标的额度是原子的，并发请求不会同时拿到最后一个额度
+    - commit：预占转为已用，analysis_records 交给写队列 write-behind 落盘
+    - release：流失败/断开时归还预占，未落盘的预占重启后自然消失；漏掉 release 的预占
+      QUOTA_RESERVATION_TTL_SEC 后过期
+    条目超过 QUOTA_LEDGER_TTL_SEC 后重新加载（合并内存中的已用与预占）；邀请奖励、同步写入等旁路通过
+    mark_stale 触发重载。
+
+    进程内账本只对单进程原子：WEB_WORKERS>1 时各 worker 各有一份，会各自放出整份额度。
+    此时（shared=True）reserve 改为在数据库事务里检查并预占（SQLite BEGIN IMMEDIATE 串行化，
+    PostgreSQL 按用户取 advisory 事务锁），未完成的预占记在 quota_reservations，所有 worker 都能看到。
+    """
+
+    def __init__(self, ttl_sec: float = QUOTA_LEDGER_TTL_SEC, *, shared: Optional[bool] = None):
+        self.ttl_sec = ttl_sec
+        self.shared = WEB_WORKERS > 1 if shared is None else shared
+        self._lock = threading.Lock()
+        # (db_path, user_id, analysis_date) -> 当天账目
+        self._entries: Dict[Tuple[str, str, date], _UserDay] = {}
+
+    def _fresh(self, entry: Optional[_UserDay]) -> bool:
+        return entry is not None and time.monotonic() - entry.loaded_at < self.ttl_sec
+
+    def is_loaded(self, user_id: str, analysis_date: Optional[date] = None) -> bool:
+        key = (DatabaseFactory.get_db_path(), user_id, analysis_date or date.today())
+        with self._lock:
+            return self._fresh(self._entries.get(key))
+
+    def load(self, user_id: str, analysis_date: Optional[date] = None) -> None:
+        """从 SQLite 加载（或重载）该用户当天的已用额度与邀请额度"""
+        analysis_date = analysis_date or date.today()
+        QuotaService._await_pending_writes(user_id)
+        with DatabaseFactory.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT stock_code FROM analysis_records
+                WHERE user_id = ? AND analysis_date = ?
+            """, (user_id, analysis_date))
+            analyzed = {row["stock_code"] for row in cursor.fetchall()}
+            cursor.execute("""
+                SELECT COALESCE(SUM(reward_quota), 0) as total
+                FROM invite_rewards
+                WHERE inviter_id = ? AND reward_date = ?
+            """, (user_id, analysis_date))
+            row = cursor.fetchone()
+        invite_quota = min(int(row.get("total", 0) if row else 0), QuotaService.DAILY_INVITE_LIMIT)
+
+        with self._lock:
+            key = (DatabaseFactory.get_db_path(), user_id, analysis_date)
+            previous = self._entries.get(key)
+            entry = _UserDay(analyzed=analyzed, invite_quota=invite_quota)
+            if previous is not None:
+                # 当天已用只增不减：加载期间刚 commit 的标的以内存为准
+                entry.analyzed |= previous.analyzed
+                previous.drop_expired_reservations()
+                entry.reserved = previous.reserved
+            self._entries[key] = entry
+            # 跨天后丢弃旧日期条目
+            for stale in [k for k in self._entries if k[2] != analysis_date]:
+                self._entries.pop(stale, None)
+
+    def mark_stale(self, user_id: str) -> None:
+        """旁路写入（邀请奖励、同步记录）后调用，下次 reserve 前重新加载"""
+        with self._lock:
+            for (_, entry_user, _), entry in self._entries.items():
+                if entry_user == user_id:
+                    entry.loaded_at = 0.0
+
+    def try_reserve(
+        self,
+        user_id: str,
+        stock_codes: List[str],
+        *,
+        is_authenticated: bool = False,
+        analysis_date: Optional[date] = None,
+        allow_stale: bool = False,
+    ) -> Optional[Tuple[bool, str, Dict, Optional[QuotaReservation]]]:
+        """
+        纯内存的检查并预占；条目未加载或已过期时返回 None（调用方先 load）
+
+        返回值与 QuotaService.check_quota_for_codes 相同的 (allowed, reason, details)，
+        另附 reservation（不需要新额度或被拒绝时为 None）。
+        allow_stale=True 时不看 TTL，只要已加载即可（刚 load 完的条目在 TTL<=0 时也立刻"过期"）。
+        """
+        analysis_date = analysis_date or date.today()
+        codes = list(dict.fromkeys(str(code).strip() for code in stock_codes if str(code).strip()))
+        if not codes:
+            return (False, "invalid_request", {"message": "请输入代码"}, None)
+
+        db_path = DatabaseFactory.get_db_path()
+        with self._lock:
+            entry = self._entries.get((db_path, user_id, analysis_date))
+            if entry is None or not (allow_stale or self._fresh(entry)):
+                return None
+            entry.drop_expired_reservations()
+            in_flight = {code for reserved, _ in entry.reserved.values() for code in reserved}
+            result = self._evaluate(codes, entry.analyzed, in_flight, entry.invite_quota, is_authenticated)
+            if not result[0]:
+                return result + (None,)
+            reservation = QuotaReservation(
+                reservation_id=uuid.uuid4().hex,
+                db_path=db_path,
+                user_id=user_id,
+                analysis_date=analysis_date,
+                new_codes=tuple(result[2]["new_codes"]),
+            )
+            entry.reserved[reservation.reservation_id] = (
+                reservation.new_codes,
+                time.monotonic() + QUOTA_RESERVATION_TTL_SEC,
+            )
+        return result + (reservation,)
+
+    @staticmethod
+    def _evaluate(
+        codes: List[str],
+        analyzed: Set[str],
+        in_flight: Set[str],
+        invite_quota: int,
+        is_authenticated: bool,
+    ) -> Tuple[bool, str, Dict]:
+        """按已用、进行中的预占与邀请额度判断这批代码能否分析（进程内与共享预占共用）"""
+        history_codes = [code for code in codes if code in analyzed]
+        # 其它请求正在分析的标的不重复占额度，结果会由那边的 commit 计入
+        new_codes = [code for code in codes if code not in analyzed and code not in in_flight]
+        total_quota = QuotaService._resolve_base_quota(is_authenticated) + invite_quota
+        remaining = max(0, total_quota - len(analyzed) - len(in_flight - analyzed))
+        required = len(new_codes)
+
+        if required > remaining:
+            status = {"total_quota": total_quota, "analyzed_stocks_today": sorted(analyzed)}
+            return (
+                False,
+                "quota_exceeded",
+                {
+                    "remaining_quota": remaining,
+                    "required_quota": required,
+                    "new_codes": new_codes,
+                    "history_codes": history_codes,
+                    "total_quota": total_quota,
+                    "analyzed_stocks_today": status["analyzed_stocks_today"],
+                    "message": QuotaService._get_quota_exceeded_message(status),
+                },
+            )
+        return (
+            True,
+            "quota_available",
+            {
+                "remaining_quota": remaining,
+                "required_quota": required,
+                "new_codes": new_codes,
+                "history_codes": history_codes,
+                "message": (
+                    f"可以分析 {len(codes)} 只标的，其中 {required} 只需新额度"
+                    if required
+                    else "均为今日已分析标的，可重复查看"
+                ),
+            },
+        )
+
+    def reserve_shared(
+        self,
+        user_id: str,
+        stock_codes: List[str],
+        *,
+        is_authenticated: bool = False,
+        analysis_date: Optional[date] = None,
+    ) -> Tuple[bool, str, Dict, Optional[QuotaReservation]]:
+        """
+        在数据库事务里检查并预占（多 worker 共享），阻塞调用，协程里经 run_db 执行
+
+        SQLite 的 BEGIN IMMEDIATE 让各进程的检查-写入串行化；PostgreSQL 下 BEGIN 不抢库级锁，
+        改为对 (user_id, 日期) 取 advisory 事务锁，同一用户的预占依次进行，不同用户互不阻塞。
+        """
+        analysis_date = analysis_date or date.today()
+        codes = list(dict.fromkeys(str(code).strip() for code in stock_codes if str(code).strip()))
+        if not codes:
+            return (False, "invalid_request", {"message": "请输入代码"}, None)
+
+        QuotaService._await_pending_writes(user_id)
+        day = str(analysis_date)
+        reservation_id = uuid.uuid4().hex
+
+        def attempt() -> Tuple[bool, str, Dict]:
+            now = time.time()
+            with DatabaseFactory.get_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    if DatabaseConfig.backend() == "postgres":
+                        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(?))", (f"quota:{user_id}:{day}",))
+                    cursor.execute("DELETE FROM quota_reservations WHERE expires_at <= ?", (now,))
+                    cursor.execute("""
+                        SELECT stock_code FROM analysis_records
+                        WHERE user_id = ? AND analysis_date = ?
+                    """, (user_id, analysis_date))
+                    analyzed = {row["stock_code"] for row in cursor.fetchall()}
+                    cursor.execute("""
+                        SELECT COALESCE(SUM(reward_quota), 0) as total
+                        FROM invite_rewards
+                        WHERE inviter_id = ? AND reward_date = ?
+                    """, (user_id, analysis_date))
+                    row = cursor.fetchone()
+                    invite_quota = min(int(row.get("total", 0) if row else 0), QuotaService.DAILY_INVITE_LIMIT)
+                    cursor.execute("""
+                        SELECT stock_code FROM quota_reservations
+                        WHERE user_id = ? AND analysis_date = ?
+                    """, (user_id, day))
+                    in_flight = {row["stock_code"] for row in cursor.fetchall()}
+
+                    result = self._evaluate(codes, analyzed, in_flight, invite_quota, is_authenticated)
+                    if result[0] and result[2]["new_codes"]:
+                        expires_at = now + QUOTA_RESERVATION_TTL_SEC
+                        cursor.executemany("""
+                            INSERT INTO quota_reservations
+                            (reservation_id, user_id, analysis_date, stock_code, expires_at)
+                            VALUES (?, ?, ?, ?, ?)
+                        """, [(reservation_id, user_id, day, code, expires_at) for code in result[2]["new_codes"]])
+                    conn.commit()
+                    return result
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+
+        result = run_with_busy_retry(attempt)
+        if not result[0]:
+            return result + (None,)
+        reservation = QuotaReservation(
+            reservation_id=reservation_id,
+            db_path=DatabaseFactory.get_db_path(),
+            user_id=user_id,
+            analysis_date=analysis_date,
+            new_codes=tuple(result[2]["new_codes"]),
+            shared=True,
+        )
+        return result + (reservation,)
+
+    async def reserve(
+        self,
+        user_id: str,
+        stock_codes: List[str],
+        *,
+        is_authenticated: bool = False,
+    ) -> Tuple[bool, str, Dict, Optional[QuotaReservation]]:
+        """协程版：条目已加载时直接在事件循环上完成（微秒级），否则先在 DB 线程池加载；多 worker 时走共享预占"""
+        analysis_date = date.today()
+        if self.shared:
+            return await run_db(
+                self.reserve_shared,
+                user_id,
+                stock_codes,
+                is_authenticated=is_authenticated,
+                analysis_date=analysis_date,
+            )
+        loaded = False
+        while True:
+            # 刚加载的条目直接用，否则 QUOTA_LEDGER_TTL_SEC<=0 时会一直重载
+            result = self.try_reserve(
+                user_id,
+                stock_codes,
+                is_authenticated=is_authenticated,
+                analysis_date=analysis_date,
+                allow_stale=loaded,
+            )
+            if result is not None:
+                return result
+            await run_db(self.load, user_id, analysis_date)
+            loaded = True
+
+    def commit(self, reservation: Optional[QuotaReservation], stock_codes: List[str]) -> int:
+        """
+        预占转为已用并 write-behind 落盘
+
+        stock_codes 是实际分析的（解析后的）代码，可能与预占时的原始输入不同；全部计入当天已用。
+        """
+        if reservation is None or reservation.state != "open":
+            return 0
+        codes = list(dict.fromkeys(str(code).strip() for code in stock_codes if str(code).strip()))
+        with self._lock:
+            reservation.state = "committed"
+            entry = self._entries.get(
+                (reservation.db_path, reservation.user_id, reservation.analysis_date)
+            )
+            if entry is not None:
+                entry.reserved.pop(reservation.reservation_id, None)
+                entry.analyzed.update(codes)
+        QuotaService.queue_analyses(
+            reservation.user_id,
+            codes,
+            reservation.analysis_date,
+            reservation_id=reservation.reservation_id if reservation.shared else None,
+        )
+        return len(codes)
+
+    def release(self, reservation: Optional[QuotaReservation]) -> None:
+        """归还未 commit 的预占（幂等；共享预占交给写队列删除，不阻塞调用方）"""
+        if reservation is None or reservation.state != "open":
+            return
+        with self._lock:
+            reservation.state = "released"
+            entry = self._entries.get(
+                (reservation.db_path, reservation.user_id, reservation.analysis_date)
+            )
+            if entry is not None:
+                entry.reserved.pop(reservation.reservation_id, None)
+        if reservation.shared and reservation.new_codes:
+            reservation_id = reservation.reservation_id
+
+            def _delete(cursor: sqlite3.Cursor) -> None:
+                cursor.execute("DELETE FROM quota_reservations WHERE reservation_id = ?", (reservation_id,))
+
+            write_queue.submit(
+                _delete,
+                key=("analysis_records", reservation.user_id),
+                label="quota_reservations",
+            )
+
+
+# Singleton instance
+quota_ledger = QuotaLedger()
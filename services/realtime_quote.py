@@ -18,7 +18,7 @@ from __future__ import annotations
 import os
 import threading
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 from zoneinfo import ZoneInfo
 
 import pandas as pd
@@ -133,6 +133,67 @@ def _fetch_sina_quote(code: str) -> Optional[Dict[str, Any]]:
     return _parse_sina_payload(text, code)
 
 
+def _fetch_sina_quotes(codes: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """一次请求拉多只报价，返回 {sina_symbol: quote}；请求失败返回空 dict。"""
+    import httpx
+
+    symbols = {to_sina_symbol(code): code for code in codes}
+    symbols.pop(None, None)
+    if not symbols:
+        return {}
+    url = f"https://hq.sinajs.cn/list={','.join(symbols)}"
+    headers = {
+        "User-Agent": "Mozilla/5.0",
+        "Referer": "https://finance.sina.com.cn/",
+    }
+    try:
+        with httpx.Client(timeout=8.0) as client:
+            resp = client.get(url, headers=headers)
+            resp.raise_for_status()
+            text = resp.text
+    except Exception as exc:
+        logger.warning(f"[RealtimeQuote] sina bulk fetch failed ({len(symbols)} symbols): {exc}")
+        return {}
+
+    quotes: Dict[str, Optional[Dict[str, Any]]] = {symbol: None for symbol in symbols}
+    for line in text.splitlines():
+        head, sep, _ = line.partition("=")
+        if not sep or not head.startswith("var hq_str_"):
+            continue
+        symbol = head[len("var hq_str_"):].strip()
+        if symbol in symbols:
+            quotes[symbol] = _parse_sina_payload(line, symbols[symbol])
+    return quotes
+
+
+def prefetch_quotes(codes: List[str], ttl: int = QUOTE_CACHE_TTL_SECONDS, chunk_size: int = 100) -> int:
+    """
+    观察列表等批量场景：缺失/过期的报价按 chunk_size 合并成少量请求预热缓存，
+    之后逐只 get_quote() 直接命中。返回实际请求的标的数。
+    """
+    import time
+
+    now = time.monotonic()
+    with _cache_lock:
+        pending = []
+        for code in codes:
+            symbol = to_sina_symbol(code)
+            if not symbol:
+                continue
+            cached = _quote_cache.get(symbol)
+            if cached is None or now - cached[1] >= ttl:
+                pending.append(code)
+
+    for i in range(0, len(pending), chunk_size):
+        quotes = _fetch_sina_quotes(pending[i:i + chunk_size])
+        if not quotes:
+            continue  # 整批失败不写缓存，逐只 get_quote 时再试
+        with _cache_lock:
+            for symbol, quote in quotes.items():
+                _quote_cache[symbol] = (quote, now)
+    return len(pending)
+
+
 def get_quote(code: str, ttl: int = QUOTE_CACHE_TTL_SECONDS) -> Optional[Dict[str, Any]]:
     """带 TTL 缓存的实时报价。失败结果也短暂缓存，避免反复打超时源。"""
     symbol = to_sina_symbol(code)
@@ -1,10 +1,10 @@
 """
 Background refresh for the daily risk stock list.
 """
-import threading
 from datetime import datetime
 from typing import Optional
 
+from services.scheduler_leader import TimerChain
 from utils.logger import get_logger
 
 logger = get_logger()
@@ -14,6 +14,7 @@ class RiskStockScheduler:
     _instance = None
     _scheduler = None
     _running = False
+    _timers = TimerChain()
 
     def __new__(cls):
         if cls._instance is None:
@@ -65,18 +66,19 @@ class RiskStockScheduler:
 
     @classmethod
     def _start_simple_timer(cls):
-        def run_and_reschedule():
-            cls._run_refresh_job()
-            timer = threading.Timer(24 * 3600, run_and_reschedule)
-            timer.daemon = True
-            timer.start()
-
-        timer = threading.Timer(300, run_and_reschedule)
-        timer.daemon = True
-        timer.start()
+        cls._timers.schedule(300, 24 * 3600, cls._run_refresh_job)
         cls._running = True
         logger.info("[RiskStockScheduler] Started (simple timer)")
 
+    @classmethod
+    def stop(cls):
+        if cls._scheduler:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+        cls._timers.cancel()
+        cls._running = False
+        logger.info("[RiskStockScheduler] Stopped")
+
     @classmethod
     def _run_refresh_job(cls):
         from services.job_health_tracker import job_health_tracker
@@ -84,9 +86,11 @@ class RiskStockScheduler:
         job_id = "risk_stock_scheduler"
         try:
             from services.risk_stock_service import RiskStockService
+            from services.tushare.rate_limiter import BATCH, tushare_priority
 
             logger.info("[RiskStockScheduler] Running scheduled risk stock refresh...")
-            result = RiskStockService().refresh_daily(source="scheduler")
+            with tushare_priority(BATCH):
+                result = RiskStockService().refresh_daily(source="scheduler")
             logger.info(
                 f"[RiskStockScheduler] Completed trade_date={result.get('trade_date')} "
                 f"count={result.get('count')} alerts_created={result.get('alerts_created', 0)}"
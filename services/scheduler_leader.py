@@ -0,0 +1,236 @@
+"""
+Scheduler leader election
+A lease row in scheduler_leases decides which worker process runs scheduled jobs
+
+多 worker（WEB_WORKERS>1）部署时每个进程都会执行 startup_event。判断验证、风险股、复盘、到期提醒、
+结构信号、搜索快照、观察池摘要与数据库维护这些定时任务会写库、发邮件、写快照文件，只能由一个进程执行：
+各 worker 竞争同一行租约，持有者每 SCHEDULER_HEARTBEAT_SEC 秒续约，超过 SCHEDULER_LEASE_TTL_SEC
+未续约即视为失联，其它 worker 在下一次心跳时接管。
+
+- 抢占 / 续约是一条带条件的 UPSERT（持有者是自己或租约已过期才更新），SQLite 与 PostgreSQL 通用
+- 当选时调用 on_elected 启动调度器；续约失败（已被接管）时调用 on_demoted 停止调度器
+- 正常退出时释放租约，其它 worker 不必等 TTL 过期
+"""
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Set
+
+from database.db_factory import DatabaseFactory
+from utils.logger import get_logger
+
+logger = get_logger()
+
+SCHEDULER_LEASE_NAME = "schedulers"
+SCHEDULER_LEASE_TTL_SEC = float(os.getenv("SCHEDULER_LEASE_TTL_SEC", "30"))
+SCHEDULER_HEARTBEAT_SEC = float(os.getenv("SCHEDULER_HEARTBEAT_SEC", "10"))
+
+
+class SchedulerLeader:
+    """一个租约名对应一个 leader；holder_id = 主机名:pid:随机后缀"""
+
+    def __init__(
+        self,
+        name: str = SCHEDULER_LEASE_NAME,
+        *,
+        ttl_sec: Optional[float] = None,
+        heartbeat_sec: Optional[float] = None,
+        holder_id: Optional[str] = None,
+    ):
+        self.name = name
+        self.ttl_sec = SCHEDULER_LEASE_TTL_SEC if ttl_sec is None else ttl_sec
+        self.heartbeat_sec = SCHEDULER_HEARTBEAT_SEC if heartbeat_sec is None else heartbeat_sec
+        self.holder_id = holder_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._is_leader = False
+        self._expires_at = 0.0
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._on_elected: Optional[Callable[[], None]] = None
+        self._on_demoted: Optional[Callable[[], None]] = None
+
+    def is_leader(self) -> bool:
+        return self._is_leader
+
+    def try_acquire(self, now: Optional[float] = None) -> bool:
+        """抢占或续约租约，返回本进程当前是否持有"""
+        now = time.time() if now is None else now
+        expires_at = now + self.ttl_sec
+        try:
+            with DatabaseFactory.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    INSERT INTO scheduler_leases (name, holder_id, acquired_at, expires_at, heartbeat_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET
+                        acquired_at = CASE
+                            WHEN scheduler_leases.holder_id = excluded.holder_id
+                            THEN scheduler_leases.acquired_at
+                            ELSE excluded.acquired_at
+                        END,
+                        holder_id = excluded.holder_id,
+                        expires_at = excluded.expires_at,
+                        heartbeat_at = excluded.heartbeat_at
+                    WHERE scheduler_leases.holder_id = excluded.holder_id
+                       OR scheduler_leases.expires_at <= ?
+                    """,
+                    (self.name, self.holder_id, now, expires_at, now, now),
+                )
+                held = cursor.rowcount > 0
+                conn.commit()
+        except Exception as exc:
+            # 数据库暂时不可用：上次续约的租约未过期前仍视为持有，过期后其它 worker 已可接管
+            logger.warning(f"[SchedulerLeader] Lease heartbeat failed: {exc}")
+            with self._lock:
+                self._is_leader = self._is_leader and now < self._expires_at
+                return self._is_leader
+
+        with self._lock:
+            self._is_leader = held
+            if held:
+                self._expires_at = expires_at
+        return held
+
+    def release(self) -> None:
+        """释放本进程持有的租约（未持有时无操作）"""
+        with self._lock:
+            self._is_leader = False
+            self._expires_at = 0.0
+        try:
+            with DatabaseFactory.get_connection() as conn:
+                conn.cursor().execute(
+                    "DELETE FROM scheduler_leases WHERE name = ? AND holder_id = ?",
+                    (self.name, self.holder_id),
+                )
+                conn.commit()
+        except Exception as exc:
+            logger.warning(f"[SchedulerLeader] Lease release failed: {exc}")
+
+    def current(self) -> Optional[Dict[str, Any]]:
+        """当前租约行（可能已过期）"""
+        row = DatabaseFactory.fetchone(
+            "SELECT name, holder_id, acquired_at, expires_at, heartbeat_at FROM scheduler_leases WHERE name = ?",
+            (self.name,),
+        )
+        return dict(row) if row else None
+
+    def status(self) -> Dict[str, Any]:
+        """/api/health 用：本进程是否 leader 与当前持有者"""
+        lease = self.current()
+        return {
+            "holder_id": self.holder_id,
+            "is_leader": self._is_leader,
+            "leader": lease["holder_id"] if lease and lease["expires_at"] > time.time() else None,
+        }
+
+    def heartbeat(self, now: Optional[float] = None) -> bool:
+        """续约一次，并在身份变化时触发 on_elected / on_demoted"""
+        was_leader = self._is_leader
+        held = self.try_acquire(now)
+        if held and not was_leader:
+            logger.info(f"[SchedulerLeader] {self.holder_id} elected, starting schedulers")
+            self._invoke(self._on_elected)
+        elif was_leader and not held:
+            logger.warning(f"[SchedulerLeader] {self.holder_id} lost the lease, stopping schedulers")
+            self._invoke(self._on_demoted)
+        return held
+
+    @staticmethod
+    def _invoke(callback: Optional[Callable[[], None]]) -> None:
+        if callback is None:
+            return
+        try:
+            callback()
+        except Exception as exc:
+            logger.error(f"[SchedulerLeader] Callback failed: {exc}")
+
+    def start(
+        self,
+        on_elected: Callable[[], None],
+        on_demoted: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """
+        先同步抢一次租约（单 worker 部署启动即当选），再起心跳线程
+
+        Returns:
+            本进程是否在启动时当选
+        """
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        elected = self.heartbeat()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="scheduler-leader", daemon=True)
+            self._thread.start()
+        if not elected:
+            logger.info(f"[SchedulerLeader] {self.holder_id} standing by, schedulers run in another worker")
+        return elected
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.heartbeat_sec):
+            self.heartbeat()
+
+    def stop(self) -> None:
+        """停止心跳并释放租约（进程退出时调用）"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.heartbeat_sec, 1.0))
+            self._thread = None
+        if self._is_leader:
+            self.release()
+
+
+class TimerChain:
+    """
+    APScheduler 不可用时调度器的 threading.Timer 回退链
+
+    每条链 schedule(首次延迟, 间隔, 任务) 后自行续排；cancel() 取消所有待触发的定时器，
+    并作废正在执行的任务之后的续排。卸任后很快又当选时 start() 新开的链不会和旧链叠加。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers: Set[threading.Timer] = set()
+        self._generation = 0
+
+    def schedule(self, first_delay: float, interval: float, job: Callable[[], None]) -> None:
+        with self._lock:
+            generation = self._generation
+        self._arm(first_delay, interval, job, generation)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._generation += 1
+            timers, self._timers = self._timers, set()
+        for timer in timers:
+            timer.cancel()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._timers)
+
+    def _arm(self, delay: float, interval: float, job: Callable[[], None], generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            timer = threading.Timer(delay, self._fire, args=(interval, job, generation))
+            timer.daemon = True
+            self._timers.add(timer)
+            timer.start()
+
+    def _fire(self, interval: float, job: Callable[[], None], generation: int) -> None:
+        with self._lock:
+            self._timers.discard(threading.current_thread())
+            if generation != self._generation:
+                return
+        job()
+        self._arm(interval, interval, job, generation)
+
+
+# Singleton instance
+scheduler_leader = SchedulerLeader()
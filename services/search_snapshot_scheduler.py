@@ -1,6 +1,6 @@
 """Daily refresh for A-share search snapshot (keeps newly listed names searchable)."""
-import threading
 
+from services.scheduler_leader import TimerChain
 from utils.logger import get_logger
 
 logger = get_logger()
@@ -10,6 +10,7 @@ class SearchSnapshotScheduler:
     _instance = None
     _scheduler = None
     _running = False
+    _timers = TimerChain()
 
     def __new__(cls):
         if cls._instance is None:
@@ -55,18 +56,19 @@ class SearchSnapshotScheduler:
 
     @classmethod
     def _start_simple_timer(cls):
-        def run_and_reschedule():
-            cls._run_refresh_job()
-            timer = threading.Timer(24 * 3600, run_and_reschedule)
-            timer.daemon = True
-            timer.start()
-
-        timer = threading.Timer(600, run_and_reschedule)
-        timer.daemon = True
-        timer.start()
+        cls._timers.schedule(600, 24 * 3600, cls._run_refresh_job)
         cls._running = True
         logger.info("[SearchSnapshotScheduler] Started (simple timer)")
 
+    @classmethod
+    def stop(cls):
+        if cls._scheduler:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+        cls._timers.cancel()
+        cls._running = False
+        logger.info("[SearchSnapshotScheduler] Stopped")
+
     @classmethod
     def _run_refresh_job(cls):
         from services.job_health_tracker import job_health_tracker
@@ -74,9 +76,11 @@ class SearchSnapshotScheduler:
         job_id = "search_snapshot_scheduler"
         try:
             from services.search_snapshot_service import SearchSnapshotService
+            from services.tushare.rate_limiter import BATCH, tushare_priority
 
             logger.info("[SearchSnapshotScheduler] Refreshing A-share search snapshot...")
-            count = SearchSnapshotService().refresh_a_share_snapshot()
+            with tushare_priority(BATCH):
+                count = SearchSnapshotService().refresh_a_share_snapshot()
             logger.info(f"[SearchSnapshotScheduler] Snapshot rows={count}")
             job_health_tracker.record_success(job_id)
         except Exception as exc:
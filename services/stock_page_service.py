@@ -1,10 +1,12 @@
 import html
 import json
+import threading
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import quote
 
+from database.async_db import run_db
 from services.archive_service import ArchiveService
 from services.watchlist.service import WatchlistService
 
@@ -16,6 +18,53 @@ class StockPageInfo:
     market: str
 
 
+class _AShareIndex:
+    """
+    A 股快照解析结果：按代码排序的清单 + 代码索引
+
+    以快照文件 (path, mtime) 为 key，快照刷新后自动失效。/stocks 每页只是对缓存清单切片，
+    /stock/{code} 查名称是一次 dict 查找，不再每次请求重新解析整份 JSON。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple[str, float]] = None
+        self._stocks: List[StockPageInfo] = []
+        self._by_code: Dict[str, StockPageInfo] = {}
+
+    @staticmethod
+    def snapshot_key(snapshot_service: Any) -> Optional[Tuple[str, float]]:
+        try:
+            path = snapshot_service._snapshot_path("A")
+            return (str(path), path.stat().st_mtime)
+        except Exception:
+            return None
+
+    def get(self, key: Optional[Tuple[str, float]]) -> Optional[List[StockPageInfo]]:
+        with self._lock:
+            if key is not None and key == self._key:
+                return self._stocks
+        return None
+
+    def lookup(self, key: Optional[Tuple[str, float]], code: str) -> Tuple[bool, Optional[StockPageInfo]]:
+        """(命中缓存, 股票)；命中但不在清单里时返回 (True, None)，调用方无需再解析快照"""
+        with self._lock:
+            if key is not None and key == self._key:
+                return True, self._by_code.get(code)
+        return False, None
+
+    def store(self, key: Optional[Tuple[str, float]], stocks: List[StockPageInfo]) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._key = key
+            self._stocks = stocks
+            self._by_code = {stock.code: stock for stock in stocks}
+
+
+_a_share_index = _AShareIndex()
+
+
 class StockPageService:
     """Generate crawlable stock landing pages for SEO/GEO entry traffic."""
 
@@ -166,10 +215,14 @@ class StockPageService:
             from services.search_snapshot_service import SearchSnapshotService
 
             snapshot_service = SearchSnapshotService()
+            cached = _a_share_index.get(_a_share_index.snapshot_key(snapshot_service))
+            if cached is not None:
+                return list(cached)
             if ensure_full:
                 snapshot_service.ensure_a_share_snapshot()
             rows = snapshot_service._load_snapshot("A")
-            if len(rows) < 100:
+            from_snapshot = len(rows) >= 100
+            if not from_snapshot:
                 rows = self._fetch_a_share_rows_live()
             stocks = []
             seen = set()
@@ -181,6 +234,10 @@ class StockPageService:
                 seen.add(code)
                 stocks.append(StockPageInfo(code=code, name=name, market="A"))
             stocks.sort(key=lambda item: item.code)
+            if from_snapshot:
+                # 只缓存快照结果；实时兜底拉取的清单不落缓存，下次仍会重试快照
+                _a_share_index.store(_a_share_index.snapshot_key(snapshot_service), stocks)
+                return list(stocks)
             return stocks
         except Exception:
             return self._list_a_share_stocks_from_provider()
@@ -217,6 +274,9 @@ class StockPageService:
             from services.search_snapshot_service import SearchSnapshotService
 
             snapshot_service = SearchSnapshotService()
+            hit, cached = _a_share_index.lookup(_a_share_index.snapshot_key(snapshot_service), stock_code)
+            if hit:
+                return cached
             snapshot_service.ensure_a_share_snapshot()
             rows = snapshot_service._load_snapshot("A")
             for row in rows:
@@ -252,7 +312,7 @@ class StockPageService:
 
         data_source = resolve_data_source(stock.market)
         data_provenance_label = f"页面更新 {updated_at} · 行情来源：{data_source}"
-        accuracy_stats = JudgmentAccuracyService().get_public_accuracy_stats(window_days=90)
+        accuracy_stats = await run_db(JudgmentAccuracyService().get_public_accuracy_stats, window_days=90)
         accuracy_line = ""
         if (
             accuracy_stats.get("reviewed_count", 0) > 0
@@ -623,7 +683,9 @@ class StockPageService:
 
     async def _get_recent_articles(self, stock: StockPageInfo) -> List[Dict[str, Any]]:
         try:
-            articles = await self.archive_service.get_articles(limit=5, offset=0, keyword=stock.code)
+            articles = await self.archive_service.get_articles(
+                limit=5, offset=0, keyword=stock.code, with_ai_score=True
+            )
             return [dict(article) for article in articles if article]
         except Exception:
             return []
@@ -1,30 +1,86 @@
 """
 Tushare Cache Layer
-Memory-based caching with TTL for Tushare API responses
+Memory-based LRU cache with TTL for Tushare API responses, backed by a persistent disk tier
 """
 import hashlib
 import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Callable, Dict, Any, Optional, Tuple
 from threading import Lock
+from services.tushare.disk_cache import tushare_disk_cache
+from services.tushare.rate_limiter import BATCH, tushare_priority
 from utils.logger import get_logger
 
 logger = get_logger()
 
 
+class _Entry:
+    __slots__ = ('data', 'expires_at', 'size', 'module')
+
+    def __init__(self, data: Any, expires_at: datetime, size: int, module: str):
+        self.data = data
+        self.expires_at = expires_at
+        self.size = size
+        self.module = module
+
+
+def _estimate_size(data: Any) -> int:
+    """近似估算缓存值占用字节数（DataFrame 用 deep memory_usage，其余按序列化长度）"""
+    try:
+        memory_usage = getattr(data, 'memory_usage', None)
+        if callable(memory_usage):
+            return int(memory_usage(deep=True).sum())
+        model_dump_json = getattr(data, 'model_dump_json', None)
+        if callable(model_dump_json):
+            return len(model_dump_json())
+        return len(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 1024
+
+
+def _empty_counters() -> Dict[str, int]:
+    return {
+        'hits': 0, 'l2_hits': 0, 'stale_hits': 0, 'misses': 0, 'sets': 0,
+        'evictions': 0, 'expirations': 0, 'refreshes': 0, 'refresh_failures': 0,
+    }
+
+
 class TushareCache:
     """
     Tushare 请求缓存层
-    
+
     Key 格式: tsr:{module}:{ts_code}:{asof}:{params_hash}
-    
+
     TTL 配置:
-    - relative_strength / industry: 900s (盘中) 
+    - relative_strength / industry: 900s (盘中)
     - capital_flow: 300s
     - events: 86400s
     - stock_basic / index_weight: 604800s
+
+    容量与回收:
+    - LRU，按条目数（TUSHARE_CACHE_MAX_ENTRIES）与近似字节数（TUSHARE_CACHE_MAX_BYTES）双重上限
+    - 后台清扫线程每 SWEEP_INTERVAL_SEC 秒移除过期条目；
+      key 含 asof，跨日后旧 key 不会再被读到，必须靠清扫回收
+    - 按模块统计 hit/miss/set/eviction/expiration，用于根据真实命中率调 TTL
+
+    持久化（L2）:
+    - 写入同时落盘到 TushareDiskCache（独立 SQLite，多 worker 共享、重启不丢）
+    - 内存未命中时回查磁盘，命中后按剩余 TTL 回填内存（计为 l2_hits）
+    - TUSHARE_DISK_CACHE=false 可关闭
+
+    Stale-while-revalidate:
+    - 过期条目保留至 expires_at + STALE_MAX_SEC（TUSHARE_CACHE_STALE_MAX，0 关闭）
+    - get() 只返回新鲜数据；get_stale() 取已过期但未超硬上限的旧值，
+      调用方先返回旧值，再用 schedule_refresh() 后台重建（同一 key 同时只有一个刷新）
+    - 超过硬上限的条目被清扫，调用方同步等待上游
     """
-    
+
     # TTL 配置 (秒)
     TTL_CONFIG = {
         'relative_strength': 900,
@@ -37,21 +93,33 @@ class TushareCache:
         'index_weight': 604800,
         'default': 900
     }
-    
+
+    MAX_ENTRIES = int(os.getenv('TUSHARE_CACHE_MAX_ENTRIES', '5000'))
+    MAX_BYTES = int(os.getenv('TUSHARE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    SWEEP_INTERVAL_SEC = int(os.getenv('TUSHARE_CACHE_SWEEP_INTERVAL', '60'))
+    STALE_MAX_SEC = int(os.getenv('TUSHARE_CACHE_STALE_MAX', '3600'))
+    REFRESH_WORKERS = int(os.getenv('TUSHARE_CACHE_REFRESH_WORKERS', '4'))
+
     _instance: Optional['TushareCache'] = None
-    _cache: Dict[str, Tuple[Any, datetime]] = {}
+    _cache: 'OrderedDict[str, _Entry]' = OrderedDict()
+    _bytes: int = 0
+    _counters: Dict[str, Dict[str, int]] = {}
     _lock: Lock = Lock()
-    
+    _sweeper: Optional[threading.Thread] = None
+    _disk = tushare_disk_cache
+    _refreshing: set = set()
+    _refresh_executor: Optional[ThreadPoolExecutor] = None
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
-    
+
     @classmethod
     def _make_key(cls, module: str, ts_code: str, asof: str, params: Dict = None) -> str:
         """
         生成缓存键
-        
+
         Args:
             module: 模块名称
             ts_code: 股票代码
@@ -62,41 +130,155 @@ class TushareCache:
         if params:
             params_str = json.dumps(params, sort_keys=True)
             params_hash = hashlib.md5(params_str.encode()).hexdigest()[:8]
-        
+
         return f"tsr:{module}:{ts_code}:{asof}:{params_hash}"
-    
+
+    @classmethod
+    def _count(cls, module: str, counter: str, n: int = 1) -> None:
+        """调用方需持有 _lock"""
+        counters = cls._counters.get(module)
+        if counters is None:
+            counters = cls._counters[module] = _empty_counters()
+        counters[counter] += n
+
+    @classmethod
+    def _is_dead(cls, entry: _Entry, now: datetime) -> bool:
+        """已超过 stale 硬上限"""
+        return now >= entry.expires_at + timedelta(seconds=cls.STALE_MAX_SEC)
+
+    @classmethod
+    def _remove(cls, key: str) -> _Entry:
+        """调用方需持有 _lock"""
+        entry = cls._cache.pop(key)
+        cls._bytes -= entry.size
+        return entry
+
     @classmethod
     def get(cls, module: str, ts_code: str, asof: str = None, params: Dict = None) -> Tuple[bool, Any]:
         """
         从缓存获取数据
-        
+
         Returns:
             (hit, data): hit=True 表示缓存命中
         """
         if asof is None:
             asof = datetime.now().strftime('%Y%m%d')
-        
+
         key = cls._make_key(module, ts_code, asof, params)
-        
+
         with cls._lock:
-            if key in cls._cache:
-                data, expires_at = cls._cache[key]
-                if datetime.now() < expires_at:
+            entry = cls._cache.get(key)
+            if entry is not None:
+                now = datetime.now()
+                if now < entry.expires_at:
+                    cls._cache.move_to_end(key)
+                    cls._count(module, 'hits')
                     logger.debug(f"[TushareCache] HIT: {key}")
-                    return True, data
-                else:
-                    # Expired, remove
-                    del cls._cache[key]
+                    return True, entry.data
+                elif cls._is_dead(entry, now):
+                    cls._remove(key)
+                    cls._count(module, 'expirations')
                     logger.debug(f"[TushareCache] EXPIRED: {key}")
-        
+
+        hit, data, expires_ts = cls._disk.get(key)
+        with cls._lock:
+            if hit:
+                cls._store(key, _Entry(data, datetime.fromtimestamp(expires_ts), _estimate_size(data), module))
+                cls._count(module, 'l2_hits')
+                logger.debug(f"[TushareCache] L2 HIT: {key}")
+                return True, data
+            cls._count(module, 'misses')
+
         logger.debug(f"[TushareCache] MISS: {key}")
         return False, None
-    
+
+    @classmethod
+    def get_stale(cls, module: str, ts_code: str, asof: str = None, params: Dict = None) -> Tuple[bool, Any]:
+        """
+        取已过期但未超过 STALE_MAX_SEC 的旧值（新鲜或不存在时返回未命中）
+
+        Returns:
+            (hit, data): hit=True 表示拿到了可先行返回的旧值
+        """
+        if cls.STALE_MAX_SEC <= 0:
+            return False, None
+        if asof is None:
+            asof = datetime.now().strftime('%Y%m%d')
+
+        key = cls._make_key(module, ts_code, asof, params)
+        now = datetime.now()
+
+        with cls._lock:
+            entry = cls._cache.get(key)
+            if entry is not None:
+                if now < entry.expires_at or cls._is_dead(entry, now):
+                    return False, None
+                cls._cache.move_to_end(key)
+                cls._count(module, 'stale_hits')
+                logger.debug(f"[TushareCache] STALE: {key}")
+                return True, entry.data
+
+        hit, data, expires_ts = cls._disk.get(key, stale_sec=cls.STALE_MAX_SEC)
+        if not hit or expires_ts > now.timestamp():
+            return False, None
+        with cls._lock:
+            cls._store(key, _Entry(data, datetime.fromtimestamp(expires_ts), _estimate_size(data), module))
+            cls._count(module, 'stale_hits')
+        logger.debug(f"[TushareCache] L2 STALE: {key}")
+        return True, data
+
+    @classmethod
+    def schedule_refresh(
+        cls,
+        module: str,
+        ts_code: str,
+        refresh_fn: Callable[[], Any],
+        asof: str = None,
+        params: Dict = None,
+    ) -> bool:
+        """
+        后台重建一个 key；refresh_fn 负责重新取数并写回缓存（如 enhancer.enhance）
+
+        Returns:
+            False 表示该 key 已有刷新在进行
+        """
+        if asof is None:
+            asof = datetime.now().strftime('%Y%m%d')
+        key = cls._make_key(module, ts_code, asof, params)
+
+        with cls._lock:
+            if key in cls._refreshing:
+                return False
+            cls._refreshing.add(key)
+            if cls._refresh_executor is None:
+                cls._refresh_executor = ThreadPoolExecutor(
+                    max_workers=cls.REFRESH_WORKERS,
+                    thread_name_prefix="tushare-cache-refresh",
+                )
+            executor = cls._refresh_executor
+
+        def _run():
+            try:
+                with tushare_priority(BATCH):
+                    refresh_fn()
+                with cls._lock:
+                    cls._count(module, 'refreshes')
+            except Exception as e:
+                with cls._lock:
+                    cls._count(module, 'refresh_failures')
+                logger.warning(f"[TushareCache] Background refresh failed for {key}: {e}")
+            finally:
+                with cls._lock:
+                    cls._refreshing.discard(key)
+
+        executor.submit(_run)
+        return True
+
     @classmethod
     def set(cls, module: str, ts_code: str, data: Any, asof: str = None, params: Dict = None, ttl: int = None):
         """
         写入缓存
-        
+
         Args:
             module: 模块名称
             ts_code: 股票代码
@@ -107,61 +289,159 @@ class TushareCache:
         """
         if asof is None:
             asof = datetime.now().strftime('%Y%m%d')
-        
+
         if ttl is None:
             ttl = cls.TTL_CONFIG.get(module, cls.TTL_CONFIG['default'])
-        
+
         key = cls._make_key(module, ts_code, asof, params)
         expires_at = datetime.now() + timedelta(seconds=ttl)
-        
+        size = _estimate_size(data)
+
+        if size > cls.MAX_BYTES:
+            logger.warning(f"[TushareCache] SKIP oversized entry: {key} ({size} bytes)")
+            return
+
         with cls._lock:
-            cls._cache[key] = (data, expires_at)
+            cls._store(key, _Entry(data, expires_at, size, module))
+            cls._count(module, 'sets')
             logger.debug(f"[TushareCache] SET: {key}, TTL={ttl}s")
-    
+
+        cls._disk.set(key, module, data, expires_at.timestamp())
+        cls._ensure_sweeper()
+
+    @classmethod
+    def _store(cls, key: str, entry: _Entry) -> None:
+        """写入内存层并按容量淘汰；调用方需持有 _lock"""
+        if entry.size > cls.MAX_BYTES:
+            return
+        if key in cls._cache:
+            cls._remove(key)
+        cls._cache[key] = entry
+        cls._bytes += entry.size
+        cls._evict_over_capacity()
+
+    @classmethod
+    def _evict_over_capacity(cls) -> None:
+        """按 LRU 顺序淘汰直至满足条目数与字节数上限；调用方需持有 _lock"""
+        while cls._cache and (len(cls._cache) > cls.MAX_ENTRIES or cls._bytes > cls.MAX_BYTES):
+            key = next(iter(cls._cache))
+            entry = cls._remove(key)
+            cls._count(entry.module, 'evictions')
+            logger.debug(f"[TushareCache] EVICT: {key}")
+
+    @classmethod
+    def sweep_expired(cls) -> int:
+        """移除超过 stale 硬上限的条目，返回移除数量"""
+        now = datetime.now()
+        with cls._lock:
+            expired_keys = [key for key, entry in cls._cache.items() if cls._is_dead(entry, now)]
+            for key in expired_keys:
+                entry = cls._remove(key)
+                cls._count(entry.module, 'expirations')
+        if expired_keys:
+            logger.debug(f"[TushareCache] Swept {len(expired_keys)} expired entries")
+        cls._disk.purge_expired(stale_sec=cls.STALE_MAX_SEC)
+        return len(expired_keys)
+
+    @classmethod
+    def _ensure_sweeper(cls) -> None:
+        if cls._sweeper is not None and cls._sweeper.is_alive():
+            return
+        with cls._lock:
+            if cls._sweeper is not None and cls._sweeper.is_alive():
+                return
+
+            def _loop():
+                while True:
+                    time.sleep(cls.SWEEP_INTERVAL_SEC)
+                    try:
+                        cls.sweep_expired()
+                    except Exception as e:
+                        logger.warning(f"[TushareCache] Sweep failed: {e}")
+
+            cls._sweeper = threading.Thread(target=_loop, name="tushare-cache-sweeper", daemon=True)
+            cls._sweeper.start()
+
     @classmethod
     def invalidate(cls, module: str = None, ts_code: str = None):
         """
         清除缓存
-        
+
         Args:
             module: 如果指定，只清除该模块的缓存
             ts_code: 如果指定，只清除该股票的缓存
         """
+        cls._disk.invalidate(module=module, ts_code=ts_code)
+
         with cls._lock:
             if module is None and ts_code is None:
                 cls._cache.clear()
+                cls._bytes = 0
                 logger.info("[TushareCache] All cache cleared")
                 return
-            
+
             keys_to_remove = []
             for key in cls._cache:
                 parts = key.split(':')
                 if len(parts) >= 3:
                     cache_module = parts[1]
                     cache_ts_code = parts[2]
-                    
+
                     if module and module != cache_module:
                         continue
                     if ts_code and ts_code != cache_ts_code:
                         continue
                     keys_to_remove.append(key)
-            
+
             for key in keys_to_remove:
-                del cls._cache[key]
-            
+                cls._remove(key)
+
             logger.info(f"[TushareCache] Cleared {len(keys_to_remove)} entries")
-    
+
     @classmethod
-    def stats(cls) -> Dict[str, int]:
-        """获取缓存统计"""
+    def reset_stats(cls) -> None:
+        """清零命中统计（不影响缓存内容）"""
+        with cls._lock:
+            cls._counters = {}
+
+    @classmethod
+    def stats(cls) -> Dict[str, Any]:
+        """获取缓存统计（总量 + 按模块命中率）"""
+        now = datetime.now()
         with cls._lock:
             total = len(cls._cache)
-            expired = sum(1 for _, (_, exp) in cls._cache.items() if datetime.now() >= exp)
-            return {
-                'total': total,
-                'active': total - expired,
-                'expired': expired
+            expired = 0
+            per_module: Dict[str, Dict[str, Any]] = {
+                module: dict(counters) for module, counters in cls._counters.items()
             }
+            for entry in cls._cache.values():
+                module_stats = per_module.setdefault(entry.module, _empty_counters())
+                module_stats['entries'] = module_stats.get('entries', 0) + 1
+                module_stats['bytes'] = module_stats.get('bytes', 0) + entry.size
+                if now >= entry.expires_at:
+                    expired += 1
+            total_bytes = cls._bytes
+
+        for module, module_stats in per_module.items():
+            module_stats.setdefault('entries', 0)
+            module_stats.setdefault('bytes', 0)
+            hits = module_stats['hits'] + module_stats['l2_hits'] + module_stats['stale_hits']
+            lookups = hits + module_stats['misses']
+            module_stats['hit_rate'] = round(hits / lookups, 4) if lookups else None
+            module_stats['ttl_sec'] = cls.TTL_CONFIG.get(module, cls.TTL_CONFIG['default'])
+
+        return {
+            'total': total,
+            'active': total - expired,
+            'expired': expired,
+            'bytes': total_bytes,
+            'max_entries': cls.MAX_ENTRIES,
+            'max_bytes': cls.MAX_BYTES,
+            'stale_max_sec': cls.STALE_MAX_SEC,
+            'refreshing': len(cls._refreshing),
+            'modules': per_module,
+            'disk': cls._disk.stats(),
+        }
 
 
 # Singleton instance
@@ -3,9 +3,17 @@ Tushare Pro API Client
 Secure token handling via environment variables only
 """
 import os
+import threading
 import tushare as ts
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+from services.tushare.daily_series import daily_series_cache
+from services.tushare.rate_limiter import (
+    MAX_BATCH_ROWS,
+    _estimate_rows_per_code,
+    is_rate_limit_error,
+    tushare_request_scheduler,
+)
 from utils.logger import get_logger
 
 logger = get_logger()
@@ -18,12 +26,18 @@ class TushareClient:
     安全说明:
     - Token 仅从环境变量 TUSHARE_TOKEN 读取
     - 绝不在日志中输出完整 Token
+
+    限频:
+    - 每次调用先向 tushare_request_scheduler 取令牌（按接口限额 + 优先级）
+    - 单股票取数走 query_by_code，并发请求合并成逗号分隔 ts_code 的批量调用
     """
     
     _instance: Optional['TushareClient'] = None
     _pro: Optional[ts.pro_api] = None
     _initialized: bool = False
     _missing_token_warned: bool = False
+    _stock_basic_lock = threading.Lock()
+    _stock_basic_failed_at: float = 0.0
     
     def __new__(cls):
         if cls._instance is None:
@@ -90,6 +104,8 @@ class TushareClient:
         import time
         
         for attempt in range(retries):
+            if not tushare_request_scheduler.acquire(api_name):
+                return None
             try:
                 result = getattr(self.pro, api_name)(**kwargs)
                 logger.debug(f"[Tushare] Query '{api_name}' returned {len(result) if result is not None else 0} rows")
@@ -101,6 +117,12 @@ class TushareClient:
                 if 'permission' in error_msg.lower() or '权限' in error_msg:
                     logger.warning(f"[Tushare] Permission denied for '{api_name}': {error_msg}")
                     return None
+
+                # Upstream rate limit - drain the bucket and wait for the next token
+                if is_rate_limit_error(error_msg) and attempt < retries - 1:
+                    tushare_request_scheduler.penalize(api_name)
+                    logger.warning(f"[Tushare] Rate limited on '{api_name}', retry {attempt + 1}/{retries}: {error_msg}")
+                    continue
                 
                 # Network errors - retry with exponential backoff
                 is_network_error = any(x in error_msg.lower() for x in [
@@ -119,6 +141,22 @@ class TushareClient:
                 return None
         
         return None
+
+    def query_by_code(self, api_name: str, ts_code: str, **kwargs) -> Optional[Any]:
+        """
+        单股票查询；同一时间窗内参数相同的并发请求会合并为一次多代码调用
+
+        Args:
+            api_name: 支持多 ts_code 的接口（daily / daily_basic / moneyflow / adj_factor），
+                      其余接口直接透传
+            ts_code: 单个股票代码
+        """
+        return tushare_request_scheduler.fetch_by_code(
+            api_name,
+            ts_code,
+            lambda **params: self.query(api_name, **params),
+            **kwargs,
+        )
     
     def get_daily(self, ts_code: str, start_date: str = None, end_date: str = None, days: int = 60):
         """
@@ -127,6 +165,9 @@ class TushareClient:
         统一取数咽喉：当请求区间覆盖今天时，用新浪实时报价补/校当日 bar。
         tushare 日线收盘后常滞后数小时，观察列表/趋势/相对强弱等所有走
         这条路径的消费方会因此显示旧价（bug 现场：/watchlist 收盘后价格滞后）。
+
+        指定 start_date 时经 daily_series_cache 取数：趋势（400 天）、价格（10 天）、
+        相对强弱、资金流降级等窗口共用同一份序列；实时补丁只作用于返回的切片。
         
         Args:
             ts_code: 股票代码 (e.g., '600519.SH')
@@ -138,7 +179,16 @@ class TushareClient:
         if not end_date:
             end_date = datetime.now().strftime('%Y%m%d')
         
-        df = self.query('daily', ts_code=ts_code, start_date=start_date, end_date=end_date)
+        if start_date:
+            # 同一股票的各种窗口共用一份序列，只补缺失的前后缘
+            df = daily_series_cache.get_range(
+                ts_code,
+                start_date,
+                end_date,
+                lambda start, end: self.query_by_code('daily', ts_code, start_date=start, end_date=end),
+            )
+        else:
+            df = self.query_by_code('daily', ts_code, start_date=start_date, end_date=end_date)
         return self._maybe_patch_realtime(df, ts_code, requested_end)
     
     def get_index_daily(self, ts_code: str, start_date: str = None, end_date: str = None):
@@ -153,9 +203,44 @@ class TushareClient:
         if not end_date:
             end_date = datetime.now().strftime('%Y%m%d')
         
-        df = self.query('index_daily', ts_code=ts_code, start_date=start_date, end_date=end_date)
+        if start_date:
+            # 基准指数被所有标的的相对强弱共用，同样走序列缓存
+            df = daily_series_cache.get_range(
+                f"index:{ts_code}",
+                start_date,
+                end_date,
+                lambda start, end: self.query('index_daily', ts_code=ts_code, start_date=start, end_date=end),
+            )
+        else:
+            df = self.query('index_daily', ts_code=ts_code, start_date=start_date, end_date=end_date)
         return self._maybe_patch_realtime(df, ts_code, requested_end)
 
+    def prefetch_daily(self, ts_codes: List[str], start_date: str, end_date: str = None) -> int:
+        """
+        批量预热日线序列：尚未覆盖 [start_date, end_date] 的标的按单次行数上限分组，
+        每组一次逗号分隔 ts_code 的 daily 调用，之后逐只 get_daily() 纯切片。
+
+        Returns:
+            实际请求的标的数；某组请求失败时该组标的留给逐只 get_daily() 兜底
+        """
+        if not end_date:
+            end_date = datetime.now().strftime('%Y%m%d')
+
+        pending = [code for code in dict.fromkeys(ts_codes) if not daily_series_cache.covers(code, start_date, end_date)]
+        if not pending:
+            return 0
+
+        rows_per_code = _estimate_rows_per_code({'start_date': start_date, 'end_date': end_date}) or MAX_BATCH_ROWS
+        chunk_size = max(1, MAX_BATCH_ROWS // rows_per_code)
+        for i in range(0, len(pending), chunk_size):
+            chunk = pending[i:i + chunk_size]
+            df = self.query('daily', ts_code=','.join(chunk), start_date=start_date, end_date=end_date)
+            if df is None or 'ts_code' not in getattr(df, 'columns', ()):
+                continue
+            for code in chunk:
+                daily_series_cache.prime(code, start_date, end_date, df[df['ts_code'] == code])
+        return len(pending)
+
     @staticmethod
     def _maybe_patch_realtime(df, ts_code: str, requested_end: Optional[str]):
         """请求区间覆盖今天时才补当日 bar；历史回看（判卷等）保持原样。"""
@@ -180,15 +265,47 @@ class TushareClient:
         if not end_date:
             end_date = datetime.now().strftime('%Y%m%d')
         
-        return self.query('moneyflow', ts_code=ts_code, start_date=start_date, end_date=end_date)
+        return self.query_by_code('moneyflow', ts_code, start_date=start_date, end_date=end_date)
     
     def get_stock_basic(self, ts_code: str = None):
         """
         获取股票基础信息（含行业分类）
+
+        单只查询优先从全市场表（每日一次、TushareCache 缓存）过滤，
+        观察列表名称、行业模块、名称解析等逐只调用不再各自请求上游；
+        表中没有的代码（新股、ETF 等）再回退逐只查询。
         """
         if ts_code:
+            table = self._stock_basic_table()
+            if table is not None:
+                rows = table[table['ts_code'] == ts_code]
+                if not rows.empty:
+                    return rows.reset_index(drop=True)
             return self.query('stock_basic', ts_code=ts_code, fields='ts_code,name,industry,market,list_date')
         return self.query('stock_basic', fields='ts_code,name,industry,market,list_date')
+
+    def _stock_basic_table(self):
+        """全市场 stock_basic（同一时间只有一个线程拉取）"""
+        from services.tushare.cache import TushareCache
+
+        import time
+
+        hit, table = TushareCache.get('stock_basic', 'ALL')
+        if hit:
+            return table
+        self.ensure_initialized(log_missing_token=False)
+        if not self.is_available or time.time() - TushareClient._stock_basic_failed_at < 300:
+            return None
+        with TushareClient._stock_basic_lock:
+            hit, table = TushareCache.get('stock_basic', 'ALL')
+            if hit:
+                return table
+            table = self.query('stock_basic', fields='ts_code,name,industry,market,list_date')
+            if table is None or table.empty or not {'ts_code', 'name', 'industry'} <= set(table.columns):
+                TushareClient._stock_basic_failed_at = time.time()
+                return None
+            TushareCache.set('stock_basic', 'ALL', table, ttl=86400)
+            return table
     
     def get_daily_basic(self, ts_code: str, trade_date: str = None):
         """
@@ -197,7 +314,7 @@ class TushareClient:
         if not trade_date:
             trade_date = datetime.now().strftime('%Y%m%d')
         
-        return self.query('daily_basic', ts_code=ts_code, trade_date=trade_date)
+        return self.query_by_code('daily_basic', ts_code, trade_date=trade_date)
 
 
 # Singleton instance
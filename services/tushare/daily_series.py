@@ -0,0 +1,207 @@
+"""
+Daily Series Cache
+Per-symbol daily bar series that serves any window slice and only fetches missing edges
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+DATE_FMT = '%Y%m%d'
+
+Fetcher = Callable[[str, str], Optional[pd.DataFrame]]
+
+
+def _shift(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, DATE_FMT) + timedelta(days=days)).strftime(DATE_FMT)
+
+
+class _Series:
+    __slots__ = ('df', 'start', 'end', 'tail_fetched_at', 'lock')
+
+    def __init__(self):
+        self.df: Optional[pd.DataFrame] = None
+        self.start: Optional[str] = None
+        self.end: Optional[str] = None
+        self.tail_fetched_at: float = 0.0
+        self.lock = threading.Lock()
+
+
+class DailySeriesCache:
+    """
+    单股票日线序列缓存（未做实时补丁的原始 tushare daily 行）
+
+    - 每只股票只保留一份按 trade_date 升序的序列，记录已覆盖的自然日区间 [start, end]
+    - 请求窗口落在覆盖区间内直接切片；超出部分只补缺失的前缘 / 后缘
+    - 后缘覆盖到今天时按 TAIL_TTL_SEC 重新拉取最后一个覆盖日之后的数据（收盘后日线会补齐）
+    - 同一股票的并发请求串行化，避免重复拉取；按股票数 LRU 淘汰
+    - 批量场景可先用一次多代码请求 prime() 预热，之后逐只 get_range() 纯切片
+    - 返回与 tushare 一致的倒序 DataFrame 副本，调用方可随意修改
+    """
+
+    MAX_SYMBOLS = int(os.getenv('DAILY_SERIES_MAX_SYMBOLS', '1000'))
+    TAIL_TTL_SEC = int(os.getenv('DAILY_SERIES_TAIL_TTL', '900'))
+
+    def __init__(self):
+        self._series: 'OrderedDict[str, _Series]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'edge_fetches': 0, 'cold_fetches': 0, 'fetch_failures': 0, 'evictions': 0}
+
+    def _entry(self, ts_code: str) -> _Series:
+        with self._lock:
+            series = self._series.get(ts_code)
+            if series is None:
+                series = self._series[ts_code] = _Series()
+                while len(self._series) > self.MAX_SYMBOLS:
+                    self._series.popitem(last=False)
+                    self._stats['evictions'] += 1
+            else:
+                self._series.move_to_end(ts_code)
+            return series
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def get_range(self, ts_code: str, start_date: str, end_date: str, fetch: Fetcher) -> Optional[pd.DataFrame]:
+        """
+        取 [start_date, end_date] 的日线
+
+        Args:
+            ts_code: 股票代码
+            start_date: 开始日期 YYYYMMDD
+            end_date: 结束日期 YYYYMMDD
+            fetch: fetch(start, end) -> DataFrame | None，实际请求 tushare daily
+
+        Returns:
+            倒序 DataFrame；必需区间拉取失败时返回 None
+        """
+        today = datetime.now().strftime(DATE_FMT)
+        series = self._entry(ts_code)
+
+        with series.lock:
+            if series.df is None:
+                df = fetch(start_date, end_date)
+                if df is None:
+                    self._count('fetch_failures')
+                    return None
+                self._count('cold_fetches')
+                series.df = self._normalize(df)
+                series.start, series.end = start_date, end_date
+                series.tail_fetched_at = time.time()
+                return self._slice(series.df, start_date, end_date)
+
+            fetched = False
+            if start_date < series.start:
+                head = fetch(start_date, _shift(series.start, -1))
+                if head is None:
+                    self._count('fetch_failures')
+                    return None
+                self._merge(series, head)
+                series.start = start_date
+                fetched = True
+
+            tail_stale = end_date >= today and time.time() - series.tail_fetched_at > self.TAIL_TTL_SEC
+            if end_date > series.end or tail_stale:
+                # 从最后覆盖日起重拉：该日当时可能尚未出日线
+                tail = fetch(series.end, end_date)
+                if tail is None:
+                    self._count('fetch_failures')
+                    if end_date > series.end:
+                        return None
+                else:
+                    self._merge(series, tail)
+                    series.end = max(series.end, end_date)
+                    series.tail_fetched_at = time.time()
+                    fetched = True
+
+            self._count('edge_fetches' if fetched else 'hits')
+            return self._slice(series.df, start_date, end_date)
+
+    def covers(self, ts_code: str, start_date: str, end_date: str) -> bool:
+        """[start_date, end_date] 是否可直接切片返回（不需要任何上游请求）"""
+        today = datetime.now().strftime(DATE_FMT)
+        with self._lock:
+            series = self._series.get(ts_code)
+        if series is None:
+            return False
+        with series.lock:
+            if series.df is None or start_date < series.start or end_date > series.end:
+                return False
+            return end_date < today or time.time() - series.tail_fetched_at <= self.TAIL_TTL_SEC
+
+    def prime(self, ts_code: str, start_date: str, end_date: str, df: pd.DataFrame) -> None:
+        """
+        用批量请求拿到的 [start_date, end_date] 日线预热序列（如观察列表多代码 daily 调用）
+        与已有覆盖区间相交或相邻时合并，否则替换
+        """
+        series = self._entry(ts_code)
+        with series.lock:
+            adjacent = (
+                series.df is not None
+                and start_date <= _shift(series.end, 1)
+                and end_date >= _shift(series.start, -1)
+            )
+            if adjacent:
+                self._merge(series, df)
+                series.start = min(series.start, start_date)
+                if end_date >= series.end:
+                    series.tail_fetched_at = time.time()
+                series.end = max(series.end, end_date)
+            else:
+                series.df = self._normalize(df)
+                series.start, series.end = start_date, end_date
+                series.tail_fetched_at = time.time()
+
+    @staticmethod
+    def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+        if 'trade_date' not in df.columns:
+            return df.reset_index(drop=True)
+        out = df.copy()
+        out['trade_date'] = out['trade_date'].astype(str)
+        return out.drop_duplicates(subset='trade_date', keep='last').sort_values('trade_date').reset_index(drop=True)
+
+    def _merge(self, series: _Series, df: pd.DataFrame) -> None:
+        if df.empty:
+            return
+        if series.df is None or series.df.empty:
+            series.df = self._normalize(df)
+            return
+        series.df = self._normalize(pd.concat([series.df, df], ignore_index=True))
+
+    @staticmethod
+    def _slice(df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+        if df.empty or 'trade_date' not in df.columns:
+            return df.copy()
+        mask = (df['trade_date'] >= start_date) & (df['trade_date'] <= end_date)
+        return df[mask].sort_values('trade_date', ascending=False).reset_index(drop=True)
+
+    def invalidate(self, ts_code: str = None) -> None:
+        with self._lock:
+            if ts_code is None:
+                self._series.clear()
+            else:
+                self._series.pop(ts_code, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = sum(len(s.df) for s in self._series.values() if s.df is not None)
+            return {
+                'symbols': len(self._series),
+                'rows': rows,
+                'max_symbols': self.MAX_SYMBOLS,
+                'tail_ttl_sec': self.TAIL_TTL_SEC,
+                **self._stats,
+            }
+
+
+# Singleton instance
+daily_series_cache = DailySeriesCache()
@@ -0,0 +1,197 @@
+"""
+Tushare Disk Cache (L2)
+SQLite-backed persistent tier behind TushareCache, shared by all workers and surviving restarts
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from config.database import DatabaseConfig
+from utils.logger import get_logger
+
+logger = get_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tushare_cache (
+    cache_key TEXT PRIMARY KEY,
+    module TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tushare_cache_expires ON tushare_cache(expires_at);
+"""
+
+
+def _escape_like(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class TushareDiskCache:
+    """
+    Tushare 持久化缓存（L2）
+
+    - 独立 SQLite 文件（默认与主库同目录的 tushare_cache.db），WAL 模式，多进程可并发读
+    - 值以 pickle + zlib 存储，DataFrame / ModuleResult 均可直接序列化
+    - 与内存层相同的 TTL 语义：写入时记录绝对过期时间，读到过期条目视为未命中
+    - 所有异常只记日志并按未命中处理，磁盘层故障不影响主流程
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized_paths: set = set()
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv('TUSHARE_DISK_CACHE', 'true').lower() == 'true'
+
+    @staticmethod
+    def db_path() -> str:
+        override = os.getenv('TUSHARE_DISK_CACHE_PATH')
+        if override:
+            return override
+        db_dir = os.path.dirname(DatabaseConfig.db_path()) or '.'
+        return os.path.join(db_dir, 'tushare_cache.db')
+
+    def _connection(self) -> sqlite3.Connection:
+        path = self.db_path()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and getattr(self._local, 'path', None) == path:
+            return conn
+        if conn is not None:
+            conn.close()
+
+        db_dir = os.path.dirname(path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with self._init_lock:
+            if path not in self._initialized_paths:
+                conn.executescript(_SCHEMA)
+                conn.commit()
+                self._initialized_paths.add(path)
+        self._local.conn = conn
+        self._local.path = path
+        return conn
+
+    def get(self, key: str, stale_sec: float = 0) -> Tuple[bool, Any, Optional[float]]:
+        """
+        Args:
+            key: 缓存键
+            stale_sec: 允许返回过期不超过该秒数的条目（由调用方按 expires_at 判断新鲜度）
+
+        Returns:
+            (hit, data, expires_at_epoch)
+        """
+        if not self.enabled():
+            return False, None, None
+        try:
+            row = self._connection().execute(
+                "SELECT payload, expires_at FROM tushare_cache WHERE cache_key = ?",
+                (key,),
+            ).fetchone()
+            if not row:
+                return False, None, None
+            payload, expires_at = row
+            if expires_at <= time.time() - stale_sec:
+                return False, None, None
+            return True, pickle.loads(zlib.decompress(payload)), expires_at
+        except Exception as e:
+            logger.warning(f"[TushareDiskCache] get failed for {key}: {e}")
+            self.delete(key)
+            return False, None, None
+
+    def set(self, key: str, module: str, data: Any, expires_at: float) -> None:
+        if not self.enabled():
+            return
+        try:
+            payload = zlib.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            conn = self._connection()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO tushare_cache (cache_key, module, payload, expires_at, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, module, sqlite3.Binary(payload), expires_at, time.time()),
+            )
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"[TushareDiskCache] set failed for {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        if not self.enabled():
+            return
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM tushare_cache WHERE cache_key = ?", (key,))
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"[TushareDiskCache] delete failed for {key}: {e}")
+
+    def invalidate(self, module: str = None, ts_code: str = None) -> int:
+        """按模块 / 股票清除；均为空时清空全部"""
+        if not self.enabled():
+            return 0
+        module_pattern = _escape_like(module) if module else '%'
+        code_pattern = _escape_like(ts_code) if ts_code else '%'
+        try:
+            conn = self._connection()
+            cursor = conn.execute(
+                "DELETE FROM tushare_cache WHERE cache_key LIKE ? ESCAPE '\\'",
+                (f"tsr:{module_pattern}:{code_pattern}:%",),
+            )
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.warning(f"[TushareDiskCache] invalidate failed: {e}")
+            return 0
+
+    def purge_expired(self, stale_sec: float = 0) -> int:
+        """删除过期超过 stale_sec 秒的条目"""
+        if not self.enabled():
+            return 0
+        try:
+            conn = self._connection()
+            cursor = conn.execute(
+                "DELETE FROM tushare_cache WHERE expires_at <= ?", (time.time() - stale_sec,)
+            )
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.warning(f"[TushareDiskCache] purge failed: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled():
+            return {'enabled': False}
+        try:
+            path = self.db_path()
+            rows = self._connection().execute(
+                """
+                SELECT module, COUNT(*) AS entries, COALESCE(SUM(LENGTH(payload)), 0) AS bytes
+                FROM tushare_cache
+                WHERE expires_at > ?
+                GROUP BY module
+                """,
+                (time.time(),),
+            ).fetchall()
+            return {
+                'enabled': True,
+                'path': path,
+                'file_bytes': os.path.getsize(path) if os.path.exists(path) else 0,
+                'modules': {module: {'entries': entries, 'bytes': size} for module, entries, size in rows},
+            }
+        except Exception as e:
+            return {'enabled': True, 'error': str(e)}
+
+
+# Singleton instance
+tushare_disk_cache = TushareDiskCache()
@@ -79,7 +79,8 @@ class BaseEnhancer(ABC):
         """
         安全执行增强（带异常捕获）
         
-        这是对外暴露的主要方法，会捕获所有异常并返回降级结果
+        这是对外暴露的主要方法，会捕获所有异常并返回降级结果。
+        缓存已过期但未超过 stale 硬上限时先返回旧值，并在后台重算一次。
         """
         if asof is None:
             asof = datetime.now().strftime('%Y-%m-%d')
@@ -89,6 +90,18 @@ class BaseEnhancer(ABC):
             available, reason = self._check_available()
             if not available:
                 return ModuleResult.unavailable(reason)
+
+            # Stale-while-revalidate
+            cache_asof = asof.replace('-', '')
+            stale_hit, stale = self.cache.get_stale(self.MODULE_NAME, ts_code, cache_asof)
+            if stale_hit and stale:
+                self.cache.schedule_refresh(
+                    self.MODULE_NAME,
+                    ts_code,
+                    lambda: self.enhance(ts_code, asof),
+                    asof=cache_asof,
+                )
+                return stale
             
             # 执行增强
             return self.enhance(ts_code, asof)
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from typing import List, Optional
 
 from .base import BaseEnhancer
+from ..event_calendar import event_calendar, report_period_label
 from ..schemas import ModuleResult, KeyMetric, ModuleDetails, TableData
 from utils.logger import get_logger
 
@@ -21,9 +22,16 @@ class EventsEnhancer(BaseEnhancer):
     
     输出: event_count_30d, has_corporate_action, events_30d,
           days_to_disclosure（距最近财报披露日天数，无则为 None）
+
+    数据来自全市场事件日历（EventCalendar），热路径不逐只调用上游；
+    日历未就绪或日期不在覆盖窗口内时回退逐只查询。
     """
     
     MODULE_NAME = "events"
+
+    def __init__(self):
+        super().__init__()
+        self.calendar = event_calendar
     
     def enhance(self, ts_code: str, asof: str = None) -> ModuleResult:
         """获取近30日事件信息 + 财报披露日历"""
@@ -41,24 +49,16 @@ class EventsEnhancer(BaseEnhancer):
         events = []
         has_corporate_action = False
         
-        # 尝试获取分红送股信息
+        # 分红除权：优先读全市场事件日历，未覆盖时回退逐只查询
         try:
-            dividend_df = self.client.query('dividend', ts_code=ts_code)
-            if dividend_df is not None and len(dividend_df) > 0:
-                # 筛选近30日的分红
-                dividend_df['ex_date'] = dividend_df['ex_date'].astype(str)
-                recent_div = dividend_df[
-                    (dividend_df['ex_date'] >= start_date) & 
-                    (dividend_df['ex_date'] <= end_date)
-                ]
-                for _, row in recent_div.iterrows():
-                    events.append({
-                        'date': row['ex_date'],
-                        'type': '分红除权',
-                        'title': f"除权除息日",
-                        'impact_hint': '注意复权口径解读关键位'
-                    })
-                    has_corporate_action = True
+            for row in self._get_dividend_rows(ts_code, start_date, end_date):
+                events.append({
+                    'date': row['ex_date'],
+                    'type': '分红除权',
+                    'title': f"除权除息日",
+                    'impact_hint': '注意复权口径解读关键位'
+                })
+                has_corporate_action = True
         except Exception as e:
             logger.debug(f"[Events] Dividend query failed: {e}")
         
@@ -117,6 +117,47 @@ class EventsEnhancer(BaseEnhancer):
         self._set_cache(ts_code, result, asof.replace('-', ''))
         return result
 
+    def _get_dividend_rows(self, ts_code: str, start_date: str, end_date: str) -> List[dict]:
+        """区间内除权记录：日历命中零上游调用，未覆盖（冷启动/历史回看）时逐只查询"""
+        rows = self.calendar.dividends_for(ts_code, start_date, end_date)
+        if rows is not None:
+            return rows
+
+        self._request_calendar_refresh(end_date)
+        dividend_df = self.client.query('dividend', ts_code=ts_code)
+        if dividend_df is None or len(dividend_df) == 0:
+            return []
+        ex_dates = dividend_df['ex_date'].fillna('').astype(str)
+        return [
+            {'ex_date': d} for d in ex_dates
+            if d and start_date <= d <= end_date
+        ]
+
+    def _get_disclosure_rows(self, ts_code: str, end_date: str) -> List[dict]:
+        """财报披露计划：日历命中零上游调用，未覆盖时逐只查询"""
+        rows = self.calendar.disclosures_for(ts_code, end_date)
+        if rows is not None:
+            return rows
+
+        self._request_calendar_refresh(end_date)
+        df = self.client.query('disclosure_date', ts_code=ts_code)
+        if df is None or len(df) == 0:
+            return []
+        df = df.fillna('')
+        return [
+            {
+                'end_date': str(row['end_date']),
+                'pre_date': str(row['pre_date']),
+                'actual_date': str(row['actual_date']),
+            }
+            for _, row in df.iterrows()
+        ]
+
+    def _request_calendar_refresh(self, end_date: str) -> None:
+        """只为“今天”触发后台刷新；历史回看不应改写日历窗口"""
+        if end_date == datetime.now().strftime('%Y%m%d'):
+            self.calendar.refresh_in_background(end_date)
+
     def _fetch_disclosure_events(
         self, ts_code: str, *, start_date: str, end_date: str
     ) -> tuple:
@@ -131,25 +172,24 @@ class EventsEnhancer(BaseEnhancer):
         events: List[dict] = []
         days_to_disclosure: Optional[int] = None
 
-        df = self.client.query('disclosure_date', ts_code=ts_code)
-        if df is None or len(df) == 0:
+        rows = self._get_disclosure_rows(ts_code, end_date)
+        if not rows:
             return events, days_to_disclosure
 
-        df = df.fillna('')
         today = datetime.strptime(end_date, '%Y%m%d')
 
         # 未来预约披露：actual_date 为空且 pre_date >= today
-        pending = df[(df['actual_date'] == '') & (df['pre_date'] != '')]
-        future_dates = sorted(
-            d for d in pending['pre_date'].astype(str) if d >= end_date
+        pending = [r for r in rows if r['actual_date'] == '' and r['pre_date'] != '']
+        future = sorted(
+            (r for r in pending if r['pre_date'] >= end_date),
+            key=lambda r: r['pre_date'],
         )
-        if future_dates:
-            next_date = future_dates[0]
+        if future:
+            next_row = future[0]
+            next_date = next_row['pre_date']
             days_to_disclosure = (datetime.strptime(next_date, '%Y%m%d') - today).days
             if days_to_disclosure <= DISCLOSURE_ALERT_DAYS:
-                report_period = self._report_period_label(
-                    str(pending[pending['pre_date'] == next_date]['end_date'].iloc[0])
-                )
+                report_period = self._report_period_label(next_row['end_date'])
                 events.append({
                     'date': next_date,
                     'type': '财报披露',
@@ -158,15 +198,14 @@ class EventsEnhancer(BaseEnhancer):
                 })
 
         # 近30日已实际披露
-        disclosed = df[(df['actual_date'] != '')]
-        recent = disclosed[
-            (disclosed['actual_date'].astype(str) >= start_date)
-            & (disclosed['actual_date'].astype(str) <= end_date)
+        recent = [
+            r for r in rows
+            if r['actual_date'] != '' and start_date <= r['actual_date'] <= end_date
         ]
-        for _, row in recent.iterrows():
-            report_period = self._report_period_label(str(row['end_date']))
+        for row in recent:
+            report_period = self._report_period_label(row['end_date'])
             events.append({
-                'date': str(row['actual_date']),
+                'date': row['actual_date'],
                 'type': '财报披露',
                 'title': f"已披露{report_period}",
                 'impact_hint': '财报落地后注意结构是否被事件重新定价',
@@ -177,14 +216,4 @@ class EventsEnhancer(BaseEnhancer):
     @staticmethod
     def _report_period_label(end_date: str) -> str:
         """报告期转可读标签：20260630 -> 2026年中报"""
-        if len(end_date) != 8:
-            return "定期报告"
-        year, md = end_date[:4], end_date[4:]
-        period_map = {
-            '0331': '一季报',
-            '0630': '中报',
-            '0930': '三季报',
-            '1231': '年报',
-        }
-        label = period_map.get(md)
-        return f"{year}年{label}" if label else f"{year}年定期报告"
+        return report_period_label(end_date)
@@ -0,0 +1,363 @@
+"""
+Tushare Event Calendar
+全市场事件日历：按期批量拉取分红除权 / 财报披露计划，按 ts_code + 日期窗口索引
+
+EventsEnhancer 热路径只读本地日历，不再逐只调用 dividend / disclosure_date；
+观察列表“近期事件”查询也直接走内存索引，不产生 N 次上游请求。
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.tushare.rate_limiter import BATCH, tushare_priority
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# 分红按 ex_date 逐日拉取的覆盖窗口（天）
+DIVIDEND_LOOKBACK_DAYS = 30
+DIVIDEND_LOOKAHEAD_DAYS = 30
+
+# 日历超过该时长未刷新则视为不可用，热路径回退逐只查询
+STALE_AFTER_SEC = 2 * 86400
+
+# 后台刷新最小间隔（秒），避免上游持续失败时热路径反复触发全量拉取
+REFRESH_RETRY_SEC = 600
+
+# tushare 单次返回上限，超出需 offset 翻页
+PAGE_LIMIT = 3000
+
+_QUARTER_ENDS = ('0331', '0630', '0930', '1231')
+
+
+def report_period_label(end_date: str) -> str:
+    """报告期转可读标签：20260630 -> 2026年中报"""
+    if len(end_date) != 8:
+        return "定期报告"
+    year, md = end_date[:4], end_date[4:]
+    period_map = {
+        '0331': '一季报',
+        '0630': '中报',
+        '0930': '三季报',
+        '1231': '年报',
+    }
+    label = period_map.get(md)
+    return f"{year}年{label}" if label else f"{year}年定期报告"
+
+
+def relevant_periods(asof: str) -> List[str]:
+    """
+    与 asof 相关的报告期：最近 3 个已结束季度 + 下一个季度末
+
+    年报最晚 4 月底披露，因此回看 3 个季度即可覆盖近 30 日的实际披露；
+    下一个季度末用于提前拿到预约披露日（pre_date）。
+    """
+    year = int(asof[:4])
+    candidates = [
+        f"{y}{md}" for y in (year - 1, year, year + 1) for md in _QUARTER_ENDS
+    ]
+    past = [p for p in candidates if p <= asof][-3:]
+    future = [p for p in candidates if p > asof][:1]
+    return past + future
+
+
+def _clean(value: Any) -> str:
+    if value is None:
+        return ''
+    text = str(value).strip()
+    return '' if text.lower() in ('nan', 'none', 'nat') else text
+
+
+class EventCalendar:
+    """
+    全市场事件日历（进程内存）
+
+    索引结构:
+    - _dividends: ts_code -> 按 ex_date 升序的除权记录
+    - _disclosures: ts_code -> 该股各报告期的披露计划
+    - _dividend_window: 已覆盖的 ex_date 区间 (start, end)
+    - _periods: 已加载的报告期集合
+
+    查询接口在未覆盖请求区间时返回 None，调用方自行回退逐只查询。
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._dividends: Dict[str, List[Dict[str, str]]] = {}
+        self._dividend_dates: Dict[str, List[str]] = {}
+        self._dividend_window: Optional[Tuple[str, str]] = None
+        self._disclosures: Dict[str, List[Dict[str, str]]] = {}
+        self._periods: frozenset = frozenset()
+        self._refreshed_at: Optional[datetime] = None
+        self._last_attempt_at: Optional[datetime] = None
+
+    @property
+    def client(self):
+        if self._client is not None:
+            return self._client
+        from .client import tushare_client
+        return tushare_client
+
+    # ========== 刷新 ==========
+
+    def refresh(self, asof: str = None) -> Dict[str, int]:
+        """
+        批量拉取并重建索引（阻塞，供调度器 / 启动预热调用）
+
+        Args:
+            asof: 基准日期 YYYYMMDD，默认今天
+        """
+        if asof is None:
+            asof = datetime.now().strftime('%Y%m%d')
+        asof = asof.replace('-', '')
+
+        with self._refresh_lock:
+            self._last_attempt_at = datetime.now()
+            self.client.ensure_initialized(log_missing_token=False)
+            if not self.client.is_available:
+                logger.info("[EventCalendar] Refresh skipped - tushare not available")
+                return {'dividends': 0, 'disclosures': 0}
+
+            dividends, window = self._load_dividends(asof)
+            disclosures, periods = self._load_disclosures(asof)
+
+            with self._lock:
+                if window is not None:
+                    self._dividends = dividends
+                    self._dividend_dates = {
+                        code: [row['ex_date'] for row in rows]
+                        for code, rows in dividends.items()
+                    }
+                    self._dividend_window = window
+                if periods:
+                    self._disclosures = disclosures
+                    self._periods = frozenset(periods)
+                if window is not None or periods:
+                    self._refreshed_at = datetime.now()
+
+        stats = {
+            'dividends': sum(len(rows) for rows in dividends.values()),
+            'disclosures': sum(len(rows) for rows in disclosures.values()),
+        }
+        logger.info(
+            f"[EventCalendar] Refreshed as of {asof}: "
+            f"{stats['dividends']} dividend rows, {stats['disclosures']} disclosure rows"
+        )
+        return stats
+
+    def refresh_in_background(self, asof: str = None) -> bool:
+        """非阻塞刷新；已有刷新在进行时直接返回 False"""
+        if self._refresh_lock.locked():
+            return False
+        last_attempt = self._last_attempt_at
+        if last_attempt and (datetime.now() - last_attempt).total_seconds() < REFRESH_RETRY_SEC:
+            return False
+
+        def _run():
+            try:
+                with tushare_priority(BATCH):
+                    self.refresh(asof)
+            except Exception as e:
+                logger.warning(f"[EventCalendar] Background refresh failed: {e}")
+
+        threading.Thread(target=_run, name="event-calendar-refresh", daemon=True).start()
+        return True
+
+    def _query_all(self, api_name: str, **kwargs):
+        """按 PAGE_LIMIT 翻页拉取全量结果"""
+        import pandas as pd
+
+        frames = []
+        offset = 0
+        while True:
+            df = self.client.query(api_name, limit=PAGE_LIMIT, offset=offset, **kwargs)
+            if df is None:
+                return None if not frames else pd.concat(frames, ignore_index=True)
+            if len(df) > 0:
+                frames.append(df)
+            if len(df) < PAGE_LIMIT:
+                break
+            offset += PAGE_LIMIT
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def _load_dividends(self, asof: str):
+        """逐个 ex_date 拉取全市场除权记录；任一天失败则本次不更新分红索引"""
+        base = datetime.strptime(asof, '%Y%m%d')
+        start = base - timedelta(days=DIVIDEND_LOOKBACK_DAYS)
+        end = base + timedelta(days=DIVIDEND_LOOKAHEAD_DAYS)
+
+        by_code: Dict[str, Dict[str, Dict[str, str]]] = {}
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                ex_date = day.strftime('%Y%m%d')
+                df = self._query_all(
+                    'dividend', ex_date=ex_date,
+                    fields='ts_code,end_date,div_proc,ex_date,cash_div_tax,stk_div'
+                )
+                if df is None:
+                    logger.warning(f"[EventCalendar] dividend load failed at ex_date={ex_date}")
+                    return {}, None
+                for _, row in df.iterrows():
+                    code = _clean(row.get('ts_code'))
+                    row_ex_date = _clean(row.get('ex_date'))
+                    if not code or not row_ex_date:
+                        continue
+                    by_code.setdefault(code, {})[row_ex_date] = {
+                        'ex_date': row_ex_date,
+                        'end_date': _clean(row.get('end_date')),
+                        'div_proc': _clean(row.get('div_proc')),
+                    }
+            day += timedelta(days=1)
+
+        dividends = {
+            code: sorted(rows.values(), key=lambda r: r['ex_date'])
+            for code, rows in by_code.items()
+        }
+        return dividends, (start.strftime('%Y%m%d'), end.strftime('%Y%m%d'))
+
+    def _load_disclosures(self, asof: str):
+        """按报告期拉取全市场披露计划；失败的报告期不计入已覆盖集合"""
+        by_code: Dict[str, Dict[str, Dict[str, str]]] = {}
+        loaded_periods: List[str] = []
+        for period in relevant_periods(asof):
+            df = self._query_all('disclosure_date', end_date=period)
+            if df is None:
+                logger.warning(f"[EventCalendar] disclosure_date load failed for period={period}")
+                continue
+            loaded_periods.append(period)
+            for _, row in df.iterrows():
+                code = _clean(row.get('ts_code'))
+                if not code:
+                    continue
+                end_date = _clean(row.get('end_date')) or period
+                by_code.setdefault(code, {})[end_date] = {
+                    'end_date': end_date,
+                    'pre_date': _clean(row.get('pre_date')),
+                    'actual_date': _clean(row.get('actual_date')),
+                }
+
+        disclosures = {
+            code: sorted(rows.values(), key=lambda r: r['end_date'])
+            for code, rows in by_code.items()
+        }
+        return disclosures, loaded_periods
+
+    # ========== 查询 ==========
+
+    def _is_fresh(self) -> bool:
+        if self._refreshed_at is None:
+            return False
+        return (datetime.now() - self._refreshed_at).total_seconds() < STALE_AFTER_SEC
+
+    def dividends_for(self, ts_code: str, start_date: str, end_date: str) -> Optional[List[Dict[str, str]]]:
+        """
+        区间内除权记录
+
+        Returns:
+            记录列表；日历未覆盖该区间时返回 None
+        """
+        with self._lock:
+            window = self._dividend_window
+            if not self._is_fresh() or window is None:
+                return None
+            if start_date < window[0] or end_date > window[1]:
+                return None
+            rows = self._dividends.get(ts_code, [])
+            dates = self._dividend_dates.get(ts_code, [])
+            lo = bisect_left(dates, start_date)
+            hi = bisect_right(dates, end_date)
+            return [dict(row) for row in rows[lo:hi]]
+
+    def disclosures_for(self, ts_code: str, asof: str) -> Optional[List[Dict[str, str]]]:
+        """
+        该股在 asof 相关报告期的披露计划
+
+        Returns:
+            记录列表；日历未加载全部相关报告期时返回 None
+        """
+        needed = set(relevant_periods(asof))
+        with self._lock:
+            if not self._is_fresh() or not needed.issubset(self._periods):
+                return None
+            return [
+                dict(row) for row in self._disclosures.get(ts_code, [])
+                if row['end_date'] in needed
+            ]
+
+    def upcoming_events(
+        self,
+        ts_codes: Iterable[str],
+        days: int = 14,
+        asof: str = None,
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        批量查询未来 days 天内的除权 / 预约披露事件（观察列表用）
+
+        Returns:
+            {ts_code: [event, ...]}，仅包含有事件的标的；日历未就绪时返回 None
+        """
+        if asof is None:
+            asof = datetime.now().strftime('%Y%m%d')
+        asof = asof.replace('-', '')
+        until = (datetime.strptime(asof, '%Y%m%d') + timedelta(days=days)).strftime('%Y%m%d')
+
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for ts_code in ts_codes:
+            dividends = self.dividends_for(ts_code, asof, min(until, self._window_end(asof)))
+            disclosures = self.disclosures_for(ts_code, asof)
+            if dividends is None or disclosures is None:
+                return None
+
+            events: List[Dict[str, Any]] = []
+            for row in dividends:
+                events.append({
+                    'date': row['ex_date'],
+                    'type': '分红除权',
+                    'title': '除权除息日',
+                })
+            for row in disclosures:
+                pre_date = row['pre_date']
+                if row['actual_date'] or not pre_date or not (asof <= pre_date <= until):
+                    continue
+                events.append({
+                    'date': pre_date,
+                    'type': '财报披露',
+                    'title': f"预约披露{report_period_label(row['end_date'])}",
+                })
+            if events:
+                events.sort(key=lambda e: e['date'])
+                for event in events:
+                    event['days_until'] = (
+                        datetime.strptime(event['date'], '%Y%m%d')
+                        - datetime.strptime(asof, '%Y%m%d')
+                    ).days
+                result[ts_code] = events
+        return result
+
+    def _window_end(self, asof: str) -> str:
+        with self._lock:
+            if self._dividend_window is None:
+                return asof
+            return max(asof, self._dividend_window[1])
+
+    def stats(self) -> Dict[str, Any]:
+        """日历状态（ops 用）"""
+        with self._lock:
+            return {
+                'refreshed_at': self._refreshed_at.isoformat() if self._refreshed_at else None,
+                'fresh': self._is_fresh(),
+                'dividend_window': list(self._dividend_window) if self._dividend_window else None,
+                'dividend_codes': len(self._dividends),
+                'periods': sorted(self._periods),
+                'disclosure_codes': len(self._disclosures),
+            }
+
+
+# Singleton instance
+event_calendar = EventCalendar()
@@ -2,8 +2,13 @@
 Enhancement Orchestrator
 协调所有增强模块的执行
 """
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from .schemas import EnhancementsResponse, ModuleResult
 from .enhancers import (
     RelativeStrengthEnhancer,
@@ -15,13 +20,47 @@ from utils.logger import get_logger
 
 logger = get_logger()
 
+# 模块级默认截止时间（秒），从 enhance() 开始计时；调用方可通过 deadline 参数收紧
+DEFAULT_MODULE_DEADLINE_SEC = float(os.getenv('ENHANCEMENT_MODULE_DEADLINE', '6.0'))
+
+# 进程级共享线程池大小：所有请求的增强模块共用，避免每次请求新建线程
+ENHANCEMENT_MAX_WORKERS = int(os.getenv('ENHANCEMENT_MAX_WORKERS', '16'))
+
+# 批量增强（观察列表）整体截止时间（秒）：所有标的 × 模块共用线程池排队，单模块截止时间不再适用
+ENHANCEMENT_BULK_DEADLINE_SEC = float(os.getenv('ENHANCEMENT_BULK_DEADLINE', '20.0'))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=ENHANCEMENT_MAX_WORKERS,
+                thread_name_prefix="enhancer",
+            )
+        return _executor
+
+
+def _submit(executor: ThreadPoolExecutor, fn, *args) -> Future:
+    """在调用方上下文的副本里执行：tushare_priority(BATCH) 等 ContextVar 随任务进入线程池"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
 
 class EnhancementOrchestrator:
     """
     增强协调器
     
-    负责调用所有增强模块并汇总结果
+    负责调用所有增强模块并汇总结果。
+    各模块在共享线程池中并发执行，总耗时约为 max(各模块) 而非 sum；
+    每个模块有独立截止时间，超时仅该模块降级为不可用，其余结果照常返回。
+    超时模块的任务不会被中断，完成后会照常写入 TushareCache，下次请求直接命中。
     """
+
+    # 模块级截止时间覆盖（秒），未配置的模块使用 DEFAULT_MODULE_DEADLINE_SEC
+    MODULE_DEADLINES: Dict[str, float] = {}
     
     def __init__(self):
         self.enhancers = {
@@ -30,14 +69,19 @@ class EnhancementOrchestrator:
             'capital_flow': CapitalFlowEnhancer(),
             'events': EventsEnhancer()
         }
+
+    def _deadline_for(self, module_name: str, cap: Optional[float] = None) -> float:
+        deadline = self.MODULE_DEADLINES.get(module_name, DEFAULT_MODULE_DEADLINE_SEC)
+        return min(deadline, cap) if cap is not None else deadline
     
-    def enhance(self, ts_code: str, asof: str = None) -> EnhancementsResponse:
+    def enhance(self, ts_code: str, asof: str = None, deadline: Optional[float] = None) -> EnhancementsResponse:
         """
         执行所有增强模块
         
         Args:
             ts_code: 股票代码 (e.g., '600519.SH')
             asof: 数据日期
+            deadline: 整体截止时间上限（秒），如 AI 评分需在 AI_SCORE_TIMEOUT 内返回
             
         Returns:
             EnhancementsResponse: 完整增强结果
@@ -46,13 +90,71 @@ class EnhancementOrchestrator:
             asof = datetime.now().strftime('%Y-%m-%d')
         
         logger.info(f"[Enhancement] Starting enhancement for {ts_code} as of {asof}")
-        
+
+        started = time.monotonic()
+        executor = _get_executor()
+        futures = {
+            module_name: _submit(executor, enhancer.safe_enhance, ts_code, asof)
+            for module_name, enhancer in self.enhancers.items()
+        }
+        return self._collect(
+            ts_code,
+            futures,
+            started,
+            lambda module_name: self._deadline_for(module_name, deadline),
+        )
+
+    def enhance_many(
+        self,
+        ts_codes: List[str],
+        asof: str = None,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, EnhancementsResponse]:
+        """
+        批量执行增强模块（观察列表摘要）
+
+        所有标的 × 模块一次性提交到共享线程池，共用一个整体截止时间；
+        同参数的单股票请求在 tushare 调度层合并为多代码调用，日线走序列缓存切片。
+
+        Args:
+            ts_codes: 股票代码列表
+            asof: 数据日期
+            deadline: 整体截止时间（秒），默认 ENHANCEMENT_BULK_DEADLINE_SEC
+
+        Returns:
+            {ts_code: EnhancementsResponse}
+        """
+        if asof is None:
+            asof = datetime.now().strftime('%Y-%m-%d')
+        if deadline is None:
+            deadline = ENHANCEMENT_BULK_DEADLINE_SEC
+
+        logger.info(f"[Enhancement] Starting bulk enhancement for {len(ts_codes)} codes as of {asof}")
+
+        started = time.monotonic()
+        executor = _get_executor()
+        futures_by_code = {
+            ts_code: {
+                module_name: _submit(executor, enhancer.safe_enhance, ts_code, asof)
+                for module_name, enhancer in self.enhancers.items()
+            }
+            for ts_code in dict.fromkeys(ts_codes)
+        }
+        return {
+            ts_code: self._collect(ts_code, futures, started, lambda module_name: deadline)
+            for ts_code, futures in futures_by_code.items()
+        }
+
+    def _collect(self, ts_code: str, futures: Dict, started: float, deadline_for) -> EnhancementsResponse:
+        """等待各模块结果，超过截止时间的模块降级为不可用"""
         results: Dict[str, ModuleResult] = {}
         available_modules = []
-        
-        for module_name, enhancer in self.enhancers.items():
+
+        for module_name, future in futures.items():
+            module_deadline = deadline_for(module_name)
+            remaining = max(0.0, module_deadline - (time.monotonic() - started))
             try:
-                result = enhancer.safe_enhance(ts_code, asof)
+                result = future.result(timeout=remaining)
                 results[module_name] = result
                 
                 if result.available:
@@ -60,6 +162,10 @@ class EnhancementOrchestrator:
                     logger.info(f"[Enhancement] {module_name}: available")
                 else:
                     logger.info(f"[Enhancement] {module_name}: unavailable - {result.degrade_reason}")
+
+            except FutureTimeoutError:
+                logger.warning(f"[Enhancement] {module_name} exceeded deadline {module_deadline:.1f}s for {ts_code}")
+                results[module_name] = ModuleResult.unavailable(f"数据加载超时（>{module_deadline:.1f}s），稍后刷新")
                     
             except Exception as e:
                 logger.error(f"[Enhancement] {module_name} failed: {str(e)}")
@@ -0,0 +1,328 @@
+"""
+Tushare Request Scheduler
+Per-API token buckets, priority classes and multi-code request coalescing
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+_priority: ContextVar[str] = ContextVar('tushare_priority', default=INTERACTIVE)
+
+
+@contextmanager
+def tushare_priority(priority: str):
+    """
+    标记当前上下文内的 tushare 请求优先级。
+
+    定时任务 / 后台刷新用 `with tushare_priority(BATCH):` 包住任务体，
+    其余（页面请求、增强模块）默认 INTERACTIVE。
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def _parse_rates(raw: str) -> Dict[str, int]:
+    """解析 'daily=500,moneyflow=300' 形式的接口限额配置"""
+    rates: Dict[str, int] = {}
+    for part in (raw or '').split(','):
+        name, _, value = part.partition('=')
+        name = name.strip()
+        if not name or not value.strip():
+            continue
+        try:
+            rates[name] = int(value)
+        except ValueError:
+            logger.warning(f"[TushareScheduler] Ignoring invalid rate config: {part}")
+    return rates
+
+
+WEB_WORKERS = max(1, int(os.getenv('WEB_WORKERS', '1')))
+
+
+def _per_worker(rate: int) -> int:
+    """账号级限额按 worker 数均分：令牌桶在进程内，WEB_WORKERS 个进程各用满一份就会超限"""
+    return max(1, rate // WEB_WORKERS)
+
+
+# TUSHARE_RATE_PER_MIN / TUSHARE_API_RATES 配的是账号限额，这里换算为本进程的份额
+DEFAULT_RATE_PER_MIN = _per_worker(int(os.getenv('TUSHARE_RATE_PER_MIN', '200')))
+API_RATES_PER_MIN = {
+    name: _per_worker(rate) for name, rate in _parse_rates(os.getenv('TUSHARE_API_RATES', '')).items()
+}
+# 桶容量占每分钟限额的比例：容量 + 一分钟补充量 = 限额，任意 60s 窗口都不会超
+BURST_RATIO = 0.2
+# 令牌低于容量的该比例时，批量任务让路给交互请求
+BATCH_RESERVE_RATIO = float(os.getenv('TUSHARE_BATCH_RESERVE_RATIO', '0.5'))
+INTERACTIVE_MAX_WAIT_SEC = float(os.getenv('TUSHARE_INTERACTIVE_MAX_WAIT', '8'))
+BATCH_MAX_WAIT_SEC = float(os.getenv('TUSHARE_BATCH_MAX_WAIT', '300'))
+
+# 支持逗号分隔多 ts_code 的接口
+BATCHABLE_APIS = frozenset({'daily', 'daily_basic', 'moneyflow', 'adj_factor'})
+# tushare 单次返回行数上限约 6000，留余量
+MAX_BATCH_ROWS = 5000
+MAX_BATCH_CODES = 50
+BATCH_WINDOW_SEC = float(os.getenv('TUSHARE_BATCH_WINDOW', '0.02'))
+
+
+def is_rate_limit_error(error_msg: str) -> bool:
+    lowered = error_msg.lower()
+    return '每分钟最多访问' in error_msg or '最多访问该接口' in error_msg or 'rate limit' in lowered
+
+
+def _estimate_rows_per_code(kwargs: Dict[str, Any]) -> Optional[int]:
+    """估算单只股票返回行数；无法估算（如未给 start_date 拉全历史）返回 None"""
+    if kwargs.get('trade_date'):
+        return 1
+    start, end = kwargs.get('start_date'), kwargs.get('end_date')
+    if not start or not end:
+        return None
+    try:
+        days = (datetime.strptime(end, '%Y%m%d') - datetime.strptime(start, '%Y%m%d')).days
+    except ValueError:
+        return None
+    return max(1, int(days * 5 / 7) + 1)
+
+
+class _TokenBucket:
+    def __init__(self, rate_per_min: int):
+        rate_per_min = max(1, rate_per_min)
+        self.capacity = max(1.0, rate_per_min * BURST_RATIO)
+        self.refill_per_sec = rate_per_min * (1 - BURST_RATIO) / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_per_sec)
+        self.updated = now
+
+    def seconds_until(self, level: float) -> float:
+        if self.tokens >= level:
+            return 0.0
+        return (level - self.tokens) / self.refill_per_sec
+
+
+class _PendingBatch:
+    __slots__ = ('codes', 'done', 'result', 'priority')
+
+    def __init__(self):
+        self.codes: List[str] = []
+        self.done = threading.Event()
+        self.result: Any = None
+        # 合并调用按成员中最高的优先级取令牌：交互请求搭上批量任务的车时不被按 BATCH 让路
+        self.priority = BATCH
+
+
+def _empty_stats() -> Dict[str, float]:
+    return {
+        'calls': 0, 'interactive': 0, 'batch': 0, 'rejected': 0,
+        'upstream_throttled': 0, 'wait_sec': 0.0,
+        'coalesced_requests': 0, 'coalesced_calls': 0,
+    }
+
+
+class TushareRequestScheduler:
+    """
+    Tushare 请求调度
+
+    - 每个接口一个令牌桶，限额来自 TUSHARE_API_RATES（缺省 TUSHARE_RATE_PER_MIN），WEB_WORKERS>1 时按进程数均分
+    - 优先级：INTERACTIVE 可用尽全部令牌；BATCH 只能用 reserve 以上的部分，
+      且同接口有交互请求在排队时让路，夜间任务跑满时页面请求仍能拿到令牌
+    - 交互请求最多等 INTERACTIVE_MAX_WAIT_SEC，超时放弃（调用方按不可用降级）
+    - 上游返回限频错误时清空该接口令牌，后续请求自然退避
+    - fetch_by_code：同接口已有请求在途时开一个时间窗，窗内参数相同的单股票请求合并为一次逗号分隔 ts_code 调用
+    """
+
+    def __init__(self, default_rate: int = None, rates: Dict[str, int] = None):
+        self.default_rate = default_rate or DEFAULT_RATE_PER_MIN
+        self.rates = dict(API_RATES_PER_MIN if rates is None else rates)
+        self.batch_window_sec = BATCH_WINDOW_SEC
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self._interactive_waiting: Dict[str, int] = defaultdict(int)
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(_empty_stats)
+        self._batch_lock = threading.Lock()
+        self._open_batches: Dict[tuple, _PendingBatch] = {}
+        # 每个接口正在执行 / 等待合并的 fetch_by_code 调用数
+        self._by_code_in_flight: Dict[str, int] = defaultdict(int)
+
+    def _bucket(self, api_name: str) -> _TokenBucket:
+        """调用方需持有 _cond"""
+        bucket = self._buckets.get(api_name)
+        if bucket is None:
+            bucket = self._buckets[api_name] = _TokenBucket(self.rates.get(api_name, self.default_rate))
+        return bucket
+
+    def acquire(self, api_name: str, priority: str = None, max_wait: float = None) -> bool:
+        """
+        取一个令牌；超过最长等待返回 False
+
+        Args:
+            api_name: 接口名
+            priority: INTERACTIVE / BATCH，缺省取当前上下文
+            max_wait: 最长等待秒数，缺省按优先级取配置
+        """
+        priority = priority or current_priority()
+        is_batch = priority == BATCH
+        if max_wait is None:
+            max_wait = BATCH_MAX_WAIT_SEC if is_batch else INTERACTIVE_MAX_WAIT_SEC
+
+        started = time.monotonic()
+        deadline = started + max_wait
+        with self._cond:
+            bucket = self._bucket(api_name)
+            stats = self._stats[api_name]
+            if not is_batch:
+                self._interactive_waiting[api_name] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    level = 1.0
+                    if is_batch:
+                        level += bucket.capacity * BATCH_RESERVE_RATIO
+                    yielding = is_batch and self._interactive_waiting[api_name] > 0
+
+                    if not yielding and bucket.tokens >= level:
+                        bucket.tokens -= 1
+                        stats['calls'] += 1
+                        stats[priority] += 1
+                        stats['wait_sec'] += now - started
+                        return True
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        stats['rejected'] += 1
+                        logger.warning(
+                            f"[TushareScheduler] {priority} request for '{api_name}' "
+                            f"gave up after {max_wait:.1f}s waiting for quota"
+                        )
+                        return False
+                    wait = bucket.seconds_until(level) if not yielding else 0.05
+                    self._cond.wait(min(remaining, max(wait, 0.01)))
+            finally:
+                if not is_batch:
+                    self._interactive_waiting[api_name] -= 1
+                    self._cond.notify_all()
+
+    def penalize(self, api_name: str) -> None:
+        """上游返回限频错误：清空令牌，让后续请求按补充速率退避"""
+        with self._cond:
+            bucket = self._bucket(api_name)
+            bucket.refill(time.monotonic())
+            bucket.tokens = 0.0
+            self._stats[api_name]['upstream_throttled'] += 1
+
+    def _max_batch_codes(self, api_name: str, kwargs: Dict[str, Any]) -> int:
+        if api_name not in BATCHABLE_APIS or self.batch_window_sec <= 0:
+            return 1
+        rows = _estimate_rows_per_code(kwargs)
+        if rows is None:
+            return 1
+        return max(1, min(MAX_BATCH_CODES, MAX_BATCH_ROWS // rows))
+
+    def fetch_by_code(self, api_name: str, ts_code: str, fetch: Callable[..., Any], **kwargs) -> Any:
+        """
+        按单只股票取数，并与同窗口内参数相同的其他请求合并
+
+        Args:
+            api_name: 接口名
+            ts_code: 单个股票代码
+            fetch: 实际执行查询的函数，签名 fetch(ts_code=..., **kwargs)
+            **kwargs: 其余接口参数（须完全相同才会合并）
+        """
+        max_codes = self._max_batch_codes(api_name, kwargs)
+        if max_codes <= 1 or not ts_code or ',' in ts_code:
+            return fetch(ts_code=ts_code, **kwargs)
+
+        key = (api_name, tuple(sorted(kwargs.items())))
+        with self._batch_lock:
+            # 同接口没有其它请求在途时直接调用，不为等不来的合并付出窗口延迟
+            contended = self._by_code_in_flight[api_name] > 0
+            self._by_code_in_flight[api_name] += 1
+            batch = self._open_batches.get(key)
+            leader = batch is None or len(batch.codes) >= max_codes
+            if leader:
+                batch = _PendingBatch()
+                if contended:
+                    self._open_batches[key] = batch
+            if ts_code not in batch.codes:
+                batch.codes.append(ts_code)
+            if current_priority() == INTERACTIVE:
+                batch.priority = INTERACTIVE
+
+        try:
+            if leader:
+                if contended:
+                    time.sleep(self.batch_window_sec)
+                    with self._batch_lock:
+                        if self._open_batches.get(key) is batch:
+                            del self._open_batches[key]
+                try:
+                    with tushare_priority(batch.priority):
+                        batch.result = fetch(ts_code=','.join(batch.codes), **kwargs)
+                finally:
+                    batch.done.set()
+                if len(batch.codes) > 1:
+                    with self._cond:
+                        stats = self._stats[api_name]
+                        stats['coalesced_calls'] += 1
+                        stats['coalesced_requests'] += len(batch.codes)
+            else:
+                batch.done.wait()
+        finally:
+            with self._batch_lock:
+                self._by_code_in_flight[api_name] -= 1
+
+        return self._slice(batch, ts_code)
+
+    @staticmethod
+    def _slice(batch: _PendingBatch, ts_code: str) -> Any:
+        df = batch.result
+        if len(batch.codes) == 1 or df is None:
+            return df
+        if 'ts_code' not in getattr(df, 'columns', ()):
+            return None
+        return df[df['ts_code'] == ts_code].reset_index(drop=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = time.monotonic()
+            apis = {}
+            for api_name, stats in self._stats.items():
+                bucket = self._bucket(api_name)
+                bucket.refill(now)
+                apis[api_name] = {
+                    **stats,
+                    'wait_sec': round(stats['wait_sec'], 3),
+                    'rate_per_min': self.rates.get(api_name, self.default_rate),
+                    'tokens': round(bucket.tokens, 2),
+                    'capacity': round(bucket.capacity, 2),
+                }
+        return {
+            'default_rate_per_min': self.default_rate,
+            'batch_window_sec': self.batch_window_sec,
+            'apis': apis,
+        }
+
+
+# Singleton instance
+tushare_request_scheduler = TushareRequestScheduler()
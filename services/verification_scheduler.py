@@ -4,9 +4,9 @@ Automatically verifies pending judgments on a schedule
 
 Uses APScheduler for background task scheduling
 """
-import threading
 from datetime import datetime
 from typing import List, Dict
+from services.scheduler_leader import TimerChain
 from utils.logger import get_logger
 from database.db_factory import DatabaseFactory
 
@@ -22,6 +22,7 @@ class VerificationScheduler:
     _instance = None
     _scheduler = None
     _running = False
+    _timers = TimerChain()
     
     def __new__(cls):
         if cls._instance is None:
@@ -63,27 +64,20 @@ class VerificationScheduler:
     @classmethod
     def _start_simple_timer(cls):
         """Fallback: simple threading timer for environments without APScheduler"""
-        def run_and_reschedule():
-            cls._run_verification_job()
-            # Reschedule for next hour
-            timer = threading.Timer(3600, run_and_reschedule)
-            timer.daemon = True
-            timer.start()
-        
         # Run first time after 5 minutes, then every hour
-        timer = threading.Timer(300, run_and_reschedule)
-        timer.daemon = True
-        timer.start()
+        cls._timers.schedule(300, 3600, cls._run_verification_job)
         cls._running = True
         logger.info("[VerificationScheduler] Started (simple timer) - will verify pending judgments every hour")
     
     @classmethod
     def stop(cls):
-        """Stop the scheduler"""
+        """Stop the scheduler (also ends the timer fallback chain); start() may be called again"""
         if cls._scheduler:
             cls._scheduler.shutdown(wait=False)
-            cls._running = False
-            logger.info("[VerificationScheduler] Stopped")
+            cls._scheduler = None
+        cls._timers.cancel()
+        cls._running = False
+        logger.info("[VerificationScheduler] Stopped")
     
     @classmethod
     def _run_verification_job(cls):
@@ -95,6 +89,7 @@ class VerificationScheduler:
             logger.info("[VerificationScheduler] Running scheduled verification...")
             
             from services.judgment_service import JudgmentService
+            from services.tushare.rate_limiter import BATCH, tushare_priority
             service = JudgmentService()
             
             # Get all unique owner combinations with pending judgments
@@ -105,11 +100,12 @@ class VerificationScheduler:
             
             for owner_type, owner_id in pending:
                 try:
-                    result = service.verify_pending_judgments(
-                        owner_type=owner_type,
-                        owner_id=owner_id,
-                        max_checks=50
-                    )
+                    with tushare_priority(BATCH):
+                        result = service.verify_pending_judgments(
+                            owner_type=owner_type,
+                            owner_id=owner_id,
+                            max_checks=50
+                        )
                     total_checked += result.get('checked', 0)
                     total_updated += result.get('updated', 0)
                 except Exception as e:
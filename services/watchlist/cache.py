@@ -1,14 +1,18 @@
 """
 Watchlist Summary Cache
-Simple in-memory cache for watchlist item summaries with TTL
+Simple in-memory cache for watchlist item summaries with TTL and stale-while-revalidate
 """
-from typing import Optional, Dict, Any
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, Tuple
 from datetime import datetime, timedelta
 import threading
 from utils.logger import get_logger
 
 logger = get_logger()
 
+REFRESH_WORKERS = int(os.getenv('WATCHLIST_SUMMARY_REFRESH_WORKERS', '4'))
+
 
 class WatchlistSummaryCache:
     """
@@ -16,18 +20,31 @@ class WatchlistSummaryCache:
     
     Key format: {ts_code}:{asof_date}
     Example: 600519.SH:2026-01-26
+
+    Stale-while-revalidate:
+    - 过期但未超过 stale_minutes 的条目仍可读出（get_entry 返回 is_stale=True），
+      调用方先返回旧值，再经 refresh_async 后台重建（同一 key 同时只有一个刷新）
+    - 超过 ttl + stale_minutes 的条目视为不存在，调用方同步等待重建
     """
     
-    def __init__(self, ttl_minutes: int = 5):
+    def __init__(self, ttl_minutes: int = 5, stale_minutes: Optional[int] = None):
         """
         Initialize cache
         
         Args:
             ttl_minutes: Time to live in minutes (default: 5)
+            stale_minutes: Hard-stale limit after expiry in minutes
+                (default: WATCHLIST_SUMMARY_STALE_MINUTES or 30, 0 disables SWR)
         """
         self.ttl_minutes = ttl_minutes
+        if stale_minutes is None:
+            stale_minutes = int(os.getenv('WATCHLIST_SUMMARY_STALE_MINUTES', '30'))
+        self.stale_minutes = stale_minutes
         self.cache: Dict[str, Dict[str, Any]] = {}
         self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats = {'stale_served': 0, 'refreshes': 0, 'refresh_failures': 0}
     
     def _make_key(self, ts_code: str, asof: str) -> str:
         """Generate cache key"""
@@ -41,32 +58,95 @@ class WatchlistSummaryCache:
         
         expiry_time = cached_time + timedelta(minutes=self.ttl_minutes)
         return datetime.now() > expiry_time
+
+    def _is_dead(self, cached_item: Dict[str, Any]) -> bool:
+        """Check if cached item is past the hard-stale limit"""
+        cached_time = cached_item.get('cached_at')
+        if not cached_time:
+            return True
+
+        dead_time = cached_time + timedelta(minutes=self.ttl_minutes + self.stale_minutes)
+        return datetime.now() > dead_time
+
+    def get_entry(self, ts_code: str, asof: str) -> Tuple[Optional[Any], bool]:
+        """
+        Get cached summary including stale entries
+        
+        Returns:
+            (data, is_stale); data is None if not found or past the hard-stale limit
+        """
+        key = self._make_key(ts_code, asof)
+
+        with self._lock:
+            cached_item = self.cache.get(key)
+
+            if not cached_item:
+                return None, False
+
+            if self._is_dead(cached_item):
+                del self.cache[key]
+                return None, False
+
+            if self._is_expired(cached_item):
+                self._stats['stale_served'] += 1
+                logger.debug(f"[WatchlistCache] STALE {ts_code}")
+                return cached_item.get('data'), True
+
+            logger.debug(f"[WatchlistCache] HIT {ts_code}")
+            return cached_item.get('data'), False
     
-    def get(self, ts_code: str, asof: str) -> Optional[Any]:
+    def get(self, ts_code: str, asof: str, allow_stale: bool = False) -> Optional[Any]:
         """
         Get cached summary
         
         Args:
             ts_code: Stock code (e.g., 600519.SH)
             asof: Date string (e.g., 2026-01-26)
+            allow_stale: Also return expired entries within the hard-stale limit
             
         Returns:
             Cached WatchlistItemSummary or None if not found/expired
         """
-        key = self._make_key(ts_code, asof)
+        data, is_stale = self.get_entry(ts_code, asof)
+        if is_stale and not allow_stale:
+            return None
+        return data
+
+    def refresh_async(self, ts_code: str, asof: str, loader: Callable[[], Any]) -> bool:
+        """
+        Rebuild an entry in the background; the loader's result is cached.
         
+        Returns:
+            False if a refresh for this key is already running
+        """
+        key = self._make_key(ts_code, asof)
+
         with self._lock:
-            cached_item = self.cache.get(key)
-            
-            if not cached_item:
-                return None
-            
-            if self._is_expired(cached_item):
-                del self.cache[key]
-                return None
-            
-            logger.debug(f"[WatchlistCache] HIT {ts_code}")
-            return cached_item.get('data')
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=REFRESH_WORKERS,
+                    thread_name_prefix="watchlist-summary-refresh",
+                )
+            executor = self._executor
+
+        def _run():
+            try:
+                self.set(ts_code, asof, loader())
+                with self._lock:
+                    self._stats['refreshes'] += 1
+            except Exception as e:
+                with self._lock:
+                    self._stats['refresh_failures'] += 1
+                logger.warning(f"[WatchlistCache] Background refresh failed for {ts_code}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        executor.submit(_run)
+        return True
     
     def set(self, ts_code: str, asof: str, data: Any) -> None:
         """
@@ -101,11 +181,11 @@ class WatchlistSummaryCache:
             logger.info("[WatchlistCache] Cleared all cache")
     
     def cleanup_expired(self) -> int:
-        """Remove all expired items, returns count removed"""
+        """Remove all items past the hard-stale limit, returns count removed"""
         with self._lock:
             expired_keys = [
                 key for key, item in self.cache.items()
-                if self._is_expired(item)
+                if self._is_dead(item)
             ]
             
             for key in expired_keys:
@@ -129,7 +209,10 @@ class WatchlistSummaryCache:
                 'total_items': total_items,
                 'active_items': total_items - expired_items,
                 'expired_items': expired_items,
-                'ttl_minutes': self.ttl_minutes
+                'ttl_minutes': self.ttl_minutes,
+                'stale_minutes': self.stale_minutes,
+                'refreshing': len(self._refreshing),
+                **self._stats,
             }
 
 
@@ -0,0 +1,155 @@
+"""
+Watchlist Summary Executor
+Process-wide bounded worker pool with round-robin scheduling across requests
+"""
+import contextvars
+import functools
+import os
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+SUMMARY_WORKERS = int(os.getenv('WATCHLIST_SUMMARY_WORKERS', '4'))
+# 单个任务处理的标的数：越小跨请求越公平，越大批量取数越省调用
+SUMMARY_CHUNK_SIZE = int(os.getenv('WATCHLIST_SUMMARY_CHUNK', '10'))
+
+
+class SummaryJobCancelled(Exception):
+    """摘要任务已取消（客户端断开）"""
+
+
+class SummaryJob:
+    """一次请求提交的一组任务；结果按提交顺序返回，失败的任务结果为 None"""
+
+    def __init__(self, tasks: List[Callable[[], Any]]):
+        self._pending: Deque[tuple] = deque(enumerate(tasks))
+        self.results: List[Any] = [None] * len(tasks)
+        self._remaining = len(tasks)
+        self._running = 0
+        self.cancelled = False
+        self.done = threading.Event()
+        if not tasks:
+            self.done.set()
+
+    def wait(self, cancelled: Optional[threading.Event] = None, poll_sec: float = 0.2) -> List[Any]:
+        """
+        等待全部任务完成
+
+        Args:
+            cancelled: 外部取消信号（如请求断开），置位后撤销尚未开始的任务并抛 SummaryJobCancelled
+        """
+        while not self.done.wait(poll_sec if cancelled is not None else None):
+            if cancelled is not None and cancelled.is_set():
+                summary_executor.cancel(self)
+        if self.cancelled:
+            raise SummaryJobCancelled()
+        return self.results
+
+
+class FairSummaryExecutor:
+    """
+    观察列表摘要的进程级线程池
+
+    - 全进程固定 max_workers 个线程，总并发不随请求数增长
+    - 每个请求一个 SummaryJob，worker 在活跃任务组之间轮转取任务：
+      大观察列表不会堵住后来的小列表，单个请求在空闲时仍能用满全部 worker
+    - 取消只撤销尚未开始的任务；正在执行的任务跑完后结果丢弃
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max(1, max_workers or SUMMARY_WORKERS)
+        self._cond = threading.Condition()
+        self._jobs: Deque[SummaryJob] = deque()
+        self._threads: List[threading.Thread] = []
+        self._stats = {'jobs': 0, 'tasks': 0, 'task_failures': 0, 'cancelled_jobs': 0, 'dropped_tasks': 0}
+
+    def _ensure_workers(self) -> None:
+        """调用方需持有 _cond"""
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(
+                target=self._worker,
+                name=f"watchlist-summary-{len(self._threads)}",
+                daemon=True,
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, tasks: List[Callable[[], Any]]) -> SummaryJob:
+        # 每个任务在提交方上下文的副本里执行，定时任务的 tushare_priority(BATCH) 随之传入 worker
+        job = SummaryJob([functools.partial(contextvars.copy_context().run, fn) for fn in tasks])
+        if not tasks:
+            return job
+        with self._cond:
+            self._ensure_workers()
+            self._jobs.append(job)
+            self._stats['jobs'] += 1
+            self._cond.notify_all()
+        return job
+
+    def cancel(self, job: SummaryJob) -> None:
+        with self._cond:
+            if job.cancelled or job.done.is_set():
+                return
+            job.cancelled = True
+            dropped = len(job._pending)
+            job._pending.clear()
+            job._remaining -= dropped
+            self._stats['cancelled_jobs'] += 1
+            self._stats['dropped_tasks'] += dropped
+            if job in self._jobs:
+                self._jobs.remove(job)
+            if job._running == 0:
+                job.done.set()
+        logger.info(f"[WatchlistSummaryExecutor] Job cancelled, dropped {dropped} queued tasks")
+
+    def _next_task(self):
+        """轮转取下一个任务；调用方需持有 _cond"""
+        job = self._jobs.popleft()
+        index, fn = job._pending.popleft()
+        if job._pending:
+            self._jobs.append(job)
+        job._running += 1
+        return job, index, fn
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                job, index, fn = self._next_task()
+
+            try:
+                result = fn()
+                failed = False
+            except Exception as e:
+                logger.error(f"[WatchlistSummaryExecutor] Task failed: {e}")
+                result, failed = None, True
+
+            with self._cond:
+                job._running -= 1
+                job._remaining -= 1
+                self._stats['tasks'] += 1
+                if failed:
+                    self._stats['task_failures'] += 1
+                if not job.cancelled:
+                    job.results[index] = result
+                if job._remaining <= 0 and job._running == 0:
+                    job.done.set()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_workers': self.max_workers,
+                'chunk_size': SUMMARY_CHUNK_SIZE,
+                'active_jobs': len(self._jobs),
+                'queued_tasks': sum(len(job._pending) for job in self._jobs),
+                **self._stats,
+            }
+
+
+# Singleton instance
+summary_executor = FairSummaryExecutor()
@@ -2,9 +2,9 @@
 Watchlist Service
 自选股列表服务 - 核心业务逻辑
 """
+import threading
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any, Literal, Tuple
 from database.db_factory import DatabaseFactory
 from schemas.watchlist import (
@@ -16,10 +16,19 @@ from schemas.watchlist import (
 from services.user_service import UserService
 from services.trend import trend_calculator, TrendInput, TrendResult
 from services.tushare.orchestrator import enhancement_orchestrator
+from services.watchlist.executor import SUMMARY_CHUNK_SIZE, summary_executor
+from services.watchlist.summary_store import (
+    SOURCE_ON_DEMAND,
+    SOURCE_POST_CLOSE,
+    watchlist_summary_store,
+)
 from utils.logger import get_logger
 
 logger = get_logger()
 
+# 趋势计算回看的自然日数（也是批量日线预热的窗口）
+TREND_WINDOW_DAYS = 400
+
 
 class WatchlistService:
     """
@@ -478,12 +487,14 @@ class WatchlistService:
         sort: str = "SCORE_DESC",
         filters: Optional[List[str]] = None,
         phase: str = "full",
+        cancelled: Optional[threading.Event] = None,
     ) -> WatchlistSummaryResponse:
         """
         获取批量摘要 (核心接口)
         
         PRD 强制: 必须批量返回，避免逐只触发 analysis 风暴
         phase=fast: 仅返回缓存命中 + 骨架行，用于首屏快速展示
+        cancelled: 请求断开信号，置位后放弃尚未开始的摘要计算
         """
         if asof is None:
             asof = datetime.now().strftime('%Y-%m-%d')
@@ -519,7 +530,7 @@ class WatchlistService:
         if phase == "fast":
             summaries = self._batch_generate_summaries_fast(ts_codes, asof, names_by_code)
         else:
-            summaries = self._batch_generate_summaries(ts_codes, asof)
+            summaries = self._batch_generate_summaries(ts_codes, asof, cancelled=cancelled)
         for summary in summaries:
             summary.weight_pct = weights_by_code.get(summary.ts_code)
             self._apply_risk_list_flags(summary, risk_hits)
@@ -580,35 +591,243 @@ class WatchlistService:
             )
         return records
     
+    def get_upcoming_events(
+        self,
+        watchlist_id: str,
+        days: int = 14,
+        asof: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """观察列表未来 days 天的除权 / 财报披露事件（读全市场事件日历，不逐只请求上游）"""
+        from services.tushare.event_calendar import event_calendar
+
+        ts_codes = [record["ts_code"] for record in self.get_watchlist_item_records(watchlist_id)]
+        events_by_code = event_calendar.upcoming_events(ts_codes, days=days, asof=asof)
+        if events_by_code is None:
+            event_calendar.refresh_in_background()
+            return {"watchlist_id": watchlist_id, "days": days, "ready": False, "items": []}
+
+        items = [
+            {"ts_code": ts_code, **event}
+            for ts_code in ts_codes
+            for event in events_by_code.get(ts_code, [])
+        ]
+        items.sort(key=lambda item: (item["date"], item["ts_code"]))
+        return {"watchlist_id": watchlist_id, "days": days, "ready": True, "items": items}
+
     def _batch_generate_summaries(
         self, 
         ts_codes: List[str], 
-        asof: str
+        asof: str,
+        cancelled: Optional[threading.Event] = None,
     ) -> List[WatchlistItemSummary]:
-        """批量生成摘要（并行拉取，保留原顺序）"""
+        """
+        批量生成摘要（保留原顺序）
+
+        读取顺序：进程内缓存（含 stale）→ 物化表 watchlist_item_summaries（一条 SQL）
+        → 集合化流水线 _build_summaries_bulk（一次批量行情 + 一次批量增强 + 一条判断状态 SQL）。
+        现算部分按 SUMMARY_CHUNK_SIZE 分块提交到进程级 summary_executor，与其他请求轮转执行；
+        cancelled 置位（客户端断开）时撤销未开始的分块并抛 SummaryJobCancelled。
+        现算结果写回物化表与进程内缓存。
+        """
+        from .cache import watchlist_summary_cache
+
         if not ts_codes:
             return []
-        if len(ts_codes) == 1:
-            return [self._generate_single_summary(ts_codes[0], asof)]
 
-        max_workers = min(4, len(ts_codes))
         results_by_code: Dict[str, WatchlistItemSummary] = {}
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(self._generate_single_summary, ts_code, asof): ts_code
-                for ts_code in ts_codes
-            }
-            for future in as_completed(futures):
-                ts_code = futures[future]
-                try:
-                    results_by_code[ts_code] = future.result()
-                except Exception as e:
-                    logger.error(f"Failed to generate summary for {ts_code}: {e}")
-                    results_by_code[ts_code] = self._degraded_summary(ts_code, asof)
+        missing: List[str] = []
+        for ts_code in ts_codes:
+            normalized = self._normalize_ts_code(ts_code)
+            cached, is_stale = watchlist_summary_cache.get_entry(normalized, asof)
+            if cached is None:
+                missing.append(ts_code)
+                continue
+            if is_stale:
+                watchlist_summary_cache.refresh_async(
+                    normalized, asof, lambda code=normalized: self._load_or_build_summary(code, asof)
+                )
+            results_by_code[ts_code] = cached
+
+        if missing:
+            stored = self._load_materialized_summaries([self._normalize_ts_code(code) for code in missing], asof)
+            still_missing = []
+            for ts_code in missing:
+                normalized = self._normalize_ts_code(ts_code)
+                summary = stored.get(normalized)
+                if summary is None:
+                    still_missing.append(ts_code)
+                    continue
+                watchlist_summary_cache.set(normalized, asof, summary)
+                results_by_code[ts_code] = summary
+            missing = still_missing
+
+        if missing:
+            normalized_missing = [self._normalize_ts_code(code) for code in missing]
+            chunks = [
+                normalized_missing[i:i + SUMMARY_CHUNK_SIZE]
+                for i in range(0, len(normalized_missing), SUMMARY_CHUNK_SIZE)
+            ]
+            job = summary_executor.submit([
+                lambda chunk=chunk: self._build_summaries_bulk(chunk, asof) for chunk in chunks
+            ])
+            built: Dict[str, WatchlistItemSummary] = {}
+            for part in job.wait(cancelled):
+                built.update(part or {})
+            watchlist_summary_store.upsert_many(list(built.values()), source=SOURCE_ON_DEMAND)
+            for ts_code, normalized in zip(missing, normalized_missing):
+                summary = built.get(normalized)
+                if summary is None:
+                    results_by_code[ts_code] = self._degraded_summary(normalized, asof)
+                    continue
+                watchlist_summary_cache.set(normalized, asof, summary)
+                results_by_code[ts_code] = summary
 
         return [results_by_code[code] for code in ts_codes if code in results_by_code]
 
+    def _load_materialized_summaries(
+        self,
+        ts_codes: List[str],
+        asof: str,
+        built_after: Optional[str] = None,
+    ) -> Dict[str, WatchlistItemSummary]:
+        """从物化表读取摘要；判断状态随用户操作变化，读出后用一条 SQL 覆盖为当前值"""
+        stored = watchlist_summary_store.get_many(ts_codes, asof, built_after=built_after)
+        if stored:
+            judgements = self._get_judgement_statuses(list(stored))
+            for ts_code, summary in stored.items():
+                summary.judgement = judgements.get(ts_code, JudgementSummary(has_active=False))
+        return stored
+
+    def _load_or_build_summary(self, ts_code: str, asof: str) -> WatchlistItemSummary:
+        """
+        后台刷新用：盘后物化行或缓存 TTL 内刚现算的行直接用，否则现算并写回物化表
+
+        盘中价格刷新只更新价格列，不按 built_at 过滤的话趋势 / 资金流 / 事件会一直停在首次现算时。
+        """
+        from .cache import watchlist_summary_cache
+
+        built_after = (datetime.now() - timedelta(minutes=watchlist_summary_cache.ttl_minutes)).isoformat()
+        stored = self._load_materialized_summaries([ts_code], asof, built_after=built_after).get(ts_code)
+        if stored is not None:
+            return stored
+        summary = self._build_summary(ts_code, asof)
+        watchlist_summary_store.upsert_many([summary], source=SOURCE_ON_DEMAND)
+        return summary
+
+    def get_all_watchlisted_codes(self) -> List[str]:
+        """所有观察列表中的标的（去重、规范化）"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT ts_code FROM watchlist_items")
+            rows = cursor.fetchall()
+        codes = (self._normalize_ts_code(str(row.get("ts_code") or "")) for row in rows)
+        return list(dict.fromkeys(code for code in codes if code))
+
+    def materialize_summaries(self, asof: Optional[str] = None, chunk_size: int = 100) -> Dict[str, Any]:
+        """
+        盘后任务：为所有观察列表标的重建当日摘要并写入物化表
+
+        盘中现算的行（趋势等基于未收盘数据）一律覆盖；失败的标的保留原行。
+        """
+        from .cache import watchlist_summary_cache
+
+        if asof is None:
+            asof = datetime.now().strftime('%Y-%m-%d')
+        codes = self.get_all_watchlisted_codes()
+        written = 0
+        failed = 0
+        for i in range(0, len(codes), chunk_size):
+            chunk = codes[i:i + chunk_size]
+            try:
+                built = self._build_summaries_bulk(chunk, asof)
+            except Exception as e:
+                logger.error(f"[Watchlist] Materialize chunk failed ({len(chunk)} codes): {e}")
+                built = {}
+            failed += len(chunk) - len(built)
+            written += watchlist_summary_store.upsert_many(list(built.values()), source=SOURCE_POST_CLOSE)
+            for ts_code, summary in built.items():
+                watchlist_summary_cache.set(ts_code, asof, summary)
+        purged = watchlist_summary_store.purge_expired(asof)
+        return {"asof": asof, "codes": len(codes), "written": written, "failed": failed, "purged": purged}
+
+    def refresh_materialized_prices(self, asof: Optional[str] = None) -> Dict[str, Any]:
+        """
+        盘中刷新：只用实时报价更新物化行的 price / change_pct（一次批量报价请求），
+        其余字段等盘后任务重建
+        """
+        from services.realtime_quote import get_quote, prefetch_quotes
+        from .cache import watchlist_summary_cache
+
+        if asof is None:
+            asof = datetime.now().strftime('%Y-%m-%d')
+        codes = watchlist_summary_store.list_codes(asof)
+        if not codes:
+            return {"asof": asof, "codes": 0, "updated": 0}
+
+        prefetch_quotes(codes)
+        prices: Dict[str, Tuple[float, Optional[float]]] = {}
+        for ts_code in codes:
+            quote = get_quote(ts_code)
+            if not quote or str(quote.get("trade_date") or "").replace("-", "") != asof.replace("-", ""):
+                continue
+            price = float(quote["price"])
+            prev_close = quote.get("prev_close")
+            change_pct = (price / float(prev_close) - 1) if prev_close else None
+            prices[ts_code] = (price, change_pct)
+
+        updated = watchlist_summary_store.update_prices(asof, prices)
+        for ts_code in prices:
+            watchlist_summary_cache.invalidate(ts_code, asof)
+        return {"asof": asof, "codes": len(codes), "updated": updated}
+
+    def _build_summaries_bulk(self, ts_codes: List[str], asof: str) -> Dict[str, WatchlistItemSummary]:
+        """
+        集合化构建多个标的的摘要（不读写摘要缓存）
+
+        I/O 只发生在前几步，其余均为内存切片与组装：
+        1. prefetch_daily：按行数上限分组的多代码 daily 调用，预热日线序列（趋势 400 天 / 价格 10 天 / 相对强弱共用）
+        2. prefetch_quotes：一次新浪多代码报价，供当日 bar 实时补丁
+        3. enhance_many：全部标的 × 模块一次提交，资金流等同参数请求在调度层合并
+        4. _get_judgement_statuses：一条 SQL 取全部标的的活跃判断
+        """
+        from datetime import timedelta
+
+        from services.realtime_quote import prefetch_quotes
+        from services.tushare.client import tushare_client
+
+        codes = list(dict.fromkeys(ts_codes))
+        end_dt = datetime.now()
+        try:
+            tushare_client.prefetch_daily(
+                codes,
+                start_date=(end_dt - timedelta(days=TREND_WINDOW_DAYS)).strftime('%Y%m%d'),
+                end_date=end_dt.strftime('%Y%m%d'),
+            )
+        except Exception as e:
+            logger.warning(f"[Watchlist] Bulk daily prefetch failed, falling back per code: {e}")
+        try:
+            prefetch_quotes(codes)
+        except Exception as e:
+            logger.warning(f"[Watchlist] Bulk quote prefetch failed: {e}")
+
+        enhancements_by_code = enhancement_orchestrator.enhance_many(codes, asof)
+        judgements = self._get_judgement_statuses(codes)
+
+        summaries: Dict[str, WatchlistItemSummary] = {}
+        for ts_code in codes:
+            try:
+                summaries[ts_code] = self._assemble_summary(
+                    ts_code,
+                    asof,
+                    enhancements_by_code[ts_code],
+                    trend=self._build_trend(ts_code, asof),
+                    judgement=judgements.get(ts_code, JudgementSummary(has_active=False)),
+                    price_info=self._get_price_info(ts_code, asof),
+                )
+            except Exception as e:
+                logger.error(f"Failed to generate summary for {ts_code}: {e}")
+        return summaries
+
     def _batch_generate_summaries_fast(
         self,
         ts_codes: List[str],
@@ -621,16 +840,28 @@ class WatchlistService:
         names_by_code = names_by_code or {}
         for ts_code in ts_codes:
             normalized = self._normalize_ts_code(ts_code)
-            cached = watchlist_summary_cache.get(normalized, asof)
-            if cached is not None:
-                summaries.append(cached)
+            summaries.append(watchlist_summary_cache.get(normalized, asof, allow_stale=True))
+
+        # 进程内缓存未命中的标的再查一次物化表（重启后首屏仍是完整摘要）
+        missing = [
+            self._normalize_ts_code(ts_code)
+            for ts_code, summary in zip(ts_codes, summaries)
+            if summary is None
+        ]
+        stored = self._load_materialized_summaries(missing, asof) if missing else {}
+        for index, ts_code in enumerate(ts_codes):
+            if summaries[index] is not None:
+                continue
+            normalized = self._normalize_ts_code(ts_code)
+            summary = stored.get(normalized)
+            if summary is not None:
+                watchlist_summary_cache.set(normalized, asof, summary)
+                summaries[index] = summary
             else:
-                summaries.append(
-                    self._skeleton_summary(
-                        normalized,
-                        asof,
-                        name=names_by_code.get(normalized),
-                    )
+                summaries[index] = self._skeleton_summary(
+                    normalized,
+                    asof,
+                    name=names_by_code.get(normalized),
                 )
         return summaries
 
@@ -740,28 +971,57 @@ class WatchlistService:
         ts_code: str,
         asof: str
     ) -> WatchlistItemSummary:
-        """生成单个标的摘要（带缓存）"""
+        """生成单个标的摘要（带缓存，过期条目先返回旧值并后台重建）"""
         from .cache import watchlist_summary_cache
 
         ts_code = self._normalize_ts_code(ts_code)
 
-        cached = watchlist_summary_cache.get(ts_code, asof)
+        cached, is_stale = watchlist_summary_cache.get_entry(ts_code, asof)
         if cached is not None:
-            logger.debug(f"[Watchlist] Cache HIT for {ts_code}")
+            if is_stale:
+                watchlist_summary_cache.refresh_async(
+                    ts_code, asof, lambda: self._load_or_build_summary(ts_code, asof)
+                )
+            logger.debug(f"[Watchlist] Cache HIT for {ts_code} (stale={is_stale})")
             return cached
 
-        logger.debug(f"[Watchlist] Cache MISS for {ts_code}, generating...")
+        logger.debug(f"[Watchlist] Cache MISS for {ts_code}, loading...")
+
+        summary = self._load_or_build_summary(ts_code, asof)
+        watchlist_summary_cache.set(ts_code, asof, summary)
+        return summary
+
+    def _build_summary(self, ts_code: str, asof: str) -> WatchlistItemSummary:
+        """从上游数据构建单个标的摘要（不读写摘要缓存）"""
+        # 先取最长窗口（400 天）的趋势：日线序列缓存随后为相对强弱、资金流、价格等短窗口直接切片
+        trend = self._build_trend(ts_code, asof)
 
         enhancements = enhancement_orchestrator.enhance(ts_code, asof)
-        
+
+        return self._assemble_summary(
+            ts_code,
+            asof,
+            enhancements,
+            trend=trend,
+            judgement=self._get_judgement_status(ts_code),
+            price_info=self._get_price_info(ts_code, asof),
+        )
+
+    def _assemble_summary(
+        self,
+        ts_code: str,
+        asof: str,
+        enhancements,
+        trend: TrendResult,
+        judgement: JudgementSummary,
+        price_info: tuple,
+    ) -> WatchlistItemSummary:
+        """由已取得的增强结果、趋势、判断状态与价格组装摘要（纯内存）"""
         # 提取各模块数据
         rs_data = enhancements.relative_strength
         flow_data = enhancements.capital_flow
         events_data = enhancements.events
         
-        # 构建 Trend (需要从数据源获取MA数据)
-        trend = self._build_trend(ts_code, asof)
-        
         # 构建 RelativeStrength
         relative_strength = self._build_rs_summary(rs_data)
         
@@ -774,11 +1034,7 @@ class WatchlistService:
         # 构建 Events
         events = self._build_events_summary(events_data)
         
-        # 构建 Judgement (从判断记录)
-        judgement = self._get_judgement_status(ts_code)
-        
-        # 获取价格信息
-        price, change_pct, name = self._get_price_info(ts_code, asof)
+        price, change_pct, name = price_info
         
         summary = WatchlistItemSummary(
             ts_code=ts_code,
@@ -794,9 +1050,6 @@ class WatchlistService:
             judgement=judgement
         )
         
-        # Store in cache
-        watchlist_summary_cache.set(ts_code, asof, summary)
-        
         return summary
     
     def _build_trend(self, ts_code: str, asof: str) -> TrendResult:
@@ -808,7 +1061,7 @@ class WatchlistService:
             normalized = self._normalize_ts_code(ts_code)
             
             end_date = datetime.now()
-            start_date = end_date - timedelta(days=400)
+            start_date = end_date - timedelta(days=TREND_WINDOW_DAYS)
             
             start_str = start_date.strftime('%Y%m%d')
             end_str = end_date.strftime('%Y%m%d')
@@ -971,6 +1224,51 @@ class WatchlistService:
             available=True
         )
     
+    def _get_judgement_statuses(self, ts_codes: List[str]) -> Dict[str, JudgementSummary]:
+        """一条 SQL 取多个标的的活跃判断（每只取最新一条），无判断的标的不出现在结果中"""
+        if not ts_codes:
+            return {}
+        try:
+            placeholders = ",".join("?" for _ in ts_codes)
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT stock_code, candidate, validation_date, status
+                    FROM judgments
+                    WHERE stock_code IN ({placeholders}) AND status IN ('active', 'pending')
+                    ORDER BY created_at DESC
+                """, tuple(ts_codes))
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.debug(f"Error getting judgement statuses for {len(ts_codes)} codes: {e}")
+            return {}
+
+        statuses: Dict[str, JudgementSummary] = {}
+        for row in rows:
+            code = row.get('stock_code')
+            if code not in statuses:
+                statuses[code] = self._judgement_from_row(row)
+        return statuses
+
+    def _judgement_from_row(self, row: Dict[str, Any]) -> JudgementSummary:
+        validation_date = row.get('validation_date')
+        days_left = None
+        if validation_date:
+            try:
+                val_dt = datetime.fromisoformat(validation_date.replace('Z', '+00:00'))
+                days_left = (val_dt - datetime.now()).days
+                if days_left < 0:
+                    days_left = 0
+            except:
+                pass
+
+        return JudgementSummary(
+            has_active=True,
+            candidate=row.get('candidate'),
+            validation_period_days=7,  # 默认7天
+            days_left=days_left
+        )
+
     def _get_judgement_status(self, ts_code: str) -> JudgementSummary:
         """获取判断状态"""
         # 从判断记录中查询活跃判断
@@ -987,23 +1285,7 @@ class WatchlistService:
                 row = cursor.fetchone()
             
             if row:
-                validation_date = row.get('validation_date')
-                days_left = None
-                if validation_date:
-                    try:
-                        val_dt = datetime.fromisoformat(validation_date.replace('Z', '+00:00'))
-                        days_left = (val_dt - datetime.now()).days
-                        if days_left < 0:
-                            days_left = 0
-                    except:
-                        pass
-                
-                return JudgementSummary(
-                    has_active=True,
-                    candidate=row.get('candidate'),
-                    validation_period_days=7,  # 默认7天
-                    days_left=days_left
-                )
+                return self._judgement_from_row(row)
         except Exception as e:
             logger.debug(f"Error getting judgement status for {ts_code}: {e}")
         
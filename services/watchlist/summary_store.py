@@ -0,0 +1,166 @@
+"""
+Watchlist Summary Store
+Materialized watchlist_item_summaries rows keyed by (ts_code, asof)
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from database.db_factory import DatabaseFactory
+from schemas.watchlist import WatchlistItemSummary
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# 物化行保留天数（按 asof）
+RETENTION_DAYS = int(os.getenv('WATCHLIST_SUMMARY_RETENTION_DAYS', '7'))
+
+# 按观察列表叠加的字段不进物化行
+_OVERLAY_FIELDS = {'weight_pct', 'on_risk_list', 'risk_list_tags', 'is_skeleton'}
+
+SOURCE_POST_CLOSE = 'post_close'
+SOURCE_ON_DEMAND = 'on_demand'
+
+
+class WatchlistSummaryStore:
+    """
+    观察列表摘要物化表
+
+    - 盘后任务（WatchlistSummaryScheduler）为所有观察列表标的写入当日摘要（source=post_close）
+    - 请求路径未命中时现算的摘要也写入（source=on_demand），重启后仍可直接读行
+    - 盘中刷新任务只更新 price / change_pct 列，读出时以列值覆盖 payload
+    - 表不存在（未跑迁移）时读返回空、写静默跳过，调用方按未命中处理
+    """
+
+    def __init__(self):
+        self.db = DatabaseFactory()
+
+    def get_many(
+        self,
+        ts_codes: List[str],
+        asof: str,
+        built_after: Optional[str] = None,
+    ) -> Dict[str, WatchlistItemSummary]:
+        """
+        读取已物化的摘要，{ts_code: summary}；缺失的标的不出现在结果中
+
+        Args:
+            built_after: 只要盘后行或 built_at 不早于该时间（ISO 格式）的现算行；
+                更早的盘中现算行视为过期，按缺失处理
+        """
+        if not ts_codes:
+            return {}
+        codes = list(dict.fromkeys(ts_codes))
+        placeholders = ",".join("?" for _ in codes)
+        freshness = ""
+        params: Tuple = (asof, *codes)
+        if built_after is not None:
+            freshness = "AND (source = ? OR built_at >= ?)"
+            params = (*params, SOURCE_POST_CLOSE, built_after)
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT ts_code, price, change_pct, payload
+                    FROM watchlist_item_summaries
+                    WHERE asof = ? AND ts_code IN ({placeholders}) {freshness}
+                """, params)
+                rows = cursor.fetchall()
+        except Exception as e:
+            logger.debug(f"[WatchlistSummaryStore] read skipped: {e}")
+            return {}
+
+        summaries: Dict[str, WatchlistItemSummary] = {}
+        for row in rows:
+            try:
+                summary = WatchlistItemSummary.model_validate_json(row['payload'])
+            except Exception as e:
+                logger.warning(f"[WatchlistSummaryStore] Bad payload for {row.get('ts_code')}: {e}")
+                continue
+            if row.get('price') is not None:
+                summary.price = float(row['price'])
+            summary.change_pct = row.get('change_pct')
+            summaries[row['ts_code']] = summary
+        return summaries
+
+    def upsert_many(self, summaries: List[WatchlistItemSummary], source: str = SOURCE_ON_DEMAND) -> int:
+        """写入（覆盖）摘要行，返回写入行数"""
+        if not summaries:
+            return 0
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                summary.ts_code,
+                summary.asof,
+                summary.name,
+                summary.price,
+                summary.change_pct,
+                summary.model_dump_json(exclude=_OVERLAY_FIELDS),
+                source,
+                now,
+                now,
+            )
+            for summary in summaries
+        ]
+        try:
+            with self.db.get_connection() as conn:
+                conn.executemany("""
+                    INSERT INTO watchlist_item_summaries
+                        (ts_code, asof, name, price, change_pct, payload, source, built_at, price_updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(ts_code, asof) DO UPDATE SET
+                        name = excluded.name,
+                        price = excluded.price,
+                        change_pct = excluded.change_pct,
+                        payload = excluded.payload,
+                        source = excluded.source,
+                        built_at = excluded.built_at,
+                        price_updated_at = excluded.price_updated_at
+                """, rows)
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"[WatchlistSummaryStore] write skipped ({len(rows)} rows): {e}")
+            return 0
+        return len(rows)
+
+    def update_prices(self, asof: str, prices: Dict[str, Tuple[float, Optional[float]]]) -> int:
+        """盘中刷新：只更新价格列，prices 为 {ts_code: (price, change_pct)}"""
+        if not prices:
+            return 0
+        now = datetime.now().isoformat()
+        rows = [(price, change_pct, now, code, asof) for code, (price, change_pct) in prices.items()]
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                UPDATE watchlist_item_summaries
+                SET price = ?, change_pct = ?, price_updated_at = ?
+                WHERE ts_code = ? AND asof = ?
+            """, rows)
+            conn.commit()
+            return cursor.rowcount
+
+    def list_codes(self, asof: str) -> List[str]:
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT ts_code FROM watchlist_item_summaries WHERE asof = ?",
+                (asof,),
+            )
+            return [row['ts_code'] for row in cursor.fetchall()]
+
+    def purge_before(self, asof: str) -> int:
+        """删除早于 asof 的行"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM watchlist_item_summaries WHERE asof < ?", (asof,))
+            conn.commit()
+            return cursor.rowcount
+
+    def purge_expired(self, asof: str) -> int:
+        """删除 asof 往前超过 RETENTION_DAYS 的行"""
+        cutoff = datetime.strptime(asof, '%Y-%m-%d') - timedelta(days=RETENTION_DAYS)
+        return self.purge_before(cutoff.strftime('%Y-%m-%d'))
+
+
+# Singleton instance
+watchlist_summary_store = WatchlistSummaryStore()
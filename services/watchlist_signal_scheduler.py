@@ -41,6 +41,14 @@ class WatchlistSignalScheduler:
         except Exception as exc:
             logger.error(f"[WatchlistSignalScheduler] Failed to start: {exc}")
 
+    @classmethod
+    def stop(cls):
+        if cls._scheduler:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+        cls._running = False
+        logger.info("[WatchlistSignalScheduler] Stopped")
+
     @classmethod
     def _run_scan_job(cls):
         from services.job_health_tracker import job_health_tracker
@@ -48,9 +56,11 @@ class WatchlistSignalScheduler:
         job_id = "watchlist_signal_scheduler"
         try:
             from services.watchlist_signal_service import WatchlistSignalService
+            from services.tushare.rate_limiter import BATCH, tushare_priority
 
             logger.info("[WatchlistSignalScheduler] Running scheduled signal scan...")
-            result = WatchlistSignalService().scan_and_sync()
+            with tushare_priority(BATCH):
+                result = WatchlistSignalService().scan_and_sync()
             logger.info(f"[WatchlistSignalScheduler] Completed {result}")
             job_health_tracker.record_success(job_id)
         except Exception as exc:
@@ -23,6 +23,10 @@ logger = get_logger()
 MAX_SYMBOLS_PER_SCAN = 300
 # 最新 bar 距今超过该天数视为数据过期，不产生信号
 MAX_STALE_DAYS = 5
+# 每只标的保留的滚动 bar 数（detect_signals 至少需要 25 根）
+SIGNAL_STATE_BARS = 30
+# 状态缺失 / 断档时批量预热的回看自然日数（约 40 个交易日）
+WARMUP_CALENDAR_DAYS = 60
 
 SIGNAL_LABELS = {
     "golden_cross": "MA5 上穿 MA20（金叉）",
@@ -127,7 +131,262 @@ class WatchlistSignalService:
         return symbols
 
     def _scan_symbols(self, ts_codes: List[str]) -> Dict[str, List[Dict[str, Any]]]:
-        """批量拉取行情并检测信号。"""
+        """
+        增量扫描：读取持久化的滚动窗口，只追加最新一根 bar 后检测信号。
+
+        - 最新 bar 来自一次全市场 daily(trade_date=...) 调用，与观察池大小无关
+        - 窗口存原始收盘价与当日复权因子，检测前按最新因子换算为前复权，除权日不会误报交叉 / 跌破
+        - 状态缺失或落后超过一个交易日的标的，用多代码 daily 批量预热窗口
+        - tushare 不可用，或 tushare daily 不覆盖的标的（ETF/LOF 等），回退到 _scan_symbols_full
+        """
+        from services.tushare.client import tushare_client
+        from services.watchlist.service import WatchlistService
+
+        tushare_client.ensure_initialized(log_missing_token=False)
+        if not tushare_client.is_available:
+            return self._scan_symbols_full(ts_codes)
+
+        market = self._latest_market_bars()
+        if market is None:
+            return self._scan_symbols_full(ts_codes)
+        trade_date, prev_open, bars_by_code = market
+
+        normalized = {code: WatchlistService._normalize_ts_code(code) for code in ts_codes}
+        codes = list(dict.fromkeys(normalized.values()))
+        states = self._load_states(codes)
+
+        windows: Dict[str, List[list]] = {}
+        needs_warmup: List[str] = []
+        for code in codes:
+            window = self._advance_window(states.get(code), bars_by_code.get(code), trade_date, prev_open)
+            if window is None:
+                needs_warmup.append(code)
+            else:
+                windows[code] = window
+        if needs_warmup:
+            windows.update(self._warmup_windows(needs_warmup, trade_date))
+        self._save_states(windows)
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        leftover: List[str] = []
+        for ts_code in ts_codes:
+            window = windows.get(normalized[ts_code])
+            if not window:
+                leftover.append(ts_code)
+                continue
+            try:
+                signals = self.detect_signals(self._window_frame(window))
+            except Exception as exc:
+                logger.warning(f"[WatchlistSignal] detect failed for {ts_code}: {exc}")
+                continue
+            if signals:
+                results[ts_code] = signals
+
+        logger.info(
+            f"[WatchlistSignal] incremental scan trade_date={trade_date} symbols={len(codes)} "
+            f"warmed={len(needs_warmup)} fallback={len(leftover)}"
+        )
+        if leftover:
+            results.update(self._scan_symbols_full(leftover))
+        return results
+
+    def _latest_market_bars(self) -> Optional[tuple]:
+        """
+        最近一个已出日线的交易日的全市场 bar。
+
+        Returns:
+            (trade_date, 上一交易日或 None, {ts_code: [trade_date, close, vol, adj_factor]})；
+            取不到（含当日复权因子缺失，无法与窗口统一口径）返回 None
+        """
+        from services.tushare.client import tushare_client
+
+        today = datetime.now()
+        open_dates: List[str] = []
+        cal = tushare_client.query(
+            "trade_cal",
+            exchange="SSE",
+            start_date=(today - timedelta(days=20)).strftime("%Y%m%d"),
+            end_date=today.strftime("%Y%m%d"),
+            is_open="1",
+        )
+        if cal is not None and not cal.empty and "cal_date" in cal.columns:
+            open_dates = sorted(str(d) for d in cal["cal_date"].tolist())
+        calendar_known = bool(open_dates)
+        if not calendar_known:
+            # 交易日历不可用：按工作日倒推，此时无法判断断档，状态一律重新预热
+            open_dates = [
+                (today - timedelta(days=offset)).strftime("%Y%m%d")
+                for offset in range(MAX_STALE_DAYS, -1, -1)
+                if (today - timedelta(days=offset)).weekday() < 5
+            ]
+
+        # 当日日线可能尚未发布，最多回退一个交易日
+        for idx in range(len(open_dates) - 1, max(len(open_dates) - 3, -1), -1):
+            trade_date = open_dates[idx]
+            df = tushare_client.query("daily", trade_date=trade_date)
+            if df is None or df.empty or not {"ts_code", "close", "vol"} <= set(df.columns):
+                continue
+            adj = tushare_client.query("adj_factor", trade_date=trade_date)
+            if adj is None or adj.empty or not {"ts_code", "adj_factor"} <= set(adj.columns):
+                logger.warning(f"[WatchlistSignal] adj_factor unavailable for {trade_date}")
+                return None
+            factors = {str(code): float(factor) for code, factor in zip(adj["ts_code"], adj["adj_factor"])}
+            prev_open = open_dates[idx - 1] if calendar_known and idx > 0 else None
+            bars = {
+                str(row["ts_code"]): [
+                    trade_date,
+                    float(row["close"]),
+                    float(row["vol"] or 0.0),
+                    factors.get(str(row["ts_code"])),
+                ]
+                for row in df[["ts_code", "close", "vol"]].to_dict("records")
+            }
+            return trade_date, prev_open, bars
+        return None
+
+    @staticmethod
+    def _advance_window(
+        state: Optional[List[list]],
+        bar: Optional[list],
+        trade_date: str,
+        prev_open: Optional[str],
+    ) -> Optional[List[list]]:
+        """把最新 bar 追加到滚动窗口；需要重新预热时返回 None"""
+        if not state or len(state[-1]) < 4:
+            # 旧版状态没有复权因子，重新预热一次
+            return None
+        last_date = state[-1][0]
+        if last_date >= trade_date:
+            return state
+        if bar is None:
+            # 当日停牌 / 不在 tushare daily 中：窗口保持不变，detect_signals 按过期处理
+            return state if prev_open is not None and last_date >= prev_open else None
+        if prev_open is None or last_date != prev_open:
+            return None
+        if (bar[3] is None) != (state[-1][3] is None):
+            # 复权因子时有时无，无法统一口径
+            return None
+        return (state + [bar])[-SIGNAL_STATE_BARS:]
+
+    def _warmup_windows(self, codes: List[str], trade_date: str) -> Dict[str, List[list]]:
+        """批量预热滚动窗口：一次多代码 daily 预热序列缓存后逐只切片"""
+        from services.tushare.client import tushare_client
+
+        start_date = (
+            datetime.strptime(trade_date, "%Y%m%d") - timedelta(days=WARMUP_CALENDAR_DAYS)
+        ).strftime("%Y%m%d")
+        try:
+            tushare_client.prefetch_daily(codes, start_date=start_date, end_date=trade_date)
+        except Exception as exc:
+            logger.warning(f"[WatchlistSignal] warmup prefetch failed: {exc}")
+
+        factors = self._adj_factors(codes, start_date, trade_date)
+
+        windows: Dict[str, List[list]] = {}
+        for code in codes:
+            try:
+                df = tushare_client.get_daily(code, start_date=start_date, end_date=trade_date)
+            except Exception as exc:
+                logger.warning(f"[WatchlistSignal] warmup failed for {code}: {exc}")
+                continue
+            if df is None or df.empty or not {"trade_date", "close", "vol"} <= set(df.columns):
+                continue
+            df = df.sort_values("trade_date").tail(SIGNAL_STATE_BARS)
+            code_factors = factors.get(code, {})
+            bars = [
+                [str(row["trade_date"]), float(row["close"]), float(row["vol"] or 0.0)]
+                for row in df[["trade_date", "close", "vol"]].to_dict("records")
+            ]
+            # 因子缺任一天就整窗不复权，避免同一窗口里混用两种口径
+            complete = all(bar[0] in code_factors for bar in bars)
+            windows[code] = [bar + [code_factors[bar[0]] if complete else None] for bar in bars]
+        return windows
+
+    @staticmethod
+    def _adj_factors(codes: List[str], start_date: str, end_date: str) -> Dict[str, Dict[str, float]]:
+        """预热区间的复权因子 {ts_code: {trade_date: adj_factor}}，多代码分组请求"""
+        from services.tushare.client import tushare_client
+        from services.tushare.rate_limiter import MAX_BATCH_CODES
+
+        factors: Dict[str, Dict[str, float]] = {}
+        for i in range(0, len(codes), MAX_BATCH_CODES):
+            chunk = codes[i:i + MAX_BATCH_CODES]
+            df = tushare_client.query(
+                "adj_factor", ts_code=",".join(chunk), start_date=start_date, end_date=end_date
+            )
+            if df is None or df.empty or not {"ts_code", "trade_date", "adj_factor"} <= set(df.columns):
+                continue
+            for row in df[["ts_code", "trade_date", "adj_factor"]].to_dict("records"):
+                factors.setdefault(str(row["ts_code"]), {})[str(row["trade_date"])] = float(row["adj_factor"])
+        return factors
+
+    @staticmethod
+    def _window_frame(window: List[list]) -> pd.DataFrame:
+        """滚动窗口 → detect_signals 的输入；收盘价按最新复权因子换算为前复权（与全量回退口径一致）"""
+        closes = [bar[1] for bar in window]
+        factors = [bar[3] if len(bar) > 3 else None for bar in window]
+        if all(factors):
+            latest = factors[-1]
+            closes = [close * factor / latest for close, factor in zip(closes, factors)]
+        return pd.DataFrame(
+            {
+                "Close": closes,
+                "Volume": [bar[2] for bar in window],
+            },
+            index=pd.to_datetime([bar[0] for bar in window], format="%Y%m%d"),
+        )
+
+    def _load_states(self, codes: List[str]) -> Dict[str, List[list]]:
+        if not codes:
+            return {}
+        placeholders = ",".join("?" for _ in codes)
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"SELECT ts_code, bars FROM watchlist_signal_state WHERE ts_code IN ({placeholders})",
+                    codes,
+                )
+                rows = cursor.fetchall()
+        except Exception as exc:
+            logger.debug(f"[WatchlistSignal] state read skipped: {exc}")
+            return {}
+        states: Dict[str, List[list]] = {}
+        for row in rows:
+            try:
+                states[row["ts_code"]] = json.loads(row["bars"])
+            except (TypeError, ValueError):
+                continue
+        return states
+
+    def _save_states(self, windows: Dict[str, List[list]]) -> None:
+        if not windows:
+            return
+        now = datetime.utcnow().isoformat() + "Z"
+        rows = [
+            (code, window[-1][0], json.dumps(window), now)
+            for code, window in windows.items()
+            if window
+        ]
+        try:
+            with self.db.get_connection() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO watchlist_signal_state (ts_code, last_trade_date, bars, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(ts_code) DO UPDATE SET
+                        last_trade_date = excluded.last_trade_date,
+                        bars = excluded.bars,
+                        updated_at = excluded.updated_at
+                    """,
+                    rows,
+                )
+                conn.commit()
+        except Exception as exc:
+            logger.warning(f"[WatchlistSignal] state write skipped: {exc}")
+
+    def _scan_symbols_full(self, ts_codes: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """全量回退：逐只拉取整段历史并检测信号（tushare 不可用 / ETF 等）。"""
         from services.stock_data_provider import StockDataProvider
 
         provider = StockDataProvider()
@@ -0,0 +1,98 @@
+"""
+Background scheduler for the materialized watchlist summaries.
+盘后 17:10（上海时区）为所有观察列表标的重建当日摘要写入 watchlist_item_summaries；
+交易时段每 5 分钟只用实时报价刷新物化行的价格列。
+"""
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+class WatchlistSummaryScheduler:
+    _instance = None
+    _scheduler = None
+    _running = False
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    @classmethod
+    def start(cls):
+        if cls._running:
+            logger.info("[WatchlistSummaryScheduler] Already running")
+            return
+
+        try:
+            from apscheduler.schedulers.background import BackgroundScheduler
+            from apscheduler.triggers.cron import CronTrigger
+
+            cls._scheduler = BackgroundScheduler()
+            # tushare 日线 / 资金流通常 16:00 后齐备，排在 16:40 结构信号扫描之后
+            cls._scheduler.add_job(
+                cls._run_materialize_job,
+                trigger=CronTrigger(day_of_week="mon-fri", hour=17, minute=10, timezone="Asia/Shanghai"),
+                id="watchlist_summary_materialize_job",
+                name="Materialize Watchlist Summaries",
+                replace_existing=True,
+            )
+            cls._scheduler.add_job(
+                cls._run_price_refresh_job,
+                trigger=CronTrigger(
+                    day_of_week="mon-fri",
+                    hour="9-15",
+                    minute="*/5",
+                    timezone="Asia/Shanghai",
+                ),
+                id="watchlist_summary_price_job",
+                name="Intraday Watchlist Summary Price Refresh",
+                replace_existing=True,
+            )
+            cls._scheduler.start()
+            cls._running = True
+            logger.info(
+                "[WatchlistSummaryScheduler] Started - daily 17:10 + intraday prices */5min 9-15h Asia/Shanghai"
+            )
+        except Exception as exc:
+            logger.error(f"[WatchlistSummaryScheduler] Failed to start: {exc}")
+
+    @classmethod
+    def stop(cls):
+        if cls._scheduler:
+            cls._scheduler.shutdown(wait=False)
+            cls._scheduler = None
+        cls._running = False
+        logger.info("[WatchlistSummaryScheduler] Stopped")
+
+    @classmethod
+    def _run_materialize_job(cls):
+        from services.job_health_tracker import job_health_tracker
+
+        job_id = "watchlist_summary_scheduler"
+        try:
+            from services.watchlist.service import watchlist_service
+            from services.tushare.rate_limiter import BATCH, tushare_priority
+
+            logger.info("[WatchlistSummaryScheduler] Materializing watchlist summaries...")
+            with tushare_priority(BATCH):
+                result = watchlist_service.materialize_summaries()
+            logger.info(f"[WatchlistSummaryScheduler] Completed {result}")
+            job_health_tracker.record_success(job_id)
+        except Exception as exc:
+            job_health_tracker.record_failure(job_id, str(exc))
+            logger.error(f"[WatchlistSummaryScheduler] Materialize failed: {exc}")
+
+    @classmethod
+    def _run_price_refresh_job(cls):
+        try:
+            from services.watchlist.service import watchlist_service
+
+            result = watchlist_service.refresh_materialized_prices()
+            logger.debug(f"[WatchlistSummaryScheduler] Price refresh {result}")
+        except Exception as exc:
+            logger.warning(f"[WatchlistSummaryScheduler] Price refresh failed: {exc}")
+
+
+def start_watchlist_summary_scheduler():
+    WatchlistSummaryScheduler.start()
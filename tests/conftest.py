@@ -51,6 +51,16 @@ def pytest_sessionfinish(session, exitstatus):
     cleanup_test_sqlite_artifacts_in_data_dir()
 
 
+@pytest.fixture(autouse=True)
+def reset_daily_series_cache():
+    """Per-symbol daily series are process-wide; keep fake tushare data from leaking across tests."""
+    from services.tushare.daily_series import daily_series_cache
+
+    daily_series_cache.invalidate()
+    yield
+    daily_series_cache.invalidate()
+
+
 @pytest.fixture(autouse=True)
 def isolate_default_db_path(tmp_path, monkeypatch):
     """Route accidental DB writes away from repo data/ during tests."""
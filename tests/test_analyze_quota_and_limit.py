@@ -1,3 +1,4 @@
+import asyncio
 import json
 import os
 import sqlite3
@@ -209,3 +210,51 @@ def test_authenticated_user_gets_higher_base_quota(tmp_path, monkeypatch):
     assert anon_status["base_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA
     assert auth_status["base_quota"] == QuotaService.AUTHENTICATED_BASE_QUOTA
     assert auth_status["total_quota"] > anon_status["total_quota"]
+
+
+def test_reservation_released_when_client_disconnects_before_first_chunk(tmp_path, monkeypatch):
+    db_path = _setup_db(tmp_path)
+    _bind_test_db(monkeypatch, db_path)
+    _mock_analyzer(monkeypatch)
+    from services.quota_service import quota_ledger
+    from web_server import app
+
+    anonymous_id = "anon_disconnect"
+    user_id = _resolve_user_id(db_path, anonymous_id)
+    body = json.dumps({"stock_codes": ["600519"], "market_type": "A"}).encode()
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/analyze",
+        "raw_path": b"/api/analyze",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"x-anonymous-id", anonymous_id.encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # 发响应头时客户端已断开：generate_stream 一次都没被迭代
+        if message["type"] == "http.response.start":
+            raise OSError("client disconnected")
+
+    with TestClient(app):
+        with pytest.raises(Exception):
+            asyncio.run(app(scope, receive, send))
+        allowed, _, details, reservation = quota_ledger.try_reserve(
+            user_id, ["000001", "000002", "000003"], allow_stale=True
+        )
+        quota_ledger.release(reservation)
+
+    assert allowed and details["remaining_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA
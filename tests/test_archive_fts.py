@@ -0,0 +1,144 @@
+"""专栏全文检索：articles_fts 由触发器同步，列表筛选走 FTS，短关键词回退 LIKE。"""
+import asyncio
+import sqlite3
+from pathlib import Path
+
+from database.compression import register_sqlite_functions
+from database.db_factory import DatabaseFactory
+from database.schema_registry import schema_registry
+from services.archive_service import ArchiveService
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MIGRATIONS = [
+    REPO_ROOT / "migrations" / "022_create_articles_fts.sql",
+    REPO_ROOT / "migrations" / "024_articles_fts_unpack_view.sql",
+]
+
+
+def _connect(db_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    register_sqlite_functions(conn)
+    return conn
+
+
+def _article(title, code, name, content, publish_date="2026-07-01", market_type="A"):
+    return {
+        "title": title,
+        "stock_code": code,
+        "stock_name": name,
+        "market_type": market_type,
+        "content": content,
+        "score": 70,
+        "publish_date": publish_date,
+    }
+
+
+def _service(tmp_path) -> ArchiveService:
+    db_path = tmp_path / "archive_fts.db"
+    with _connect(db_path) as conn:
+        for migration in MIGRATIONS:
+            conn.executescript(migration.read_text(encoding="utf-8"))
+        schema_registry.apply(conn)
+    DatabaseFactory.initialize(str(db_path))
+    return ArchiveService(db_path=str(db_path))
+
+
+def _fts_rowids(service, match):
+    with sqlite3.connect(service.db_path) as conn:
+        return [r[0] for r in conn.execute(
+            "SELECT rowid FROM articles_fts WHERE articles_fts MATCH ? ORDER BY rowid", (match,)
+        )]
+
+
+def test_search_ranks_and_snippets_body_matches(tmp_path):
+    service = _service(tmp_path)
+    service.save_article_sync(_article("贵州茅台结构分析", "600519", "贵州茅台", "白酒龙头，估值回落到合理区间"))
+    service.save_article_sync(_article("五粮液结构分析", "000858", "五粮液", "同为白酒板块，提及贵州茅台的对比"))
+    service.save_article_sync(_article("判断验证周报", "WEEKLY_RECAP", "周报", "贵州茅台复盘", market_type="META"))
+
+    results = asyncio.run(service.search_articles("贵州茅台"))
+
+    assert [r["stock_code"] for r in results] == ["600519", "000858"]
+    assert results[0]["rank"] < results[1]["rank"]
+    assert "<mark>贵州茅台</mark>" in results[1]["snippet"]
+
+
+def test_search_branches_share_public_exclusion_rule(tmp_path, monkeypatch):
+    import services.archive_service as archive_module
+
+    service = _service(tmp_path)
+    service.save_article_sync(_article("贵州茅台结构分析", "600519", "贵州茅台", "白酒龙头"))
+    service.save_article_sync(_article("茅台对比", "000858", "五粮液", "对比贵州茅台"))
+    monkeypatch.setattr(
+        archive_module,
+        "_PUBLIC_ARTICLE_EXCLUDE_SQL",
+        archive_module._PUBLIC_ARTICLE_EXCLUDE_SQL + " AND stock_code != '000858'",
+    )
+
+    fts = asyncio.run(service.search_articles("贵州茅台"))
+    like = asyncio.run(service.search_articles("茅台"))
+
+    # FTS 与 LIKE 回退用同一条公开可见规则
+    assert [r["stock_code"] for r in fts] == ["600519"]
+    assert [r["stock_code"] for r in like] == ["600519"]
+
+
+def test_list_keyword_filter_uses_fts_for_title_code_name_only(tmp_path):
+    service = _service(tmp_path)
+    service.save_article_sync(_article("贵州茅台结构分析", "600519", "贵州茅台", "正文"))
+    service.save_article_sync(_article("五粮液结构分析", "000858", "五粮液", "正文提到 600519"))
+
+    articles = asyncio.run(service.get_articles(limit=10, offset=0, keyword="600519"))
+    rows, total = asyncio.run(service.admin_list_articles_with_total(limit=10, offset=0, keyword="结构分析"))
+
+    assert [a["stock_code"] for a in articles] == ["600519"]
+    assert total == 2 and len(rows) == 2
+
+
+def test_short_keyword_falls_back_to_like(tmp_path):
+    service = _service(tmp_path)
+    service.save_article_sync(_article("茅台观察", "600519", "贵州茅台", "正文"))
+
+    assert len(asyncio.run(service.get_articles(limit=10, offset=0, keyword="茅台"))) == 1
+    results = asyncio.run(service.search_articles("茅台"))
+    assert len(results) == 1 and results[0]["snippet"] is None
+
+
+def test_triggers_keep_index_in_sync_on_replace_update_delete(tmp_path):
+    service = _service(tmp_path)
+    first_id = service.save_article_sync(_article("同名文章", "600519", "贵州茅台", "旧正文内容"))
+    second_id = service.save_article_sync(_article("同名文章", "600519", "贵州茅台", "新正文内容"))
+
+    assert second_id != first_id
+    assert _fts_rowids(service, '"旧正文内容"') == []
+    assert _fts_rowids(service, '"新正文内容"') == [second_id]
+
+    with _connect(service.db_path) as conn:
+        conn.execute("UPDATE articles SET content = '改写后的正文' WHERE id = ?", (second_id,))
+    assert _fts_rowids(service, '"改写后的正文"') == [second_id]
+
+    with _connect(service.db_path) as conn:
+        conn.execute("DELETE FROM articles WHERE id = ?", (second_id,))
+        conn.execute("INSERT INTO articles_fts(articles_fts) VALUES ('integrity-check')")
+    assert _fts_rowids(service, '"改写后的正文"') == []
+
+
+def test_list_without_fts_table_still_uses_like(tmp_path):
+    db_path = tmp_path / "legacy_articles.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE articles (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, stock_code TEXT,"
+            " stock_name TEXT, market_type TEXT, content TEXT, score INTEGER, publish_date TEXT, created_at TEXT)"
+        )
+        # 旧库由启动迁移的 schema registry 补齐列，但没有 articles_fts
+        schema_registry.apply(conn)
+        conn.execute(
+            "INSERT INTO articles (title, stock_code, stock_name, market_type, content, publish_date)"
+            " VALUES ('贵州茅台结构分析', '600519', '贵州茅台', 'A', '正文', '2026-07-01')"
+        )
+    DatabaseFactory.initialize(str(db_path))
+    service = ArchiveService(db_path=str(db_path))
+
+    articles = asyncio.run(service.get_articles(limit=10, offset=0, keyword="600519"))
+
+    assert [a["stock_code"] for a in articles] == ["600519"]
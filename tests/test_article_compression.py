@@ -0,0 +1,143 @@
+"""文章大文本压缩：格式标记与明文兼容、压缩行仍可全文检索、回填迁移幂等、列表只取轻量列。"""
+import asyncio
+import json
+import os
+import sqlite3
+import zlib
+from pathlib import Path
+
+import pytest
+
+from database.compression import MARKER, pack_text, register_sqlite_functions, unpack_text
+from database.db_factory import DatabaseFactory
+from services.archive_service import ArchiveService, article_preview
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+LONG_BODY = "贵州茅台白酒龙头，估值回落到合理区间，结构仍在上升通道。" * 80
+LONG_JSON = json.dumps({"summary": "**结构**向上，关注回踩", "detail": ["量能温和放大"] * 200}, ensure_ascii=False)
+
+
+def _migrate(db_path):
+    original_env = os.environ.get("DB_PATH")
+    original_cwd = os.getcwd()
+    os.environ["DB_PATH"] = str(db_path)
+    os.chdir(REPO_ROOT)
+    try:
+        from scripts.run_migrations import run_migrations
+
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+        if original_env is None:
+            os.environ.pop("DB_PATH", None)
+        else:
+            os.environ["DB_PATH"] = original_env
+
+
+def _service(tmp_path) -> ArchiveService:
+    db_path = tmp_path / "stocks.db"
+    _migrate(db_path)
+    DatabaseFactory.initialize(str(db_path))
+    return ArchiveService(db_path=str(db_path))
+
+
+def _raw(db_path):
+    conn = sqlite3.connect(db_path)
+    register_sqlite_functions(conn)
+    return conn
+
+
+def test_pack_round_trip_and_plain_text_passthrough(monkeypatch):
+    packed = pack_text(LONG_BODY)
+
+    assert isinstance(packed, bytes) and packed.startswith(MARKER + b"z")
+    assert len(packed) < len(LONG_BODY.encode("utf-8")) / 5
+    assert unpack_text(packed) == LONG_BODY
+    # 短文本、None、已有的明文行原样读写
+    assert pack_text("短文本") == "短文本" and pack_text(None) is None
+    assert unpack_text("旧数据") == "旧数据" and unpack_text(None) is None
+
+    monkeypatch.setenv("DB_TEXT_COMPRESSION", "none")
+    assert pack_text(LONG_BODY) == LONG_BODY
+    monkeypatch.setenv("DB_TEXT_COMPRESSION", "zlib")
+    monkeypatch.setenv("DB_BACKEND", "postgres")
+    assert pack_text(LONG_BODY) == LONG_BODY
+
+
+def test_zstd_values_round_trip_or_fall_back_to_zlib(monkeypatch):
+    monkeypatch.setenv("DB_TEXT_COMPRESSION", "zstd")
+    packed = pack_text(LONG_BODY)
+
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        assert packed[:4] == MARKER + b"z"
+    else:
+        assert packed[:4] == MARKER + b"s"
+    assert unpack_text(packed) == LONG_BODY
+    with pytest.raises(ValueError):
+        unpack_text(MARKER + b"?" + zlib.compress(b"x"))
+
+
+def test_compressed_articles_are_searchable_and_lists_are_light(tmp_path):
+    service = _service(tmp_path)
+    article_id = service.save_article_sync({
+        "title": "贵州茅台结构分析",
+        "stock_code": "600519",
+        "stock_name": "贵州茅台",
+        "market_type": "A",
+        "content": LONG_JSON.replace("量能温和放大", "白酒龙头估值回落"),
+        "ai_score_json": LONG_JSON,
+        "score": 70,
+        "publish_date": "2026-07-01",
+    })
+
+    with _raw(service.db_path) as conn:
+        stored = conn.execute(
+            "SELECT typeof(content), typeof(ai_score_json), preview, content_length FROM articles WHERE id = ?",
+            (article_id,),
+        ).fetchone()
+    results = asyncio.run(service.search_articles("估值回落"))
+    listed = asyncio.run(service.get_articles(limit=10))
+    with_score = asyncio.run(service.get_articles(limit=10, keyword="600519", with_ai_score=True))
+    detail = asyncio.run(service.get_article_by_id(article_id))
+
+    assert stored == ("blob", "blob", "结构 向上，关注回踩", len(detail["content"]))
+    assert [r["id"] for r in results] == [article_id]
+    assert "<mark>估值回落</mark>" in results[0]["snippet"]
+    assert "content" not in listed[0] and "ai_score_json" not in listed[0]
+    assert listed[0]["preview"] == "结构 向上，关注回踩"
+    assert json.loads(with_score[0]["ai_score_json"])["summary"] == "**结构**向上，关注回踩"
+    assert detail["ai_score_json"] == LONG_JSON
+
+    assert asyncio.run(service.update_article_by_id(article_id, {"content": "改写后的正文，提到新能源"}))
+    assert asyncio.run(service.search_articles("估值回落")) == []
+    assert [r["id"] for r in asyncio.run(service.search_articles("新能源"))] == [article_id]
+
+
+def test_backfill_migration_compresses_existing_rows_idempotently(tmp_path):
+    db_path = tmp_path / "stocks.db"
+    _migrate(db_path)
+    with _raw(db_path) as conn:
+        conn.execute(
+            "INSERT INTO articles (title, stock_code, stock_name, market_type, content, ai_score_json, publish_date)"
+            " VALUES ('旧文章', '000858', '五粮液', 'A', ?, ?, '2026-06-01')",
+            (LONG_BODY, LONG_JSON),
+        )
+    stored_sql = "SELECT content, ai_score_json, preview, content_length FROM articles"
+
+    snapshots = []
+    for _ in range(2):
+        with _raw(db_path) as conn:
+            conn.execute("DELETE FROM schema_migrations WHERE name = '025_compress_article_columns.py'")
+        _migrate(db_path)
+        snapshots.append(_raw(db_path).execute(stored_sql).fetchone())
+    hits = _raw(db_path).execute("SELECT rowid FROM articles_fts WHERE articles_fts MATCH '\"合理区间\"'").fetchall()
+
+    first, second = snapshots
+    assert isinstance(first[0], bytes) and unpack_text(first[0]) == LONG_BODY
+    assert unpack_text(first[1]) == LONG_JSON
+    assert first[2] == article_preview(LONG_BODY) and first[3] == len(LONG_BODY)
+    assert second == first
+    assert len(hits) == 1
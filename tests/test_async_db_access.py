@@ -0,0 +1,386 @@
+"""async 路由/服务的数据库访问：DB 线程池行为 + 协程内同步 DB 调用静态检查。"""
+import ast
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from database.async_db import AsyncDBExecutor, db_coroutine
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCANNED = ("auth", "config", "database", "routes", "services", "utils", "web_server.py")
+
+# 直接拿连接/游标即视为同步 DB 访问
+DB_ENTRYPOINTS = {"get_connection", "get_cursor", "get_db_connection"}
+DB_FACTORY_HELPERS = {"fetchone", "fetchall", "execute", "execute_returning_id"}
+
+# 允许阻塞的协程：startup 在开始接收请求之前执行，阻塞不影响任何在途请求
+ALLOWED_COROUTINES = {"web_server.startup_event"}
+
+
+# ==================== DB 线程池 ====================
+
+def test_run_keeps_event_loop_responsive():
+    pool = AsyncDBExecutor(max_workers=2)
+
+    def slow_query():
+        time.sleep(0.3)
+        return threading.current_thread().name
+
+    async def main():
+        ticks = []
+
+        async def heartbeat():
+            while True:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        beat = asyncio.create_task(heartbeat())
+        names = await asyncio.gather(pool.run(slow_query), pool.run(slow_query))
+        beat.cancel()
+        gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+        return names, gaps
+
+    names, gaps = asyncio.run(main())
+    pool.shutdown()
+
+    assert all(name.startswith("db") for name in names)
+    # 慢查询期间心跳照常：循环从未被卡住 0.3s
+    assert max(gaps) < 0.15
+
+
+def test_pending_calls_are_bounded():
+    pool = AsyncDBExecutor(max_workers=1, max_pending=2)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def query(i):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.01)
+        with lock:
+            state["running"] -= 1
+        return i
+
+    async def main():
+        return await asyncio.gather(*(pool.run(query, i) for i in range(6)))
+
+    assert asyncio.run(main()) == list(range(6))
+    stats = pool.stats()
+    pool.shutdown()
+
+    assert state["peak"] == 1
+    assert stats["peak_in_flight"] == 2
+    assert stats["calls"] == 6
+
+
+def test_db_coroutine_runs_sync_body_off_loop():
+    loop_thread = {}
+
+    class Repo:
+        @db_coroutine
+        def load(self, key):
+            return key, threading.get_ident()
+
+    async def main():
+        loop_thread["id"] = threading.get_ident()
+        return await Repo().load("k")
+
+    key, thread_id = asyncio.run(main())
+
+    assert key == "k"
+    assert thread_id != loop_thread["id"]
+
+
+def test_failures_propagate_and_are_counted():
+    pool = AsyncDBExecutor(max_workers=1)
+
+    def broken():
+        raise RuntimeError("db locked")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(pool.run(broken))
+    assert pool.stats()["failures"] == 1
+    pool.shutdown()
+
+
+# ==================== 协程内同步 DB 调用检查 ====================
+
+def _module_name(path: Path) -> str:
+    parts = list(path.relative_to(REPO_ROOT).with_suffix("").parts)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _iter_sources():
+    for entry in SCANNED:
+        path = REPO_ROOT / entry
+        files = [path] if path.suffix == ".py" else sorted(path.rglob("*.py"))
+        for file in files:
+            tree = ast.parse(file.read_text(encoding="utf-8"), str(file))
+            yield _module_name(file), tree, file.name == "__init__.py"
+
+
+def _decorator_names(node):
+    for d in node.decorator_list:
+        d = d.func if isinstance(d, ast.Call) else d
+        if isinstance(d, ast.Name):
+            yield d.id
+        elif isinstance(d, ast.Attribute):
+            yield d.attr
+
+
+def _is_db_coroutine(node) -> bool:
+    return "db_coroutine" in set(_decorator_names(node))
+
+
+def _is_cached_factory(node) -> bool:
+    """@lru_cache 的工厂函数只在进程内首次调用时构造一次，不算每请求阻塞"""
+    return bool({"lru_cache", "cache"} & set(_decorator_names(node)))
+
+
+def _walk_body(node, nested=False):
+    """
+    遍历函数体
+
+    协程里不进入嵌套函数/lambda（它们通常被交给线程执行）；
+    同步函数里的嵌套函数（如 run_with_busy_retry 的回调）视为同线程执行，nested=True 时一并遍历。
+    """
+    skipped = (ast.AsyncFunctionDef, ast.ClassDef) if nested else (
+        ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef
+    )
+    stack = list(node.body)
+    while stack:
+        child = stack.pop()
+        if isinstance(child, skipped):
+            continue
+        yield child
+        stack.extend(ast.iter_child_nodes(child))
+
+
+class _Module:
+    def __init__(self, name, tree, is_package):
+        self.name = name
+        package = name.split(".") if is_package else name.split(".")[:-1]
+        self.imports = {}  # alias -> (module, attr)
+        self.classes = {}  # class name -> {attr: type expr}
+        self.instances = {}  # module-level alias -> Call expr
+        self.functions = []  # (name 或 Class.method, node, class name or None)
+        # 函数内的延迟 import 也计入（同名即视为同一对象）
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module:
+                base = node.module
+                if node.level:
+                    base = ".".join(package[: len(package) - node.level + 1] + [node.module])
+                for alias in node.names:
+                    self.imports.setdefault(alias.asname or alias.name, (base, alias.name))
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        self.instances[target.id] = node.value
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions.append((node.name, node, None))
+            elif isinstance(node, ast.ClassDef):
+                attrs = {}
+                for item in node.body:
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        self.functions.append((f"{node.name}.{item.name}", item, node.name))
+                        for sub in ast.walk(item):
+                            if (
+                                isinstance(sub, ast.Assign)
+                                and isinstance(sub.value, ast.Call)
+                                and len(sub.targets) == 1
+                                and isinstance(sub.targets[0], ast.Attribute)
+                                and isinstance(sub.targets[0].value, ast.Name)
+                                and sub.targets[0].value.id == "self"
+                            ):
+                                attrs[sub.targets[0].attr] = sub.value
+                self.classes[node.name] = attrs
+
+
+class _Project:
+    """粗粒度调用图：按 (模块, 函数名) 解析调用，找出会同步访问数据库的函数"""
+
+    def __init__(self):
+        self.modules = {name: _Module(name, tree, is_package) for name, tree, is_package in _iter_sources()}
+
+    def _lookup(self, module, name, depth=0):
+        """名字 -> ('class'|'func'|'instance', module, name)"""
+        mod = self.modules.get(module)
+        if mod is None or depth > 5:
+            return None
+        if name in mod.classes:
+            return ("class", module, name)
+        if any(fn == name and cls is None for fn, _, cls in mod.functions):
+            return ("func", module, name)
+        if name in mod.instances:
+            return ("instance", module, name)
+        if name in mod.imports:
+            return self._lookup(*mod.imports[name], depth + 1)
+        if name in self.modules and module != name:
+            return None
+        return None
+
+    def _class_of(self, module, expr, local_types):
+        """表达式的类型（仅识别 Cls() / 已知实例 / self.attr 链）-> (module, class)"""
+        if isinstance(expr, ast.Call):
+            return self._class_of(module, expr.func, local_types) if isinstance(expr.func, ast.Name) else None
+        if isinstance(expr, ast.Name):
+            if expr.id in local_types:
+                return local_types[expr.id]
+            found = self._lookup(module, expr.id)
+            if found is None:
+                return None
+            kind, mod, name = found
+            if kind == "class":
+                return (mod, name)
+            if kind == "instance":
+                return self._class_of(mod, self.modules[mod].instances[name], {})
+            return None
+        if isinstance(expr, ast.Attribute):
+            owner = self._class_of(module, expr.value, local_types)
+            if owner is None:
+                return None
+            attr_expr = self.modules[owner[0]].classes.get(owner[1], {}).get(expr.attr)
+            return self._class_of(owner[0], attr_expr, {}) if attr_expr is not None else None
+        return None
+
+    def resolve(self, module, call, local_types):
+        """调用目标 -> (module, function name)；无法解析返回 None"""
+        func = call.func
+        if isinstance(func, ast.Name):
+            found = self._lookup(module, func.id)
+            if found is None:
+                return None
+            kind, mod, name = found
+            if kind == "class":
+                return (mod, f"{name}.__init__")
+            return (mod, name) if kind == "func" else None
+        if isinstance(func, ast.Attribute):
+            owner = self._class_of(module, func.value, local_types)
+            if owner is not None:
+                return (owner[0], f"{owner[1]}.{func.attr}")
+        return None
+
+    @staticmethod
+    def direct_db_call(call) -> bool:
+        func = call.func
+        if isinstance(func, ast.Name):
+            return func.id in DB_ENTRYPOINTS
+        if isinstance(func, ast.Attribute):
+            if func.attr in DB_ENTRYPOINTS:
+                return True
+            base = ast.unparse(func.value)
+            if base == "DatabaseFactory":
+                return func.attr in DB_FACTORY_HELPERS
+            return base == "sqlite3" and func.attr == "connect"
+        return False
+
+    def _local_types(self, module, node, cls, nested):
+        types = {}
+        if cls is not None:
+            types["self"] = (module, cls)
+            types["cls"] = (module, cls)
+        for sub in _walk_body(node, nested):
+            if isinstance(sub, ast.Assign) and len(sub.targets) == 1 and isinstance(sub.targets[0], ast.Name):
+                found = self._class_of(module, sub.value, types)
+                if found is not None:
+                    types[sub.targets[0].id] = found
+        return types
+
+    def _calls(self, module, node, cls, nested=False):
+        types = self._local_types(module, node, cls, nested)
+        awaited = {id(sub.value) for sub in _walk_body(node, nested) if isinstance(sub, ast.Await)}
+        for sub in _walk_body(node, nested):
+            if isinstance(sub, ast.Call) and id(sub) not in awaited:
+                yield sub, self.resolve(module, sub, types)
+
+    def blocking_functions(self):
+        """同步且（直接或间接）访问数据库的函数集合"""
+        sync = {}
+        for module, mod in self.modules.items():
+            for name, node, cls in mod.functions:
+                if isinstance(node, ast.FunctionDef) and not (_is_db_coroutine(node) or _is_cached_factory(node)):
+                    sync.setdefault((module, name), []).append((node, cls))
+        edges = {}
+        blocking = set()
+        for key, defs in sync.items():
+            targets = set()
+            for node, cls in defs:
+                for call, target in self._calls(key[0], node, cls, nested=True):
+                    if self.direct_db_call(call):
+                        blocking.add(key)
+                    elif target is not None:
+                        targets.add(target)
+            edges[key] = targets
+        changed = True
+        while changed:
+            changed = False
+            for key, targets in edges.items():
+                if key not in blocking and targets & blocking:
+                    blocking.add(key)
+                    changed = True
+        return blocking
+
+    def violations(self):
+        blocking = self.blocking_functions()
+        found = []
+        for module, mod in self.modules.items():
+            for name, node, cls in mod.functions:
+                coroutines = [n for n in ast.walk(node) if isinstance(n, ast.AsyncFunctionDef)]
+                for coro in coroutines:
+                    if f"{module}.{coro.name}" in ALLOWED_COROUTINES:
+                        continue
+                    for call, target in self._calls(module, coro, cls):
+                        if self.direct_db_call(call) or target in blocking:
+                            found.append(f"{module}:{call.lineno} {coro.name} -> {ast.unparse(call.func)}")
+        return sorted(set(found))
+
+
+def test_no_sync_db_calls_inside_coroutines():
+    violations = _Project().violations()
+    assert violations == [], (
+        "async 函数里直接调用了同步数据库访问，请改用 `await run_db(...)` / `@db_coroutine`，"
+        "或把不需要 await 的路由改成普通 def：\n" + "\n".join(violations)
+    )
+
+
+def test_checker_flags_direct_and_indirect_db_calls(tmp_path, monkeypatch):
+    pkg = tmp_path / "services"
+    pkg.mkdir()
+    (pkg / "repo.py").write_text(
+        "from database.db_factory import DatabaseFactory\n"
+        "class Repo:\n"
+        "    def _conn(self):\n"
+        "        return DatabaseFactory.get_connection()\n"
+        "    def load(self):\n"
+        "        return self._conn().execute('SELECT 1')\n"
+        "repo = Repo()\n",
+        encoding="utf-8",
+    )
+    (pkg / "api.py").write_text(
+        "from database.async_db import run_db\n"
+        "from services.repo import repo, Repo\n"
+        "async def bad():\n"
+        "    return repo.load()\n"
+        "async def bad_local():\n"
+        "    r = Repo()\n"
+        "    return r.load()\n"
+        "async def good():\n"
+        "    return await run_db(repo.load)\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setitem(globals(), "REPO_ROOT", tmp_path)
+    monkeypatch.setitem(globals(), "SCANNED", ("services",))
+
+    violations = _Project().violations()
+
+    assert violations == [
+        "services.api:4 bad -> repo.load",
+        "services.api:7 bad_local -> r.load",
+    ]
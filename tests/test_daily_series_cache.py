@@ -0,0 +1,109 @@
+"""单股票日线序列缓存：窗口切片、只补缺失前后缘、get_daily 复用。"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from services.tushare.daily_series import DailySeriesCache
+
+
+def _bars(start: str, end: str) -> pd.DataFrame:
+    """start..end 之间工作日的日线，tushare 风格倒序。"""
+    days = pd.bdate_range(start, end)
+    df = pd.DataFrame({
+        'ts_code': '600519.SH',
+        'trade_date': [d.strftime('%Y%m%d') for d in days],
+        'close': [float(i) for i in range(len(days))],
+    })
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+class RecordingFetch:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        if self.fail:
+            return None
+        return _bars(start, end)
+
+
+def test_shorter_window_is_sliced_without_upstream_call():
+    cache = DailySeriesCache()
+    fetch = RecordingFetch()
+
+    long_df = cache.get_range('600519.SH', '20250601', '20260601', fetch)
+    short_df = cache.get_range('600519.SH', '20260520', '20260601', fetch)
+
+    assert fetch.calls == [('20250601', '20260601')]
+    assert short_df['trade_date'].tolist() == long_df['trade_date'].tolist()[:len(short_df)]
+    assert short_df['trade_date'].iloc[0] == '20260601'  # 与 tushare 一致倒序
+    assert short_df['trade_date'].min() >= '20260520'
+    assert cache.stats()['hits'] == 1
+
+
+def test_longer_window_only_fetches_missing_head():
+    cache = DailySeriesCache()
+    fetch = RecordingFetch()
+
+    cache.get_range('600519.SH', '20260301', '20260601', fetch)
+    df = cache.get_range('600519.SH', '20250601', '20260601', fetch)
+
+    assert fetch.calls == [('20260301', '20260601'), ('20250601', '20260228')]
+    assert df['trade_date'].is_unique
+    assert df['trade_date'].min() == '20250602'
+    assert df['trade_date'].max() == '20260601'
+
+
+def test_later_end_fetches_only_tail_from_last_covered_day():
+    cache = DailySeriesCache()
+    fetch = RecordingFetch()
+
+    cache.get_range('600519.SH', '20260101', '20260601', fetch)
+    df = cache.get_range('600519.SH', '20260101', '20260610', fetch)
+
+    assert fetch.calls[-1] == ('20260601', '20260610')
+    assert df['trade_date'].is_unique
+    assert df['trade_date'].iloc[0] == '20260610'
+
+
+def test_tail_covering_today_is_refreshed_after_ttl():
+    cache = DailySeriesCache()
+    fetch = RecordingFetch()
+    today = datetime.now().strftime('%Y%m%d')
+    start = (datetime.now() - timedelta(days=30)).strftime('%Y%m%d')
+
+    cache.get_range('600519.SH', start, today, fetch)
+    cache.get_range('600519.SH', start, today, fetch)
+    assert len(fetch.calls) == 1
+
+    cache._series['600519.SH'].tail_fetched_at -= cache.TAIL_TTL_SEC + 1
+    cache.get_range('600519.SH', start, today, fetch)
+    assert fetch.calls[-1] == (today, today)
+
+
+def test_failed_required_fetch_returns_none():
+    cache = DailySeriesCache()
+
+    assert cache.get_range('600519.SH', '20260101', '20260601', RecordingFetch(fail=True)) is None
+    assert cache.stats()['fetch_failures'] == 1
+
+
+def test_get_daily_windows_share_one_upstream_call(monkeypatch):
+    from services.tushare.client import TushareClient, tushare_client
+
+    calls = []
+
+    def fake_query(self, api_name, **kwargs):
+        calls.append((api_name, kwargs))
+        return _bars(kwargs['start_date'], kwargs['end_date'])
+
+    monkeypatch.setattr(TushareClient, 'query', fake_query)
+
+    trend_df = tushare_client.get_daily('600519.SH', start_date='20250601', end_date='20260601')
+    price_df = tushare_client.get_daily('600519.SH', start_date='20260522', end_date='20260601')
+    rs_df = tushare_client.get_daily('600519.SH', start_date='20260301', end_date='20260601')
+
+    assert len(calls) == 1
+    assert len(trend_df) > len(rs_df) > len(price_df) > 0
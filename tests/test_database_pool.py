@@ -0,0 +1,122 @@
+"""DatabaseFactory 线程亲和连接池：复用、一次性 PRAGMA、归还回滚、健康检查与容量上限。"""
+import sqlite3
+import threading
+
+from database.connection_pool import SQLiteConnectionPool
+from database.db_factory import DatabaseFactory, dict_factory
+
+
+def _pool(tmp_path, opened, **kwargs):
+    def connect(path):
+        opened.append(path)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = dict_factory
+        return conn
+
+    return SQLiteConnectionPool(connect, **kwargs), str(tmp_path / "pool.db")
+
+
+def test_connection_is_reused_within_thread(tmp_path):
+    opened = []
+    pool, path = _pool(tmp_path, opened)
+
+    first = pool.acquire(path)
+    raw = first._conn
+    first.close()
+    second = pool.acquire(path)
+
+    assert second._conn is raw
+    assert len(opened) == 1
+    assert pool.stats()["reused"] == 1
+
+
+def test_dropping_last_reference_returns_connection(tmp_path):
+    opened = []
+    pool, path = _pool(tmp_path, opened)
+
+    def query():
+        with pool.acquire(path) as conn:
+            return conn.execute("SELECT 1 AS one").fetchone()
+
+    assert query() == {"one": 1}
+    assert query() == {"one": 1}
+    assert len(opened) == 1
+
+
+def test_uncommitted_transaction_is_rolled_back_on_release(tmp_path):
+    opened = []
+    pool, path = _pool(tmp_path, opened)
+    with pool.acquire(path) as conn:
+        conn.execute("CREATE TABLE t (v INTEGER)")
+
+    conn = pool.acquire(path)
+    conn.execute("INSERT INTO t (v) VALUES (1)")
+    conn.close()
+
+    with pool.acquire(path) as conn:
+        assert conn.execute("SELECT COUNT(*) AS c FROM t").fetchone()["c"] == 0
+
+
+def test_threads_do_not_share_connections(tmp_path):
+    opened = []
+    pool, path = _pool(tmp_path, opened)
+    main = pool.acquire(path)
+    main_raw = main._conn
+    main.close()
+
+    seen = {}
+
+    def worker():
+        conn = pool.acquire(path)
+        seen["raw"] = conn._conn
+        conn.close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert seen["raw"] is not main_raw
+    assert len(opened) == 2
+
+
+def test_unhealthy_idle_connection_is_replaced(tmp_path):
+    opened = []
+    pool, path = _pool(tmp_path, opened, healthcheck_sec=0)
+    pool.acquire(path).close()
+    idle_conn, _ = pool._thread_idle()[path][0]
+    idle_conn.close()  # 模拟空闲期间底层连接失效
+
+    with pool.acquire(path) as fresh:
+        assert fresh.execute("SELECT 1 AS one").fetchone() == {"one": 1}
+    assert pool.stats()["healthcheck_failures"] == 1
+    assert len(opened) == 2
+
+
+def test_idle_connections_are_capped(tmp_path):
+    opened = []
+    pool, path = _pool(tmp_path, opened, max_size=1, max_idle_per_thread=1)
+    a = pool.acquire(path)
+    b = pool.acquire(path)
+    a.close()
+    b.close()
+
+    assert pool.stats()["idle"] == 1
+    assert pool.stats()["closed"] == 1
+
+
+def test_factory_configures_each_connection_once(tmp_path, monkeypatch):
+    configured = []
+    monkeypatch.setattr(
+        DatabaseFactory,
+        "_configure_connection",
+        classmethod(lambda cls, conn: configured.append(conn)),
+    )
+    DatabaseFactory.initialize(str(tmp_path / "factory.db"))
+
+    for _ in range(5):
+        assert DatabaseFactory.fetchone("SELECT 1 AS one") == {"one": 1}
+    DatabaseFactory.execute("CREATE TABLE t (v INTEGER)")
+    assert DatabaseFactory.execute_returning_id("INSERT INTO t (v) VALUES (7)") == 1
+    assert DatabaseFactory.fetchall("SELECT v FROM t") == [{"v": 7}]
+
+    assert len(configured) == 1
@@ -0,0 +1,93 @@
+"""SQL 方言：SQLite 写法到 PostgreSQL 的改写（占位符、INSERT OR IGNORE、函数、表结构探测），字面量不受影响。"""
+import sqlite3
+
+import pytest
+
+from database.dialect import UnsupportedSQL, get_dialect, statement_kind, upsert_sql
+
+pg = get_dialect("postgres")
+
+
+def test_sqlite_dialect_is_identity():
+    sql = "INSERT OR IGNORE INTO t (a) VALUES (?)"
+    assert get_dialect("sqlite").translate(sql) == sql
+
+
+def test_placeholders_and_percent_outside_and_inside_literals():
+    sql = "SELECT * FROM articles WHERE title LIKE ? AND note = 'why? 100%' AND id = ?"
+
+    assert pg.translate(sql) == (
+        "SELECT * FROM articles WHERE title ILIKE %s AND note = 'why? 100%%' AND id = %s"
+    )
+    # 不带参数的脚本：% 与 ? 都原样保留
+    assert pg.translate("SELECT '50%'", placeholders=False) == "SELECT '50%'"
+
+
+def test_insert_or_ignore_becomes_on_conflict_do_nothing():
+    assert pg.translate("INSERT OR IGNORE INTO t (a, b) VALUES (?, ?);") == (
+        "INSERT INTO t (a, b) VALUES (%s, %s) ON CONFLICT DO NOTHING"
+    )
+    assert pg.translate("INSERT OR IGNORE INTO t (a) VALUES (?) RETURNING id") == (
+        "INSERT INTO t (a) VALUES (%s) ON CONFLICT DO NOTHING RETURNING id"
+    )
+    with pytest.raises(UnsupportedSQL):
+        pg.translate("INSERT OR REPLACE INTO t (a) VALUES (?)")
+
+
+def test_sqlite_functions_are_rewritten():
+    sql = (
+        "SELECT GROUP_CONCAT(stock_code) AS s, IFNULL(name, '') AS n FROM analysis_records"
+        " WHERE datetime(created_at) >= datetime('now', ?)"
+    )
+
+    assert pg.translate(sql) == (
+        "SELECT STRING_AGG(CAST(stock_code AS TEXT), ',') AS s, COALESCE(name, '') AS n FROM analysis_records"
+        " WHERE TO_CHAR(CAST(created_at AS TIMESTAMP), 'YYYY-MM-DD HH24:MI:SS')"
+        " >= TO_CHAR((NOW() AT TIME ZONE 'UTC') + CAST(%s AS INTERVAL), 'YYYY-MM-DD HH24:MI:SS')"
+    )
+    assert pg.translate("SELECT GROUP_CONCAT(DISTINCT code, '|') FROM t") == (
+        "SELECT STRING_AGG(DISTINCT CAST(code AS TEXT), '|') FROM t"
+    )
+
+
+def test_schema_probes_and_pragmas():
+    assert "information_schema.tables" in pg.translate(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=? LIMIT 1"
+    )
+    info = pg.translate("PRAGMA table_info(judgments)")
+    assert "information_schema.columns" in info and "table_name = 'judgments'" in info
+    assert pg.translate("PRAGMA journal_mode=WAL") == "SELECT 1 WHERE FALSE"
+    assert pg.translate("BEGIN IMMEDIATE") == "BEGIN"
+
+
+def test_ddl_keeps_sqlite_storage_semantics():
+    ddl = pg.translate(
+        "CREATE TABLE IF NOT EXISTS x (id INTEGER PRIMARY KEY AUTOINCREMENT, d DATE NOT NULL,"
+        " price REAL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+        placeholders=False,
+    )
+
+    assert "id BIGSERIAL PRIMARY KEY" in ddl
+    assert "d TEXT NOT NULL" in ddl and "price DOUBLE PRECISION" in ddl
+    assert "created_at TEXT DEFAULT (TO_CHAR((NOW() AT TIME ZONE 'UTC'), 'YYYY-MM-DD HH24:MI:SS'))" in ddl
+    # 索引语句里的列名不被当成类型改写
+    assert pg.translate("CREATE INDEX i ON t(date)", placeholders=False) == "CREATE INDEX i ON t(date)"
+
+
+def test_statement_kind_skips_comments():
+    assert statement_kind("-- note\n  insert into t values (1)") == "INSERT"
+    assert statement_kind("/* x */ ROLLBACK TO sp") == "ROLLBACK"
+
+
+def test_upsert_sql_runs_on_sqlite():
+    sql = upsert_sql("kv", ("k", "v", "n"), ("k",))
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE kv (k TEXT PRIMARY KEY, v TEXT, n INTEGER)")
+    conn.execute(sql, ("a", "1", 1))
+    conn.execute(sql, ("a", "2", 2))
+    conn.execute(upsert_sql("kv", ("k", "v", "n"), ("k",), update=()), ("a", "3", 3))
+
+    assert conn.execute("SELECT v, n FROM kv").fetchall() == [("2", 2)]
+    assert sql == (
+        "INSERT INTO kv (k, v, n) VALUES (?, ?, ?) ON CONFLICT(k) DO UPDATE SET v = excluded.v, n = excluded.n"
+    )
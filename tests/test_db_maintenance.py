@@ -0,0 +1,134 @@
+"""SQLite 维护：TRUNCATE 检查点截断 WAL、新库增量 vacuum 归还空闲页、调度任务记录耗时与文件大小、完整性失败立即告警。"""
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from database.db_factory import DatabaseFactory
+from database.maintenance import SQLiteMaintenance
+from database.write_queue import write_queue
+from services import db_maintenance_scheduler
+from services.db_maintenance_scheduler import DbMaintenanceScheduler, is_quiet_time, maintenance_health
+from services.job_health_tracker import job_health_tracker
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SH = ZoneInfo("Asia/Shanghai")
+TRADING = datetime(2026, 7, 1, 10, 0, tzinfo=SH)  # 周三上午
+NIGHT = datetime(2026, 7, 1, 3, 30, tzinfo=SH)
+
+
+def _migrated_db(tmp_path) -> Path:
+    db_path = tmp_path / "stocks.db"
+    original_env = os.environ.get("DB_PATH")
+    original_cwd = os.getcwd()
+    os.environ["DB_PATH"] = str(db_path)
+    os.chdir(REPO_ROOT)
+    try:
+        from scripts.run_migrations import run_migrations
+
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+        if original_env is None:
+            os.environ.pop("DB_PATH", None)
+        else:
+            os.environ["DB_PATH"] = original_env
+    DatabaseFactory.initialize(str(db_path))
+    return db_path
+
+
+def _fill_wal(db_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    conn.execute("CREATE TABLE IF NOT EXISTS blobs (id INTEGER PRIMARY KEY, data BLOB)")
+    conn.executemany("INSERT INTO blobs (data) VALUES (?)", [(os.urandom(4096),) for _ in range(200)])
+    conn.commit()
+    return conn
+
+
+def test_truncate_checkpoint_empties_wal(tmp_path):
+    db_path = tmp_path / "wal.db"
+    writer = _fill_wal(db_path)
+    maintenance = SQLiteMaintenance(str(db_path))
+    try:
+        result = maintenance.checkpoint("TRUNCATE")
+    finally:
+        writer.close()
+
+    assert result["mode"] == "TRUNCATE" and result["busy"] == 0
+    assert result["wal_bytes_before"] > 0 and result["wal_bytes_after"] == 0
+
+
+def test_new_database_reclaims_free_pages_incrementally(tmp_path):
+    db_path = _migrated_db(tmp_path)
+    writer = _fill_wal(db_path)
+    writer.execute("DELETE FROM blobs")
+    writer.commit()
+    writer.close()
+    maintenance = SQLiteMaintenance(str(db_path))
+
+    vacuum = maintenance.incremental_vacuum()
+    optimize = maintenance.optimize()
+    integrity = maintenance.integrity_check(full=True)
+
+    assert vacuum["auto_vacuum"] == "incremental"
+    assert vacuum["freelist_pages_before"] > 0 and vacuum["freelist_pages_after"] == 0
+    assert vacuum["reclaimed_bytes"] > 0
+    assert optimize["duration_ms"] >= 0
+    assert integrity == {"check": "integrity_check", "ok": True, "errors": [], "duration_ms": integrity["duration_ms"]}
+
+
+def test_checkpoint_mode_follows_market_hours(tmp_path, monkeypatch):
+    db_path = _migrated_db(tmp_path)
+    monkeypatch.setattr(db_maintenance_scheduler, "db_maintenance", SQLiteMaintenance(str(db_path)))
+
+    busy = DbMaintenanceScheduler._run_checkpoint_job(now=TRADING)
+    quiet = DbMaintenanceScheduler._run_checkpoint_job(now=NIGHT)
+    monkeypatch.setenv("DB_WAL_TRUNCATE_MB", "0")
+    oversized = DbMaintenanceScheduler._run_checkpoint_job(now=TRADING)
+
+    assert not is_quiet_time(TRADING) and is_quiet_time(NIGHT)
+    assert is_quiet_time(datetime(2026, 7, 4, 10, 0, tzinfo=SH))  # 周六
+    assert (busy["mode"], quiet["mode"], oversized["mode"]) == ("PASSIVE", "TRUNCATE", "TRUNCATE")
+
+
+def test_nightly_job_records_durations_and_sizes(tmp_path, monkeypatch):
+    db_path = _migrated_db(tmp_path)
+    monkeypatch.setattr(db_maintenance_scheduler, "db_maintenance", SQLiteMaintenance(str(db_path)))
+
+    metrics = DbMaintenanceScheduler._run_maintenance_job(now=NIGHT)
+    assert write_queue.flush()
+    row = DatabaseFactory.fetchone(
+        "SELECT last_status, last_duration_ms, last_metrics FROM job_health WHERE job_id = 'db_maintenance'"
+    )
+    job_health_tracker.snapshot()
+    health = maintenance_health()
+
+    assert metrics["optimize"]["full_analyze"] is False and metrics["integrity"]["check"] == "quick_check"
+    assert row["last_status"] == "ok" and row["last_duration_ms"] > 0
+    assert json.loads(row["last_metrics"])["sizes_after"]["db_bytes"] == os.path.getsize(db_path)
+    assert health["db_mb"] >= 0 and health["db_maintenance"]["last_status"] == "ok"
+
+
+def test_integrity_failure_alerts_immediately(tmp_path, monkeypatch):
+    db_path = _migrated_db(tmp_path)
+    maintenance = SQLiteMaintenance(str(db_path))
+    monkeypatch.setattr(
+        maintenance,
+        "integrity_check",
+        lambda full=False: {"check": "quick_check", "ok": False, "errors": ["page 7 is never used"], "duration_ms": 1},
+    )
+    monkeypatch.setattr(db_maintenance_scheduler, "db_maintenance", maintenance)
+    alerts = []
+    monkeypatch.setattr(
+        "services.ops_alert_service.ops_alert_service.send_job_failure_alert",
+        lambda job_id, failures, error: alerts.append((job_id, failures, error)),
+    )
+
+    DbMaintenanceScheduler._run_maintenance_job(now=NIGHT)
+
+    assert alerts == [("db_maintenance", 1, "quick_check failed: page 7 is never used")]
+    assert job_health_tracker.get("db_maintenance")["last_status"] == "fail"
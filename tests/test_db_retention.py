@@ -0,0 +1,206 @@
+"""分区保留：过期整月搬到月度归档库并生成汇总，最新检查 / 被邀请人记录留在热库，重跑幂等，历史可合并查询。"""
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from database.db_factory import DatabaseFactory
+from database.retention import RetentionManager
+from database.write_queue import write_queue
+from services import db_maintenance_scheduler
+from services.db_maintenance_scheduler import DbMaintenanceScheduler
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+TODAY = date(2026, 10, 19)  # analysis_records 保留 180 天 → 2026-04-01 之前的整月过期
+
+
+def _migrated_db(tmp_path) -> Path:
+    db_path = tmp_path / "stocks.db"
+    original_env = os.environ.get("DB_PATH")
+    original_cwd = os.getcwd()
+    os.environ["DB_PATH"] = str(db_path)
+    os.chdir(REPO_ROOT)
+    try:
+        from scripts.run_migrations import run_migrations
+
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+        if original_env is None:
+            os.environ.pop("DB_PATH", None)
+        else:
+            os.environ["DB_PATH"] = original_env
+    DatabaseFactory.initialize(str(db_path))
+    return db_path
+
+
+def _seed(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO analysis_records (user_id, stock_code, analysis_date) VALUES (?, ?, ?)",
+        [
+            ("u1", "600519", "2026-02-03"),
+            ("u1", "000001", "2026-02-17"),
+            ("u2", "600519", "2026-03-31"),
+            ("invitee", "300750", "2026-02-10"),
+            ("u1", "600519", "2026-04-01"),
+            ("u2", "000001", "2026-10-18"),
+        ],
+    )
+    conn.execute(
+        "INSERT INTO invite_acceptances (inviter_id, invitee_id, invite_code) VALUES ('u1', 'invitee', 'ABCD1234')"
+    )
+    conn.executemany(
+        "INSERT INTO judgment_checks (judgment_id, check_time, current_structure_status, created_at) VALUES (?, ?, ?, ?)",
+        [
+            ("j1", "2026-01-05 15:00:00", "holding", "2026-01-05 15:00:00"),
+            ("j1", "2026-01-12 15:00:00", "broken", "2026-01-12 15:00:00"),
+            ("j2", "2026-10-01 15:00:00", "holding", "2026-10-01 15:00:00"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+def _hot(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_expired_months_move_to_monthly_archives_with_rollups(tmp_path):
+    db_path = _migrated_db(tmp_path)
+    _seed(db_path)
+    manager = RetentionManager(str(db_path))
+
+    result = manager.run(today=TODAY, tables=["analysis_records"])
+
+    assert result["tables"]["analysis_records"] == {
+        "cutoff": "2026-04-01",
+        "months": {"2026-02": 2, "2026-03": 1},
+        "moved": 3,
+    }
+    assert manager.archived_months() == ["2026-02", "2026-03"]
+    assert _hot(db_path, "SELECT user_id, analysis_date FROM analysis_records ORDER BY analysis_date") == [
+        ("invitee", "2026-02-10"),
+        ("u1", "2026-04-01"),
+        ("u2", "2026-10-18"),
+    ]
+    archived = sqlite3.connect(manager.archive_path("2026-02"))
+    assert archived.execute("SELECT COUNT(*) FROM analysis_records").fetchone()[0] == 2
+    archived.close()
+    rollups = {(row["period"], row["row_count"], row["distinct_users"]) for row in manager.rollups("analysis_records")}
+    assert rollups == {("2026-02", 2, 1), ("2026-03", 1, 1)}
+
+
+def test_latest_check_per_judgment_stays_hot(tmp_path):
+    db_path = _migrated_db(tmp_path)
+    _seed(db_path)
+    manager = RetentionManager(str(db_path))
+
+    manager.run(today=TODAY, tables=["judgment_checks"])
+
+    assert _hot(db_path, "SELECT judgment_id, current_structure_status FROM judgment_checks ORDER BY id") == [
+        ("j1", "broken"),
+        ("j2", "holding"),
+    ]
+    assert [(row["dimension"], row["row_count"]) for row in manager.rollups("judgment_checks")] == [("holding", 1)]
+
+
+def test_rerun_is_idempotent_and_history_query_spans_archives(tmp_path, monkeypatch):
+    db_path = _migrated_db(tmp_path)
+    _seed(db_path)
+    manager = RetentionManager(str(db_path))
+    manager.run(today=TODAY)
+
+    # 主库后来补的列同步到已有归档库；旧行在历史查询里为 NULL
+    conn = sqlite3.connect(db_path)
+    conn.execute("ALTER TABLE analysis_records ADD COLUMN source TEXT")
+    conn.execute(
+        "INSERT INTO analysis_records (user_id, stock_code, analysis_date, source) "
+        "VALUES ('u3', '600036', '2026-02-20', 'web')"
+    )
+    conn.commit()
+    conn.close()
+    monkeypatch.setenv("DB_RETENTION_BATCH_SIZE", "1")
+    second = manager.run(today=TODAY, tables=["analysis_records"])
+
+    assert second["tables"]["analysis_records"]["months"] == {"2026-02": 1}
+    history = manager.query_history("analysis_records", where="user_id != ?", params=("invitee",))
+    assert [(row["user_id"], row["analysis_date"], row["source"]) for row in history] == [
+        ("u2", "2026-10-18", None),
+        ("u1", "2026-04-01", None),
+        ("u2", "2026-03-31", None),
+        ("u3", "2026-02-20", "web"),
+        ("u1", "2026-02-17", None),
+        ("u1", "2026-02-03", None),
+    ]
+    ranged = manager.query_history("analysis_records", since="2026-03-01", until="2026-04-01")
+    assert [row["analysis_date"] for row in ranged] == ["2026-03-31"]
+    assert [(row["period"], row["row_count"]) for row in manager.rollups("analysis_records")] == [
+        ("2026-03", 1),
+        ("2026-02", 3),
+    ]
+
+
+class _CrashBeforeDelete:
+    """主库 DELETE 之前「崩溃」的连接：模拟归档库已提交、主库删除未执行"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql, *args):
+        if sql.lstrip().startswith("DELETE FROM main."):
+            raise sqlite3.OperationalError("simulated crash")
+        return self._conn.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_interrupted_batch_keeps_rows_and_rerun_completes(tmp_path, monkeypatch):
+    db_path = _migrated_db(tmp_path)
+    _seed(db_path)
+    manager = RetentionManager(str(db_path))
+    real_connect = manager._connect
+
+    @contextmanager
+    def crashing_connect():
+        with real_connect() as conn:
+            yield _CrashBeforeDelete(conn)
+
+    monkeypatch.setattr(manager, "_connect", crashing_connect)
+    crashed = manager.run(today=TODAY, tables=["analysis_records"])
+    monkeypatch.undo()
+
+    assert "error" in crashed["tables"]["analysis_records"]
+    # 归档库已有副本，主库行也还在：中断不丢行
+    assert len(_hot(db_path, "SELECT id FROM analysis_records")) == 6
+    archived = sqlite3.connect(manager.archive_path("2026-02"))
+    assert archived.execute("SELECT COUNT(*) FROM analysis_records").fetchone()[0] == 2
+    archived.close()
+
+    rerun = manager.run(today=TODAY, tables=["analysis_records"])
+
+    assert rerun["tables"]["analysis_records"]["moved"] == 3
+    assert len(_hot(db_path, "SELECT id FROM analysis_records")) == 3
+    assert len(manager.query_history("analysis_records")) == 6
+
+
+def test_nightly_retention_job_records_metrics(tmp_path, monkeypatch):
+    db_path = _migrated_db(tmp_path)
+    _seed(db_path)
+    monkeypatch.setattr(db_maintenance_scheduler, "retention_manager", RetentionManager(str(db_path)))
+
+    now = datetime(2026, 10, 19, 3, 0, tzinfo=ZoneInfo("Asia/Shanghai"))
+    result = DbMaintenanceScheduler._run_retention_job(now=now)
+    assert write_queue.flush()
+    row = DatabaseFactory.fetchone("SELECT last_status FROM job_health WHERE job_id = 'db_retention'")
+
+    assert result["moved"] == 4 and row["last_status"] == "ok"
+    monkeypatch.setenv("DB_RETENTION_ENABLED", "false")
+    assert DbMaintenanceScheduler._run_retention_job(now=now) is None
@@ -0,0 +1,129 @@
+"""EnhancementOrchestrator 并发执行与模块级截止时间。"""
+import threading
+import time
+
+from services.tushare import orchestrator
+from services.tushare.orchestrator import EnhancementOrchestrator
+from services.tushare.rate_limiter import BATCH, current_priority, tushare_priority
+from services.tushare.schemas import ModuleResult
+
+
+class SleepyEnhancer:
+    def __init__(self, delay: float, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+
+    def safe_enhance(self, ts_code, asof=None):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("boom")
+        return ModuleResult(available=True, summary=f"ok {ts_code}")
+
+
+def _orchestrator(delays, fail=()):
+    orch = EnhancementOrchestrator()
+    orch.enhancers = {
+        name: SleepyEnhancer(delay, fail=name in fail)
+        for name, delay in delays.items()
+    }
+    return orch
+
+
+def test_modules_run_concurrently_so_latency_is_max_not_sum():
+    orch = _orchestrator({
+        'relative_strength': 0.3,
+        'industry_position': 0.3,
+        'capital_flow': 0.3,
+        'events': 0.3,
+    })
+
+    started = time.monotonic()
+    response = orch.enhance('600519.SH', '2026-06-01')
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.9
+    assert set(response.available_modules) == {
+        'relative_strength', 'industry_position', 'capital_flow', 'events'
+    }
+
+
+def test_slow_module_degrades_alone_when_deadline_passes():
+    orch = _orchestrator({
+        'relative_strength': 0.05,
+        'industry_position': 0.05,
+        'capital_flow': 2.0,
+        'events': 0.05,
+    })
+
+    started = time.monotonic()
+    response = orch.enhance('600519.SH', '2026-06-01', deadline=0.4)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    assert response.capital_flow.available is False
+    assert '超时' in response.capital_flow.degrade_reason
+    assert set(response.available_modules) == {'relative_strength', 'industry_position', 'events'}
+
+
+def test_module_deadline_override_applies_per_module():
+    orch = _orchestrator({
+        'relative_strength': 0.05,
+        'industry_position': 0.05,
+        'capital_flow': 0.05,
+        'events': 0.5,
+    })
+    orch.MODULE_DEADLINES = {'events': 0.2}
+
+    response = orch.enhance('600519.SH', '2026-06-01')
+
+    assert response.events.available is False
+    assert response.relative_strength.available is True
+
+
+def test_module_exception_is_isolated():
+    orch = _orchestrator(
+        {'relative_strength': 0.0, 'industry_position': 0.0, 'capital_flow': 0.0, 'events': 0.0},
+        fail={'industry_position'},
+    )
+
+    response = orch.enhance('600519.SH', '2026-06-01')
+
+    assert response.industry_position.available is False
+    assert '执行异常' in response.industry_position.degrade_reason
+    assert len(response.available_modules) == 3
+
+
+def test_concurrent_first_calls_share_one_executor(monkeypatch):
+    monkeypatch.setattr(orchestrator, "_executor", None)
+    barrier = threading.Barrier(8)
+    pools = []
+
+    def first_call():
+        barrier.wait()
+        pools.append(orchestrator._get_executor())
+
+    threads = [threading.Thread(target=first_call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pools[0].shutdown(wait=False)
+
+    assert len({id(pool) for pool in pools}) == 1
+
+
+def test_modules_run_with_caller_priority():
+    seen = []
+
+    class PriorityProbe:
+        def safe_enhance(self, ts_code, asof=None):
+            seen.append(current_priority())
+            return ModuleResult(available=True, summary="ok")
+
+    orch = EnhancementOrchestrator()
+    orch.enhancers = {'relative_strength': PriorityProbe(), 'events': PriorityProbe()}
+
+    with tushare_priority(BATCH):
+        orch.enhance_many(['600519.SH', '000001.SZ'], '2026-06-01')
+
+    assert seen == [BATCH] * 4
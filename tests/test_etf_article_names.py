@@ -152,7 +152,7 @@ def test_stock_page_from_archived_etf_article(monkeypatch):
     from fastapi.testclient import TestClient
     from web_server import app
 
-    async def fake_get_articles(self, limit=20, offset=0, keyword=None):
+    async def fake_get_articles(self, limit=20, offset=0, keyword=None, **kwargs):
         assert keyword == "159915"
         return [
             {
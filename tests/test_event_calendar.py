@@ -0,0 +1,163 @@
+"""全市场事件日历：批量加载、窗口索引、EventsEnhancer 热路径零上游调用。"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from services.tushare.event_calendar import EventCalendar, relevant_periods
+from services.tushare.enhancers.events import EventsEnhancer
+
+
+def _d(offset_days: int) -> str:
+    return (datetime.now() + timedelta(days=offset_days)).strftime('%Y%m%d')
+
+
+class BulkClient:
+    """模拟 tushare：只回应按 ex_date / end_date 的全市场批量查询。"""
+
+    is_available = True
+
+    def __init__(self, dividend_rows, disclosure_rows):
+        self.dividend_rows = dividend_rows
+        self.disclosure_rows = disclosure_rows
+        self.calls = []
+
+    def ensure_initialized(self, log_missing_token: bool = True):
+        pass
+
+    def query(self, api_name, **kwargs):
+        self.calls.append((api_name, kwargs))
+        if kwargs.get('offset'):
+            return pd.DataFrame()
+        if api_name == 'dividend':
+            assert 'ts_code' not in kwargs
+            rows = [r for r in self.dividend_rows if r['ex_date'] == kwargs['ex_date']]
+            return pd.DataFrame(rows)
+        if api_name == 'disclosure_date':
+            assert 'ts_code' not in kwargs
+            rows = [r for r in self.disclosure_rows if r['end_date'] == kwargs['end_date']]
+            return pd.DataFrame(rows)
+        return None
+
+
+class CountingClient:
+    is_available = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def query(self, api_name, **kwargs):
+        self.calls += 1
+        return None
+
+
+class NoCache:
+    TTL_CONFIG = {}
+
+    def get(self, *args, **kwargs):
+        return False, None
+
+    def set(self, *args, **kwargs):
+        pass
+
+
+def _loaded_calendar():
+    today = datetime.now().strftime('%Y%m%d')
+    periods = relevant_periods(today)
+    upcoming_period = periods[-1]
+    # 找一个未来 5 天内的工作日作为除权日
+    ex_offset = next(i for i in range(1, 8) if (datetime.now() + timedelta(days=i)).weekday() < 5)
+    past_offset = next(i for i in range(5, 12) if (datetime.now() - timedelta(days=i)).weekday() < 5)
+    dividend_rows = [
+        {'ts_code': '600519.SH', 'end_date': '20251231', 'div_proc': '实施', 'ex_date': _d(-past_offset)},
+        {'ts_code': '000001.SZ', 'end_date': '20251231', 'div_proc': '实施', 'ex_date': _d(ex_offset)},
+    ]
+    disclosure_rows = [
+        {'ts_code': '600519.SH', 'ann_date': '', 'end_date': upcoming_period,
+         'pre_date': _d(9), 'actual_date': None},
+        {'ts_code': '000001.SZ', 'ann_date': '', 'end_date': periods[0],
+         'pre_date': _d(-40), 'actual_date': _d(-40)},
+    ]
+    client = BulkClient(dividend_rows, disclosure_rows)
+    calendar = EventCalendar(client=client)
+    calendar.refresh()
+    return calendar, client, ex_offset, past_offset
+
+
+def test_relevant_periods_cover_recent_and_next_quarter():
+    assert relevant_periods('20261019') == ['20260331', '20260630', '20260930', '20261231']
+    assert relevant_periods('20260520') == ['20250930', '20251231', '20260331', '20260630']
+
+
+def test_refresh_uses_only_bulk_queries():
+    calendar, client, _, _ = _loaded_calendar()
+
+    apis = {api for api, _ in client.calls}
+    assert apis == {'dividend', 'disclosure_date'}
+    disclosure_calls = [kw for api, kw in client.calls if api == 'disclosure_date']
+    assert len(disclosure_calls) == 4
+    assert calendar.stats()['fresh'] is True
+
+
+def test_dividends_and_disclosures_indexed_by_code_and_window():
+    calendar, _, ex_offset, past_offset = _loaded_calendar()
+
+    rows = calendar.dividends_for('600519.SH', _d(-30), _d(0))
+    assert [r['ex_date'] for r in rows] == [_d(-past_offset)]
+    assert calendar.dividends_for('600519.SH', _d(-3), _d(0)) == []
+    assert calendar.dividends_for('999999.SH', _d(-30), _d(0)) == []
+
+    # 超出已覆盖窗口 -> None，调用方回退逐只查询
+    assert calendar.dividends_for('600519.SH', _d(-90), _d(0)) is None
+    assert calendar.disclosures_for('600519.SH', _d(-400)) is None
+
+
+def test_enhance_reads_calendar_without_upstream_calls():
+    calendar, _, _, _ = _loaded_calendar()
+    enh = EventsEnhancer()
+    enh.client = CountingClient()
+    enh.cache = NoCache()
+    enh.calendar = calendar
+
+    result = enh.enhance('600519.SH')
+
+    assert enh.client.calls == 0
+    metrics = {m.key: m.value for m in result.key_metrics}
+    assert metrics['days_to_disclosure'] == 9
+    assert metrics['has_corporate_action'] is True
+    types = {r['type'] for r in result.details.tables[0].rows}
+    assert types == {'分红除权', '财报披露'}
+
+
+def test_enhance_falls_back_to_per_code_query_when_calendar_empty():
+    enh = EventsEnhancer()
+    enh.client = CountingClient()
+    enh.cache = NoCache()
+    enh.calendar = EventCalendar(client=CountingClient())
+    enh.calendar._last_attempt_at = datetime.now()  # 不触发后台刷新
+
+    result = enh.enhance('600519.SH')
+
+    assert result.available
+    assert enh.client.calls == 2  # dividend + disclosure_date
+
+
+def test_upcoming_events_for_watchlist_codes():
+    calendar, client, ex_offset, _ = _loaded_calendar()
+    calls_before = len(client.calls)
+
+    events = calendar.upcoming_events(['600519.SH', '000001.SZ', '300750.SZ'], days=14)
+
+    assert len(client.calls) == calls_before
+    assert set(events) == {'600519.SH', '000001.SZ'}
+    assert events['600519.SH'][0]['type'] == '财报披露'
+    assert events['600519.SH'][0]['days_until'] == 9
+    assert events['000001.SZ'][0] == {
+        'date': _d(ex_offset),
+        'type': '分红除权',
+        'title': '除权除息日',
+        'days_until': ex_offset,
+    }
+
+
+def test_upcoming_events_none_when_calendar_not_loaded():
+    assert EventCalendar(client=CountingClient()).upcoming_events(['600519.SH']) is None
@@ -171,9 +171,10 @@ def test_publish_weekly_recap_article_writes_to_archive(tmp_path):
     DatabaseFactory.initialize(str(db_path))
     _create_judgments_table(db_path)
 
+    from database.schema_registry import schema_registry
     from services.archive_service import ArchiveService
 
-    ArchiveService(db_path=str(db_path))
+    schema_registry.ensure(str(db_path))
 
     created_at = (datetime.utcnow() - timedelta(days=2)).isoformat() + "Z"
     with sqlite3.connect(db_path) as conn:
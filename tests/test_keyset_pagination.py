@@ -0,0 +1,187 @@
+"""keyset 分页：游标翻页与 offset 结果一致、非法游标 400、近似总数缓存与失效、/stocks 清单缓存。"""
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+from database.compression import register_sqlite_functions
+from database.db_factory import DatabaseFactory
+from database.pagination import (
+    ApproxCountCache,
+    CursorError,
+    decode_cursor,
+    encode_cursor,
+    keyset_after_desc,
+)
+from database.schema_registry import schema_registry
+from services.archive_service import ArchiveService, article_cursor
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _archive(tmp_path) -> ArchiveService:
+    db_path = tmp_path / "keyset.db"
+    with sqlite3.connect(db_path) as conn:
+        register_sqlite_functions(conn)
+        for name in ("022_create_articles_fts.sql", "024_articles_fts_unpack_view.sql"):
+            conn.executescript((REPO_ROOT / "migrations" / name).read_text(encoding="utf-8"))
+        schema_registry.apply(conn)
+        rows = []
+        for i in range(23):
+            # 同一天多篇 + created_at 相同 + 个别 NULL，覆盖排序键的并列与空值
+            created_at = None if i % 7 == 0 else f"2026-07-0{i % 3 + 1} 10:00:00"
+            rows.append((f"分析 {i}", "600519", "贵州茅台", "A", "正文", f"2026-07-0{i % 4 + 1}", created_at))
+        conn.executemany(
+            "INSERT INTO articles (title, stock_code, stock_name, market_type, content, publish_date, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+    DatabaseFactory.initialize(str(db_path))
+    return ArchiveService(db_path=str(db_path))
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    token = encode_cursor(["2026-07-01", None, 42])
+
+    assert decode_cursor(token, 3) == ("2026-07-01", None, 42)
+    assert decode_cursor(None, 3) is None
+    for bad in ("not-a-cursor", encode_cursor([1, 2]), encode_cursor([{"x": 1}, 1, 2])):
+        with pytest.raises(CursorError):
+            decode_cursor(bad, 3)
+
+
+def test_keyset_predicate_handles_nullable_columns():
+    sql, params = keyset_after_desc(("p", "c", "id"), ("d", None, 5), nullable=("c",))
+
+    assert sql == "(p <= ? AND ((p < ?) OR (p = ? AND c IS NULL AND id < ?)))"
+    assert params == ["d", "d", "d", 5]
+
+
+def test_cursor_pages_match_offset_order(tmp_path):
+    service = _archive(tmp_path)
+    expected = [a["id"] for a in asyncio.run(service.get_articles(limit=100, offset=0))]
+
+    seen, after = [], None
+    while True:
+        page = asyncio.run(service.get_articles(limit=5, offset=0, after=after))
+        seen.extend(a["id"] for a in page)
+        if len(page) < 5:
+            break
+        after = article_cursor(page[-1])
+
+    assert len(expected) == 23
+    assert seen == expected
+
+
+def test_admin_articles_total_is_cached_until_write(tmp_path):
+    service = _archive(tmp_path)
+
+    _, total = asyncio.run(service.admin_list_articles_with_total(limit=5, offset=0))
+    with sqlite3.connect(service.db_path) as conn:
+        register_sqlite_functions(conn)
+        conn.execute("DELETE FROM articles WHERE title = '分析 0'")
+    _, cached_total = asyncio.run(service.admin_list_articles_with_total(limit=5, offset=0))
+    service.save_article_sync({
+        "title": "新文章", "stock_code": "000001", "stock_name": "平安银行",
+        "market_type": "A", "content": "正文", "publish_date": "2026-07-09",
+    })
+    items, fresh_total = asyncio.run(service.admin_list_articles_with_total(limit=5, offset=0))
+
+    assert (total, cached_total, fresh_total) == (23, 23, 23)
+    assert items[0]["title"] == "新文章"
+
+
+def test_admin_routes_return_next_cursor_and_reject_bad_cursor(tmp_path, monkeypatch):
+    from routes import admin
+
+    service = _archive(tmp_path)
+    monkeypatch.setattr(admin, "_archive_service", lambda: service)
+
+    first = asyncio.run(admin.admin_list_articles(limit=10, offset=0, q=None, cursor=None, _={}))
+    second = asyncio.run(
+        admin.admin_list_articles(limit=10, offset=0, q=None, cursor=first["next_cursor"], _={})
+    )
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(admin.admin_list_articles(limit=10, offset=0, q=None, cursor="%%%", _={}))
+
+    assert first["total_is_estimate"] is True
+    assert len(first["articles"]) == 10
+    assert not {a["id"] for a in first["articles"]} & {a["id"] for a in second["articles"]}
+    assert exc.value.status_code == 400
+
+
+def test_admin_users_keyset(tmp_path):
+    from routes import admin
+
+    db_path = tmp_path / "users.db"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript((REPO_ROOT / "migrations" / "008_create_user_tables.sql").read_text(encoding="utf-8"))
+        conn.executemany(
+            "INSERT INTO users (user_id, created_at, last_active_at) VALUES (?, ?, ?)",
+            [(f"u{i:02d}", f"2026-07-0{i % 3 + 1}", "2026-07-09") for i in range(7)],
+        )
+    DatabaseFactory.initialize(str(db_path))
+
+    kwargs = dict(q=None, email_verified=None, has_email=None, _={})
+    expected = [u["user_id"] for u in asyncio.run(admin.admin_list_users(limit=50, offset=0, cursor=None, **kwargs))["users"]]
+    seen, cursor = [], None
+    while True:
+        body = asyncio.run(admin.admin_list_users(limit=3, offset=0, cursor=cursor, **kwargs))
+        seen.extend(u["user_id"] for u in body["users"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == expected
+    assert body["total"] == 7
+
+
+def test_approx_count_cache_expires():
+    cache = ApproxCountCache(ttl_sec=0)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get(("t",), compute) == 1
+    assert cache.get(("t",), compute) == 2
+
+
+def test_stock_index_reuses_parsed_snapshot(tmp_path, monkeypatch):
+    from services import stock_page_service
+    from services.search_snapshot_service import SearchSnapshotService
+    from services.stock_page_service import StockPageService
+
+    class _Provider:
+        def get_a_share_list(self, force_refresh=False):
+            return [{"code": f"{600000 + i}", "name": f"股票{i}"} for i in range(150)]
+
+    real_init = SearchSnapshotService.__init__
+    real_load = SearchSnapshotService._load_snapshot
+    loads = []
+
+    def init(self, snapshot_dir=None, provider_factory=_Provider):
+        real_init(self, snapshot_dir=tmp_path, provider_factory=provider_factory)
+
+    def counting_load(self, market):
+        loads.append(market)
+        return real_load(self, market)
+
+    monkeypatch.setattr(SearchSnapshotService, "__init__", init)
+    monkeypatch.setattr(SearchSnapshotService, "_load_snapshot", counting_load)
+    monkeypatch.setattr(SearchSnapshotService, "ensure_a_share_snapshot", lambda self, min_count=100: 150)
+    monkeypatch.setattr(stock_page_service, "_a_share_index", stock_page_service._AShareIndex())
+    SearchSnapshotService().refresh_a_share_snapshot()
+
+    service = StockPageService.__new__(StockPageService)
+    first = service.list_a_share_stocks()
+    loads_after_first = len(loads)
+    second = service.list_a_share_stocks()
+
+    assert len(first) == 150 and first == second
+    assert service._resolve_from_snapshot("600001").name == "股票1"
+    assert service._resolve_from_snapshot("999999") is None
+    assert len(loads) == loads_after_first == 1
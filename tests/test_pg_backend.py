@@ -0,0 +1,200 @@
+"""PostgreSQL 后端：迁移、sqlite3 兼容语义、多线程并发写与服务层流程。
+
+需要本地 PostgreSQL：设置 TEST_DATABASE_URL（如 postgresql://postgres@localhost/postgres）后运行，
+每个测试模块在独立 schema 里执行并在结束时删除；未设置或未安装 psycopg 时跳过。
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+pytest.importorskip("psycopg_pool")
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture(scope="module")
+def pg_env(tmp_path_factory):
+    from psycopg.conninfo import make_conninfo
+
+    from database.db_factory import DatabaseFactory
+    from database.pg_backend import pg_backend
+    from database.write_queue import write_queue
+
+    schema = f"test_{uuid.uuid4().hex[:10]}"
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as admin:
+        admin.execute(f"CREATE SCHEMA {schema}")
+
+    saved = {k: os.environ.get(k) for k in ("DB_BACKEND", "DATABASE_URL", "DB_PATH")}
+    os.environ["DB_BACKEND"] = "postgres"
+    os.environ["DATABASE_URL"] = make_conninfo(TEST_DATABASE_URL, options=f"-csearch_path={schema}")
+    # db_path 在 PostgreSQL 下只是写队列/额度账本的分组键
+    os.environ["DB_PATH"] = str(tmp_path_factory.mktemp("pg") / f"{schema}.db")
+    pg_backend.close()
+    DatabaseFactory.initialize(os.environ["DB_PATH"])
+    original_cwd = os.getcwd()
+    os.chdir(REPO_ROOT)
+    try:
+        from scripts.run_migrations import run_migrations
+
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+    try:
+        yield schema
+    finally:
+        write_queue.flush()
+        pg_backend.close()
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as admin:
+            admin.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def test_migrations_are_recorded_and_idempotent(pg_env, capsys):
+    from database.db_factory import DatabaseFactory
+    from scripts.run_migrations import run_migrations
+
+    original_cwd = os.getcwd()
+    os.chdir(REPO_ROOT)
+    try:
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+    output = capsys.readouterr().out
+
+    applied = DatabaseFactory.fetchall("SELECT name FROM schema_migrations")
+    columns = DatabaseFactory.fetchall("PRAGMA table_info(judgments)")
+    assert {"name": "001_baseline_schema.sql"} in applied
+    assert "already applied" in output and "Schema registry" not in output
+    assert "verification_period" in {c["name"] for c in columns}
+
+
+def test_connection_follows_sqlite3_semantics(pg_env):
+    from database.db_factory import DatabaseFactory
+
+    conn = DatabaseFactory.get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO nav_links (label, href, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            ("a", "https://a", "2026-01-01", "2026-01-01"),
+        )
+        first_id = cur.lastrowid
+        assert conn.in_transaction and first_id
+        cur.execute(
+            "INSERT INTO app_settings (key, value, updated_at) VALUES (?, ?, ?)", ("k", "100%", "2026-01-01")
+        )
+        with pytest.raises(sqlite3.IntegrityError):
+            cur.execute("INSERT INTO app_settings (key, value, updated_at) VALUES (?, ?, ?)", ("k", "x", "y"))
+        # 出错的语句单独回滚，事务里其余写入仍可提交
+        cur.execute("INSERT OR IGNORE INTO app_settings (key, value, updated_at) VALUES (?, ?, ?)", ("k", "x", "y"))
+        assert cur.rowcount == 0
+        conn.commit()
+        assert not conn.in_transaction
+
+        conn.execute("UPDATE app_settings SET value = ? WHERE key = ?", ("rolled back", "k"))
+        conn.rollback()
+    finally:
+        conn.close()
+
+    row = DatabaseFactory.fetchone("SELECT value, GROUP_CONCAT(key) AS keys FROM app_settings GROUP BY value")
+    assert row == {"value": "100%", "keys": "k"}
+    assert DatabaseFactory.fetchone("SELECT label FROM nav_links WHERE id = ?", (first_id,)) == {"label": "a"}
+    assert DatabaseFactory.fetchone(
+        "SELECT COUNT(*) AS c FROM nav_links WHERE label LIKE ? AND created_at >= datetime('now', ?)",
+        ("A%", "-100 years"),
+    ) == {"c": 1}
+
+
+def test_concurrent_writers_do_not_lose_updates(pg_env):
+    from database.db_factory import DatabaseFactory
+    from database.dialect import upsert_sql
+
+    def worker(i):
+        for j in range(20):
+            with DatabaseFactory.get_cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO llm_usage_daily (usage_date, user_type, call_count, stock_count) VALUES (?, ?, 1, 1)"
+                    " ON CONFLICT(usage_date, user_type) DO UPDATE SET call_count = llm_usage_daily.call_count + 1",
+                    ("2026-07-01", "anonymous"),
+                )
+                cursor.execute(
+                    upsert_sql("job_health", ("job_id", "last_status", "updated_at"), ("job_id",)),
+                    (f"job-{i}", "ok", str(j)),
+                )
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert DatabaseFactory.fetchone(
+        "SELECT call_count FROM llm_usage_daily WHERE usage_date = ?", ("2026-07-01",)
+    ) == {"call_count": 160}
+    assert DatabaseFactory.fetchone("SELECT COUNT(*) AS c FROM job_health WHERE updated_at = '19'") == {"c": 8}
+
+
+def test_async_api_does_not_need_a_db_thread(pg_env):
+    from database.pg_backend import pg_backend
+
+    async def main():
+        await pg_backend.execute_async(
+            "INSERT OR IGNORE INTO app_settings (key, value, updated_at) VALUES (?, ?, ?)", ("async", "1", "t")
+        )
+        return await pg_backend.fetchall_async("SELECT value FROM app_settings WHERE key = ?", ("async",))
+
+    assert asyncio.run(main()) == [{"value": "1"}]
+
+
+def test_quota_and_invite_flow_through_write_queue(pg_env):
+    from services.invite_service import InviteService
+    from services.quota_service import QuotaService
+    from services.user_service import UserService
+
+    users, invites, quota = UserService(), InviteService(), QuotaService()
+    inviter = users.get_or_create_user_by_identity(identity_type="anonymous", identity_value="pg-inviter")
+    invitee = users.get_or_create_user_by_identity(identity_type="anonymous", identity_value="pg-invitee")
+    code = invites.generate_invite_code(inviter)["invite_code"]
+    invites.record_invite_acceptance(invitee, code)
+
+    assert quota.queue_analyses(invitee, ["600519.SH", "600519.SH"]) == 1
+    assert invites.queue_reward_check(invitee_id=invitee)
+
+    assert quota.get_quota_status(invitee)["used_quota"] == 1
+    assert quota.get_quota_status(inviter)["invite_quota"] == InviteService.REWARD_QUOTA
+
+
+def test_shared_quota_reserves_serialize_across_ledgers(pg_env):
+    from database.write_queue import write_queue
+    from services.quota_service import QuotaLedger, QuotaService
+
+    workers = [QuotaLedger(shared=True) for _ in range(2)]
+    results = []
+
+    def reserve(i):
+        results.append(workers[i % 2].reserve_shared("pg-shared", [f"60000{i}"]))
+
+    threads = [threading.Thread(target=reserve, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    granted = [r[3] for r in results if r[0]]
+    workers[0].commit(granted[0], list(granted[0].new_codes))
+    assert write_queue.flush()
+
+    assert len(granted) == QuotaService.ANONYMOUS_BASE_QUOTA
+    assert QuotaService().get_quota_status("pg-shared")["used_quota"] == 1
@@ -0,0 +1,197 @@
+"""热点查询计划回归：迁移后的库上每条登记查询都走索引，不出现全表 SCAN 或 ORDER BY 临时 B 树。
+
+新增高频查询或改动下列 SQL 时在 HOT_QUERIES 里登记/同步；索引被误删或查询写法退化会在这里失败。
+"""
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from database.pagination import keyset_after_desc
+from services.archive_service import _ARTICLE_LIST_COLUMNS, _PUBLIC_ARTICLE_EXCLUDE_SQL
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+_ARTICLE_KEYSET, _ARTICLE_KEYSET_PARAMS = keyset_after_desc(
+    ("publish_date", "created_at", "id"), ("2026-07-01", "2026-07-01 10:00:00", 42), nullable=("created_at",)
+)
+_USER_KEYSET, _USER_KEYSET_PARAMS = keyset_after_desc(("created_at", "user_id"), ("2026-07-01", "u1"))
+
+# (名称, SQL, 参数, 期望用到的索引)
+HOT_QUERIES = [
+    (
+        "articles_public_list",
+        f"SELECT {_ARTICLE_LIST_COLUMNS} FROM articles"
+        f" WHERE ({_PUBLIC_ARTICLE_EXCLUDE_SQL})"
+        " ORDER BY publish_date DESC, created_at DESC, id DESC LIMIT ? OFFSET ?",
+        (20, 0),
+        "idx_articles_publish_order",
+    ),
+    (
+        "articles_public_list_after_cursor",
+        f"SELECT {_ARTICLE_LIST_COLUMNS} FROM articles"
+        f" WHERE ({_PUBLIC_ARTICLE_EXCLUDE_SQL}) AND {_ARTICLE_KEYSET}"
+        " ORDER BY publish_date DESC, created_at DESC, id DESC LIMIT ? OFFSET ?",
+        (*_ARTICLE_KEYSET_PARAMS, 20, 0),
+        "idx_articles_publish_order",
+    ),
+    (
+        "articles_latest_weekly_recap",
+        "SELECT id, title, publish_date, stock_code, stock_name FROM articles"
+        " WHERE stock_code = 'WEEKLY_RECAP' ORDER BY publish_date DESC, id DESC LIMIT 1",
+        (),
+        "idx_articles_stock_publish",
+    ),
+    (
+        "judgment_latest_check",
+        "SELECT * FROM judgment_checks WHERE judgment_id = ? ORDER BY created_at DESC LIMIT 1",
+        ("jr_1",),
+        "idx_checks_judgment_created",
+    ),
+    (
+        "watchlist_items_by_watchlist",
+        "SELECT ts_code, name, weight_pct FROM watchlist_items WHERE watchlist_id = ? ORDER BY added_at DESC",
+        ("wl_1",),
+        "idx_watchlist_items_added",
+    ),
+    (
+        "risk_alerts_unread_count",
+        "SELECT COUNT(*) AS c FROM watchlist_risk_alerts WHERE user_id = ? AND read_at IS NULL",
+        ("u1",),
+        "idx_watchlist_risk_alerts_unread_created",
+    ),
+    (
+        "risk_alerts_list",
+        "SELECT * FROM watchlist_risk_alerts WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+        ("u1", 20),
+        "idx_watchlist_risk_alerts_user_created",
+    ),
+    (
+        "risk_alerts_list_unread",
+        "SELECT * FROM watchlist_risk_alerts WHERE user_id = ? AND read_at IS NULL"
+        " ORDER BY created_at DESC LIMIT ?",
+        ("u1", 20),
+        "idx_watchlist_risk_alerts_unread_created",
+    ),
+    (
+        "risk_alerts_users_by_trade_date",
+        "SELECT DISTINCT user_id FROM watchlist_risk_alerts WHERE trade_date = ? ORDER BY user_id",
+        ("20260701",),
+        "idx_watchlist_risk_alerts_trade_user",
+    ),
+    (
+        "signal_alerts_unread_count",
+        "SELECT COUNT(*) AS c FROM watchlist_signal_alerts WHERE user_id = ? AND read_at IS NULL",
+        ("u1",),
+        "idx_watchlist_signal_alerts_unread_created",
+    ),
+    (
+        "signal_alerts_list",
+        "SELECT * FROM watchlist_signal_alerts WHERE user_id = ?"
+        " ORDER BY created_at DESC, trade_date DESC LIMIT ?",
+        ("u1", 20),
+        "idx_watchlist_signal_alerts_user_created",
+    ),
+    (
+        "signal_alerts_list_unread",
+        "SELECT * FROM watchlist_signal_alerts WHERE user_id = ? AND read_at IS NULL"
+        " ORDER BY created_at DESC, trade_date DESC LIMIT ?",
+        ("u1", 20),
+        "idx_watchlist_signal_alerts_unread_created",
+    ),
+    (
+        "quota_used_today",
+        "SELECT COUNT(*) as cnt, GROUP_CONCAT(stock_code) as stocks FROM analysis_records"
+        " WHERE user_id = ? AND analysis_date = ?",
+        ("u1", "2026-07-01"),
+        "COVERING INDEX idx_analysis_user_date_stock",
+    ),
+    (
+        "quota_stock_already_analyzed",
+        "SELECT id FROM analysis_records WHERE user_id = ? AND stock_code = ? AND analysis_date = ?",
+        ("u1", "600519", "2026-07-01"),
+        "sqlite_autoindex_analysis_records_1",
+    ),
+    (
+        "invitee_analysis_count",
+        "SELECT COUNT(*) as cnt FROM analysis_records WHERE user_id = ?",
+        ("u1",),
+        "COVERING INDEX idx_analysis_user_date_stock",
+    ),
+    (
+        "llm_usage_by_date",
+        "SELECT ar.analysis_date, ar.user_id, COUNT(*) FROM analysis_records ar"
+        " LEFT JOIN users u ON u.user_id = ar.user_id"
+        " WHERE ar.analysis_date >= ? GROUP BY ar.analysis_date, ar.user_id",
+        ("2026-07-01",),
+        "idx_analysis_date_user",
+    ),
+    (
+        "admin_users_after_cursor",
+        f"SELECT user_id FROM users WHERE 1=1 AND {_USER_KEYSET}"
+        " ORDER BY created_at DESC, user_id DESC LIMIT ? OFFSET ?",
+        (*_USER_KEYSET_PARAMS, 20, 0),
+        "idx_users_created_user",
+    ),
+    (
+        "admin_invite_acceptances",
+        "SELECT a.id, (SELECT COUNT(*) FROM analysis_records ar WHERE ar.user_id = a.invitee_id) AS n,"
+        " r.id FROM invite_acceptances a"
+        " LEFT JOIN invite_rewards r ON r.inviter_id = a.inviter_id AND r.invitee_id = a.invitee_id"
+        " WHERE 1=1 ORDER BY a.accepted_at DESC, a.id DESC LIMIT ? OFFSET ?",
+        (20, 0),
+        "idx_invite_acceptances_accepted",
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def migrated_db(tmp_path_factory):
+    db_path = tmp_path_factory.mktemp("plans") / "stocks.db"
+    original_env = os.environ.get("DB_PATH")
+    original_cwd = os.getcwd()
+    os.environ["DB_PATH"] = str(db_path)
+    os.chdir(REPO_ROOT)
+    try:
+        from scripts.run_migrations import run_migrations
+
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+        if original_env is None:
+            os.environ.pop("DB_PATH", None)
+        else:
+            os.environ["DB_PATH"] = original_env
+
+    conn = sqlite3.connect(db_path)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def _is_table_scan(detail: str) -> bool:
+    # 允许有序地走索引（SCAN ... USING INDEX，配合 LIMIT 提前结束），不允许裸表扫描
+    return detail.startswith("SCAN ") and " USING " not in detail
+
+
+@pytest.mark.parametrize("name,sql,params,index", HOT_QUERIES, ids=[q[0] for q in HOT_QUERIES])
+def test_hot_query_uses_index(migrated_db, name, sql, params, index):
+    plan = _plan(migrated_db, sql, params)
+
+    assert not [d for d in plan if _is_table_scan(d)], plan
+    assert not [d for d in plan if "TEMP B-TREE" in d], plan
+    assert any(index in d for d in plan), plan
+
+
+@pytest.mark.parametrize("name", ["articles_public_list_after_cursor", "admin_users_after_cursor"])
+def test_keyset_pages_seek_instead_of_walking_index(migrated_db, name):
+    _, sql, params, _ = next(q for q in HOT_QUERIES if q[0] == name)
+    plan = _plan(migrated_db, sql, params)
+
+    assert any(d.startswith("SEARCH ") for d in plan), plan
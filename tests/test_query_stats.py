@@ -0,0 +1,94 @@
+"""SQL 埋点：按语句模板聚合耗时/行数，慢查询附带 EXPLAIN QUERY PLAN。"""
+import asyncio
+import sqlite3
+
+from database import query_stats as query_stats_module
+from database.db_factory import DatabaseFactory
+from database.query_stats import InstrumentedConnection, QueryStats, normalize_sql
+
+
+def _connect(tmp_path, monkeypatch, stats):
+    monkeypatch.setattr(query_stats_module, "query_stats", stats)
+    conn = sqlite3.connect(tmp_path / "q.db", factory=InstrumentedConnection)
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, code TEXT, v INTEGER)")
+    conn.executemany("INSERT INTO t (code, v) VALUES (?, ?)", [("A", i) for i in range(5)])
+    stats.reset()
+    return conn
+
+
+def test_normalize_sql_collapses_literals_and_in_lists():
+    a = normalize_sql("SELECT * FROM t WHERE code = 'X' AND v > 10 AND id IN (?, ?, ?)")
+    b = normalize_sql("select * from t\n  where code = 'YY' and v > 3 and id in (?)")
+
+    assert a == "SELECT * FROM t WHERE code = ? AND v > ? AND id IN (...)"
+    assert a.lower() == b.lower()
+    assert normalize_sql("SELECT col1 FROM t2") == "SELECT col1 FROM t2"
+
+
+def test_rows_and_counts_are_aggregated_per_template(tmp_path, monkeypatch):
+    stats = QueryStats(slow_ms=0)
+    conn = _connect(tmp_path, monkeypatch, stats)
+
+    for code in ("A", "B"):
+        conn.execute("SELECT v FROM t WHERE code = ?", (code,)).fetchall()
+    for _ in conn.execute("SELECT id FROM t"):
+        pass
+    conn.execute("UPDATE t SET v = v + 1 WHERE code = 'A'")
+
+    templates = {t["template"]: t for t in stats.snapshot()["templates"]}
+    assert templates["SELECT v FROM t WHERE code = ?"]["count"] == 2
+    assert templates["SELECT v FROM t WHERE code = ?"]["rows"] == 5
+    assert templates["SELECT id FROM t"]["rows"] == 5
+    assert templates["UPDATE t SET v = v + ? WHERE code = ?"]["rows"] == 5
+    assert sum(templates["SELECT id FROM t"]["histogram"]) == 1
+
+
+def test_single_row_cursor_is_recorded_when_dropped(tmp_path, monkeypatch):
+    stats = QueryStats(slow_ms=0)
+    conn = _connect(tmp_path, monkeypatch, stats)
+
+    assert conn.execute("SELECT v FROM t WHERE id = ?", (1,)).fetchone() == (0,)
+
+    (entry,) = stats.snapshot()["templates"]
+    assert entry["count"] == 1 and entry["rows"] == 1
+
+
+def test_slow_query_is_logged_with_plan(tmp_path, monkeypatch):
+    stats = QueryStats(slow_ms=0.000001)
+    conn = _connect(tmp_path, monkeypatch, stats)
+
+    conn.execute("SELECT v FROM t WHERE code = ?", ("A",)).fetchall()
+    conn.execute("PRAGMA table_info(t)").fetchall()
+
+    slow = stats.snapshot()["slow_queries"]
+    by_template = {s["template"]: s for s in slow}
+    plan = by_template["SELECT v FROM t WHERE code = ?"]["plan"]
+    assert any("SCAN" in line for line in plan)
+    assert by_template["PRAGMA table_info(t)"]["plan"] == []
+
+
+def test_factory_connections_are_instrumented(tmp_path, monkeypatch):
+    stats = QueryStats(slow_ms=0)
+    monkeypatch.setattr(query_stats_module, "query_stats", stats)
+    DatabaseFactory.initialize(str(tmp_path / "factory.db"))
+    DatabaseFactory.execute("CREATE TABLE IF NOT EXISTS kv (k TEXT, v TEXT)")
+    DatabaseFactory.execute("INSERT INTO kv (k, v) VALUES (?, ?)", ("a", "1"))
+
+    assert DatabaseFactory.fetchall("SELECT k, v FROM kv") == [{"k": "a", "v": "1"}]
+
+    templates = {t["template"]: t for t in stats.snapshot()["templates"]}
+    assert templates["SELECT k, v FROM kv"]["rows"] == 1
+
+
+def test_admin_ops_queries_exposes_snapshot(monkeypatch):
+    from routes import admin
+
+    stats = QueryStats(slow_ms=0)
+    stats.observe("SELECT id FROM t", 3.0, 1)
+    monkeypatch.setattr(admin, "query_stats", stats)
+
+    body = asyncio.run(admin.admin_ops_queries(limit=10, order_by="count", _={}))
+
+    assert body["scope"] == "since_process_restart"
+    assert body["templates"][0]["template"] == "SELECT id FROM t"
+    assert body["templates"][0]["p50_ms"] == 5.0
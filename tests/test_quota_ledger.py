@@ -0,0 +1,213 @@
+"""额度账本：并发预占原子、失败归还、commit 写后落盘且重启后计数一致、已加载时不访问数据库、多 worker 共享预占。"""
+import asyncio
+import sqlite3
+import threading
+from datetime import date
+from pathlib import Path
+
+from database.db_factory import DatabaseFactory
+from database.write_queue import write_queue
+from services.quota_service import QuotaLedger, QuotaService
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _ledger(tmp_path) -> QuotaLedger:
+    db_path = tmp_path / "quota.db"
+    with sqlite3.connect(db_path) as conn:
+        for name in ("002_create_quota_tables.sql", "027_create_quota_reservations.sql"):
+            conn.executescript((REPO_ROOT / "migrations" / name).read_text(encoding="utf-8"))
+    DatabaseFactory.initialize(str(db_path))
+    return QuotaLedger(ttl_sec=60)
+
+
+def test_concurrent_reserves_never_exceed_quota(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.load("u1")
+    results = []
+
+    def reserve(i):
+        results.append(ledger.try_reserve("u1", [f"60000{i}"], is_authenticated=False))
+
+    threads = [threading.Thread(target=reserve, args=(i,)) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    allowed = [r for r in results if r[0]]
+    assert len(allowed) == QuotaService.ANONYMOUS_BASE_QUOTA
+    assert {r[1] for r in results if not r[0]} == {"quota_exceeded"}
+
+
+def test_release_returns_quota_and_commit_survives_restart(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.load("u1")
+
+    _, _, _, failed = ledger.try_reserve("u1", ["600519", "000001", "000002"])
+    exhausted = ledger.try_reserve("u1", ["000003"])
+    ledger.release(failed)
+    allowed, _, details, ok = ledger.try_reserve("u1", ["600519.SH"])
+    ledger.commit(ok, ["600519.SH"])
+    ledger.commit(ok, ["600519.SH"])  # 重复 commit 无效
+    assert write_queue.flush()
+
+    restarted = QuotaLedger(ttl_sec=60)
+    restarted.load("u1")
+    again = restarted.try_reserve("u1", ["600519.SH", "000858"])
+
+    assert exhausted[0] is False
+    assert allowed and details["required_quota"] == 1
+    assert QuotaService(db_path=DatabaseFactory.get_db_path()).get_quota_status("u1")["used_quota"] == 1
+    assert again[2]["history_codes"] == ["600519.SH"] and again[2]["new_codes"] == ["000858"]
+    assert again[2]["remaining_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA - 1
+
+
+def test_code_in_flight_elsewhere_is_not_charged_twice(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.load("u1")
+
+    first = ledger.try_reserve("u1", ["600519"])
+    second = ledger.try_reserve("u1", ["600519", "000001"])
+
+    assert first[2]["required_quota"] == 1
+    assert second[2]["new_codes"] == ["000001"]
+    assert second[2]["remaining_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA - 1
+
+
+def test_reserve_is_in_memory_once_loaded(tmp_path, monkeypatch):
+    ledger = _ledger(tmp_path)
+    loads = []
+    real_load = ledger.load
+    monkeypatch.setattr(ledger, "load", lambda *a: (loads.append(a), real_load(*a)))
+
+    async def main():
+        for code in ("600519", "000001"):
+            await ledger.reserve("u1", [code])
+
+    asyncio.run(main())
+
+    assert len(loads) == 1
+
+
+def test_zero_ttl_reloads_once_per_reserve(tmp_path):
+    _ledger(tmp_path)
+    ledger = QuotaLedger(ttl_sec=0)
+    loads = []
+    real_load = ledger.load
+    ledger.load = lambda *a: (loads.append(a), real_load(*a))
+
+    async def main():
+        return [await ledger.reserve("u1", [code]) for code in ("600519", "000001")]
+
+    results = asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+    assert [r[0] for r in results] == [True, True]
+    # TTL<=0 相当于每次都读库，但每次 reserve 只加载一次
+    assert len(loads) == 2
+    assert results[1][2]["remaining_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA - 1
+
+
+def test_invite_reward_marks_inviter_stale(tmp_path):
+    ledger = _ledger(tmp_path)
+    ledger.load("inviter")
+    with DatabaseFactory.get_connection() as conn:
+        conn.execute(
+            "INSERT INTO invite_rewards (inviter_id, invitee_id, invite_code, reward_quota, reward_date)"
+            " VALUES ('inviter', 'invitee', 'c1', 5, ?)",
+            (date.today(),),
+        )
+        conn.commit()
+
+    before = ledger.try_reserve("inviter", ["600519"])
+    ledger.mark_stale("inviter")
+    assert ledger.try_reserve("inviter", ["000001"]) is None
+    ledger.load("inviter")
+    after = ledger.try_reserve("inviter", ["000001"])
+
+    assert before[2]["remaining_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA
+    # 重载后保留仍未完成的预占（600519）
+    assert after[2]["remaining_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA + 5 - 1
+
+
+def test_shared_reserves_across_workers_never_exceed_quota(tmp_path):
+    _ledger(tmp_path)
+    # 两个 worker 各一份账本，共用同一个库
+    workers = [QuotaLedger(ttl_sec=60, shared=True) for _ in range(2)]
+    results = []
+
+    def reserve(i):
+        results.append(workers[i % 2].reserve_shared("u1", [f"60000{i}"]))
+
+    threads = [threading.Thread(target=reserve, args=(i,)) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len([r for r in results if r[0]]) == QuotaService.ANONYMOUS_BASE_QUOTA
+    assert {r[1] for r in results if not r[0]} == {"quota_exceeded"}
+
+
+def test_shared_commit_and_release_update_other_workers(tmp_path):
+    _ledger(tmp_path)
+    first, second = QuotaLedger(ttl_sec=60, shared=True), QuotaLedger(ttl_sec=60, shared=True)
+
+    _, _, _, committed = first.reserve_shared("u1", ["600519"])
+    _, _, _, released = first.reserve_shared("u1", ["000001"])
+    in_flight = second.reserve_shared("u1", ["600519", "000003"])
+    first.commit(committed, ["600519"])
+    first.release(released)
+    assert write_queue.flush()
+    after = second.reserve_shared("u1", ["600519", "000004"])
+    leftover = DatabaseFactory.fetchall(
+        "SELECT reservation_id FROM quota_reservations WHERE reservation_id IN (?, ?)",
+        (committed.reservation_id, released.reservation_id),
+    )
+
+    base = QuotaService.ANONYMOUS_BASE_QUOTA
+    # 另一个 worker 正在分析的 600519 不重复扣额度
+    assert in_flight[0] and in_flight[2]["new_codes"] == ["000003"]
+    assert in_flight[2]["remaining_quota"] == base - 2
+    assert after[2]["history_codes"] == ["600519"]
+    assert after[2]["remaining_quota"] == base - 2
+    assert leftover == []
+
+
+def test_shared_reservation_expires_when_worker_dies(tmp_path, monkeypatch):
+    _ledger(tmp_path)
+    ledger = QuotaLedger(ttl_sec=60, shared=True)
+    monkeypatch.setattr("services.quota_service.QUOTA_RESERVATION_TTL_SEC", 0)
+
+    ledger.reserve_shared("u1", ["600519", "000001"])
+    after = ledger.reserve_shared("u1", ["000002"])
+
+    assert after[2]["remaining_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA
+
+
+def test_shared_ledger_reserve_goes_through_database(tmp_path):
+    _ledger(tmp_path)
+    ledger = QuotaLedger(ttl_sec=60, shared=True)
+
+    allowed, _, details, reservation = asyncio.run(ledger.reserve("u1", ["600519"]))
+
+    assert allowed and reservation.shared and details["required_quota"] == 1
+    assert ledger.try_reserve("u1", ["000001"]) is None
+    assert DatabaseFactory.fetchone(
+        "SELECT COUNT(*) AS cnt FROM quota_reservations WHERE reservation_id = ?",
+        (reservation.reservation_id,),
+    )["cnt"] == 1
+
+
+def test_unreleased_in_process_reservation_expires(tmp_path, monkeypatch):
+    ledger = _ledger(tmp_path)
+    ledger.load("u1")
+    monkeypatch.setattr("services.quota_service.QUOTA_RESERVATION_TTL_SEC", 0)
+
+    leaked = ledger.try_reserve("u1", ["600519", "000001"])
+    ledger.load("u1")
+    after = ledger.try_reserve("u1", ["000002"])
+
+    assert leaked[0] and after[0]
+    # 既未 commit 也未 release 的预占过期后不再占额度，重载也不会把它带回来
+    assert after[2]["remaining_quota"] == QuotaService.ANONYMOUS_BASE_QUOTA
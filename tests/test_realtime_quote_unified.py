@@ -153,9 +153,13 @@ def test_watchlist_price_info_reflects_patched_close(monkeypatch):
     from services.tushare.client import TushareClient
     from services.watchlist.service import WatchlistService
 
+    from services.tushare.daily_series import daily_series_cache
+
     stale = _tushare_daily_stale_today()
     monkeypatch.setattr(TushareClient, "query", lambda self, api, **kw: stale.copy())
     monkeypatch.setattr(realtime_quote, "_fetch_sina_quote", lambda code: _quote_002129())
+    # 固定日期的假行情不落在“最近 10 天”窗口内，绕过序列缓存的窗口切片
+    monkeypatch.setattr(daily_series_cache, "get_range", lambda ts_code, start, end, fetch: fetch(start, end))
 
     service = WatchlistService.__new__(WatchlistService)  # 跳过 DB 初始化
     price, change_pct, _name = service._get_price_info("002129.SZ", "2026-07-10")
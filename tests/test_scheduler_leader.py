@@ -0,0 +1,146 @@
+"""调度 leader 租约：同时竞争只有一个 worker 当选，失联超时 / 主动释放后被接管，多进程并发迁移不冲突。"""
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from database.db_factory import DatabaseFactory
+from services.scheduler_leader import SchedulerLeader, TimerChain
+from services.search_snapshot_scheduler import SearchSnapshotScheduler
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _migrated_db(tmp_path) -> Path:
+    db_path = tmp_path / "stocks.db"
+    original_env = os.environ.get("DB_PATH")
+    original_cwd = os.getcwd()
+    os.environ["DB_PATH"] = str(db_path)
+    os.chdir(REPO_ROOT)
+    try:
+        from scripts.run_migrations import run_migrations
+
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+        if original_env is None:
+            os.environ.pop("DB_PATH", None)
+        else:
+            os.environ["DB_PATH"] = original_env
+    DatabaseFactory.initialize(str(db_path))
+    return db_path
+
+
+def test_only_one_worker_wins_concurrent_election(tmp_path):
+    _migrated_db(tmp_path)
+    leaders = [SchedulerLeader(holder_id=f"worker-{index}") for index in range(8)]
+    barrier = threading.Barrier(len(leaders))
+    results = {}
+
+    def _campaign(leader):
+        barrier.wait()
+        results[leader.holder_id] = leader.try_acquire()
+
+    threads = [threading.Thread(target=_campaign, args=(leader,)) for leader in leaders]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = [holder for holder, won in results.items() if won]
+    assert len(winners) == 1
+    assert leaders[0].current()["holder_id"] == winners[0]
+
+
+def test_expired_lease_is_taken_over_and_old_leader_demoted(tmp_path):
+    _migrated_db(tmp_path)
+    events = []
+    first = SchedulerLeader(ttl_sec=30, holder_id="worker-a")
+    second = SchedulerLeader(ttl_sec=30, holder_id="worker-b")
+    first._on_elected, first._on_demoted = (lambda: events.append("a elected")), (lambda: events.append("a demoted"))
+    second._on_elected = lambda: events.append("b elected")
+
+    assert first.heartbeat(now=1000.0) and not second.heartbeat(now=1010.0)
+    assert first.heartbeat(now=1020.0)  # 续约：租约延到 1050，acquired_at 不变
+    assert not second.heartbeat(now=1049.0)
+    assert second.heartbeat(now=1051.0)
+    assert not first.heartbeat(now=1052.0)
+
+    lease = second.current()
+    assert events == ["a elected", "b elected", "a demoted"]
+    assert (lease["holder_id"], lease["acquired_at"], lease["expires_at"]) == ("worker-b", 1051.0, 1081.0)
+
+
+def test_released_lease_is_taken_over_immediately(tmp_path):
+    _migrated_db(tmp_path)
+    first = SchedulerLeader(holder_id="worker-a")
+    second = SchedulerLeader(holder_id="worker-b")
+    assert first.try_acquire() and not second.try_acquire()
+
+    first.stop()
+
+    assert not first.is_leader() and second.try_acquire()
+    assert second.status()["leader"] == "worker-b"
+
+
+def test_stopped_scheduler_can_start_again():
+    SearchSnapshotScheduler.start()
+    try:
+        SearchSnapshotScheduler.stop()
+        assert not SearchSnapshotScheduler._running and SearchSnapshotScheduler._scheduler is None
+        SearchSnapshotScheduler.start()
+        assert SearchSnapshotScheduler._running
+    finally:
+        SearchSnapshotScheduler.stop()
+
+
+def test_cancelled_timer_chain_does_not_survive_quick_restart():
+    chain = TimerChain()
+    runs = []
+    first_run = threading.Event()
+    release = threading.Event()
+
+    def old_job():
+        runs.append("old")
+        first_run.set()
+        release.wait(2)
+
+    chain.schedule(0, 0.05, old_job)
+    assert first_run.wait(2)
+    # 旧任务还在执行时卸任又当选：旧链不得在任务结束后续排
+    chain.cancel()
+    chain.schedule(0.05, 60, lambda: runs.append("new"))
+    release.set()
+    time.sleep(0.3)
+    assert runs == ["old", "new"]
+    assert chain.pending() == 1
+    chain.cancel()
+    assert chain.pending() == 0
+
+
+def test_concurrent_worker_startups_apply_each_migration_once(tmp_path):
+    db_path = tmp_path / "stocks.db"
+    env = {**os.environ, "DB_PATH": str(db_path)}
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", "from scripts.run_migrations import run_migrations; run_migrations()"],
+            cwd=REPO_ROOT,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        for _ in range(4)
+    ]
+    outputs = [worker.communicate(timeout=120)[0].decode() for worker in workers]
+
+    # 不加锁时并发执行同一迁移会失败后被当作「无害失败」标记为已应用
+    assert [worker.returncode for worker in workers] == [0, 0, 0, 0], outputs
+    assert not any("FAILED" in output for output in outputs), outputs
+    conn = sqlite3.connect(db_path)
+    applied = [row[0] for row in conn.execute("SELECT name FROM schema_migrations")]
+    conn.close()
+    migrations = sorted(name for name in os.listdir(REPO_ROOT / "migrations") if name.endswith((".sql", ".py")))
+    assert sorted(applied) == migrations
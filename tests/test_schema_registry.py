@@ -0,0 +1,96 @@
+"""schema registry：DDL/补列只在启动迁移时执行一次，服务构造不再触碰表结构。"""
+import os
+import sqlite3
+from pathlib import Path
+
+from database.schema_registry import SchemaRegistry, TableSchema, schema_registry
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _columns(db_path, table):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    finally:
+        conn.close()
+
+
+def test_apply_creates_table_and_is_idempotent(tmp_path):
+    registry = SchemaRegistry()
+    registry.register(TableSchema(
+        table="things",
+        create_sql="CREATE TABLE IF NOT EXISTS things (id INTEGER PRIMARY KEY, name TEXT)",
+        columns=(("name", "TEXT"),),
+        indexes=("CREATE INDEX IF NOT EXISTS idx_things_name ON things(name)",),
+    ))
+    conn = sqlite3.connect(tmp_path / "r.db")
+    try:
+        assert registry.apply(conn) == ["CREATE TABLE things"]
+        assert registry.apply(conn) == []
+    finally:
+        conn.close()
+
+
+def test_apply_adds_missing_columns_to_existing_table(tmp_path):
+    db_path = tmp_path / "old.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE articles (id INTEGER PRIMARY KEY, title TEXT, stock_code TEXT, stock_name TEXT,"
+        " market_type TEXT, content TEXT, score INTEGER, publish_date TEXT)"
+    )
+    conn.commit()
+    conn.close()
+
+    changes = schema_registry.ensure(str(db_path))
+
+    assert "ALTER TABLE articles ADD COLUMN ai_score_json" in changes
+    assert {"legacy_score", "score_version", "ai_score_json"} <= _columns(db_path, "articles")
+
+
+def test_table_owned_by_migrations_is_not_created(tmp_path):
+    conn = sqlite3.connect(tmp_path / "empty.db")
+    try:
+        changes = schema_registry.apply(conn)
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    finally:
+        conn.close()
+
+    assert "CREATE TABLE articles" in changes
+    assert "judgments" not in tables
+
+
+def test_run_migrations_applies_registry(tmp_path, monkeypatch):
+    db_path = tmp_path / "stocks.db"
+    monkeypatch.setenv("DB_PATH", str(db_path))
+    original_cwd = os.getcwd()
+    os.chdir(REPO_ROOT)
+    try:
+        from scripts.run_migrations import run_migrations
+
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+
+    assert "ai_score_json" in _columns(db_path, "articles")
+    assert "verification_period" in _columns(db_path, "judgments")
+
+
+def test_service_constructors_issue_no_ddl(tmp_path):
+    from database.db_factory import DatabaseFactory
+    from services.archive_service import ArchiveService
+    from services.judgment_service import JudgmentService
+    from services.quota_service import QuotaService
+
+    db_path = str(tmp_path / "fresh.db")
+    DatabaseFactory.initialize(db_path)
+    ArchiveService(db_path=db_path)
+    JudgmentService(db_path=db_path)
+    QuotaService(db_path=db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        tables = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+    finally:
+        conn.close()
+    assert tables == []
@@ -11,6 +11,7 @@ import pytest
 import pandas as pd
 from fastapi.testclient import TestClient
 
+from database.schema_registry import schema_registry
 from services.ai_analyzer import AIAnalyzer
 from services.judgment_service import JudgmentService
 from services.stock_data_provider import StockDataProvider
@@ -30,9 +31,9 @@ def _apply_migration(db_path: Path, migration_name: str) -> None:
 
 
 def test_tushare_client_can_initialize_after_token_appears(monkeypatch):
-    TushareClient._instance = None
-    TushareClient._pro = None
-    TushareClient._initialized = False
+    monkeypatch.setattr(TushareClient, "_instance", None)
+    monkeypatch.setattr(TushareClient, "_pro", None)
+    monkeypatch.setattr(TushareClient, "_initialized", False)
 
     monkeypatch.delenv("TUSHARE_TOKEN", raising=False)
     client = TushareClient()
@@ -54,6 +55,8 @@ def test_tushare_client_can_initialize_after_token_appears(monkeypatch):
 def test_judgment_service_initializes_legacy_schema_without_error(tmp_path):
     db_path = tmp_path / "legacy.db"
     _apply_migration(db_path, "001_create_judgments_tables.sql")
+    # 补列由启动迁移里的 schema registry 负责，服务构造不再执行 DDL
+    schema_registry.ensure(str(db_path))
 
     service = JudgmentService(db_path=str(db_path))
     assert service is not None
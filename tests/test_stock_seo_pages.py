@@ -117,7 +117,7 @@ def test_sitemap_includes_stock_index_and_hot_stock_pages():
 
 
 def test_stock_landing_page_lists_recent_articles(monkeypatch):
-    async def fake_get_articles(self, limit=20, offset=0, keyword=None):
+    async def fake_get_articles(self, limit=20, offset=0, keyword=None, **kwargs):
         assert limit == 5
         assert keyword == "600519"
         return [
@@ -172,7 +172,7 @@ def test_stock_landing_page_faq_uses_ai_score_insights(monkeypatch):
         },
     }
 
-    async def fake_get_articles(self, limit=20, offset=0, keyword=None):
+    async def fake_get_articles(self, limit=20, offset=0, keyword=None, **kwargs):
         assert keyword == "600519"
         return [
             {
@@ -202,7 +202,7 @@ def test_stock_landing_page_faq_uses_ai_score_insights(monkeypatch):
 
 
 def test_stock_landing_page_supports_stocks_with_archived_articles(monkeypatch):
-    async def fake_get_articles(self, limit=20, offset=0, keyword=None):
+    async def fake_get_articles(self, limit=20, offset=0, keyword=None, **kwargs):
         assert keyword == "300735"
         return [
             {
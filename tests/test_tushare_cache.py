@@ -0,0 +1,256 @@
+"""TushareCache：LRU 容量上限、过期清扫、按模块统计、磁盘层与 stale-while-revalidate。"""
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from services.tushare.cache import TushareCache
+from services.tushare.schemas import ModuleResult
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    TushareCache.invalidate()
+    TushareCache.reset_stats()
+    monkeypatch.setattr(TushareCache, "_ensure_sweeper", classmethod(lambda cls: None))
+    yield
+    TushareCache.invalidate()
+    TushareCache.reset_stats()
+
+
+def test_hit_miss_counters_per_module():
+    TushareCache.set("capital_flow", "600519.SH", {"v": 1}, asof="20260601")
+
+    assert TushareCache.get("capital_flow", "600519.SH", asof="20260601") == (True, {"v": 1})
+    assert TushareCache.get("capital_flow", "000001.SZ", asof="20260601") == (False, None)
+    assert TushareCache.get("events", "600519.SH", asof="20260601") == (False, None)
+
+    modules = TushareCache.stats()["modules"]
+    assert modules["capital_flow"]["hits"] == 1
+    assert modules["capital_flow"]["misses"] == 1
+    assert modules["capital_flow"]["hit_rate"] == 0.5
+    assert modules["capital_flow"]["entries"] == 1
+    assert modules["events"]["misses"] == 1
+
+
+def test_lru_evicts_least_recently_used_over_entry_limit(monkeypatch):
+    monkeypatch.setattr(TushareCache, "MAX_ENTRIES", 2)
+    monkeypatch.setenv("TUSHARE_DISK_CACHE", "false")  # 只看内存层淘汰
+
+    TushareCache.set("events", "A", 1, asof="20260601")
+    TushareCache.set("events", "B", 2, asof="20260601")
+    TushareCache.get("events", "A", asof="20260601")  # A 变为最近使用
+    TushareCache.set("events", "C", 3, asof="20260601")
+
+    assert TushareCache.get("events", "B", asof="20260601") == (False, None)
+    assert TushareCache.get("events", "A", asof="20260601") == (True, 1)
+    assert TushareCache.get("events", "C", asof="20260601") == (True, 3)
+    stats = TushareCache.stats()
+    assert stats["total"] == 2
+    assert stats["modules"]["events"]["evictions"] == 1
+
+
+def test_byte_limit_bounds_memory(monkeypatch):
+    df = pd.DataFrame({"close": range(1000)})
+    size = int(df.memory_usage(deep=True).sum())
+    monkeypatch.setattr(TushareCache, "MAX_BYTES", size * 3)
+
+    for code in ("A", "B", "C", "D", "E"):
+        TushareCache.set("relative_strength", code, df, asof="20260601")
+
+    stats = TushareCache.stats()
+    assert stats["total"] == 3
+    assert stats["bytes"] <= size * 3
+    assert stats["modules"]["relative_strength"]["evictions"] == 2
+
+
+def test_sweep_removes_expired_entries_never_read_again(monkeypatch):
+    monkeypatch.setattr(TushareCache, "STALE_MAX_SEC", 0)
+    TushareCache.set("capital_flow", "600519.SH", 1, asof="20260531", ttl=-1)
+    TushareCache.set("capital_flow", "600519.SH", 2, asof="20260601", ttl=300)
+
+    assert TushareCache.sweep_expired() == 1
+    stats = TushareCache.stats()
+    assert stats["total"] == 1
+    assert stats["modules"]["capital_flow"]["expirations"] == 1
+
+
+def test_invalidate_keeps_byte_accounting_consistent():
+    TushareCache.set("events", "600519.SH", {"v": "x" * 100}, asof="20260601")
+    TushareCache.set("capital_flow", "600519.SH", {"v": "y" * 100}, asof="20260601")
+
+    TushareCache.invalidate(module="events")
+    remaining = TushareCache.stats()
+    assert remaining["total"] == 1
+    assert remaining["bytes"] == remaining["modules"]["capital_flow"]["bytes"]
+
+    TushareCache.invalidate()
+    assert TushareCache.stats()["bytes"] == 0
+
+
+def test_admin_ops_cache_exposes_stats():
+    import asyncio
+
+    from routes.admin import admin_ops_cache
+
+    TushareCache.set("events", "600519.SH", 1, asof="20260601")
+    TushareCache.get("events", "600519.SH", asof="20260601")
+
+    body = asyncio.run(admin_ops_cache(_={}))
+
+    assert body["tushare_cache"]["modules"]["events"]["hits"] == 1
+    assert "event_calendar" in body
+    assert "watchlist_summary_cache" in body
+
+
+def _drop_memory_tier():
+    """模拟进程重启：只清内存层，磁盘层保留"""
+    with TushareCache._lock:
+        TushareCache._cache.clear()
+        TushareCache._bytes = 0
+
+
+def test_warm_restart_serves_from_disk_tier():
+    df = pd.DataFrame({"trade_date": ["20260601"], "close": [1688.0]})
+    TushareCache.set("relative_strength", "600519.SH", df, asof="20260601")
+    _drop_memory_tier()
+
+    hit, data = TushareCache.get("relative_strength", "600519.SH", asof="20260601")
+
+    assert hit is True
+    pd.testing.assert_frame_equal(data, df)
+    modules = TushareCache.stats()["modules"]
+    assert modules["relative_strength"]["l2_hits"] == 1
+    assert modules["relative_strength"]["entries"] == 1  # 已回填内存
+
+
+def test_disk_tier_respects_ttl_and_invalidate():
+    TushareCache.set("capital_flow", "600519.SH", 1, asof="20260601", ttl=-1)
+    TushareCache.set("events", "600519.SH", 2, asof="20260601")
+    TushareCache.set("events", "000001.SZ", 3, asof="20260601")
+    _drop_memory_tier()
+
+    assert TushareCache.get("capital_flow", "600519.SH", asof="20260601") == (False, None)
+
+    TushareCache.invalidate(module="events", ts_code="600519.SH")
+    assert TushareCache.get("events", "600519.SH", asof="20260601") == (False, None)
+    assert TushareCache.get("events", "000001.SZ", asof="20260601") == (True, 3)
+
+
+def test_disk_tier_shared_between_instances():
+    from services.tushare.disk_cache import TushareDiskCache
+
+    writer, reader = TushareDiskCache(), TushareDiskCache()
+    key = TushareCache._make_key("events", "600519.SH", "20260601")
+    writer.set(key, "events", {"v": 1}, expires_at=time.time() + 60)
+
+    hit, data, _ = reader.get(key)
+    assert hit is True and data == {"v": 1}
+
+
+def test_disk_tier_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("TUSHARE_DISK_CACHE", "false")
+    TushareCache.set("events", "600519.SH", 1, asof="20260601")
+    _drop_memory_tier()
+
+    assert TushareCache.get("events", "600519.SH", asof="20260601") == (False, None)
+    assert TushareCache.stats()["disk"] == {"enabled": False}
+
+
+class CountingEnhancer:
+    """最小 enhancer：每次 enhance 计数并写缓存。"""
+
+    MODULE_NAME = "capital_flow"
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def build(self):
+        from services.tushare.enhancers.base import BaseEnhancer
+
+        outer = self
+
+        class _Enhancer(BaseEnhancer):
+            MODULE_NAME = "capital_flow"
+
+            def _check_available(self):
+                return True, None
+
+            def enhance(self, ts_code, asof=None):
+                hit, cached = self._get_cached(ts_code, asof.replace("-", ""))
+                if hit:
+                    return cached
+                outer.release.wait(2)
+                outer.calls += 1
+                result = ModuleResult(available=True, summary=f"v{outer.calls}")
+                self._set_cache(ts_code, result, asof.replace("-", ""))
+                return result
+
+        return _Enhancer()
+
+
+def test_expired_entry_is_served_stale_and_refreshed_once_in_background(monkeypatch):
+    monkeypatch.setattr(TushareCache, "STALE_MAX_SEC", 600)
+    counter = CountingEnhancer()
+    enh = counter.build()
+    TushareCache.set("capital_flow", "600519.SH", ModuleResult(available=True, summary="old"), asof="20260601", ttl=-1)
+
+    counter.release.clear()  # 卡住后台刷新，验证并发请求只触发一次
+    first = enh.safe_enhance("600519.SH", "2026-06-01")
+    second = enh.safe_enhance("600519.SH", "2026-06-01")
+    assert first.summary == "old" and second.summary == "old"
+
+    counter.release.set()
+    for _ in range(100):
+        if TushareCache.get("capital_flow", "600519.SH", asof="20260601")[0]:
+            break
+        time.sleep(0.02)
+
+    assert counter.calls == 1
+    assert enh.safe_enhance("600519.SH", "2026-06-01").summary == "v1"
+    stats = TushareCache.stats()["modules"]["capital_flow"]
+    assert stats["stale_hits"] == 2
+    assert stats["refreshes"] == 1
+
+
+def test_entry_past_hard_stale_limit_makes_caller_wait(monkeypatch):
+    monkeypatch.setattr(TushareCache, "STALE_MAX_SEC", 0)
+    counter = CountingEnhancer()
+    enh = counter.build()
+    TushareCache.set("capital_flow", "600519.SH", ModuleResult(available=True, summary="old"), asof="20260601", ttl=-1)
+
+    assert enh.safe_enhance("600519.SH", "2026-06-01").summary == "v1"
+    assert counter.calls == 1
+
+
+def test_watchlist_summary_cache_serves_stale_within_limit():
+    from datetime import datetime, timedelta
+
+    from services.watchlist.cache import WatchlistSummaryCache
+
+    cache = WatchlistSummaryCache(ttl_minutes=5, stale_minutes=30)
+    cache.set("600519.SH", "2026-06-01", "old")
+    cache.cache["600519.SH:2026-06-01"]["cached_at"] = datetime.now() - timedelta(minutes=10)
+
+    assert cache.get("600519.SH", "2026-06-01") is None
+    assert cache.get_entry("600519.SH", "2026-06-01") == ("old", True)
+
+    done = threading.Event()
+
+    def loader():
+        done.set()
+        return "new"
+
+    assert cache.refresh_async("600519.SH", "2026-06-01", loader) is True
+    assert done.wait(2)
+    for _ in range(100):
+        if cache.get("600519.SH", "2026-06-01") == "new":
+            break
+        time.sleep(0.02)
+    assert cache.get_entry("600519.SH", "2026-06-01") == ("new", False)
+
+    cache.cache["600519.SH:2026-06-01"]["cached_at"] = datetime.now() - timedelta(minutes=40)
+    assert cache.get_entry("600519.SH", "2026-06-01") == (None, False)
@@ -0,0 +1,207 @@
+"""Tushare 请求调度：按接口令牌桶、交互优先、同窗口单股票请求合并、多 worker 均分限额。"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from services.tushare import client as client_module
+from services.tushare.client import TushareClient
+from services.tushare.rate_limiter import (
+    BATCH,
+    INTERACTIVE,
+    TushareRequestScheduler,
+    tushare_priority,
+    current_priority,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_token_bucket_caps_burst_per_api():
+    scheduler = TushareRequestScheduler(default_rate=60)  # 容量 12
+
+    granted = [scheduler.acquire('daily', priority=INTERACTIVE, max_wait=0) for _ in range(13)]
+
+    assert granted.count(True) == 12
+    assert granted[-1] is False
+    # 其他接口独立计数
+    assert scheduler.acquire('moneyflow', priority=INTERACTIVE, max_wait=0) is True
+    assert scheduler.stats()['apis']['daily']['rejected'] == 1
+
+
+def test_batch_priority_leaves_reserve_for_interactive():
+    scheduler = TushareRequestScheduler(default_rate=60)
+
+    batch_granted = 0
+    while scheduler.acquire('daily', priority=BATCH, max_wait=0):
+        batch_granted += 1
+
+    assert 0 < batch_granted < 12
+    assert scheduler.acquire('daily', priority=INTERACTIVE, max_wait=0) is True
+
+
+def test_priority_context_defaults_to_interactive():
+    assert current_priority() == INTERACTIVE
+    with tushare_priority(BATCH):
+        assert current_priority() == BATCH
+    assert current_priority() == INTERACTIVE
+
+
+@contextmanager
+def _daily_in_flight(scheduler):
+    """占住一个 daily 请求（参数不同，不参与合并），让后续请求看到接口繁忙"""
+    release = threading.Event()
+
+    def slow_fetch(ts_code, **kwargs):
+        release.wait(2)
+        return pd.DataFrame({'ts_code': [ts_code]})
+
+    busy = threading.Thread(
+        target=scheduler.fetch_by_code,
+        args=('daily', 'X.SH', slow_fetch),
+        kwargs={'start_date': '20260401', 'end_date': '20260601'},
+    )
+    busy.start()
+    while not scheduler._by_code_in_flight['daily']:
+        pass
+    try:
+        yield
+    finally:
+        release.set()
+        busy.join()
+
+
+def test_concurrent_single_code_requests_are_coalesced():
+    scheduler = TushareRequestScheduler(default_rate=6000)
+    scheduler.batch_window_sec = 0.1
+    calls = []
+
+    def fetch(ts_code, **kwargs):
+        calls.append(ts_code)
+        codes = ts_code.split(',')
+        return pd.DataFrame({'ts_code': codes, 'close': [float(i) for i in range(len(codes))]})
+
+    results = {}
+
+    def worker(code):
+        results[code] = scheduler.fetch_by_code(
+            'daily', code, fetch, start_date='20260501', end_date='20260601'
+        )
+
+    with _daily_in_flight(scheduler):
+        threads = [threading.Thread(target=worker, args=(code,)) for code in ('A.SH', 'B.SZ', 'C.SZ')]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(calls) == 1
+    assert sorted(calls[0].split(',')) == ['A.SH', 'B.SZ', 'C.SZ']
+    for code, df in results.items():
+        assert df['ts_code'].tolist() == [code]
+    assert scheduler.stats()['apis']['daily']['coalesced_requests'] == 3
+
+
+def test_lone_request_skips_batch_window():
+    scheduler = TushareRequestScheduler(default_rate=6000)
+    scheduler.batch_window_sec = 1.0
+    calls = []
+
+    def fetch(ts_code, **kwargs):
+        calls.append(ts_code)
+        return pd.DataFrame({'ts_code': [ts_code]})
+
+    started = time.monotonic()
+    scheduler.fetch_by_code('daily', 'A.SH', fetch, start_date='20260501', end_date='20260601')
+
+    assert time.monotonic() - started < 0.5
+    assert calls == ['A.SH']
+
+
+def test_coalesced_call_uses_highest_member_priority():
+    scheduler = TushareRequestScheduler(default_rate=6000)
+    scheduler.batch_window_sec = 0.1
+    seen = []
+
+    def fetch(ts_code, **kwargs):
+        seen.append(current_priority())
+        return pd.DataFrame({'ts_code': ts_code.split(',')})
+
+    def batch_leader():
+        with tushare_priority(BATCH):
+            scheduler.fetch_by_code('daily', 'A.SH', fetch, start_date='20260501', end_date='20260601')
+
+    with _daily_in_flight(scheduler):
+        leader = threading.Thread(target=batch_leader)
+        leader.start()
+        while not scheduler._open_batches:
+            pass
+        scheduler.fetch_by_code('daily', 'B.SZ', fetch, start_date='20260501', end_date='20260601')
+        leader.join()
+
+    # 交互请求搭上批量任务的合并调用：按 INTERACTIVE 取令牌，不被 BATCH 让路拖慢
+    assert seen == [INTERACTIVE]
+
+
+def test_no_coalescing_when_rows_cannot_be_bounded():
+    scheduler = TushareRequestScheduler(default_rate=6000)
+    calls = []
+
+    def fetch(ts_code, **kwargs):
+        calls.append(ts_code)
+        return pd.DataFrame({'ts_code': [ts_code]})
+
+    # 未给 start_date 会拉全历史，合并可能超过单次行数上限
+    scheduler.fetch_by_code('daily', 'A.SH', fetch, end_date='20260601')
+    # 不支持多代码的接口直接透传
+    scheduler.fetch_by_code('index_daily', '000300.SH', fetch, start_date='20260501', end_date='20260601')
+
+    assert calls == ['A.SH', '000300.SH']
+
+
+def test_client_backs_off_on_upstream_rate_limit(monkeypatch):
+    scheduler = TushareRequestScheduler(default_rate=6000)
+    monkeypatch.setattr(client_module, 'tushare_request_scheduler', scheduler)
+
+    class FakePro:
+        def __init__(self):
+            self.calls = 0
+
+        def daily(self, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise Exception('抱歉，您每分钟最多访问该接口500次')
+            return pd.DataFrame({'ts_code': [kwargs['ts_code']]})
+
+    pro = FakePro()
+    monkeypatch.setattr(TushareClient, '_pro', pro)
+
+    df = TushareClient().query('daily', ts_code='600519.SH')
+
+    assert pro.calls == 2
+    assert df['ts_code'].tolist() == ['600519.SH']
+    assert scheduler.stats()['apis']['daily']['upstream_throttled'] == 1
+
+
+def test_account_rates_are_split_across_workers():
+    env = dict(os.environ, WEB_WORKERS="4", TUSHARE_RATE_PER_MIN="200", TUSHARE_API_RATES="daily=500,moneyflow=2")
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from services.tushare.rate_limiter import DEFAULT_RATE_PER_MIN as d, API_RATES_PER_MIN as r;"
+            "print(d, r['daily'], r['moneyflow'])",
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+
+    assert out == ["50", "125", "1"]
@@ -0,0 +1,133 @@
+"""观察列表批量摘要：集合化取数（一次日线预热、一次批量增强、一条判断 SQL）与批量报价。"""
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from services import realtime_quote
+from services.trend.schemas import TrendResult
+from services.tushare.client import tushare_client
+from services.tushare.orchestrator import enhancement_orchestrator
+from services.tushare.schemas import EnhancementsResponse
+from services.watchlist.cache import watchlist_summary_cache
+from services.watchlist.service import WatchlistService
+
+
+@pytest.fixture(autouse=True)
+def clear_summary_cache():
+    watchlist_summary_cache.clear()
+    yield
+    watchlist_summary_cache.clear()
+
+
+def _insert_judgment(db_path, judgment_id, stock_code, candidate, created_at, status="active"):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            """
+            INSERT INTO judgments (id, user_id, stock_code, candidate, status, created_at, updated_at)
+            VALUES (?, 'u1', ?, ?, ?, ?, ?)
+            """,
+            (judgment_id, stock_code, candidate, status, created_at, created_at),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_batch_summaries_use_set_oriented_io(isolated_db, monkeypatch):
+    _insert_judgment(isolated_db, "j1", "600519.SH", "A", "2026-06-01T00:00:00")
+    _insert_judgment(isolated_db, "j2", "600519.SH", "B", "2026-06-02T00:00:00")
+    _insert_judgment(isolated_db, "j3", "000001.SZ", "C", "2026-06-03T00:00:00", status="archived")
+
+    calls = {"daily": [], "quotes": [], "enhance": []}
+    monkeypatch.setattr(
+        tushare_client, "prefetch_daily",
+        lambda codes, start_date, end_date=None: calls["daily"].append(list(codes)) or len(codes),
+    )
+    monkeypatch.setattr(realtime_quote, "prefetch_quotes", lambda codes: calls["quotes"].append(list(codes)) or 0)
+
+    def fake_enhance_many(codes, asof=None, deadline=None):
+        calls["enhance"].append(list(codes))
+        return {code: EnhancementsResponse() for code in codes}
+
+    monkeypatch.setattr(enhancement_orchestrator, "enhance_many", fake_enhance_many)
+
+    service = WatchlistService()
+    monkeypatch.setattr(
+        service, "_build_trend",
+        lambda ts_code, asof: TrendResult(direction="up", strength=60, degraded=False, evidence=[]),
+    )
+    monkeypatch.setattr(service, "_get_price_info", lambda ts_code, asof: (10.0, 1.5, f"名称{ts_code}"))
+
+    def per_code_judgement(ts_code):
+        raise AssertionError("批量路径不应逐只查询判断状态")
+
+    monkeypatch.setattr(service, "_get_judgement_status", per_code_judgement)
+
+    summaries = service._batch_generate_summaries(["000001.SZ", "600519"], "2026-06-18")
+
+    assert [s.ts_code for s in summaries] == ["000001.SZ", "600519.SH"]
+    assert calls["daily"] == [["000001.SZ", "600519.SH"]]
+    assert calls["quotes"] == [["000001.SZ", "600519.SH"]]
+    assert calls["enhance"] == [["000001.SZ", "600519.SH"]]
+    assert summaries[0].judgement.has_active is False
+    assert summaries[1].judgement.has_active is True
+    assert summaries[1].judgement.candidate == "B"  # 取最新一条
+    assert summaries[1].name == "名称600519.SH"
+
+    # 成功结果写入摘要缓存，第二次不再触发上游
+    again = service._batch_generate_summaries(["600519.SH"], "2026-06-18")
+    assert again[0].judgement.candidate == "B"
+    assert len(calls["enhance"]) == 1
+
+
+def test_batch_summaries_degrade_failed_codes_without_caching(isolated_db, monkeypatch):
+    monkeypatch.setattr(tushare_client, "prefetch_daily", lambda codes, start_date, end_date=None: 0)
+    monkeypatch.setattr(realtime_quote, "prefetch_quotes", lambda codes: 0)
+    monkeypatch.setattr(
+        enhancement_orchestrator, "enhance_many",
+        lambda codes, asof=None, deadline=None: {code: EnhancementsResponse() for code in codes},
+    )
+
+    service = WatchlistService()
+
+    def flaky_trend(ts_code, asof):
+        if ts_code == "000001.SZ":
+            raise RuntimeError("boom")
+        return TrendResult(direction="up", strength=60, degraded=False, evidence=[])
+
+    monkeypatch.setattr(service, "_build_trend", flaky_trend)
+    monkeypatch.setattr(service, "_get_price_info", lambda ts_code, asof: (10.0, None, None))
+
+    summaries = service._batch_generate_summaries(["000001.SZ", "600519.SH"], "2026-06-18")
+
+    assert summaries[0].trend.degraded is True
+    assert summaries[1].trend.degraded is False
+    assert watchlist_summary_cache.get("000001.SZ", "2026-06-18") is None
+    assert watchlist_summary_cache.get("600519.SH", "2026-06-18") is not None
+
+
+def test_prefetch_quotes_warms_cache_with_one_request(monkeypatch):
+    requested = []
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    def fake_bulk(codes):
+        requested.append(list(codes))
+        return {
+            realtime_quote.to_sina_symbol(code): {"price": 10.0 + i, "trade_date": today}
+            for i, code in enumerate(codes)
+        }
+
+    def single_fetch(code):
+        raise AssertionError("预热后不应逐只请求")
+
+    monkeypatch.setattr(realtime_quote, "_fetch_sina_quotes", fake_bulk)
+    monkeypatch.setattr(realtime_quote, "_fetch_sina_quote", single_fetch)
+    monkeypatch.setattr(realtime_quote, "_quote_cache", {})
+
+    assert realtime_quote.prefetch_quotes(["600519.SH", "000001.SZ"]) == 2
+    assert len(requested) == 1
+    assert realtime_quote.get_quote("000001.SZ")["price"] == 11.0
+    # 已缓存的不再请求
+    assert realtime_quote.prefetch_quotes(["600519.SH"]) == 0
@@ -204,3 +204,162 @@ def test_frontend_watchlist_page_renders_signal_panel():
     store_text = (REPO_ROOT / "frontend/src/stores/notification.ts").read_text(encoding="utf-8")
     assert "signalAlertCount" in store_text
     assert "signal_alert_count" in store_text
+
+
+def _open_dates(periods: int) -> list:
+    return [d.strftime("%Y%m%d") for d in pd.bdate_range(end=datetime.now(), periods=periods)]
+
+
+class FakeTushare:
+    """trade_cal + 全市场 daily / adj_factor(trade_date=...) 的假上游，记录调用。"""
+
+    def __init__(self, open_dates, market_rows, adj_factors=None):
+        self.open_dates = open_dates
+        self.market_rows = market_rows
+        # 全市场复权因子；缺省每只 1.0
+        self.adj_factors = adj_factors or {row["ts_code"]: 1.0 for row in market_rows}
+        self.calls = []
+
+    def query(self, api_name, **kwargs):
+        self.calls.append((api_name, kwargs))
+        if api_name == "trade_cal":
+            return pd.DataFrame({"cal_date": self.open_dates})
+        if kwargs.get("trade_date") == self.open_dates[-1]:
+            if api_name == "daily":
+                return pd.DataFrame(self.market_rows)
+            if api_name == "adj_factor":
+                return pd.DataFrame({
+                    "ts_code": list(self.adj_factors),
+                    "adj_factor": list(self.adj_factors.values()),
+                })
+        if api_name == "adj_factor" and kwargs.get("ts_code"):
+            return pd.DataFrame([
+                {"ts_code": code, "trade_date": d, "adj_factor": 1.0}
+                for code in kwargs["ts_code"].split(",")
+                for d in self.open_dates
+            ])
+        return pd.DataFrame()
+
+
+def _signal_state_service(tmp_path, monkeypatch, fake):
+    from services.tushare.client import TushareClient, tushare_client
+
+    db_path = tmp_path / "signal_state.db"
+    _apply_migrations(db_path, ["021_create_watchlist_signal_state.sql"])
+    DatabaseFactory.initialize(str(db_path))
+    monkeypatch.setattr(TushareClient, "_pro", object())
+    monkeypatch.setattr(tushare_client, "query", fake.query)
+    return WatchlistSignalService()
+
+
+def test_incremental_scan_appends_latest_bar_from_one_market_call(tmp_path, monkeypatch):
+    from services.tushare.client import tushare_client
+
+    dates = _open_dates(30)
+    fake = FakeTushare(dates, [
+        {"ts_code": "600519.SH", "close": 103.0, "vol": 3000.0},
+        {"ts_code": "000001.SZ", "close": 10.0, "vol": 500.0},  # 不在观察池
+    ])
+    service = _signal_state_service(tmp_path, monkeypatch, fake)
+    service._save_states({"600519.SH": [[d, 100.0, 1000.0, 1.0] for d in dates[:-1]]})
+
+    def no_history(*args, **kwargs):
+        raise AssertionError("状态连续时不应拉历史")
+
+    monkeypatch.setattr(tushare_client, "prefetch_daily", no_history)
+    monkeypatch.setattr(tushare_client, "get_daily", no_history)
+    monkeypatch.setattr(service, "_scan_symbols_full", no_history)
+
+    results = service._scan_symbols(["600519.SH"])
+
+    assert {s["signal_type"] for s in results["600519.SH"]} >= {"volume_spike"}
+    assert [name for name, _ in fake.calls] == ["trade_cal", "daily", "adj_factor"]
+    state = service._load_states(["600519.SH"])["600519.SH"]
+    assert len(state) == 30
+    assert state[-1] == [dates[-1], 103.0, 3000.0, 1.0]
+
+    # 同一交易日重跑：窗口不重复追加
+    service._scan_symbols(["600519.SH"])
+    assert service._load_states(["600519.SH"])["600519.SH"] == state
+
+
+def test_scan_warms_missing_or_gapped_state_in_bulk(tmp_path, monkeypatch):
+    from services.tushare.client import tushare_client
+
+    dates = _open_dates(40)
+    fake = FakeTushare(dates, [
+        {"ts_code": "600519.SH", "close": 100.0, "vol": 1000.0},
+        {"ts_code": "000858.SZ", "close": 100.0, "vol": 1000.0},
+    ])
+    service = _signal_state_service(tmp_path, monkeypatch, fake)
+    # 000858 的状态停在三个交易日前：断档需要重新预热
+    service._save_states({"000858.SZ": [[d, 100.0, 1000.0, 1.0] for d in dates[:-3]]})
+
+    prefetched = []
+    monkeypatch.setattr(
+        tushare_client, "prefetch_daily",
+        lambda codes, start_date, end_date=None: prefetched.append(sorted(codes)) or len(codes),
+    )
+
+    def fake_get_daily(code, start_date=None, end_date=None):
+        if code == "510300.SH":
+            return pd.DataFrame()
+        return pd.DataFrame({
+            "trade_date": list(reversed(dates)),
+            "close": [100.0] * len(dates),
+            "vol": [1000.0] * len(dates),
+        })
+
+    monkeypatch.setattr(tushare_client, "get_daily", fake_get_daily)
+    fallback = []
+    monkeypatch.setattr(service, "_scan_symbols_full", lambda codes: fallback.extend(codes) or {})
+
+    service._scan_symbols(["600519.SH", "000858.SZ", "510300.SH"])
+
+    assert prefetched == [["000858.SZ", "510300.SH", "600519.SH"]]
+    states = service._load_states(["600519.SH", "000858.SZ"])
+    assert states["600519.SH"][-1][0] == dates[-1]
+    assert len(states["000858.SZ"]) == 30
+    # 无 tushare 日线的 ETF 走全量回退
+    assert fallback == ["510300.SH"]
+
+
+def test_ex_dividend_day_is_forward_adjusted(tmp_path, monkeypatch):
+    dates = _open_dates(30)
+    # 10 送 10：原始收盘价腰斩，复权因子翻倍
+    fake = FakeTushare(
+        dates,
+        [{"ts_code": "600519.SH", "close": 50.0, "vol": 1000.0}],
+        adj_factors={"600519.SH": 2.0},
+    )
+    service = _signal_state_service(tmp_path, monkeypatch, fake)
+    service._save_states({"600519.SH": [[d, 100.0, 1000.0, 1.0] for d in dates[:-1]]})
+    monkeypatch.setattr(service, "_scan_symbols_full", lambda codes: {})
+
+    results = service._scan_symbols(["600519.SH"])
+
+    assert results == {}
+    state = service._load_states(["600519.SH"])["600519.SH"]
+    assert state[-1] == [dates[-1], 50.0, 1000.0, 2.0]
+    assert service._window_frame(state)["Close"].tolist() == [50.0] * 30
+
+
+def test_legacy_state_without_adj_factor_is_rewarmed(tmp_path, monkeypatch):
+    from services.tushare.client import tushare_client
+
+    dates = _open_dates(40)
+    fake = FakeTushare(dates, [{"ts_code": "600519.SH", "close": 100.0, "vol": 1000.0}])
+    service = _signal_state_service(tmp_path, monkeypatch, fake)
+    service._save_states({"600519.SH": [[d, 100.0, 1000.0] for d in dates[:-1]]})
+    monkeypatch.setattr(tushare_client, "prefetch_daily", lambda codes, start_date, end_date=None: len(codes))
+    monkeypatch.setattr(
+        tushare_client, "get_daily",
+        lambda code, start_date=None, end_date=None: pd.DataFrame({
+            "trade_date": dates, "close": [100.0] * len(dates), "vol": [1000.0] * len(dates),
+        }),
+    )
+
+    service._scan_symbols(["600519.SH"])
+
+    state = service._load_states(["600519.SH"])["600519.SH"]
+    assert len(state) == 30 and all(bar[3] == 1.0 for bar in state)
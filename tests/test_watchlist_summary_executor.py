@@ -0,0 +1,109 @@
+"""观察列表摘要进程级线程池：总并发有界、跨请求轮转、断开取消。"""
+import threading
+import time
+
+import pytest
+
+from services.watchlist import executor as executor_module
+from services.tushare.rate_limiter import BATCH, current_priority, tushare_priority
+from services.watchlist.executor import FairSummaryExecutor, SummaryJobCancelled
+
+
+def test_concurrency_is_bounded_across_jobs():
+    pool = FairSummaryExecutor(max_workers=2)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+
+    def task():
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        return True
+
+    jobs = [pool.submit([task] * 4) for _ in range(3)]
+    for job in jobs:
+        assert job.wait() == [True] * 4
+
+    assert state["peak"] == 2
+    assert len(pool._threads) == 2
+
+
+def test_round_robin_interleaves_jobs():
+    pool = FairSummaryExecutor(max_workers=1)
+    gate = threading.Event()
+    order = []
+
+    # 第一个任务先占住唯一的 worker，保证两组任务都已入队
+    blocker = pool.submit([gate.wait])
+    big = pool.submit([lambda i=i: order.append(("big", i)) for i in range(4)])
+    small = pool.submit([lambda: order.append(("small", 0))])
+    gate.set()
+    blocker.wait()
+    big.wait()
+    small.wait()
+
+    # 小请求不必等大请求全部跑完
+    assert order.index(("small", 0)) == 1
+
+
+def test_cancel_drops_queued_tasks(monkeypatch):
+    pool = FairSummaryExecutor(max_workers=1)
+    monkeypatch.setattr(executor_module, "summary_executor", pool)
+    gate = threading.Event()
+    ran = []
+
+    def first():
+        gate.wait()
+        ran.append(0)
+
+    job = pool.submit([first] + [lambda i=i: ran.append(i) for i in range(1, 5)])
+    cancelled = threading.Event()
+    cancelled.set()
+
+    threading.Timer(0.05, gate.set).start()
+    with pytest.raises(SummaryJobCancelled):
+        job.wait(cancelled, poll_sec=0.01)
+
+    assert ran == [0]
+    assert pool.stats()["dropped_tasks"] == 4
+
+
+def test_failed_task_yields_none():
+    pool = FairSummaryExecutor(max_workers=2)
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    assert pool.submit([lambda: 1, boom]).wait() == [1, None]
+    assert pool.stats()["task_failures"] == 1
+
+
+def test_disconnect_watcher_sets_cancel_flag():
+    import asyncio
+
+    from routes.watchlists import _watch_disconnect
+
+    class FakeRequest:
+        def __init__(self):
+            self.polls = 0
+
+        async def is_disconnected(self):
+            self.polls += 1
+            return self.polls >= 3
+
+    cancelled = threading.Event()
+    asyncio.run(_watch_disconnect(FakeRequest(), cancelled, poll_sec=0))
+
+    assert cancelled.is_set()
+
+
+def test_tasks_inherit_submitter_priority():
+    pool = FairSummaryExecutor(max_workers=2)
+
+    with tushare_priority(BATCH):
+        job = pool.submit([current_priority, current_priority])
+
+    assert job.wait() == [BATCH, BATCH]
@@ -0,0 +1,172 @@
+"""观察列表摘要物化表：盘后写入、请求直接读行、盘中只刷新价格列。"""
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from services import realtime_quote
+from services.trend.schemas import TrendResult
+from services.tushare.client import tushare_client
+from services.tushare.orchestrator import enhancement_orchestrator
+from services.tushare.schemas import EnhancementsResponse
+from services.watchlist.cache import watchlist_summary_cache
+from services.watchlist.service import WatchlistService
+from services.watchlist.summary_store import watchlist_summary_store
+
+ASOF = "2026-06-18"
+MIGRATION = Path(__file__).resolve().parents[1] / "migrations" / "020_create_watchlist_item_summaries.sql"
+
+
+@pytest.fixture
+def summary_db(isolated_db):
+    conn = sqlite3.connect(isolated_db)
+    conn.executescript(MIGRATION.read_text(encoding="utf-8"))
+    conn.close()
+    watchlist_summary_cache.clear()
+    yield isolated_db
+    watchlist_summary_cache.clear()
+
+
+def _execute(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _fake_upstream(monkeypatch, service, calls):
+    monkeypatch.setattr(tushare_client, "prefetch_daily", lambda codes, start_date, end_date=None: 0)
+    monkeypatch.setattr(realtime_quote, "prefetch_quotes", lambda codes: 0)
+
+    def fake_enhance_many(codes, asof=None, deadline=None):
+        calls.append(list(codes))
+        return {code: EnhancementsResponse() for code in codes}
+
+    monkeypatch.setattr(enhancement_orchestrator, "enhance_many", fake_enhance_many)
+    monkeypatch.setattr(
+        service, "_build_trend",
+        lambda ts_code, asof: TrendResult(direction="up", strength=70, degraded=False, evidence=[]),
+    )
+    monkeypatch.setattr(service, "_get_price_info", lambda ts_code, asof: (10.0, 0.01, f"名称{ts_code}"))
+
+
+def test_materialized_rows_are_served_without_upstream_calls(summary_db, monkeypatch):
+    service = WatchlistService()
+    calls = []
+    _fake_upstream(monkeypatch, service, calls)
+    _execute(summary_db, "INSERT INTO watchlists (id, user_id, created_at, updated_at) VALUES ('w1', 'u1', 'x', 'x')")
+    for code in ("600519.SH", "000001.SZ"):
+        _execute(
+            summary_db,
+            "INSERT INTO watchlist_items (watchlist_id, ts_code, added_at) VALUES ('w1', ?, 'x')",
+            (code,),
+        )
+
+    result = service.materialize_summaries(asof=ASOF)
+
+    assert result["written"] == 2
+    assert calls == [["600519.SH", "000001.SZ"]] or calls == [["000001.SZ", "600519.SH"]]
+
+    # 模拟重启：进程内缓存清空，上游不可用
+    watchlist_summary_cache.clear()
+
+    def no_upstream(*args, **kwargs):
+        raise AssertionError("物化命中时不应触发上游")
+
+    monkeypatch.setattr(service, "_build_summaries_bulk", no_upstream)
+    _execute(
+        summary_db,
+        """
+        INSERT INTO judgments (id, user_id, stock_code, candidate, status, created_at, updated_at)
+        VALUES ('j1', 'u1', '600519.SH', 'A', 'active', 'x', 'x')
+        """,
+    )
+
+    summaries = service._batch_generate_summaries(["600519.SH", "000001.SZ"], ASOF)
+
+    assert [s.name for s in summaries] == ["名称600519.SH", "名称000001.SZ"]
+    assert summaries[0].trend.strength == 70
+    # 判断状态读出时按当前记录覆盖
+    assert summaries[0].judgement.candidate == "A"
+    assert summaries[1].judgement.has_active is False
+
+    fast = WatchlistService()
+    watchlist_summary_cache.clear()
+    fast_items = fast._batch_generate_summaries_fast(["000001.SZ"], ASOF)
+    assert fast_items[0].is_skeleton is False
+
+
+def test_on_demand_build_is_persisted_without_overlay_fields(summary_db, monkeypatch):
+    service = WatchlistService()
+    calls = []
+    _fake_upstream(monkeypatch, service, calls)
+
+    summary = service._batch_generate_summaries(["600519"], ASOF)[0]
+    summary.weight_pct = 30.0
+    summary.on_risk_list = True
+
+    stored = watchlist_summary_store.get_many(["600519.SH"], ASOF)["600519.SH"]
+    assert stored.weight_pct is None
+    assert stored.on_risk_list is False
+    assert len(calls) == 1
+
+
+def test_intraday_refresh_updates_price_columns_only(summary_db, monkeypatch):
+    service = WatchlistService()
+    _fake_upstream(monkeypatch, service, [])
+    service._batch_generate_summaries(["600519.SH", "000001.SZ"], ASOF)
+
+    quote_date = datetime.strptime(ASOF, "%Y-%m-%d").strftime("%Y-%m-%d")
+    quotes = {
+        "600519.SH": {"price": 12.0, "prev_close": 10.0, "trade_date": quote_date},
+        "000001.SZ": {"price": 9.0, "prev_close": 9.0, "trade_date": "2026-06-17"},  # 停牌/旧报价
+    }
+    monkeypatch.setattr(realtime_quote, "prefetch_quotes", lambda codes: len(codes))
+    monkeypatch.setattr(realtime_quote, "get_quote", lambda code: quotes[code])
+
+    result = service.refresh_materialized_prices(asof=ASOF)
+
+    assert result == {"asof": ASOF, "codes": 2, "updated": 1}
+    stored = watchlist_summary_store.get_many(["600519.SH", "000001.SZ"], ASOF)
+    assert stored["600519.SH"].price == 12.0
+    assert stored["600519.SH"].change_pct == pytest.approx(0.2)
+    assert stored["600519.SH"].trend.strength == 70
+    assert stored["000001.SZ"].price == 10.0
+    # 进程内缓存失效，下次读取拿到新价格
+    assert watchlist_summary_cache.get("600519.SH", ASOF) is None
+
+
+def test_background_refresh_rebuilds_stale_intraday_rows(summary_db, monkeypatch):
+    service = WatchlistService()
+    _fake_upstream(monkeypatch, service, [])
+    service._batch_generate_summaries(["600519.SH"], ASOF)
+
+    def trend(strength):
+        monkeypatch.setattr(
+            service, "_build_trend",
+            lambda ts_code, asof: TrendResult(direction="up", strength=strength, degraded=False, evidence=[]),
+        )
+
+    # 刚现算的行在 TTL 内直接复用
+    trend(40)
+    assert service._load_or_build_summary("600519.SH", ASOF).trend.strength == 70
+
+    # 盘中现算行超过 TTL：后台刷新重新计算并写回，而不是读回旧行
+    _execute(summary_db, "UPDATE watchlist_item_summaries SET built_at = '2026-06-18T09:40:00'")
+    assert service._load_or_build_summary("600519.SH", ASOF).trend.strength == 40
+    assert watchlist_summary_store.get_many(["600519.SH"], ASOF)["600519.SH"].trend.strength == 40
+
+    # 盘后物化行是当日终值，不论 built_at 都直接读
+    _execute(
+        summary_db,
+        "UPDATE watchlist_item_summaries SET built_at = '2026-06-18T17:10:00', source = 'post_close'",
+    )
+    trend(10)
+    assert service._load_or_build_summary("600519.SH", ASOF).trend.strength == 40
+
+
+def test_store_reads_degrade_to_miss_without_table(isolated_db):
+    assert watchlist_summary_store.get_many(["600519.SH"], ASOF) == {}
@@ -0,0 +1,167 @@
+"""写队列：多次小写入合并为少量事务、单条失败只回滚自己、按 key 合并、停止前落盘、读自己写、写连接按 LRU 淘汰。"""
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from database.db_factory import DatabaseFactory
+from database.write_queue import GroupCommitWriter, write_queue
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _events_db(tmp_path, name="writes.db") -> Path:
+    db_path = tmp_path / name
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)")
+    DatabaseFactory.initialize(str(db_path))
+    return db_path
+
+
+def _insert(name):
+    def op(cursor):
+        cursor.execute("INSERT INTO events (name) VALUES (?)", (name,))
+    return op
+
+
+def _names(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return sorted(r[0] for r in conn.execute("SELECT name FROM events"))
+
+
+def test_concurrent_writes_share_few_commits(tmp_path):
+    db_path = _events_db(tmp_path)
+    writer = GroupCommitWriter(flush_ms=200, max_batch=50)
+
+    def worker(i):
+        for j in range(20):
+            writer.submit(_insert(f"e{i}-{j}"), label="events")
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert writer.flush()
+    stats = writer.stats()
+    writer.stop()
+
+    assert len(_names(db_path)) == 120
+    assert stats["committed"] == 120 and stats["pending"] == 0
+    assert stats["batches"] <= 4
+    assert stats["max_batch_size"] <= 50
+
+
+def test_failed_write_rolls_back_only_itself(tmp_path):
+    db_path = _events_db(tmp_path)
+    writer = GroupCommitWriter(flush_ms=200)
+
+    def boom(cursor):
+        cursor.execute("INSERT INTO events (name) VALUES ('partial')")
+        raise ValueError("boom")
+
+    writer.submit(_insert("a"))
+    writer.submit(boom, label="boom")
+    writer.submit(_insert("a"))  # UNIQUE 冲突
+    writer.submit(_insert("b"))
+    writer.flush()
+    stats = writer.stats()
+    writer.stop()
+
+    assert _names(db_path) == ["a", "b"]
+    assert stats["failed"] == 2 and stats["batches"] == 1
+
+
+def test_coalesced_key_keeps_only_latest_pending_write(tmp_path):
+    db_path = _events_db(tmp_path)
+    writer = GroupCommitWriter(flush_ms=500)
+
+    for name in ("v1", "v2", "v3"):
+        writer.submit(_insert(name), key=("state", "job"), coalesce=True)
+    assert writer.has_pending(("state", "job"))
+    writer.flush()
+    stats = writer.stats()
+    writer.stop()
+
+    assert _names(db_path) == ["v3"]
+    assert stats["coalesced"] == 2
+    assert not writer.has_pending(("state", "job"))
+
+
+def test_stop_drains_queue_then_writes_inline(tmp_path):
+    db_path = _events_db(tmp_path)
+    writer = GroupCommitWriter(flush_ms=10_000)
+
+    writer.submit(_insert("queued"))
+    writer.stop()
+    writer.submit(_insert("after_stop"))
+
+    assert _names(db_path) == ["after_stop", "queued"]
+
+
+def test_writes_follow_the_database_they_were_submitted_for(tmp_path):
+    first = _events_db(tmp_path, "first.db")
+    writer = GroupCommitWriter(flush_ms=10_000)
+    writer.submit(_insert("first"))
+    second = _events_db(tmp_path, "second.db")
+    writer.submit(_insert("second"))
+    writer.stop()
+
+    assert _names(first) == ["first"]
+    assert _names(second) == ["second"]
+
+
+def _migrated(tmp_path, monkeypatch) -> Path:
+    db_path = tmp_path / "stocks.db"
+    monkeypatch.setenv("DB_PATH", str(db_path))
+    original_cwd = os.getcwd()
+    os.chdir(REPO_ROOT)
+    try:
+        from scripts.run_migrations import run_migrations
+
+        run_migrations()
+    finally:
+        os.chdir(original_cwd)
+    DatabaseFactory.initialize(str(db_path))
+    return db_path
+
+
+def test_writer_evicts_least_recently_used_connection(tmp_path, monkeypatch):
+    import database.write_queue as wq
+
+    monkeypatch.setattr(wq, "_MAX_WRITER_CONNECTIONS", 2)
+    writer = GroupCommitWriter()
+    paths = [str(_events_db(tmp_path, f"db{i}.db")) for i in range(3)]
+    hot = writer._writer_connection(paths[0])
+    writer._writer_connection(paths[1])
+    writer._writer_connection(paths[0])
+    writer._writer_connection(paths[2])
+
+    # db0 刚用过，被关闭的应是最久未用的 db1
+    assert list(writer._connections) == [paths[0], paths[2]]
+    assert writer._writer_connection(paths[0]) is hot
+    for conn in writer._connections.values():
+        conn.close()
+
+
+def test_queued_analysis_is_visible_to_quota_and_reward_check(tmp_path, monkeypatch):
+    from services.invite_service import InviteService
+    from services.quota_service import QuotaService
+    from services.user_service import UserService
+
+    db_path = _migrated(tmp_path, monkeypatch)
+    users = UserService(db_path=str(db_path))
+    invites = InviteService(db_path=str(db_path))
+    quota = QuotaService(db_path=str(db_path))
+    inviter = users.get_or_create_user_by_identity(identity_type="anonymous", identity_value="inviter")
+    invitee = users.get_or_create_user_by_identity(identity_type="anonymous", identity_value="invitee")
+    code = invites.generate_invite_code(inviter)["invite_code"]
+    invites.record_invite_acceptance(invitee, code)
+
+    assert quota.queue_analyses(invitee, ["600519.SH", "600519.SH"]) == 1
+    assert invites.queue_reward_check(invitee_id=invitee)
+
+    # 额度读取先 barrier：不需要显式 flush 也能读到刚入队的写入
+    assert quota.get_quota_status(invitee)["used_quota"] == 1
+    assert quota.get_quota_status(inviter)["invite_quota"] == InviteService.REWARD_QUOTA
+    assert write_queue.pending() == 0
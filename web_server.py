@@ -16,7 +16,7 @@ from services.search_snapshot_service import SearchSnapshotService
 from services.market_overview_service import MarketOverviewService
 import asyncio
 import httpx
-from services.quota_service import QuotaService
+from services.quota_service import QuotaReservation, quota_ledger
 from services.analyze_rate_limiter import check_analyze_rate_limit
 from services.invite_service import InviteService
 from services.user_service import UserService
@@ -27,6 +27,11 @@ from services.journal_due_scheduler import start_journal_due_scheduler
 from services.analyze_slo_tracker import analyze_slo_tracker
 from services.job_health_tracker import job_health_tracker
 from services.llm_usage_service import llm_usage_service
+from services.scheduler_leader import scheduler_leader
+from config.database import DatabaseConfig
+from database.async_db import db_coroutine, db_executor, run_db
+from database.pagination import CursorError
+from database.write_queue import write_queue
 from auth.dependencies import (
     require_login,
     create_user_token,
@@ -119,16 +124,11 @@ async def startup_event():
         job_health_tracker.record_failure("startup_migrations", str(e))
         logger.error(f"[Startup] Failed to run migrations: {e}")
         
-    start_verification_scheduler()
-    start_risk_stock_scheduler()
-    start_judgment_recap_scheduler()
-    start_journal_due_scheduler()
-
-    from services.watchlist_signal_scheduler import start_watchlist_signal_scheduler
-    from services.search_snapshot_scheduler import start_search_snapshot_scheduler
+    from services.event_calendar_scheduler import start_event_calendar_scheduler
+    from services.db_maintenance_scheduler import CHECKPOINT_JOB_ID, MAINTENANCE_JOB_ID, RETENTION_JOB_ID
 
-    start_watchlist_signal_scheduler()
-    start_search_snapshot_scheduler()
+    # 事件日历是进程内索引，每个 worker 各自刷新；其余定时任务只在持有 leader 租约的 worker 上运行
+    start_event_calendar_scheduler()
 
     for scheduled_job in (
         "risk_stock_scheduler",
@@ -137,12 +137,82 @@ async def startup_event():
         "journal_due_scheduler",
         "watchlist_signal_scheduler",
         "search_snapshot_scheduler",
+        "event_calendar_scheduler",
+        "watchlist_summary_scheduler",
     ):
         job_health_tracker.ensure_registered(scheduled_job)
+    if DatabaseConfig.backend() == "sqlite" and DatabaseConfig.maintenance_enabled():
+        for scheduled_job in (CHECKPOINT_JOB_ID, MAINTENANCE_JOB_ID):
+            job_health_tracker.ensure_registered(scheduled_job)
+        if DatabaseConfig.retention_enabled():
+            job_health_tracker.ensure_registered(RETENTION_JOB_ID)
+
+    global _startup_loop
+    _startup_loop = asyncio.get_running_loop()
+    scheduler_leader.start(on_elected=_start_leader_schedulers, on_demoted=_stop_leader_schedulers)
 
-    asyncio.create_task(_refresh_search_snapshot_background())
-    asyncio.create_task(_refresh_risk_stocks_background())
     asyncio.create_task(_preload_industry_map_background())
+    asyncio.create_task(_refresh_event_calendar_background())
+
+
+# startup_event 所在的事件循环；leader 接管可能发生在心跳线程里，启动刷新需投递回该循环
+_startup_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _start_leader_schedulers() -> None:
+    """当选调度 leader（启动时或接管失联的 leader）：启动会写库 / 发邮件 / 写快照文件的定时任务"""
+    from services.watchlist_signal_scheduler import start_watchlist_signal_scheduler
+    from services.search_snapshot_scheduler import start_search_snapshot_scheduler
+    from services.watchlist_summary_scheduler import start_watchlist_summary_scheduler
+    from services.db_maintenance_scheduler import start_db_maintenance_scheduler
+
+    start_verification_scheduler()
+    start_risk_stock_scheduler()
+    start_judgment_recap_scheduler()
+    start_journal_due_scheduler()
+    start_watchlist_signal_scheduler()
+    start_search_snapshot_scheduler()
+    start_watchlist_summary_scheduler()
+    start_db_maintenance_scheduler()
+
+    if _startup_loop is not None and not _startup_loop.is_closed():
+        asyncio.run_coroutine_threadsafe(_refresh_search_snapshot_background(), _startup_loop)
+        asyncio.run_coroutine_threadsafe(_refresh_risk_stocks_background(), _startup_loop)
+
+
+def _stop_leader_schedulers() -> None:
+    """租约已被其它 worker 接管：停止本进程的定时任务（正在执行的一轮会跑完）"""
+    from services.db_maintenance_scheduler import DbMaintenanceScheduler
+    from services.journal_due_scheduler import JournalDueScheduler
+    from services.judgment_recap_scheduler import JudgmentRecapScheduler
+    from services.search_snapshot_scheduler import SearchSnapshotScheduler
+    from services.verification_scheduler import VerificationScheduler
+    from services.watchlist_signal_scheduler import WatchlistSignalScheduler
+    from services.watchlist_summary_scheduler import WatchlistSummaryScheduler
+
+    for scheduler in (
+        VerificationScheduler,
+        RiskStockScheduler,
+        JudgmentRecapScheduler,
+        JournalDueScheduler,
+        WatchlistSignalScheduler,
+        SearchSnapshotScheduler,
+        WatchlistSummaryScheduler,
+        DbMaintenanceScheduler,
+    ):
+        scheduler.stop()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release the scheduler lease, let in-flight DB work finish, then commit queued writes"""
+    await asyncio.to_thread(scheduler_leader.stop)
+    await asyncio.to_thread(db_executor.shutdown)
+    await asyncio.to_thread(write_queue.stop)
+    if DatabaseConfig.backend() == "postgres":
+        from database.pg_backend import pg_backend
+
+        await asyncio.to_thread(pg_backend.close)
 
 
 async def _preload_industry_map_background():
@@ -154,21 +224,30 @@ async def _preload_industry_map_background():
         logger.warning(f"[Startup] Failed to preload industry map: {e}")
 
 
+async def _refresh_event_calendar_background():
+    try:
+        from services.tushare.event_calendar import event_calendar
+
+        await asyncio.to_thread(event_calendar.refresh)
+    except Exception as e:
+        logger.warning(f"[Startup] Failed to refresh event calendar: {e}")
+
+
 async def _refresh_risk_stocks_background():
     try:
         await asyncio.to_thread(RiskStockScheduler.refresh_if_missing)
-        job_health_tracker.record_success("risk_stock_startup_refresh")
+        await run_db(job_health_tracker.record_success, "risk_stock_startup_refresh")
     except Exception as e:
-        job_health_tracker.record_failure("risk_stock_startup_refresh", str(e))
+        await run_db(job_health_tracker.record_failure, "risk_stock_startup_refresh", str(e))
         logger.warning(f"[Startup] Failed to refresh risk stock list: {e}")
 
 
 async def _refresh_search_snapshot_background():
     try:
         await asyncio.to_thread(search_snapshot_service.refresh_a_share_snapshot)
-        job_health_tracker.record_success("search_snapshot_refresh")
+        await run_db(job_health_tracker.record_success, "search_snapshot_refresh")
     except Exception as e:
-        job_health_tracker.record_failure("search_snapshot_refresh", str(e))
+        await run_db(job_health_tracker.record_failure, "search_snapshot_refresh", str(e))
         logger.warning(f"[Startup] Failed to refresh search snapshot: {e}")
 
 # 初始化异步服务
@@ -231,7 +310,8 @@ async def check_auth(user: UserContext = Depends(require_login)):
 
 # 获取系统配置
 @app.get("/api/config")
-async def get_config():
+@db_coroutine
+def get_config():
     """返回系统配置信息（含导航外链，供 NavBar 使用）"""
     announcement = os.getenv("ANNOUNCEMENT_TEXT") or ""
     nav_links: List[Dict[str, Any]] = []
@@ -269,9 +349,16 @@ async def health():
     def _ping_db():
         from database.sqlite_utils import configure_sqlite_connection
 
-        conn = sqlite3.connect(db_path, timeout=2.0)
+        postgres = DatabaseConfig.backend() == "postgres"
+        if postgres:
+            from database.pg_backend import pg_backend
+
+            conn = pg_backend.connect()
+        else:
+            conn = sqlite3.connect(db_path, timeout=2.0)
         try:
-            configure_sqlite_connection(conn)
+            if not postgres:
+                configure_sqlite_connection(conn)
             conn.execute("SELECT 1").fetchone()
         finally:
             conn.close()
@@ -319,9 +406,23 @@ async def health():
     except Exception as e:
         checks["email"] = f"fail: {type(e).__name__}"
 
-    scheduler_checks = job_health_tracker.snapshot_for_health()
+    scheduler_checks = await run_db(job_health_tracker.snapshot_for_health)
     checks["schedulers"] = scheduler_checks
-    degraded = job_health_tracker.is_degraded()
+    # 多 worker 时只有 leader 运行定时任务（仅展示，不影响 ok）
+    try:
+        checks["scheduler_leader"] = await run_db(scheduler_leader.status)
+    except Exception as e:
+        checks["scheduler_leader"] = f"fail: {type(e).__name__}"
+    degraded = await run_db(job_health_tracker.is_degraded)
+
+    # SQLite 维护：库/WAL 文件大小与最近一次检查点、夜间维护的耗时（仅展示，不影响 ok）
+    if DatabaseConfig.backend() == "sqlite":
+        try:
+            from services.db_maintenance_scheduler import maintenance_health
+
+            checks["db_maintenance"] = maintenance_health()
+        except Exception as e:
+            checks["db_maintenance"] = f"fail: {type(e).__name__}"
 
     # 3) 数据目录磁盘余量：日志/归档表写入路径阻塞是常见月度复发原因
     try:
@@ -353,6 +454,42 @@ async def analyze_slo_legacy(user: UserContext = Depends(require_login)):
     """Deprecated: use /api/admin/ops/summary with admin token."""
     return analyze_slo_tracker.snapshot()
     
+class _QuotaReleasingStreamingResponse(StreamingResponse):
+    """
+    响应拆除时归还未 commit 的额度预占
+
+    客户端在首包前断开时，Starlette 可能在 body 迭代器第一次 __anext__ 之前就取消 / 抛出 ClientDisconnect，
+    从未启动的 async generator 不会执行自己的 finally，所以归还不能只靠 generate_stream 的 finally。
+    release 幂等，已 commit 的预占不受影响。
+    """
+
+    def __init__(self, content, reservation: Optional[QuotaReservation], **kwargs):
+        super().__init__(content, **kwargs)
+        self.reservation = reservation
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await asyncio.shield(run_db(quota_ledger.release, self.reservation))
+
+
+def _record_analysis_completion(
+    reservation: Optional[QuotaReservation],
+    invite_service_instance: InviteService,
+    *,
+    user_id: str,
+    stock_codes: List[str],
+    is_authenticated: bool,
+    aguai_ref: Optional[str] = None,
+) -> None:
+    """分析完成后的额度、用量与邀请奖励写入，统一交给写队列合并提交（奖励判定排在分析记录之后）"""
+    quota_ledger.commit(reservation, stock_codes)
+    llm_usage_service.record_analyze(is_authenticated=is_authenticated, stock_count=len(stock_codes))
+    if aguai_ref:
+        invite_service_instance.queue_reward_check(invitee_id=user_id, referrer_id=aguai_ref)
+
+
 # AI分析股票
 @app.post("/api/analyze")
 async def analyze(
@@ -363,12 +500,12 @@ async def analyze(
     aguai_ref: Optional[str] = Cookie(None),
 ):
     slo_sample = analyze_slo_tracker.start()
+    reservation: Optional[QuotaReservation] = None
     try:
         logger.info("开始处理分析请求")
         stock_codes = request.stock_codes
         market_type = request.market_type
 
-        quota_service_instance = QuotaService()
         canonical_user_id = user.user_id
         client_host = http_request.client.host if http_request.client else "unknown"
 
@@ -383,9 +520,10 @@ async def analyze(
                     },
                 )
 
-            allowed, reason, details = quota_service_instance.check_quota_for_codes(
-                user_id=canonical_user_id,
-                stock_codes=stock_codes,
+            # 账本已加载时纯内存完成检查并预占；流失败或客户端断开时归还
+            allowed, reason, details, reservation = await quota_ledger.reserve(
+                canonical_user_id,
+                stock_codes,
                 is_authenticated=user.is_authenticated,
             )
             if not allowed:
@@ -415,7 +553,7 @@ async def analyze(
         logger.debug(f"接收到分析请求: stock_codes={stock_codes}, market_type={market_type}")
         
         # 创建分析器实例（使用服务端环境变量配置）
-        analyzer = StockAnalyzerService()
+        analyzer = await run_db(StockAnalyzerService)
         
         if not stock_codes:
             logger.warning("未提供股票代码")
@@ -545,25 +683,18 @@ async def analyze(
                     analyze_slo_tracker.add_chunk(slo_sample)
                     yield end_payload + '\n'
 
-                    # Record analysis consumption
-                    if canonical_user_id:
-                        quota_service_instance.record_analysis(
+                    # Record analysis consumption（超时视为失败，预占在 finally 中归还）
+                    if canonical_user_id and slo_sample.status != "timeout":
+                        await run_db(
+                            _record_analysis_completion,
+                            reservation,
+                            invite_service_instance,
                             user_id=canonical_user_id,
-                            stock_code=target_code
-                        )
-                        llm_usage_service.record_analyze(
+                            stock_codes=[target_code],
                             is_authenticated=user.is_authenticated,
-                            stock_count=1,
+                            aguai_ref=aguai_ref,
                         )
                         logger.info(f"Recorded analysis for user {canonical_user_id}, stock {target_code}")
-                    
-                        if aguai_ref:
-                            reward_result = invite_service_instance.check_and_reward_inviter(
-                                invitee_id=canonical_user_id,
-                                referrer_id=aguai_ref
-                            )
-                            if reward_result:
-                                logger.info(f"Invite reward granted: {reward_result}")
 
                 else:
                     # 批量分析流式处理
@@ -607,13 +738,13 @@ async def analyze(
                     yield end_payload + '\n'
 
                     if canonical_user_id:
-                        quota_service_instance.record_analyses(
+                        await run_db(
+                            _record_analysis_completion,
+                            reservation,
+                            invite_service_instance,
                             user_id=canonical_user_id,
                             stock_codes=resolved_codes,
-                        )
-                        llm_usage_service.record_analyze(
                             is_authenticated=user.is_authenticated,
-                            stock_count=len(resolved_codes),
                         )
                         logger.info(
                             f"Recorded batch analysis for user {canonical_user_id}, "
@@ -628,16 +759,22 @@ async def analyze(
                     "status": "error",
                 }, ensure_ascii=False)
                 yield error_payload + '\n'
+            finally:
+                # 未 commit 的预占（异常、超时、客户端断开）归还给账本；共享预占要写库，放到 DB 线程池，
+                # shield 保证生成器被取消时归还照样完成
+                await asyncio.shield(run_db(quota_ledger.release, reservation))
         
         logger.info("成功创建流式响应生成器")
-        return StreamingResponse(generate_stream(), media_type='application/json')
+        return _QuotaReleasingStreamingResponse(generate_stream(), reservation, media_type='application/json')
             
     except HTTPException:
+        await run_db(quota_ledger.release, reservation)
         if slo_sample.status == "running":
             analyze_slo_tracker.finish(slo_sample, "error")
         # Re-raise HTTPException (like 403 quota exceeded) without catching
         raise
     except Exception as e:
+        await run_db(quota_ledger.release, reservation)
         if slo_sample.status == "running":
             analyze_slo_tracker.finish(slo_sample, "error")
         error_msg = f"分析时出错: {str(e)}"
@@ -762,7 +899,7 @@ async def get_fund_detail(symbol: str, market_type: str = "ETF", user: UserConte
 @app.get("/api/kline/{code}")
 async def get_kline(code: str, market_type: str = "A", days: int = 100, user: UserContext = Depends(require_login)):
     try:
-        analyzer = StockAnalyzerService()
+        analyzer = await run_db(StockAnalyzerService)
         data = await analyzer.get_kline_data(code, market_type, days)
         return data
     except Exception as e:
@@ -783,20 +920,36 @@ async def get_market_overview(response: Response, user: UserContext = Depends(re
 
 # 获取文章列表 (分析专栏)
 @app.get("/api/articles")
-async def get_articles(limit: int = 20, offset: int = 0, q: str = None):
+async def get_articles(limit: int = 20, offset: int = 0, q: str = None, cursor: str = None):
+    """文章列表：优先用 next_cursor 翻页（keyset），offset 仅为兼容旧客户端保留"""
+    from services.archive_service import article_cursor
+
     try:
-        analyzer = StockAnalyzerService()
-        articles = await analyzer.archive_service.get_articles(limit, offset, q)
-        return {"articles": articles}
+        analyzer = await run_db(StockAnalyzerService)
+        articles = await analyzer.archive_service.get_articles(limit, offset, q, after=cursor)
+        next_cursor = article_cursor(articles[-1]) if articles and len(articles) >= limit else None
+        return {"articles": articles, "next_cursor": next_cursor}
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"获取文章列表出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# 全文检索文章（相关度排序 + 正文摘要）；须声明在 /api/articles/{article_id} 之前
+@app.get("/api/articles/search")
+async def search_articles(q: str, limit: int = 20, offset: int = 0):
+    from services.archive_service import ArchiveService
+
+    limit = max(1, min(int(limit), 50))
+    offset = max(0, int(offset))
+    articles = await ArchiveService().search_articles(q, limit=limit, offset=offset)
+    return {"articles": articles}
+
 # 获取单篇文章详情
 @app.get("/api/articles/{article_id}")
 async def get_article_detail(article_id: int):
     try:
-        analyzer = StockAnalyzerService()
+        analyzer = await run_db(StockAnalyzerService)
         article = await analyzer.archive_service.get_article_by_id(article_id)
         if not article:
             raise HTTPException(status_code=404, detail="文章不存在")
@@ -826,7 +979,7 @@ async def stock_landing_page(stock_code: str, request: Request):
 
 
 @app.get("/stocks")
-async def stock_index_page(page: int = 1):
+def stock_index_page(page: int = 1):
     from services.stock_page_service import StockPageService
 
     html_content = StockPageService(base_url="https://aguai.net").render_stock_index_page(page=page)
@@ -1014,4 +1167,8 @@ else:
 
 if __name__ == '__main__':
     reload_enabled = os.getenv("UVICORN_RELOAD", "false").lower() == "true"
-    uvicorn.run("web_server:app", host="0.0.0.0", port=8888, reload=reload_enabled)
+    # WEB_WORKERS>1 时每个 worker 各自跑 startup_event，定时任务由 leader 租约保证只在一个 worker 上执行；
+    # reload 模式只支持单进程；实际进程数写回环境变量，worker 据此决定额度预占是否走数据库
+    workers = 1 if reload_enabled else max(1, int(os.getenv("WEB_WORKERS", "1")))
+    os.environ["WEB_WORKERS"] = str(workers)
+    uvicorn.run("web_server:app", host="0.0.0.0", port=8888, reload=reload_enabled, workers=workers)